@@ -0,0 +1,203 @@
+"""
+知识图谱分析路由
+提供实体路径查询、统计信息和流式导出等分析类API，与列表查询共用依赖注入、异常处理和响应缓存
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Optional, List
+from datetime import datetime
+
+from app.api.kg_route_utils import (
+    IF_NONE_MATCH_DESCRIPTION, cached_json, get_query_service, handle_service_exception
+)
+from app.services.kg_query_service import KGQueryService
+from app.services.kg_export_service import KGExportService
+from app.database.manager import get_session
+from app.llm.rate_limiter import get_llm_rate_limiter
+from app.llm.response_cache import get_llm_response_cache
+from app.store.response_cache_manage import get_response_cache_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 创建路由器
+router = APIRouter(prefix="/api/kg", tags=["知识图谱分析"], default_response_class=ORJSONResponse)
+
+# 路径查询结果依赖的数据表（任一表写入后缓存和ETag失效）
+PATH_TABLES = ("entities", "relations")
+
+
+# ==================== 路径查询API ====================
+
+@router.get("/paths", summary="查询两个实体之间的路径")
+async def find_paths(
+    from_id: int = Query(..., alias="from", description="起点实体ID"),
+    to_id: int = Query(..., alias="to", description="终点实体ID"),
+    max_hops: int = Query(4, ge=1, le=6, description="最大跳数"),
+    relation_types: Optional[List[str]] = Query(None, description="关系类型过滤"),
+    top_k: int = Query(5, ge=1, le=50, description="最多返回的路径数量"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    query_service: KGQueryService = Depends(get_query_service)
+):
+    """
+    查询两个实体之间的最短路径（双向广度优先搜索）
+    
+    返回数据：
+    - paths: 最多top_k条最短路径，每条包含实体ID序列和途经的关系
+    - nodes: 路径上的实体信息
+    - metadata: 最短路径长度、扫描边数、是否因边预算或超时提前停止（stopped_by）
+    """
+    params = {
+        "from_id": from_id,
+        "to_id": to_id,
+        "max_hops": max_hops,
+        "relation_types": relation_types,
+        "top_k": top_k
+    }
+    
+    async def compute():
+        result = await query_service.find_paths(**params)
+        if result is None:
+            raise HTTPException(status_code=404, detail="起点或终点实体不存在")
+        return result
+    
+    try:
+        return await cached_json("paths", params, PATH_TABLES, compute, if_none_match)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await handle_service_exception("查询实体路径", e)
+
+
+# ==================== 统计分析API ====================
+
+@router.get("/statistics/overview", summary="获取知识图谱概览统计")
+async def get_kg_statistics(
+    query_service: KGQueryService = Depends(get_query_service)
+):
+    """
+    获取知识图谱的概览统计信息
+    
+    返回：
+    - 实体总数和类型分布
+    - 关系总数和类型分布
+    - 新闻总数
+    - 实体-新闻关联总数
+    """
+    try:
+        # 这里可以扩展实现更详细的统计功能
+        # 暂时返回基础统计，后续可以在KGQueryService中添加专门的统计方法
+        
+        # 示例实现思路：
+        # 1. 查询实体总数和按类型分组
+        # 2. 查询关系总数和按类型分组
+        # 3. 查询新闻总数
+        # 4. 查询实体-新闻关联总数
+        
+        return {
+            "message": "统计功能开发中",
+            "available_endpoints": [
+                "/api/kg/entities",
+                "/api/kg/relations",
+                "/api/kg/entities/{id}/neighbors",
+                "/api/kg/entities/{id}/news",
+                "/api/kg/entities/common-news",
+                "/api/kg/news/{id}/entities",
+                "/api/kg/export",
+                "/api/kg/statistics/cache",
+                "/api/kg/statistics/llm",
+                "/api/kg/health"
+            ]
+        }
+    except Exception as e:
+        logger.error(f"获取统计信息失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
+
+
+@router.get("/statistics/cache", summary="获取查询响应缓存统计")
+async def get_cache_statistics():
+    """
+    获取查询响应缓存的运行状态
+    
+    返回：
+    - backend: 缓存后端（memory或redis）
+    - entries / memory_bytes: 内存后端的条目数和占用字节数
+    - hits / misses / hit_ratio: 命中统计
+    - evictions: LRU淘汰次数
+    - versions: 本进程记录的各数据表版本号
+    """
+    return get_response_cache_manager().get_stats()
+
+
+@router.get("/statistics/llm", summary="获取大模型调用限流和响应缓存统计")
+async def get_llm_statistics():
+    """
+    获取大模型调用限流器的运行状态（按模型）和响应缓存的命中统计
+    
+    返回：
+    - concurrency_limit / in_flight / waiting: 当前自适应并发数、进行中和排队中的请求数
+    - requests / throttled: 请求数和收到429的次数
+    - paused_seconds: 按Retry-After暂停的剩余时间
+    - queue_time_avg / queue_time_p50 / queue_time_p99 / queue_time_max: 排队时间（秒）
+    - rpm_available / tpm_available: 令牌桶中剩余的请求数和token数（未限制时为null）
+    - response_cache: 响应缓存的条目数、命中次数和命中率（hits / misses / hit_rate，另按提示词键统计）、
+      命中节省的大模型调用时间（saved_latency，秒）和token数（saved_tokens）
+    """
+    stats = get_llm_rate_limiter().get_stats()
+    stats["response_cache"] = get_llm_response_cache().get_stats()
+    return stats
+
+
+# ==================== 图谱导出API ====================
+
+@router.get("/export", summary="流式导出知识图谱")
+async def export_graph(
+    types: Optional[List[str]] = Query(None, description="导出类型：entities、relations、news_entities，默认全部"),
+    updated_since: Optional[datetime] = Query(None, description="只导出此时间之后创建或更新的记录"),
+    export_format: str = Query(
+        "ndjson", alias="format", pattern="^(ndjson|columnar)$",
+        description="ndjson为每行一条记录，columnar为每行一批记录的并行数组"
+    ),
+    batch_size: int = Query(
+        KGExportService.DEFAULT_BATCH_SIZE, ge=100, le=10000, description="每批读取的记录数"
+    )
+):
+    """
+    以NDJSON流式导出实体、关系和新闻-实体关联，用于下游分析
+    
+    数据通过服务端游标分批读取，不计算总数；首行meta中的exported_at
+    可作为下一次增量导出的updated_since，末行end记录各类型导出条数
+    """
+    try:
+        types = KGExportService.normalize_types(types)
+    except ValueError as e:
+        await handle_service_exception("导出知识图谱", e)
+    
+    async def generate():
+        # 导出会话随响应流结束而关闭，不使用请求依赖的会话
+        async for session in get_session():
+            async for chunk in KGExportService(session).stream_export(
+                types, updated_since, export_format, batch_size
+            ):
+                yield chunk
+    
+    # 两种格式都是每行一个JSON文档（columnar每行一批记录），逐批写出，均按NDJSON返回
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+# ==================== 路由注册 ====================
+
+def register_routes(app):
+    """
+    注册知识图谱分析路由
+    
+    在main.py中使用：
+    ```python
+    from app.api.kg_analysis_routes import register_routes
+    
+    # 注册路由
+    register_routes(app)
+    ```
+    """
+    app.include_router(router)
@@ -3,42 +3,34 @@
 展示如何将KGQueryService集成到FastAPI应用中
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from typing import Optional, List
 from datetime import datetime
 
+from app.api.kg_route_utils import (
+    IF_NONE_MATCH_DESCRIPTION, cached_json, get_query_service, handle_service_exception
+)
 from app.services.kg_query_service import KGQueryService
-from app.database.manager import get_session
+from app.store.vector_breaker_manage import get_vector_breaker_manager
 from app.utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
 # 创建路由
-router = APIRouter(prefix="/api/kg", tags=["知识图谱查询"])
+# 未经缓存直接返回的结果也使用orjson序列化
+router = APIRouter(prefix="/api/kg", tags=["知识图谱查询"], default_response_class=ORJSONResponse)
 
 
-# ==================== 依赖注入和工具函数 ====================
-
-async def get_query_service() -> KGQueryService:
-    """获取查询服务实例"""
-    async for session in get_session():
-        return KGQueryService(session)
-
-
-async def handle_service_exception(operation: str, e: Exception) -> None:
-    """统一处理服务层异常"""
-    logger.error(f"{operation}失败: {e}", extra={
-        "operation": operation,
-        "error_type": type(e).__name__,
-        "error_message": str(e)
-    })
-    
-    if isinstance(e, HTTPException):
-        raise e
-    elif isinstance(e, ValueError):
-        raise HTTPException(status_code=400, detail=f"{operation}参数错误: {str(e)}")
-    else:
-        raise HTTPException(status_code=500, detail=f"{operation}失败: {str(e)}")
+# 各缓存接口依赖的数据表，任一表写入后对应缓存和ETag失效
+ENTITY_LIST_TABLES = ("entities", "entity_stats")
+# 属性表目前只在删除实体时随之删除（HybridStoreCore.delete_entity）
+ENTITY_DETAIL_TABLES = ("entities", "relations", "news_event_entity", "attributes")
+RELATION_LIST_TABLES = ("relations", "entities")
+NEIGHBOR_TABLES = ("entities", "relations", "entity_stats")
+ENTITY_NEWS_TABLES = ("news_events", "news_event_entity")
+NEWS_LIST_TABLES = ("news_events",)
+NEWS_ENTITY_TABLES = ("entities", "news_event_entity", "entity_stats")
 
 
 # ==================== 实体相关API ====================
@@ -49,8 +41,11 @@ async def get_entities(
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     entity_type: Optional[str] = Query(None, description="实体类型过滤"),
-    sort_by: str = Query("created_at", description="排序字段"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$", description="排序方向"),
+    sort_by: str = Query("created_at", description="排序字段，importance表示按实体重要性排序"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的next_cursor，提供时忽略page）"),
+    exact_count: bool = Query(False, description="是否精确计算总数（默认返回缓存总数）"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
@@ -58,24 +53,33 @@ async def get_entities(
     
     返回统一的分页格式：
     - items: 实体数据列表
-    - total: 总数量
+    - total: 总数量（默认来自缓存，exact_count=true时精确计算）
     - page: 当前页码
     - page_size: 每页数量
     - total_pages: 总页数
+    - next_cursor: 下一页游标，深分页时建议使用游标代替page
+    - has_more: 是否还有下一页
+    - total_is_exact: 总数是否为本次精确计算
+    - total_is_stale: 总数是否为写入前的缓存值（正在后台重新计算）
     """
     logger.info(f"获取实体列表: page={page}, page_size={page_size}, search={search}, entity_type={entity_type}")
+    params = {
+        "page": page,
+        "page_size": page_size,
+        "search": search,
+        "entity_type": entity_type,
+        "sort_by": sort_by,
+        "sort_order": sort_order,
+        "cursor": cursor
+    }
     
-    try:
-        result = await query_service.get_entity_list(
-            page=page,
-            page_size=page_size,
-            search=search,
-            entity_type=entity_type,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
+    async def compute():
+        result = await query_service.get_entity_list(exact_count=exact_count, **params)
         logger.info(f"成功获取实体列表: {result['total']}个实体")
         return result
+    
+    try:
+        return await cached_json("entities", params, ENTITY_LIST_TABLES, compute, if_none_match, bypass=exact_count)
     except Exception as e:
         await handle_service_exception("获取实体列表", e)
 
@@ -83,6 +87,7 @@ async def get_entities(
 @router.get("/entities/{entity_id}", summary="获取实体详细信息")
 async def get_entity_detail(
     entity_id: int,
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
@@ -94,13 +99,18 @@ async def get_entity_detail(
     """
     logger.info(f"获取实体详情: entity_id={entity_id}")
     
-    try:
+    async def compute():
         result = await query_service.get_entity_detail(entity_id)
         if not result:
             logger.warning(f"实体不存在: entity_id={entity_id}")
             raise HTTPException(status_code=404, detail="实体不存在")
         logger.info(f"成功获取实体详情: {result['name']}")
         return result
+    
+    try:
+        return await cached_json(
+            "entity_detail", {"entity_id": entity_id}, ENTITY_DETAIL_TABLES, compute, if_none_match
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -116,24 +126,32 @@ async def get_relations(
     entity_id: Optional[int] = Query(None, description="实体ID过滤"),
     relation_type: Optional[str] = Query(None, description="关系类型过滤"),
     search: Optional[str] = Query(None, description="搜索关键词"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的next_cursor，提供时忽略page）"),
+    exact_count: bool = Query(False, description="是否精确计算总数（默认返回缓存总数）"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
     获取关系列表，支持按实体和关系类型过滤
     
-    返回关系数据，包含源实体和目标实体的详细信息
+    返回关系数据，包含源实体和目标实体的详细信息，支持游标分页
     """
+    params = {
+        "page": page,
+        "page_size": page_size,
+        "entity_id": entity_id,
+        "relation_type": relation_type,
+        "search": search,
+        "cursor": cursor
+    }
+    
+    async def compute():
+        return await query_service.get_relation_list(exact_count=exact_count, **params)
+    
     try:
-        return await query_service.get_relation_list(
-            page=page,
-            page_size=page_size,
-            entity_id=entity_id,
-            relation_type=relation_type,
-            search=search
-        )
+        return await cached_json("relations", params, RELATION_LIST_TABLES, compute, if_none_match, bypass=exact_count)
     except Exception as e:
-        logger.error(f"获取关系列表失败: {e}")
-        raise HTTPException(status_code=500, detail=f"获取关系列表失败: {str(e)}")
+        await handle_service_exception("获取关系列表", e)
 
 
 # ==================== 网络分析API ====================
@@ -144,28 +162,43 @@ async def get_entity_neighbors(
     depth: int = Query(2, ge=1, le=5, description="遍历深度"),
     relation_types: Optional[List[str]] = Query(None, description="关系类型过滤"),
     max_entities: int = Query(100, ge=1, le=500, description="最大实体数量"),
+    response_format: str = Query(
+        "records", alias="format", pattern="^(records|columnar)$",
+        description="返回格式：records为节点/边对象列表，columnar为并行数组"
+    ),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
     获取实体的邻居网络，适合图可视化展示
     
-    返回图数据格式：
+    返回图数据格式（format=records）：
     - nodes: 实体节点列表
     - edges: 关系边列表
     - metadata: 网络统计信息
+    
+    format=columnar 时返回紧凑的列式数据，可直接用于D3绘图：
+    - nodes: {id, name, type, level} 等长数组，type为实体类型编码
+    - edges: {source, target, predicate} 等长数组，predicate为关系类型编码
+    - dictionaries: {type, predicate} 编码对应的名称列表（编码即下标）
+    - metadata: 网络统计信息
     """
-    try:
-        result = await query_service.get_entity_neighbors(
-            entity_id=entity_id,
-            depth=depth,
-            relation_types=relation_types,
-            max_entities=max_entities
-        )
-        
-        if not result["nodes"]:
+    params = {
+        "entity_id": entity_id,
+        "depth": depth,
+        "relation_types": relation_types,
+        "max_entities": max_entities,
+        "response_format": response_format
+    }
+    
+    async def compute():
+        result = await query_service.get_entity_neighbors(**params)
+        if not result["metadata"]["total_nodes"]:
             raise HTTPException(status_code=404, detail="实体不存在或无关联数据")
-            
         return result
+    
+    try:
+        return await cached_json("neighbors", params, NEIGHBOR_TABLES, compute, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
@@ -182,24 +215,34 @@ async def get_entity_news(
     page_size: int = Query(10, ge=1, le=50, description="每页数量"),
     start_date: Optional[datetime] = Query(None, description="开始日期"),
     end_date: Optional[datetime] = Query(None, description="结束日期"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的next_cursor，提供时忽略page）"),
+    exact_count: bool = Query(False, description="是否精确计算总数（默认返回缓存总数）"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
     获取实体关联的新闻，支持时间范围过滤
     
-    返回分页的新闻数据，包含新闻的基本信息
+    返回分页的新闻数据，包含新闻的基本信息，支持游标分页
     """
+    params = {
+        "entity_id": entity_id,
+        "page": page,
+        "page_size": page_size,
+        "start_date": start_date,
+        "end_date": end_date,
+        "cursor": cursor
+    }
+    
+    async def compute():
+        return await query_service.get_entity_news(exact_count=exact_count, **params)
+    
     try:
-        return await query_service.get_entity_news(
-            entity_id=entity_id,
-            page=page,
-            page_size=page_size,
-            start_date=start_date,
-            end_date=end_date
+        return await cached_json(
+            "entity_news", params, ENTITY_NEWS_TABLES, compute, if_none_match, bypass=exact_count
         )
     except Exception as e:
-        logger.error(f"获取实体关联新闻失败: {e}")
-        raise HTTPException(status_code=500, detail=f"获取实体关联新闻失败: {str(e)}")
+        await handle_service_exception("获取实体关联新闻", e)
 
 
 @router.post("/entities/common-news", summary="获取多个实体的共同新闻")
@@ -207,22 +250,26 @@ async def get_common_news_for_entities(
     entity_ids: List[int] = Query(..., min_items=2, description="实体ID列表，至少2个"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=50, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的next_cursor，提供时忽略page）"),
+    min_match: Optional[int] = Query(None, ge=1, description="至少关联其中多少个实体（模糊共现），默认要求全部关联"),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
     获取多个实体共同关联的新闻
     
-    返回这些实体都关联的新闻，适合分析实体间的关联强度
+    默认返回这些实体都关联的新闻；指定min_match时返回至少关联其中min_match个实体的新闻，
+    每条新闻附带命中的实体数量（matched_entities），适合分析实体间的关联强度
     """
     try:
         return await query_service.get_common_news_for_entities(
             entity_ids=entity_ids,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            min_match=min_match
         )
     except Exception as e:
-        logger.error(f"获取多实体共同新闻失败: {e}")
-        raise HTTPException(status_code=500, detail=f"获取多实体共同新闻失败: {str(e)}")
+        await handle_service_exception("获取多实体共同新闻", e)
 
 
 # ==================== 新闻列表查询API ====================
@@ -236,7 +283,10 @@ async def get_news_list(
     start_date: Optional[datetime] = Query(None, description="开始日期"),
     end_date: Optional[datetime] = Query(None, description="结束日期"),
     sort_by: str = Query("publish_time", description="排序字段"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$", description="排序方向"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页的next_cursor，提供时忽略page）"),
+    exact_count: bool = Query(False, description="是否精确计算总数（默认返回缓存总数）"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
@@ -244,26 +294,35 @@ async def get_news_list(
     
     返回统一的分页格式：
     - items: 新闻数据列表
-       - total: 总数量
+       - total: 总数量（默认来自缓存，exact_count=true时精确计算）
     - page: 当前页码
     - page_size: 每页数量
     - total_pages: 总页数
+    - next_cursor: 下一页游标
+    - has_more: 是否还有下一页
+    - total_is_exact: 总数是否为本次精确计算
+    - total_is_stale: 总数是否为写入前的缓存值（正在后台重新计算）
     """
     logger.info(f"获取新闻列表: page={page}, page_size={page_size}, search={search}, source={source}")
+    params = {
+        "page": page,
+        "page_size": page_size,
+        "search": search,
+        "source": source,
+        "start_date": start_date,
+        "end_date": end_date,
+        "sort_by": sort_by,
+        "sort_order": sort_order,
+        "cursor": cursor
+    }
     
-    try:
-        result = await query_service.get_news_list(
-            page=page,
-            page_size=page_size,
-            search=search,
-            source=source,
-            start_date=start_date,
-            end_date=end_date,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
+    async def compute():
+        result = await query_service.get_news_list(exact_count=exact_count, **params)
         logger.info(f"成功获取新闻列表: {result['total']}条新闻")
         return result
+    
+    try:
+        return await cached_json("news", params, NEWS_LIST_TABLES, compute, if_none_match, bypass=exact_count)
     except Exception as e:
         await handle_service_exception("获取新闻列表", e)
 
@@ -334,24 +393,24 @@ async def get_news_entities(
     news_id: int,
     entity_type: Optional[str] = Query(None, description="实体类型过滤"),
     limit: int = Query(50, ge=1, le=200, description="返回实体数量限制"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     query_service: KGQueryService = Depends(get_query_service)
 ):
     """
-    获取新闻相关的实体，按相关性排序
+    获取新闻相关的实体，按重要性（PageRank）和新闻提及次数排序
     
-    返回相关实体列表，包含相关性评分
+    返回相关实体列表，每个实体包含importance和news_count，confidence为null
     """
-    try:
-        result = await query_service.get_news_entities(
-            news_id=news_id,
-            entity_type=entity_type,
-            limit=limit
-        )
-        
+    params = {"news_id": news_id, "entity_type": entity_type, "limit": limit}
+    
+    async def compute():
+        result = await query_service.get_news_entities(**params)
         if not result["entities"]:
             raise HTTPException(status_code=404, detail="新闻不存在或无关联实体")
-            
         return result
+    
+    try:
+        return await cached_json("news_entities", params, NEWS_ENTITY_TABLES, compute, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
@@ -359,45 +418,22 @@ async def get_news_entities(
         raise HTTPException(status_code=500, detail=f"获取新闻相关实体失败: {str(e)}")
 
 
-# ==================== 统计分析API ====================
-
-@router.get("/statistics/overview", summary="获取知识图谱概览统计")
-async def get_kg_statistics(
-    query_service: KGQueryService = Depends(get_query_service)
-):
+@router.get("/health", summary="获取服务健康状态")
+async def get_health():
     """
-    获取知识图谱的概览统计信息
+    获取服务健康状态和向量存储熔断器状态
     
     返回：
-    - 实体总数和类型分布
-    - 关系总数和类型分布
-    - 新闻总数
-    - 实体-新闻关联总数
+    - status: healthy；向量存储熔断中（或正在探测）时为degraded，此时实体搜索按名称精确匹配、
+      新闻搜索按内容关键词搜索，向量写操作进入待重放队列
+    - vector_breaker: 熔断器状态（state）、最近调用的失败比例和慢调用比例、熔断次数（trips）、
+      被拒绝的调用数（rejected）、超时次数（timeouts）、待重放队列长度（outbox_depth）
     """
-    try:
-        # 这里可以扩展实现更详细的统计功能
-        # 暂时返回基础统计，后续可以在KGQueryService中添加专门的统计方法
-        
-        # 示例实现思路：
-        # 1. 查询实体总数和按类型分组
-        # 2. 查询关系总数和按类型分组
-        # 3. 查询新闻总数
-        # 4. 查询实体-新闻关联总数
-        
-        return {
-            "message": "统计功能开发中",
-            "available_endpoints": [
-                "/api/kg/entities",
-                "/api/kg/relations",
-                "/api/kg/entities/{id}/neighbors",
-                "/api/kg/entities/{id}/news",
-                "/api/kg/entities/common-news",
-                "/api/kg/news/{id}/entities"
-            ]
-        }
-    except Exception as e:
-        logger.error(f"获取统计信息失败: {e}")
-        raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
+    breaker = get_vector_breaker_manager().get_stats()
+    return {
+        "status": "healthy" if breaker["state"] == "closed" else "degraded",
+        "vector_breaker": breaker
+    }
 
 
 # ==================== 错误处理示例 ====================
@@ -0,0 +1,105 @@
+"""
+知识图谱路由公共工具
+查询服务的依赖注入、服务层异常到HTTP错误的转换、orjson响应序列化，以及基于数据表版本号的ETag和响应缓存
+"""
+
+import orjson
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.services.kg_query_service import KGQueryService
+from app.database.manager import get_session
+from app.store.response_cache_manage import get_response_cache_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# If-None-Match请求头参数说明
+IF_NONE_MATCH_DESCRIPTION = "上次响应的ETag，数据未变化时返回304"
+
+
+# ==================== 依赖注入和工具函数 ====================
+
+async def get_query_service() -> KGQueryService:
+    """获取查询服务实例"""
+    async for session in get_session():
+        return KGQueryService(session)
+
+
+async def handle_service_exception(operation: str, e: Exception) -> None:
+    """统一处理服务层异常"""
+    logger.error(f"{operation}失败: {e}", extra={
+        "operation": operation,
+        "error_type": type(e).__name__,
+        "error_message": str(e)
+    })
+    
+    if isinstance(e, HTTPException):
+        raise e
+    elif isinstance(e, ValueError):
+        raise HTTPException(status_code=400, detail=f"{operation}参数错误: {str(e)}")
+    else:
+        raise HTTPException(status_code=500, detail=f"{operation}失败: {str(e)}")
+
+
+def render_json(content: Any) -> bytes:
+    """
+    使用orjson序列化响应体
+    
+    datetime、numpy数值和非字符串键由orjson直接处理，不经过jsonable_encoder逐层转换；
+    其他类型（如Decimal、Pydantic模型）再交给jsonable_encoder
+    """
+    return orjson.dumps(
+        content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+async def cached_json(
+    route: str,
+    params: Dict[str, Any],
+    tables: Tuple[str, ...],
+    compute: Callable[[], Awaitable[Any]],
+    if_none_match: Optional[str] = None,
+    bypass: bool = False
+) -> Any:
+    """
+    通过ETag和响应缓存返回查询结果
+    
+    缓存键和ETag都由依赖数据表的当前版本号和请求参数生成：
+    客户端携带的ETag仍然有效时直接返回304，不查询也不序列化；
+    否则优先返回已序列化的缓存响应体，未命中时才执行查询。总数为写入前陈旧值的结果不缓存
+    
+    Args:
+        route: 路由标识
+        params: 影响结果的请求参数
+        tables: 结果依赖的数据表
+        compute: 未命中时执行查询的协程函数
+        if_none_match: If-None-Match请求头
+        bypass: 是否跳过ETag和缓存（如请求精确总数）
+        
+    Returns:
+        304响应、带ETag的JSON响应；跳过时返回原始结果
+    """
+    if bypass:
+        return await compute()
+    
+    cache = get_response_cache_manager()
+    key = cache.make_key(route, params, await cache.get_versions(tables))
+    etag = cache.make_etag(key)
+    # no-cache 要求浏览器每次携带ETag重新验证，而不是直接使用本地副本
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cache.etag_matches(if_none_match, etag):
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    
+    body = await cache.get(key) if cache.enabled else None
+    if body is None:
+        result = await compute()
+        body = render_json(result)
+        if isinstance(result, dict) and result.get("total_is_stale"):
+            # 总数还是写入前的值：不缓存也不返回ETag，避免后台重新计算完成后仍命中旧响应
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-cache"})
+        if cache.enabled:
+            await cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -34,6 +34,37 @@ class LLMConfig:
     max_tokens: int
 
 
+@dataclass
+class LLMRateLimitConfig:
+    """
+    大模型调用限流配置（按模型统计，同一进程中的客户端共用）
+    """
+    enabled: bool = True  # 是否启用限流（启用时由客户端统一退避，ChatOpenAI内部不再重试）
+    requests_per_minute: int = 0  # 每分钟请求数上限（RPM），0表示不限制
+    tokens_per_minute: int = 0  # 每分钟token数上限（TPM，按提示词估算值 + max_tokens预占，完成后按实际用量退还），0表示不限制
+    burst_seconds: float = 10.0  # 令牌桶容量对应的秒数，限制瞬时突发
+    initial_concurrency: int = 4  # 初始并发数
+    min_concurrency: int = 1  # 并发数下限
+    max_concurrency: int = 32  # 并发数上限
+    increase_step: float = 1.0  # 每完成约一轮（当前并发数个）成功请求后增加的并发数
+    decrease_factor: float = 0.5  # 收到429时并发数乘以该系数
+    default_retry_after: float = 2.0  # 429响应没有Retry-After时暂停发送的时间（秒）
+    models: Optional[Dict[str, Dict[str, Any]]] = None  # 模型名 -> 覆盖的限流参数
+
+
+@dataclass
+class LLMCacheConfig:
+    """
+    大模型响应缓存配置（按模型、采样参数和格式化后的提示词缓存，进程重启后仍有效）
+    """
+    enabled: bool = False  # 是否启用响应缓存
+    path: str = "./data/llm_cache.db"  # 缓存SQLite文件路径
+    ttl_seconds: int = 604800  # 缓存有效期（秒），0表示不过期
+    max_entries: int = 10000  # 最大缓存条目数，超过时淘汰最久未命中的条目
+    default_enabled: bool = False  # 未在prompt_keys中列出的提示词（以及未指定提示词键的调用）是否缓存
+    prompt_keys: Optional[Dict[str, bool]] = None  # 提示词键 -> 是否缓存
+
+
 @dataclass
 class DatabaseConfig:
     """数据库配置"""
@@ -139,6 +170,7 @@ class KnowledgeGraphConfig:
     filter_news_similarity_threshold: float
     max_entities_per_news: int
     entity_merging: EntityMergingConfig
+    streaming_extraction: bool = True  # 是否流式提取实体关系（实体生成完整就开始处理，与大模型生成同时进行）
 
 
     def get_categories_prompt(self):
@@ -168,6 +200,8 @@ class CacheConfig:
     ttl: int
     max_size: int
     redis: Dict[str, Any]
+    response_enabled: bool = True  # 是否缓存查询接口的响应
+    max_memory_mb: int = 64  # 内存后端响应缓存的内存上限（MB）
 
 
 @dataclass
@@ -185,6 +219,96 @@ class VectorSearchConfig:
     dimension: int = 1536  # 默认向量维度
     metric: str = "cosine"  # 距离度量方式，如 'cosine', 'euclidean', 'l2' 等
     embedding_model: Optional[str] = None  # 关联的嵌入模型名称
+    entity_type_collections: Optional[Dict[str, str]] = None  # 单独建集合的实体类型 -> 集合名后缀
+    index_type: str = "hnsw"  # ann后端的索引类型：flat / hnsw / ivf_pq
+    ann_engine: str = "auto"  # ann后端的引擎：auto（优先faiss）/ faiss / hnswlib
+    partition_key: Optional[str] = "type"  # ann后端按该元数据字段拆分子索引
+    hnsw_m: int = 16  # HNSW每个节点的连接数（chroma/ann后端）
+    hnsw_ef_construction: int = 200  # HNSW构建时的候选列表大小
+    hnsw_ef_search: int = 64  # HNSW搜索时的候选列表大小
+    ivf_nlist: int = 1024  # IVF聚类中心数
+    ivf_nprobe: int = 16  # IVF搜索时访问的聚类数
+    pq_m: int = 16  # PQ子空间数（需整除向量维度）
+    index_hnsw: Optional[Dict[str, Dict[str, int]]] = None  # 索引名（或后缀，如 'entity'） -> 覆盖的HNSW参数
+    compact_dimension: Optional[int] = None  # numpy/ann后端粗排使用的向量维度（截取前N维），为空时使用完整维度
+    quantization: str = "none"  # numpy/ann后端粗排向量的量化方式：none / float16 / int8
+    rerank_factor: int = 4  # 粗排取 top_k × rerank_factor 个候选后用完整向量精排
+    async_mode: bool = False  # chroma_remote后端的异步方法使用Chroma原生异步HTTP客户端
+    pool_max_connections: int = 16  # 异步模式下最多同时进行的请求数
+    pool_max_keepalive: Optional[int] = None  # 异步模式下保持的空闲连接数，为空时与pool_max_connections相同
+    operation_timeouts: Optional[Dict[str, float]] = None  # 操作名（search / add / delete） -> 含重试的截止时间（秒）
+    max_retries: int = 3  # 异步模式下连接错误、超时和429/5xx的最大重试次数
+    retry_base_delay: float = 0.1  # 重试退避基数（秒），实际等待在 [0, base × 2^(n-1)] 内随机
+    retry_max_delay: float = 2.0  # 单次重试等待上限（秒）
+    add_batch_size: int = 256  # 异步添加时合并到一个请求的最大向量数，0表示不合并
+    add_flush_interval: float = 0.02  # 异步添加的向量最多等待多久（秒）后发送
+
+
+@dataclass
+class GraphIndexConfig:
+    """
+    内存图索引配置
+    """
+    enabled: bool = True  # 是否启用内存邻接索引（关闭时图查询全部走SQL）
+    compact_threshold: int = 10000  # 增量边数量超过该值时后台合并到CSR数组
+    reload_interval: int = 3600  # 定期全量重载间隔（秒），0表示不定期重载
+    load_batch_size: int = 100000  # 全量加载时每批读取的关系数量
+
+
+@dataclass
+class EntityStatsConfig:
+    """
+    实体重要性统计配置
+    """
+    enabled: bool = True  # 是否启用实体统计（关闭时排序不使用重要性）
+    refresh_interval: int = 3600  # 全量重算间隔（秒），0表示只在启动时计算
+    damping: float = 0.85  # PageRank阻尼系数
+    max_iterations: int = 100  # PageRank最大迭代次数
+    tolerance: float = 1e-8  # PageRank收敛阈值（L1距离）
+    reverse_weight: float = 0.5  # 客体指向主体的反向边权重（相对正向边），0表示只沿关系方向传递
+    predicate_weights: Optional[Dict[str, float]] = None  # 谓词 -> 关系权重，未列出的谓词为1
+
+
+@dataclass
+class BulkImportConfig:
+    """
+    批量导入配置
+    """
+    batch_size: int = 5000  # 每批读取并写入数据库的记录数（每批完成后保存断点）
+    embed_batch_size: int = 256  # 每次调用嵌入服务的文本数
+    vector_batch_size: int = 4000  # 每次写入向量库的向量数（Chroma单次写入有上限）
+    default_entity_type: str = "未知"  # 关系或新闻引用了不存在的实体且未给出类型时使用的类型
+    signal_path: str = "./data/bulk_import_signal.json"  # 导入完成后写入的信号文件，通知运行中的服务刷新
+    signal_poll_interval: float = 2.0  # 服务检查信号文件的间隔（秒），0表示不检查
+
+
+@dataclass
+class VectorRebuildConfig:
+    """
+    向量索引重建配置
+    """
+    state_path: str = "./data/vector_index_state.json"  # 记录当前生效向量集合的状态文件
+    batch_size: int = 1000  # 每页从数据库读取的行数（每页写入一次向量库并保存断点）
+    embed_batch_size: int = 64  # 每次调用嵌入服务的文本数
+    concurrency: int = 4  # 同时进行的嵌入请求数
+    keep_previous: bool = True  # 切换后保留上一个集合用于回滚，下次重建时删除
+
+
+@dataclass
+class VectorBreakerConfig:
+    """
+    向量存储熔断配置
+    """
+    enabled: bool = True  # 是否启用熔断（关闭时向量存储调用在事件循环中同步执行，不设超时）
+    call_timeout: float = 5.0  # 单次向量存储调用的超时时间（秒），超时计为失败
+    window_size: int = 20  # 统计失败率和慢调用比例的最近调用数
+    min_calls: int = 5  # 窗口中至少有这么多次调用才判断是否熔断
+    failure_rate: float = 0.5  # 失败比例达到该值时熔断
+    slow_call_seconds: float = 2.0  # 耗时超过该值（秒）的调用计为慢调用
+    slow_call_rate: float = 0.8  # 慢调用比例达到该值时熔断
+    open_seconds: float = 30.0  # 熔断后经过该时间（秒）放行一次探测调用
+    outbox_path: str = "./data/vector_outbox.db"  # 熔断期间写操作的本地待重放队列（SQLite文件）
+    max_replay_attempts: int = 5  # 重放时非连接类错误的最大重试次数，超过后丢弃该操作
 
 
 @dataclass
@@ -322,6 +446,35 @@ class ConfigManager:
             max_tokens=config.get('max_tokens', 2048)
         )
     
+    def get_llm_rate_limit_config(self) -> LLMRateLimitConfig:
+        """获取大模型调用限流配置"""
+        config = self.get_config().get('llm_rate_limit', {})
+        return LLMRateLimitConfig(
+            enabled=config.get('enabled', True),
+            requests_per_minute=config.get('requests_per_minute', 0),
+            tokens_per_minute=config.get('tokens_per_minute', 0),
+            burst_seconds=config.get('burst_seconds', 10.0),
+            initial_concurrency=config.get('initial_concurrency', 4),
+            min_concurrency=config.get('min_concurrency', 1),
+            max_concurrency=config.get('max_concurrency', 32),
+            increase_step=config.get('increase_step', 1.0),
+            decrease_factor=config.get('decrease_factor', 0.5),
+            default_retry_after=config.get('default_retry_after', 2.0),
+            models=config.get('models') or {}
+        )
+    
+    def get_llm_cache_config(self) -> LLMCacheConfig:
+        """获取大模型响应缓存配置"""
+        config = self.get_config().get('llm_cache', {})
+        return LLMCacheConfig(
+            enabled=config.get('enabled', False),
+            path=config.get('path', "./data/llm_cache.db"),
+            ttl_seconds=config.get('ttl_seconds', 604800),
+            max_entries=config.get('max_entries', 10000),
+            default_enabled=config.get('default_enabled', False),
+            prompt_keys=config.get('prompt_keys') or {}
+        )
+    
     def get_database_config(self) -> DatabaseConfig:
         """获取数据库配置"""
         config = self.get_config().get('database', {})
@@ -420,6 +573,7 @@ class ConfigManager:
             max_entities_per_news=config.get('max_entities_per_news', 50),
             entity_merging=entity_merging,
             filter_news_similarity_threshold=config.get('filter_similar_entities', 0.6),
+            streaming_extraction=config.get('streaming_extraction', True),
         )
     
     def get_cache_config(self) -> CacheConfig:
@@ -431,7 +585,9 @@ class ConfigManager:
             type=config.get('type', 'memory'),
             ttl=config.get('ttl', 3600),
             max_size=config.get('max_size', 1000),
-            redis=config.get('redis', {})
+            redis=config.get('redis', {}),
+            response_enabled=config.get('response_enabled', True),
+            max_memory_mb=config.get('max_memory_mb', 64)
         )
     
     def get_embedding_config(self) -> EmbeddingConfig:
@@ -479,7 +635,102 @@ class ConfigManager:
             collection_name=config.get('collection_name', 'default'),
             dimension=config.get('dimension', 1536),
             metric=config.get('metric', 'cosine'),
-            embedding_model=config.get('embedding_model')
+            embedding_model=config.get('embedding_model'),
+            entity_type_collections=config.get('entity_type_collections') or {},
+            index_type=config.get('index_type', 'hnsw'),
+            ann_engine=config.get('ann_engine', 'auto'),
+            partition_key=config.get('partition_key', 'type'),
+            hnsw_m=config.get('hnsw_m', 16),
+            hnsw_ef_construction=config.get('hnsw_ef_construction', 200),
+            hnsw_ef_search=config.get('hnsw_ef_search', 64),
+            ivf_nlist=config.get('ivf_nlist', 1024),
+            ivf_nprobe=config.get('ivf_nprobe', 16),
+            pq_m=config.get('pq_m', 16),
+            index_hnsw=config.get('index_hnsw') or {},
+            compact_dimension=config.get('compact_dimension'),
+            quantization=config.get('quantization', 'none'),
+            rerank_factor=config.get('rerank_factor', 4),
+            async_mode=config.get('async_mode', False),
+            pool_max_connections=config.get('pool_max_connections', 16),
+            pool_max_keepalive=config.get('pool_max_keepalive'),
+            operation_timeouts=config.get('operation_timeouts') or {},
+            max_retries=config.get('max_retries', 3),
+            retry_base_delay=config.get('retry_base_delay', 0.1),
+            retry_max_delay=config.get('retry_max_delay', 2.0),
+            add_batch_size=config.get('add_batch_size', 256),
+            add_flush_interval=config.get('add_flush_interval', 0.02)
+        )
+    
+    def get_graph_index_config(self) -> GraphIndexConfig:
+        """
+        获取内存图索引配置
+        """
+        config = self.get_config().get('graph_index', {})
+        return GraphIndexConfig(
+            enabled=config.get('enabled', True),
+            compact_threshold=config.get('compact_threshold', 10000),
+            reload_interval=config.get('reload_interval', 3600),
+            load_batch_size=config.get('load_batch_size', 100000)
+        )
+    
+    def get_entity_stats_config(self) -> EntityStatsConfig:
+        """
+        获取实体重要性统计配置
+        """
+        config = self.get_config().get('entity_stats', {})
+        return EntityStatsConfig(
+            enabled=config.get('enabled', True),
+            refresh_interval=config.get('refresh_interval', 3600),
+            damping=config.get('damping', 0.85),
+            max_iterations=config.get('max_iterations', 100),
+            tolerance=config.get('tolerance', 1e-8),
+            reverse_weight=config.get('reverse_weight', 0.5),
+            predicate_weights=config.get('predicate_weights') or {}
+        )
+    
+    def get_bulk_import_config(self) -> BulkImportConfig:
+        """
+        获取批量导入配置
+        """
+        config = self.get_config().get('bulk_import', {})
+        return BulkImportConfig(
+            batch_size=config.get('batch_size', 5000),
+            embed_batch_size=config.get('embed_batch_size', 256),
+            vector_batch_size=config.get('vector_batch_size', 4000),
+            default_entity_type=config.get('default_entity_type', "未知"),
+            signal_path=config.get('signal_path', "./data/bulk_import_signal.json"),
+            signal_poll_interval=config.get('signal_poll_interval', 2.0)
+        )
+    
+    def get_vector_rebuild_config(self) -> VectorRebuildConfig:
+        """
+        获取向量索引重建配置
+        """
+        config = self.get_config().get('vector_rebuild', {})
+        return VectorRebuildConfig(
+            state_path=config.get('state_path', "./data/vector_index_state.json"),
+            batch_size=config.get('batch_size', 1000),
+            embed_batch_size=config.get('embed_batch_size', 64),
+            concurrency=config.get('concurrency', 4),
+            keep_previous=config.get('keep_previous', True)
+        )
+    
+    def get_vector_breaker_config(self) -> VectorBreakerConfig:
+        """
+        获取向量存储熔断配置
+        """
+        config = self.get_config().get('vector_breaker', {})
+        return VectorBreakerConfig(
+            enabled=config.get('enabled', True),
+            call_timeout=config.get('call_timeout', 5.0),
+            window_size=config.get('window_size', 20),
+            min_calls=config.get('min_calls', 5),
+            failure_rate=config.get('failure_rate', 0.5),
+            slow_call_seconds=config.get('slow_call_seconds', 2.0),
+            slow_call_rate=config.get('slow_call_rate', 0.8),
+            open_seconds=config.get('open_seconds', 30.0),
+            outbox_path=config.get('outbox_path', "./data/vector_outbox.db"),
+            max_replay_attempts=config.get('max_replay_attempts', 5)
         )
     
     def __enter__(self):
@@ -4,7 +4,7 @@
 import json
 import re
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 from app.config.config_manager import ConfigManager
 from app.llm.prompt_manager import PromptManager
@@ -66,7 +66,7 @@ class BaseService(ABC):
             
             # 调用大模型 - 使用异步调用
             logger.info(f"开始LLM调用: {prompt_key}")
-            response_obj = await self.llm_service.generate_async(formatted_prompt)
+            response_obj = await self.llm_service.generate_async(formatted_prompt, prompt_key=prompt_key)
             response = response_obj.content if hasattr(response_obj, 'content') else str(response_obj)
             
             if not response:
@@ -82,6 +82,36 @@ class BaseService(ABC):
             logger.error(f"LLM调用失败: {prompt_key} - {str(e)}")
             raise RuntimeError(f"LLM调用失败: {str(e)}")
     
+    async def stream_with_prompt(self, prompt_key: str, **kwargs) -> AsyncIterator[str]:
+        """
+        使用指定的prompt流式调用大模型
+        
+        流式调用不在内部重试（重试会从头重新输出，已输出的部分无法撤回），失败时由调用方处理
+        
+        Args:
+            prompt_key: prompt的键名
+            **kwargs: prompt参数
+            
+        Yields:
+            大模型响应文本块
+            
+        Raises:
+            ValueError: 当prompt不存在时
+            RuntimeError: 当LLM调用失败时
+        """
+        prompt_template = self.prompt_manager.get_prompt(prompt_key)
+        if not prompt_template:
+            raise ValueError(f"Prompt不存在: {prompt_key}")
+        formatted_prompt = prompt_template.format(**kwargs)
+        
+        logger.info(f"开始LLM流式调用: {prompt_key}")
+        try:
+            async for chunk in self.llm_service.astream(formatted_prompt, prompt_key=prompt_key, max_retries=0):
+                yield chunk
+        except Exception as e:
+            logger.error(f"LLM流式调用失败: {prompt_key} - {str(e)}")
+            raise RuntimeError(f"LLM流式调用失败: {str(e)}")
+    
     def extract_json_from_response(self, response: str) -> Optional[Dict[str, Any]]:
         """从LLM响应中提取JSON对象 - 智能提取算法（已废弃，使用json_extractor模块）"""
         logger.warning("extract_json_from_response 方法已废弃，使用 extract_json_robust 替代")
@@ -13,8 +13,15 @@
     
     # 实体关系提取
     extraction = await processor.extract_entities_and_relations("苹果公司发布了新款iPhone")
+    
+    # 流式实体关系提取：实体一生成完整就返回，迭代结束后stream.result为完整结果
+    stream = processor.stream_entities_and_relations("苹果公司发布了新款iPhone")
+    async for entity in stream:
+        ...
 """
-from typing import List, Optional, Dict
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional, Dict
 
 from app.config.config_manager import CategoryConfigItem
 from app.core.base_service import BaseService
@@ -32,6 +39,7 @@ from app.core.prompt_parameter_builder import (
 )
 from app.llm.llm_service import LLMService
 from app.utils.json_extractor import extract_json_robust
+from app.utils.json_stream_parser import JsonStreamParser
 
 from app.utils.logging_utils import get_logger
 
@@ -45,6 +53,7 @@ class ContentProcessor(BaseService):
     主要方法：
     - classify_content: 对输入文本进行内容分类
     - extract_entities_and_relations: 从文本中提取实体及其相互关系
+    - stream_entities_and_relations: 流式提取，实体一生成完整就返回
     """
     
     def __init__(self, parameter_builder: Optional[PromptParameterBuilder] = None, llm_service: Optional[LLMService] = None):
@@ -187,6 +196,44 @@ class ContentProcessor(BaseService):
             
             raise RuntimeError(f"实体关系提取失败: {str(e)}")
     
+    def stream_entities_and_relations(self,
+                                      text: str,
+                                      entity_types: Optional[List[str]] = None,
+                                      relation_types: Optional[List[str]] = None,
+                                      prompt_key: Optional[str] = None) -> 'ExtractionStream':
+        """
+        流式提取实体及其相互关系
+        
+        大模型流式输出的过程中，entities数组中的实体对象一闭合就返回，调用方可以在大模型
+        继续生成的同时查找、消歧和存储已返回的实体；迭代结束后result为完整的提取结果（含关系）
+        
+        Args:
+            text: 待提取的文本内容
+            entity_types: 可选的实体类型列表，如不提供则使用默认类型
+            relation_types: 可选的关系类型列表，如不提供则使用默认类型
+            prompt_key: 使用的prompt键名，默认为'entity_relation_extraction_unified'
+            
+        Returns:
+            ExtractionStream: 实体的异步迭代器
+            
+        Raises:
+            ValueError: 当输入参数无效时
+        """
+        if not text or not text.strip():
+            raise ValueError("文本内容不能为空")
+        
+        if prompt_key is None:
+            prompt_key = 'entity_relation_extraction_unified'
+        logger.info(f"开始流式实体关系提取，文本长度: {len(text)}, prompt_key: {prompt_key}")
+        
+        prompt_params = self.parameter_builder.build_parameters(
+            text=text,
+            prompt_key=prompt_key,
+            entity_types=entity_types,
+            relation_types=relation_types
+        )
+        return ExtractionStream(self, prompt_key, prompt_params, text)
+    
     def _parse_classification_response(self, response: str, original_text: str = "") -> ContentClassificationResult:
         """统一JSON格式解析分类响应（使用json_extractor模块）"""
         try:
@@ -235,12 +282,8 @@ class ContentProcessor(BaseService):
             entities = []
             for entity_data in data.get('entities', []):
                 try:
-                    entity = Entity(
-                        name=str(entity_data.get('name', '')),
-                        type=str(entity_data.get('type', '')),
-                        description=str(entity_data.get('description', ''))
-                    )
-                    if entity.name:  # 只添加非空实体
+                    entity = self._build_entity(entity_data)
+                    if entity:  # 只添加非空实体
                         entities.append(entity)
                 except Exception as e:
                     logger.warning(f"解析实体失败: {e}")
@@ -290,7 +333,114 @@ class ContentProcessor(BaseService):
             logger.error(f"解析提取响应失败: {e}")
             raise ValueError(f"解析提取响应失败: {str(e)}")
     
+    @staticmethod
+    def _build_entity(entity_data: Dict[str, Any]) -> Optional[Entity]:
+        """由响应中的实体数据构建实体，名称为空时返回None"""
+        entity = Entity(
+            name=str(entity_data.get('name', '')),
+            type=str(entity_data.get('type', '')),
+            description=str(entity_data.get('description', ''))
+        )
+        return entity if entity.name else None
+    
     def parse_llm_response(self, response: str) -> dict:
         """实现基础类的抽象方法"""
         # 内容处理器有专门的解析方法，这里返回空字典
-        return {}
\ No newline at end of file
+        return {}
+
+
+class ExtractionStream:
+    """
+    流式实体关系提取结果
+    
+    迭代时逐个返回大模型已输出完整的实体（按名称去重）。流式输出在后台读取，调用方处理实体时
+    大模型继续生成；流式调用失败时改为一次性调用，补充返回尚未返回的实体。迭代结束后：
+    - result: 完整的提取结果（含关系），与extract_entities_and_relations的返回值相同
+    - first_entity_seconds / total_seconds: 第一个实体返回和大模型输出完毕时距开始的秒数
+    """
+    
+    _END = object()
+    
+    def __init__(self, processor: ContentProcessor, prompt_key: str, prompt_params: Dict[str, Any], text: str):
+        """
+        初始化流式提取
+        
+        Args:
+            processor: 内容处理器
+            prompt_key: prompt键名
+            prompt_params: prompt参数
+            text: 原始文本
+        """
+        self._processor = processor
+        self._prompt_key = prompt_key
+        self._prompt_params = prompt_params
+        self._text = text
+        self._error: Optional[Exception] = None
+        self._started_at = 0.0
+        self.result: Optional[KnowledgeExtractionResult] = None
+        self.fallback = False
+        self.first_entity_seconds: Optional[float] = None
+        self.total_seconds: Optional[float] = None
+    
+    async def _read(self, queue: asyncio.Queue) -> None:
+        """读取流式输出，实体一闭合就放入队列；输出完毕后解析完整响应"""
+        parser = JsonStreamParser(['entities'])
+        try:
+            try:
+                async for chunk in self._processor.stream_with_prompt(self._prompt_key, **self._prompt_params):
+                    for _, entity_data in parser.feed(chunk):
+                        try:
+                            entity = self._processor._build_entity(entity_data)
+                        except Exception as e:
+                            logger.warning(f"解析实体失败: {e}")
+                            continue
+                        if entity:
+                            queue.put_nowait(entity)
+                response = parser.text
+            except RuntimeError as e:
+                logger.warning(f"流式实体关系提取失败，改为一次性调用: {e}")
+                self.fallback = True
+                response = await self._processor.generate_with_prompt(self._prompt_key, **self._prompt_params)
+            self.total_seconds = time.time() - self._started_at
+            
+            # 完整响应是最终结果；增量解析没有返回的实体（如格式不规范的元素）在这里补充
+            self.result = self._processor._parse_extraction_response(response, self._text)
+            for entity in self.result.knowledge_graph.entities:
+                queue.put_nowait(entity)
+            logger.info(f"流式实体关系提取完成 - 实体数量: {len(self.result.knowledge_graph.entities)}, "
+                        f"关系数量: {len(self.result.knowledge_graph.relations)}, 耗时: {self.total_seconds:.2f}秒")
+        except Exception as e:
+            self._error = e
+        finally:
+            queue.put_nowait(self._END)
+    
+    async def __aiter__(self) -> AsyncIterator[Entity]:
+        """
+        逐个返回实体
+        
+        Raises:
+            RuntimeError: 当LLM调用或解析完整响应失败时
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._started_at = time.time()
+        reader = asyncio.create_task(self._read(queue))
+        returned = set()
+        try:
+            while True:
+                entity = await queue.get()
+                if entity is self._END:
+                    break
+                if entity.name in returned:
+                    continue
+                returned.add(entity.name)
+                if self.first_entity_seconds is None:
+                    self.first_entity_seconds = time.time() - self._started_at
+                yield entity
+        finally:
+            # 调用方提前结束迭代时停止读取
+            if not reader.done():
+                reader.cancel()
+        
+        if self._error is not None:
+            logger.error(f"实体关系提取失败: {self._error}")
+            raise RuntimeError(f"实体关系提取失败: {str(self._error)}")
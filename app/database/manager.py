@@ -6,6 +6,7 @@
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -17,6 +18,35 @@ from app.utils.logging_utils import get_logger
 # 配置日志
 logger = get_logger(__name__)
 
+# 已被其他索引覆盖、升级时从已有数据库删除的索引：表名 -> 索引名
+OBSOLETE_INDEXES = {
+    "relations": ("idx_relation_subject",),  # 被idx_relation_subject_object的前缀覆盖
+}
+
+
+def upgrade_schema(connection) -> None:
+    """
+    创建缺少的数据表，并为已有数据表补建模型中新增的索引、删除废弃的索引
+
+    create_all只为新建的表建索引，已有数据库升级后需要补建（如relations的复合索引）
+
+    Args:
+        connection: 同步数据库连接（通过AsyncConnection.run_sync调用）
+    """
+    Base.metadata.create_all(connection, checkfirst=True)
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                logger.info(f"补建索引: {table.name}.{index.name}")
+        for name in OBSOLETE_INDEXES.get(table.name, ()):
+            if name in existing:
+                on_table = f" ON {table.name}" if connection.dialect.name == "mysql" else ""
+                connection.execute(text(f"DROP INDEX {name}{on_table}"))
+                logger.info(f"删除废弃索引: {table.name}.{name}")
+
 
 class DatabaseManager:
     """数据库管理器"""
@@ -78,11 +108,11 @@ class DatabaseManager:
         return self._engine
     
     async def create_tables(self):
-        """创建所有数据表"""
+        """创建所有数据表，已有数据库补建缺少的数据表和索引（见upgrade_schema）"""
         from .core import DatabaseError
         try:
             async with self.engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(upgrade_schema)
             logger.info("数据表创建成功")
         except SQLAlchemyError as e:
             logger.error(f"创建数据表失败: {e}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, UniqueConstraint, Index, JSON
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Table, UniqueConstraint, Index, JSON
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -40,14 +40,30 @@ class Relation(Base):
     # 联合唯一：同一主体+谓词+客体只能出现一次
     __table_args__ = (
         UniqueConstraint('subject_id', 'predicate', 'object_id', name='uq_relation_spo'),
-        Index('idx_relation_subject', 'subject_id'),
         Index('idx_relation_object', 'object_id'),
+        # 邻居网络查询按实体对取边（subject_id IN ... AND object_id IN ...），
+        # 也覆盖按subject_id的查询，旧的idx_relation_subject在启动升级时删除
+        Index('idx_relation_subject_object', 'subject_id', 'object_id'),
     )
 
     subject = relationship('Entity', foreign_keys=[subject_id], back_populates='as_subject')
     object  = relationship('Entity', foreign_keys=[object_id],  back_populates='as_object')
 
 
+# 实体统计表：由后台任务计算的实体重要性，用于排序和截断
+class EntityStats(Base):
+    __tablename__ = 'entity_stats'
+    entity_id  = Column(Integer, ForeignKey('entities.id'), primary_key=True, comment='实体ID')
+    degree     = Column(Integer, nullable=False, default=0, comment='关系度数（出边+入边）')
+    pagerank   = Column(Float, nullable=False, default=0.0, comment='加权PageRank分数（全部实体之和为1）')
+    news_count = Column(Integer, nullable=False, default=0, comment='新闻提及次数')
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+
+    __table_args__ = (
+        Index('idx_entity_stats_pagerank', 'pagerank'),
+    )
+
+
 # 属性表（可选：给实体挂任意键值属性）
 class Attribute(Base):
     __tablename__ = 'attributes'
@@ -86,7 +102,9 @@ news_event_entity = Table(
     Base.metadata,
     Column('news_event_id', Integer, ForeignKey('news_events.id'), primary_key=True),
     Column('entity_id', Integer, ForeignKey('entities.id'), primary_key=True),
-    Column('created_at', DateTime, default=datetime.now, comment='关联创建时间')
+    Column('created_at', DateTime, default=datetime.now, comment='关联创建时间'),
+    # 主键以news_event_id开头，按实体查新闻（共同新闻、实体新闻）需要以entity_id开头的索引
+    Index('idx_news_entity_entity_news', 'entity_id', 'news_event_id')
 )
 
 
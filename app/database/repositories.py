@@ -3,7 +3,7 @@
 包含具体的实体、关系、属性和新闻事件的操作逻辑
 """
 
-from typing import Optional
+from typing import List, Optional, Tuple
 # 延迟导入模型，避免循环导入问题
 from typing import TYPE_CHECKING
 
@@ -39,6 +39,19 @@ class EntityRepository(BaseRepository):
             logger.error(f"根据名称获取实体失败: {e}")
             raise DatabaseError(f"根据名称获取实体失败: {e}")
     
+    async def find_by_name(self, name: str, entity_type: Optional[str] = None, limit: int = 10):
+        """根据名称精确匹配实体（可按类型过滤）- 向量存储不可用时的降级搜索"""
+        try:
+            from .models import Entity
+            stmt = select(Entity).where(Entity.name == name)
+            if entity_type:
+                stmt = stmt.where(Entity.type == entity_type)
+            result = await self.session.execute(stmt.order_by(Entity.id).limit(limit))
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"根据名称匹配实体失败: {e}")
+            raise DatabaseError(f"根据名称匹配实体失败: {e}")
+    
     async def get_by_type(self, entity_type: str, skip: int = 0, limit: int = 100):
         """根据类型获取实体"""
         try:
@@ -104,6 +117,38 @@ class EntityRepository(BaseRepository):
             logger.error(f"获取规范实体失败: {e}")
             raise DatabaseError(f"获取规范实体失败: {e}")
 
+    async def delete_with_dependents(self, entity_id: int) -> List[Tuple[int, int, int, Optional[str]]]:
+        """删除实体及依赖它的关系、新闻关联、属性和统计，别名实体的canonical_id置空
+
+        外键没有配置级联删除，需要先删除依赖行再删除实体
+
+        Returns:
+            List[Tuple[int, int, int, Optional[str]]]: 被删除关系的 (关系ID, 主体ID, 客体ID, 向量ID)
+        """
+        try:
+            from sqlalchemy import delete, or_
+            from .models import Entity, Relation, Attribute, EntityStats, news_event_entity
+            relation_filter = or_(Relation.subject_id == entity_id, Relation.object_id == entity_id)
+            result = await self.session.execute(
+                select(Relation.id, Relation.subject_id, Relation.object_id, Relation.vector_id)
+                .where(relation_filter)
+            )
+            relations = [tuple(row) for row in result.all()]
+
+            await self.session.execute(delete(Relation).where(relation_filter))
+            await self.session.execute(delete(news_event_entity).where(news_event_entity.c.entity_id == entity_id))
+            await self.session.execute(delete(Attribute).where(Attribute.entity_id == entity_id))
+            await self.session.execute(delete(EntityStats).where(EntityStats.entity_id == entity_id))
+            await self.session.execute(
+                update(Entity).where(Entity.canonical_id == entity_id).values(canonical_id=None)
+            )
+            await self.session.execute(delete(Entity).where(Entity.id == entity_id))
+            logger.info(f"删除实体及依赖数据成功: entity_id={entity_id}, relations={len(relations)}")
+            return relations
+        except SQLAlchemyError as e:
+            logger.error(f"删除实体及依赖数据失败: {e}")
+            raise DatabaseError(f"删除实体及依赖数据失败: {e}")
+
     async def get_entity_relations(self, entity_id: int, skip: int = 0, limit: int = 100):
         """获取实体的所有关系"""
         try:
@@ -189,7 +234,45 @@ class RelationRepository(BaseRepository):
         except SQLAlchemyError as e:
             logger.error(f"获取三元组失败: {e}")
             raise DatabaseError(f"获取三元组失败: {e}")
-    
+
+    async def get_adjacent_triplets(self, entity_ids: List[int], predicates: Optional[List[str]] = None,
+                                    limit: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """
+        批量获取一组实体的双向邻接三元组 - 用于图遍历逐层扩展
+
+        出边和入边分别走subject_id/object_id索引，UNION ALL合并后一次返回
+
+        Args:
+            entity_ids: 实体ID列表
+            predicates: 谓词过滤
+            limit: 最多返回的邻接条数
+
+        Returns:
+            List[Tuple[int, int, int]]: (实体ID, 邻居实体ID, 关系ID)
+        """
+        try:
+            from .models import Relation
+            from sqlalchemy import union_all
+
+            outgoing = select(
+                Relation.subject_id.label("entity_id"), Relation.object_id.label("neighbor_id"), Relation.id
+            ).where(Relation.subject_id.in_(entity_ids))
+            incoming = select(
+                Relation.object_id.label("entity_id"), Relation.subject_id.label("neighbor_id"), Relation.id
+            ).where(Relation.object_id.in_(entity_ids))
+            if predicates:
+                outgoing = outgoing.where(Relation.predicate.in_(predicates))
+                incoming = incoming.where(Relation.predicate.in_(predicates))
+
+            stmt = union_all(outgoing, incoming)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            result = await self.session.execute(stmt)
+            return [tuple(row) for row in result.all()]
+        except SQLAlchemyError as e:
+            logger.error(f"批量获取邻接三元组失败: {e}")
+            raise DatabaseError(f"批量获取邻接三元组失败: {e}")
+
     async def exists_by_triplet(self, subject_id: int, predicate: str, object_id: int) -> bool:
         """检查三元组是否已存在 - 用于避免唯一约束冲突"""
         try:
@@ -466,14 +549,17 @@ class NewsEventRepository(BaseRepository):
             logger.error(f"获取最近新闻事件失败: {e}")
             raise DatabaseError(f"获取最近新闻事件失败: {e}")
     
-    async def search_by_content(self, keyword: str, limit: int = 100):
-        """根据内容关键词搜索新闻事件 - 全文搜索"""
+    async def search_by_content(self, keyword: str, limit: int = 100, start_time=None, end_time=None):
+        """根据内容关键词搜索新闻事件 - 全文搜索（可按发布时间范围过滤）"""
         try:
             from .models import NewsEvent
             # 简单的LIKE搜索，实际项目中可以考虑使用全文搜索引擎
-            stmt = select(NewsEvent).where(
-                NewsEvent.content.contains(keyword)
-            ).order_by(NewsEvent.publish_time.desc()).limit(limit)
+            stmt = select(NewsEvent).where(NewsEvent.content.contains(keyword))
+            if start_time is not None:
+                stmt = stmt.where(NewsEvent.publish_time >= start_time)
+            if end_time is not None:
+                stmt = stmt.where(NewsEvent.publish_time <= end_time)
+            stmt = stmt.order_by(NewsEvent.publish_time.desc()).limit(limit)
             
             result = await self.session.execute(stmt)
             return result.scalars().all()
@@ -382,4 +382,22 @@ class VectorOperationError(VectorSearchError):
         """
         kwargs['operation'] = operation
         kwargs['error_code'] = "VECTOR_OPERATION_ERROR"
-        super().__init__(message, **kwargs)
\ No newline at end of file
+        super().__init__(message, **kwargs)
+
+
+class VectorStoreUnavailableError(VectorSearchError):
+    """向量存储不可用异常
+    
+    当熔断器打开或向量存储调用超时时抛出，调用方应走降级路径
+    """
+    def __init__(self, message: str, breaker_state: str = None, **kwargs):
+        """初始化异常
+        
+        Args:
+            message: 错误消息
+            breaker_state: 熔断器状态
+            **kwargs: 额外信息
+        """
+        kwargs['breaker_state'] = breaker_state
+        kwargs['error_code'] = "VECTOR_STORE_UNAVAILABLE_ERROR"
+        super().__init__(message, **kwargs)
@@ -5,14 +5,22 @@
 - Prompt管理
 - 错误处理
 - 配置集成
+- 调用限流
+- 响应缓存
 """
 
 from .llm_client import LLMClient
 from .prompt_manager import PromptManager
 from .base import BaseLLMService
+from .rate_limiter import LLMRateLimiter, get_llm_rate_limiter
+from .response_cache import LLMResponseCache, get_llm_response_cache
 
 __all__ = [
     'LLMClient',
     'PromptManager',
-    'BaseLLMService'
+    'BaseLLMService',
+    'LLMRateLimiter',
+    'get_llm_rate_limiter',
+    'LLMResponseCache',
+    'get_llm_response_cache'
 ]
\ No newline at end of file
@@ -6,6 +6,7 @@
 import time
 import asyncio
 from contextlib import contextmanager
+from functools import lru_cache
 from pyexpat.errors import messages
 from typing import Any, Dict, Optional, List
 
@@ -16,6 +17,9 @@ from app.config.config_manager import ConfigManager, LLMConfig
 from app.llm.base import BaseLLMService, LLMResponse
 from app.exceptions import GenerationError, ConfigurationError, AuthenticationError
 from app.llm.prompt_manager import PromptManager
+from app.llm.rate_limiter import (
+    LLMRateLimiter, RatePermit, get_llm_rate_limiter, get_retry_after, is_rate_limit_error
+)
 from app.utils.logging_utils import get_logger
 
 
@@ -23,25 +27,41 @@ from app.utils.logging_utils import get_logger
 logger = get_logger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """获取tiktoken编码（只加载一次；不可用时返回None，避免每次估算都尝试下载编码文件）"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")  # GPT-4的编码方案
+    except Exception:
+        return None
+
+
 class LLMClient(BaseLLMService):
     """基于LangChain的大模型客户端
 
     提供与大模型服务的交互功能，支持配置管理、响应生成、批处理等功能
+
+    异步调用（generate_async / generate_batch_async / astream）经过按模型共用的限流器：
+    RPM/TPM令牌桶和AIMD自适应并发，收到429时由限流器统一按Retry-After暂停后再重试
     """
 
     def __init__(self,
                  config_manager: Optional[ConfigManager] = None,
                  prompt_manager: Optional[PromptManager] = None,
+                 rate_limiter: Optional[LLMRateLimiter] = None,
                  **kwargs):
         """初始化大模型客户端
 
         Args:
             config_manager: 配置管理器实例
             prompt_manager: 提示词管理器实例
+            rate_limiter: 限流器，为空时使用全局实例
             **kwargs: 可选的配置覆盖项
         """
         self._config_manager = config_manager or ConfigManager()
         self._prompt_manager = prompt_manager or PromptManager()
+        self._rate_limiter = rate_limiter or get_llm_rate_limiter()
         self._llm_config = None
         self._llm_instance = None
         self._custom_config = kwargs
@@ -119,7 +139,8 @@ class LLMClient(BaseLLMService):
                 temperature=config.temperature,
                 max_tokens=config.max_tokens,
                 request_timeout=config.timeout,
-                max_retries=config.max_retries
+                # 启用限流时由本客户端统一重试，ChatOpenAI内部的重试会绕过限流器
+                max_retries=0 if self._rate_limiter.enabled else config.max_retries
             )
             logger.debug("LangChain LLM实例创建成功")
         except Exception as e:
@@ -221,11 +242,10 @@ class LLMClient(BaseLLMService):
         Returns:
             Dict[str, int]: token使用估算
         """
-        try:
-            import tiktoken
+        prompt_text = " ".join(msg.content for msg in messages)
+        encoding = _get_token_encoding()
+        if encoding is not None:
             # 使用tiktoken库估算token数量
-            encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4的编码方案
-            prompt_text = " ".join(msg.content for msg in messages)
             prompt_tokens = len(encoding.encode(prompt_text))
             completion_tokens = len(encoding.encode(content))
             return {
@@ -233,14 +253,12 @@ class LLMClient(BaseLLMService):
                 'completion': completion_tokens,
                 'total': prompt_tokens + completion_tokens
             }
-        except Exception:
-            # 如果tiktoken不可用，使用字符数粗略估算
-            prompt_text = " ".join(msg.content for msg in messages)
-            return {
-                'prompt': len(prompt_text) // 4,  # 粗略估算：4个字符约等于1个token
-                'completion': len(content) // 4,
-                'total': (len(prompt_text) + len(content)) // 4
-            }
+        # 如果tiktoken不可用，使用字符数粗略估算
+        return {
+            'prompt': len(prompt_text) // 4,  # 粗略估算：4个字符约等于1个token
+            'completion': len(content) // 4,
+            'total': (len(prompt_text) + len(content)) // 4
+        }
 
     def _get_retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
         """获取重试延迟时间
@@ -269,6 +287,49 @@ class LLMClient(BaseLLMService):
         # 其他错误，固定延迟
         return 1.0
 
+    async def _acquire_rate_permit(self, messages: List[SystemMessage | HumanMessage],
+                                   call_kwargs: Dict[str, Any]) -> Optional[RatePermit]:
+        """等待限流许可，预占的token数为提示词估算值加max_tokens；未启用限流时返回None
+
+        Args:
+            messages: 消息列表
+            call_kwargs: 调用参数
+
+        Returns:
+            Optional[RatePermit]: 限流许可
+        """
+        if not self._rate_limiter.enabled:
+            return None
+        model = call_kwargs.get('model', self._llm_config.model)
+        tokens = self._estimate_token_usage(messages, "")['prompt'] + \
+            call_kwargs.get('max_tokens', self._llm_config.max_tokens)
+        return await self._rate_limiter.acquire(model, tokens)
+
+    @staticmethod
+    def _release_rate_permit(permit: Optional[RatePermit], error: Optional[Exception] = None,
+                             used_tokens: Optional[int] = None) -> bool:
+        """释放限流许可
+
+        Returns:
+            bool: 是否为429限流错误（限流器已按Retry-After暂停，重试前不需要再等待）
+        """
+        if permit is None:
+            return False
+        if error is None:
+            permit.release(used_tokens=used_tokens)
+            return False
+        rate_limited = is_rate_limit_error(error)
+        permit.release(rate_limited=rate_limited, retry_after=get_retry_after(error) if rate_limited else None)
+        return rate_limited
+
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """获取限流统计（各模型的并发数、排队时间、429次数等）
+
+        Returns:
+            Dict[str, Any]: 限流统计
+        """
+        return self._rate_limiter.get_stats()
+
     def _handle_generation_error(self, error: Exception) -> None:
         """处理生成错误
 
@@ -418,10 +479,14 @@ class LLMClient(BaseLLMService):
         while attempt <= max_retries:
             attempt += 1
 
+            permit = None
             try:
                 # 构建消息列表
                 messages, call_kwargs = self._build_llm_messages(prompt, **kwargs)
 
+                # 等待限流许可
+                permit = await self._acquire_rate_permit(messages, call_kwargs)
+
                 # 异步生成响应
                 response = await self._llm_instance.ainvoke(messages, **call_kwargs)
 
@@ -429,6 +494,9 @@ class LLMClient(BaseLLMService):
                 latency = time.time() - start_time
 
                 llm_response = self._build_response(response,messages,attempt=attempt,latency=latency)
+                self._release_rate_permit(permit, used_tokens=llm_response.tokens_used['total'])
+                if permit is not None:
+                    llm_response.metadata['queue_time'] = permit.queue_time
 
 
                 logger.info(f"异步生成成功，模型: {self._llm_config.model}, 尝试次数: {attempt}, 延迟: {latency:.2f}s")
@@ -436,12 +504,15 @@ class LLMClient(BaseLLMService):
 
             except Exception as e:
                 logger.error(f"异步生成失败 (尝试 {attempt}/{max_retries}): {e}")
+                rate_limited = self._release_rate_permit(permit, error=e)
 
                 # 根据错误类型处理
                 self._handle_generation_error(e)
 
-                # 检查是否需要重试
+                # 检查是否需要重试（429由限流器按Retry-After统一暂停，不再单独等待）
                 retry_delay = self._get_retry_delay(e, attempt)
+                if rate_limited and retry_delay is not None:
+                    retry_delay = 0
                 if retry_delay is not None:
                     if attempt >= max_retries:
                         # 达到最大重试次数
@@ -456,6 +527,10 @@ class LLMClient(BaseLLMService):
 
                 # 不可重试的错误，直接抛出
                 raise
+            finally:
+                # 取消时也释放并发名额（已释放时不重复释放）
+                if permit is not None:
+                    permit.release()
 
 
         # 提取token使用信息
@@ -534,7 +609,7 @@ class LLMClient(BaseLLMService):
                     }
                 )
 
-        # 使用asyncio.gather并发执行所有任务
+        # 使用asyncio.gather并发执行所有任务，实际并发数和速率由限流器控制
         tasks = [async_generate_single(prompt, i) for i, prompt in enumerate(prompts)]
         results = await asyncio.gather(*tasks)
 
@@ -607,28 +682,41 @@ class LLMClient(BaseLLMService):
         while attempt <= max_retries:
             attempt += 1
 
+            permit = None
             try:
                 # 构建消息列表
                 messages,call_kwargs = self._build_llm_messages(prompt,**kwargs)
 
+                # 等待限流许可，流式生成期间占用并发名额
+                permit = await self._acquire_rate_permit(messages, call_kwargs)
+
                 logger.info(f"开始异步流式生成，模型: {self._llm_config.model}, 尝试次数: {attempt}")
 
                 # 异步流式生成响应
+                content = []
                 async for chunk in self._llm_instance.astream(messages, **call_kwargs):
+                    content.append(chunk.content)
                     # 逐块返回结果
                     yield chunk.content
 
+                if permit is not None:
+                    self._release_rate_permit(
+                        permit, used_tokens=self._estimate_token_usage(messages, "".join(content))['total']
+                    )
                 logger.info(f"异步流式生成完成，模型: {self._llm_config.model}, 尝试次数: {attempt}")
                 return
 
             except Exception as e:
                 logger.error(f"异步流式生成失败 (尝试 {attempt}/{max_retries}): {e}")
+                rate_limited = self._release_rate_permit(permit, error=e)
 
                 # 根据错误类型处理
                 self._handle_generation_error(e)
 
-                # 检查是否需要重试
+                # 检查是否需要重试（429由限流器按Retry-After统一暂停，不再单独等待）
                 retry_delay = await self._execute_exception(attempt, e)
+                if rate_limited and retry_delay is not None:
+                    retry_delay = 0
                 if retry_delay is not None:
                     if attempt >= max_retries:
                         # 达到最大重试次数
@@ -643,6 +731,10 @@ class LLMClient(BaseLLMService):
 
                 # 不可重试的错误，直接抛出
                 raise
+            finally:
+                # 调用方提前结束迭代或取消时也释放并发名额（已释放时不重复释放）
+                if permit is not None:
+                    permit.release()
 
     async def _execute_exception(self, attempt: int, e: Exception) -> float | None:
         return self._get_retry_delay(e, attempt)
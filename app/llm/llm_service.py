@@ -4,11 +4,13 @@
 """
 
 import asyncio
-from typing import Any, Dict, Optional, List
+import time
+from typing import Any, AsyncIterator, Dict, Optional, List
 from concurrent.futures import ThreadPoolExecutor
 
 from app.llm.llm_client import LLMClient
 from app.llm.base import LLMResponse
+from app.llm.response_cache import LLMResponseCache
 from app.config.config_manager import ConfigManager
 from app.utils.logging_utils import get_logger
 
@@ -37,19 +39,22 @@ class LLMService:
     def __init__(self, 
                  config_manager: Optional[ConfigManager] = None,
                  max_workers: int = 5,
-                 executor: Optional[ThreadPoolExecutor] = None):
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 response_cache: Optional[LLMResponseCache] = None):
         """初始化大模型服务
         
         Args:
             config_manager: 配置管理器实例
             max_workers: 线程池最大工作线程数
             executor: 自定义线程池执行器（可选）
+            response_cache: 响应缓存（可选），默认使用共享的响应缓存
         """
         # 避免重复初始化
         if hasattr(self, '_initialized') and self._initialized:
             return
         
         self._client = LLMClient(config_manager=config_manager)
+        self._cache = response_cache if response_cache else LLMResponseCache()
         # 使用自定义执行器或创建新的
         self._executor = executor if executor else ThreadPoolExecutor(max_workers=max_workers)
         self._initialized = True
@@ -162,18 +167,94 @@ class LLMService:
     async def generate_async(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> LLMResponse:
         """异步生成响应（符合基类接口）
         
+        提示词键开启了响应缓存时，相同的模型、采样参数和提示词直接返回缓存的响应
+        （metadata中cache_hit为True）
+        
         Args:
             prompt: 用户提示词
             system_prompt: 系统提示词
-            **kwargs: 其他参数
+            **kwargs: 其他参数，包括：
+                - prompt_key: 提示词键，用于按提示词开关响应缓存
             
         Returns:
             LLMResponse: 响应对象
         """
-        # 直接调用客户端的generate_async方法
+        prompt_key = kwargs.pop('prompt_key', None)
+        if system_prompt:
+            kwargs['system_prompt'] = system_prompt
+        if not self._cache.is_enabled_for(prompt_key):
+            return await self._client.generate_async(prompt, **kwargs)
+        
+        key = self._cache_key(prompt, system_prompt, kwargs)
+        # 缓存读写是同步的SQLite操作，在线程中执行，不阻塞事件循环
+        cached = await asyncio.to_thread(self._cache.get, key, prompt_key)
+        if cached is not None:
+            logger.debug(f"大模型响应缓存命中: {prompt_key}")
+            return cached
+        
         response = await self._client.generate_async(prompt, **kwargs)
+        await asyncio.to_thread(self._cache.put, key, response, prompt_key)
         return response
     
+    # 不影响生成内容、不计入响应缓存键的调用参数
+    _CACHE_KEY_EXCLUDED_KWARGS = frozenset({'system_prompt', 'max_retries', 'timeout'})
+    
+    def _cache_key(self, prompt: str, system_prompt: Optional[str], kwargs: Dict[str, Any]) -> str:
+        """按模型、全部采样参数和提示词生成响应缓存键"""
+        config = self._client.get_config()
+        sampling = {
+            name: value for name, value in kwargs.items()
+            if name not in self._CACHE_KEY_EXCLUDED_KWARGS and name not in ('model', 'temperature', 'max_tokens')
+        }
+        return self._cache.make_key(
+            kwargs.get('model', config.get('model')),
+            kwargs.get('temperature', config.get('temperature')),
+            kwargs.get('max_tokens', config.get('max_tokens')),
+            prompt,
+            system_prompt,
+            **sampling
+        )
+    
+    async def astream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """异步流式生成响应
+        
+        提示词键开启了响应缓存时，命中则一次返回缓存的完整响应；未命中时在流式生成完毕后写入缓存
+        
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            **kwargs: 其他参数，包括：
+                - prompt_key: 提示词键，用于按提示词开关响应缓存
+                - max_retries: 最大重试次数（重试会从头重新输出，需要增量解析时传0）
+            
+        Yields:
+            str: 生成的文本块
+        """
+        prompt_key = kwargs.pop('prompt_key', None)
+        if system_prompt:
+            kwargs['system_prompt'] = system_prompt
+        key = None
+        if self._cache.is_enabled_for(prompt_key):
+            key = self._cache_key(prompt, system_prompt, kwargs)
+            cached = await asyncio.to_thread(self._cache.get, key, prompt_key)
+            if cached is not None:
+                logger.debug(f"大模型响应缓存命中: {prompt_key}")
+                yield cached.content
+                return
+        
+        start_time = time.time()
+        content = []
+        async for chunk in self._client.astream(prompt, **kwargs):
+            content.append(chunk)
+            yield chunk
+        if key is not None:
+            config = self._client.get_config()
+            await asyncio.to_thread(self._cache.put, key, LLMResponse(
+                content="".join(content),
+                metadata={'model': kwargs.get('model', config.get('model')), 'stream': True},
+                latency=time.time() - start_time
+            ), prompt_key)
+    
     async def generate_batch_async(self, prompts: List[str], system_prompt: Optional[str] = None, **kwargs) -> list[LLMResponse]:
         """异步批量生成响应（符合基类接口）
         
@@ -318,7 +399,7 @@ class LLMService:
         """获取统计信息
         
         Returns:
-            Dict[str, Any]: 包含调用次数、成功率、令牌使用等统计信息
+            Dict[str, Any]: 包含调用次数、成功率、令牌使用等统计信息，cache为响应缓存的命中率和节省的时间
         """
         if not self._call_history:
             return {
@@ -326,7 +407,8 @@ class LLMService:
                 'successful_calls': 0,
                 'failed_calls': 0,
                 'total_tokens': 0,
-                'success_rate': 0
+                'success_rate': 0,
+                'cache': self._cache.get_stats()
             }
         
         total_calls = len(self._call_history)
@@ -339,7 +421,8 @@ class LLMService:
             'successful_calls': successful_calls,
             'failed_calls': failed_calls,
             'total_tokens': total_tokens,
-            'success_rate': (successful_calls / total_calls * 100) if total_calls > 0 else 0
+            'success_rate': (successful_calls / total_calls * 100) if total_calls > 0 else 0,
+            'cache': self._cache.get_stats()
         }
     
     def clear_stats(self) -> None:
@@ -0,0 +1,365 @@
+"""大模型调用限流
+
+按模型限制大模型调用的速率和并发，同一进程中的客户端共用：
+- RPM/TPM令牌桶：请求前按估算的token数（提示词 + max_tokens）预占，完成后按实际用量退还
+- AIMD自适应并发：成功时并发数缓慢增加，收到429时并发数按比例减少（同一轮请求只减少一次），
+  并按Retry-After暂停该模型的所有请求，避免各请求各自重试造成重试风暴
+- 统计排队时间（等待并发名额、令牌桶和Retry-After的时间）
+"""
+
+import asyncio
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from app.config.config_manager import ConfigManager, LLMRateLimitConfig
+from app.utils.logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+# 统计排队时间分位数使用的最近请求数
+QUEUE_TIME_WINDOW = 1000
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """判断异常是否为429限流错误
+
+    Args:
+        error: 异常对象
+
+    Returns:
+        bool: 是否为限流错误
+    """
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    error_msg = str(error).lower()
+    return any(keyword in error_msg for keyword in ['rate limit', 'too many requests', '429'])
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """从限流错误中读取Retry-After（秒）
+
+    优先读取响应头 retry-after-ms / retry-after（秒数或HTTP日期），其次匹配错误消息中的 "retry after N"
+
+    Args:
+        error: 异常对象
+
+    Returns:
+        Optional[float]: 需要等待的秒数，没有时返回None
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers:
+        try:
+            value = headers.get('retry-after-ms')
+            if value:
+                return max(0.0, float(value) / 1000)
+            value = headers.get('retry-after')
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    match = re.search(r'retry after (\d+(?:\.\d+)?)', str(error).lower())
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """令牌桶，按每分钟的额度匀速补充，容量为burst_seconds秒的额度"""
+
+    def __init__(self, per_minute: int, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """取出amount需要等待的秒数（超过容量的请求按容量计）"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> float:
+        """取出令牌，返回实际取出的数量"""
+        amount = min(amount, self.capacity)
+        self.level -= amount
+        return amount
+
+    def give_back(self, amount: float) -> None:
+        """退还（amount为负数时补扣）令牌，补扣后可以为负数"""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RatePermit:
+    """一次调用的限流许可，调用结束后必须调用release"""
+
+    def __init__(self, limiter: "ModelRateLimiter", tokens: float, queue_time: float):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.queue_time = queue_time
+        self.started_at = time.monotonic()
+        self._released = False
+
+    def release(self, used_tokens: Optional[int] = None, rate_limited: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        """释放并发名额
+
+        Args:
+            used_tokens: 调用成功时实际使用的token数；为空表示调用失败，不退还预占的token、不增加并发数
+            rate_limited: 调用是否收到429
+            retry_after: 429响应的Retry-After（秒）
+        """
+        if self._released:
+            return
+        self._released = True
+        self.limiter.release(self, used_tokens, rate_limited, retry_after)
+
+
+class ModelRateLimiter:
+    """单个模型的限流器：RPM/TPM令牌桶 + AIMD自适应并发"""
+
+    def __init__(self, model: str, config: LLMRateLimitConfig, overrides: Optional[Dict[str, Any]] = None):
+        """初始化限流器
+
+        Args:
+            model: 模型名称
+            config: 限流配置
+            overrides: 该模型覆盖的限流参数
+        """
+        overrides = overrides or {}
+        option = lambda name: overrides.get(name, getattr(config, name))
+        self.model = model
+        self.min_concurrency = max(1, option('min_concurrency'))
+        self.max_concurrency = max(self.min_concurrency, option('max_concurrency'))
+        self.increase_step = option('increase_step')
+        self.decrease_factor = option('decrease_factor')
+        self.default_retry_after = option('default_retry_after')
+        rpm, tpm, burst = option('requests_per_minute'), option('tokens_per_minute'), option('burst_seconds')
+        self.rpm = TokenBucket(rpm, burst) if rpm else None
+        self.tpm = TokenBucket(tpm, burst) if tpm else None
+
+        self.limit = float(min(self.max_concurrency, max(self.min_concurrency, option('initial_concurrency'))))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: deque = deque()
+        self._granted = set()  # 已交给等待者、等待者尚未醒来的名额
+        self._lock = Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self._queue_times: deque = deque(maxlen=QUEUE_TIME_WINDOW)
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+
+    async def acquire(self, tokens: float = 0) -> RatePermit:
+        """等待并发名额、Retry-After暂停和令牌桶，返回许可
+
+        Args:
+            tokens: 预占的token数
+
+        Returns:
+            RatePermit: 限流许可
+        """
+        start = time.monotonic()
+        waiter = None
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+        if waiter is not None:
+            try:
+                # 释放名额的请求直接把名额交给队首的等待者
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    if waiter in self._granted:
+                        self._granted.discard(waiter)
+                        self._release_slot()
+                raise
+            with self._lock:
+                self._granted.discard(waiter)
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = max(
+                        self.blocked_until - now,
+                        self.rpm.wait_time(1, now) if self.rpm else 0.0,
+                        self.tpm.wait_time(tokens, now) if self.tpm else 0.0
+                    )
+                    if wait <= 0:
+                        if self.rpm:
+                            self.rpm.take(1)
+                        if self.tpm:
+                            tokens = self.tpm.take(tokens)
+                        queue_time = now - start
+                        self.requests += 1
+                        self._queue_times.append(queue_time)
+                        self._queue_time_total += queue_time
+                        self._queue_time_max = max(self._queue_time_max, queue_time)
+                        break
+                await asyncio.sleep(wait)
+        except BaseException:
+            with self._lock:
+                self._release_slot()
+            raise
+        return RatePermit(self, tokens, queue_time)
+
+    def _grant(self, waiter: asyncio.Future) -> bool:
+        """把一个名额交给等待者，等待者已取消时返回False（调用方持有锁）"""
+        if waiter.done():
+            return False
+        self._granted.add(waiter)
+        waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+        return True
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _release_slot(self) -> None:
+        """释放一个并发名额，交给仍在等待的请求（调用方持有锁）"""
+        while self._waiters and self.in_flight <= int(self.limit):
+            if self._grant(self._waiters.popleft()):
+                return
+        self.in_flight -= 1
+
+    def _grant_extra(self) -> None:
+        """并发数增加后，把新增的名额交给等待的请求（调用方持有锁）"""
+        while self._waiters and self.in_flight < int(self.limit):
+            if self._grant(self._waiters.popleft()):
+                self.in_flight += 1
+
+    def release(self, permit: RatePermit, used_tokens: Optional[int], rate_limited: bool,
+                retry_after: Optional[float]) -> None:
+        """调用结束：调整令牌桶和并发数，释放并发名额"""
+        with self._lock:
+            now = time.monotonic()
+            if self.tpm and (used_tokens is not None or rate_limited):
+                # 被限流的请求没有消耗token，全部退还
+                self.tpm.give_back(permit.tokens - (used_tokens or 0))
+            if rate_limited:
+                self.throttled += 1
+                pause = retry_after if retry_after is not None else self.default_retry_after
+                self.blocked_until = max(self.blocked_until, now + pause)
+                # 同一轮（上次减少之后才开始）的请求只减少一次并发数
+                if permit.started_at >= self._last_decrease:
+                    self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    logger.warning(f"模型 {self.model} 触发限流，并发数降为 {int(self.limit)}，"
+                                   f"暂停 {pause:.1f}秒")
+            elif used_tokens is not None:
+                self.limit = min(float(self.max_concurrency), self.limit + self.increase_step / self.limit)
+            self._release_slot()
+            self._grant_extra()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计"""
+        with self._lock:
+            queue_times = sorted(self._queue_times)
+            now = time.monotonic()
+
+            def percentile(ratio: float) -> float:
+                return queue_times[min(len(queue_times) - 1, int(len(queue_times) * ratio))] if queue_times else 0.0
+
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "paused_seconds": max(0.0, self.blocked_until - now),
+                "queue_time_avg": self._queue_time_total / self.requests if self.requests else 0.0,
+                "queue_time_p50": percentile(0.5),
+                "queue_time_p99": percentile(0.99),
+                "queue_time_max": self._queue_time_max,
+                "rpm_available": self.rpm.level if self.rpm else None,
+                "tpm_available": self.tpm.level if self.tpm else None,
+            }
+
+
+class LLMRateLimiter:
+    """大模型调用限流管理器
+
+    实现单例模式，同一进程中的大模型客户端按模型共用限流状态
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, config: Optional[LLMRateLimitConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 限流配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(LLMRateLimiter, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[LLMRateLimitConfig] = None):
+        """初始化限流状态"""
+        self.config = config or ConfigManager().get_llm_rate_limit_config()
+        self._models: Dict[str, ModelRateLimiter] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用限流"""
+        return self.config.enabled
+
+    def for_model(self, model: str) -> ModelRateLimiter:
+        """获取模型的限流器"""
+        limiter = self._models.get(model)
+        if limiter is None:
+            with self._lock:
+                limiter = self._models.get(model)
+                if limiter is None:
+                    limiter = ModelRateLimiter(model, self.config, (self.config.models or {}).get(model))
+                    self._models[model] = limiter
+        return limiter
+
+    async def acquire(self, model: str, tokens: float = 0) -> RatePermit:
+        """获取模型的调用许可
+
+        Args:
+            model: 模型名称
+            tokens: 预占的token数
+
+        Returns:
+            RatePermit: 限流许可
+        """
+        return await self.for_model(model).acquire(tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各模型的限流统计"""
+        return {
+            "enabled": self.enabled,
+            "models": {model: limiter.get_stats() for model, limiter in list(self._models.items())}
+        }
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """获取大模型调用限流管理器实例"""
+    return LLMRateLimiter()
@@ -0,0 +1,271 @@
+"""
+大模型响应缓存 - 相同的模型、采样参数和提示词直接返回上次的响应
+
+- 缓存键为 hash(模型, temperature, max_tokens, 其他采样参数, 系统提示词, 格式化后的提示词)，任一项变化即不命中
+- 缓存保存在本地SQLite文件中，进程重启、回填和崩溃恢复后仍然有效
+- 按提示词键开关：确定性的分类和抽取开启，需要多样性的生成类提示词关闭
+- 条目超过有效期后不再命中；条目数超过上限时淘汰最久未命中的条目
+- get/put是同步的SQLite操作，异步调用方应通过asyncio.to_thread调用，避免阻塞事件循环
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, Optional
+
+import orjson
+
+from app.config.config_manager import ConfigManager, LLMCacheConfig
+from app.llm.base import LLMResponse
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMResponseCache:
+    """
+    大模型响应缓存
+
+    实现单例模式，同一进程中的大模型服务共用缓存文件和命中统计；SQLite文件在第一次写入时创建
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, config: Optional[LLMCacheConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 缓存配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(LLMResponseCache, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[LLMCacheConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_llm_cache_config()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries: Optional[int] = None
+        self._db_lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._errors = 0
+        self._saved_latency = 0.0
+        self._saved_tokens = 0
+        # 提示词键 -> {"hits": 命中次数, "misses": 未命中次数}
+        self._by_prompt: Dict[str, Dict[str, int]] = {}
+
+    def is_enabled_for(self, prompt_key: Optional[str]) -> bool:
+        """
+        指定提示词的响应是否缓存
+
+        Args:
+            prompt_key: 提示词键，为空表示未指定
+
+        Returns:
+            bool: 是否缓存
+        """
+        if not self.config.enabled:
+            return False
+        prompt_keys = self.config.prompt_keys or {}
+        if prompt_key is not None and prompt_key in prompt_keys:
+            return bool(prompt_keys[prompt_key])
+        return self.config.default_enabled
+
+    @staticmethod
+    def make_key(model: str, temperature: Any, max_tokens: Any, prompt: str,
+                 system_prompt: Optional[str] = None, **sampling: Any) -> str:
+        """
+        生成缓存键
+
+        Args:
+            model: 模型名称
+            temperature: 温度参数
+            max_tokens: 最大令牌数
+            prompt: 格式化后的提示词
+            system_prompt: 系统提示词
+            **sampling: 其他采样参数（如top_p、stop），与参数顺序无关
+
+        Returns:
+            str: 缓存键（SHA-256十六进制）
+        """
+        payload = [model, temperature, max_tokens, system_prompt, prompt]
+        if sampling:
+            payload.append(sampling)
+        return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """打开缓存文件，文件不存在且create为False时返回None"""
+        if self._conn is None:
+            if not create and not os.path.exists(self.config.path):
+                return None
+            directory = os.path.dirname(os.path.abspath(self.config.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.config.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, prompt_key TEXT, content TEXT NOT NULL, response BLOB NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at)")
+            self._conn = conn
+            self._entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return self._conn
+
+    def _count(self, prompt_key: Optional[str], hit: bool) -> None:
+        """记录一次命中或未命中"""
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        counters = self._by_prompt.setdefault(prompt_key or "default", {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+    def get(self, key: str, prompt_key: Optional[str] = None) -> Optional[LLMResponse]:
+        """
+        读取缓存的响应，读取失败时按未命中处理
+
+        Args:
+            key: 缓存键
+            prompt_key: 提示词键（用于统计）
+
+        Returns:
+            Optional[LLMResponse]: 缓存的响应，metadata中cache_hit为True；未命中时返回None
+        """
+        start = time.monotonic()
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                row = None if conn is None else conn.execute(
+                    "SELECT content, response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row is not None and self.config.ttl_seconds and now - row[2] > self.config.ttl_seconds:
+                    if conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)).rowcount:
+                        self._entries -= 1
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self._errors += 1
+            logger.warning(f"读取大模型响应缓存失败: {str(e)}")
+            row = None
+
+        # 可能在多个线程中同时调用，统计也在锁内更新
+        with self._db_lock:
+            self._count(prompt_key, row is not None)
+            if row is None:
+                return None
+            stored = orjson.loads(row[1])
+            self._saved_latency += stored.get("latency") or 0.0
+            self._saved_tokens += (stored.get("tokens_used") or {}).get("total", 0)
+        return LLMResponse(
+            content=row[0],
+            metadata={
+                **(stored.get("metadata") or {}),
+                "cache_hit": True,
+                "cached_at": row[2],
+                "cached_latency": stored.get("latency"),
+                "cached_tokens_used": stored.get("tokens_used"),
+            },
+            cost=0.0,
+            latency=time.monotonic() - start,
+            tokens_used={"prompt": 0, "completion": 0, "total": 0}
+        )
+
+    def put(self, key: str, response: LLMResponse, prompt_key: Optional[str] = None) -> None:
+        """
+        写入响应，条目数超过上限时淘汰最久未命中的条目；写入失败只记录日志
+
+        Args:
+            key: 缓存键
+            response: 大模型响应
+            prompt_key: 提示词键
+        """
+        if not response.content:
+            return
+        stored = orjson.dumps({
+            "metadata": response.metadata,
+            "latency": response.latency,
+            "tokens_used": response.tokens_used,
+        }, default=str)
+        try:
+            with self._db_lock:
+                conn = self._connect(create=True)
+                now = time.time()
+                existed = conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone() is not None
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, prompt_key, content, response, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, prompt_key, response.content, stored, now, now)
+                )
+                self._writes += 1
+                if not existed:
+                    self._entries += 1
+                if self._entries > self.config.max_entries:
+                    evicted = conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN ("
+                        "SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                        (self._entries - self.config.max_entries,)
+                    ).rowcount
+                    self._entries -= evicted
+                    self._evictions += evicted
+        except sqlite3.Error as e:
+            self._errors += 1
+            logger.warning(f"写入大模型响应缓存失败: {str(e)}")
+
+    def clear(self) -> None:
+        """清空缓存条目（统计不清零）"""
+        with self._db_lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                self._entries = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            Dict[str, Any]: 命中次数、命中率、节省的大模型调用时间（秒）和token数等
+        """
+        lookups = self._hits + self._misses
+        with self._db_lock:
+            entries = self._entries if self._connect() is not None else 0
+        return {
+            "enabled": self.config.enabled,
+            "entries": entries,
+            "max_entries": self.config.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "saved_latency": self._saved_latency,
+            "saved_tokens": self._saved_tokens,
+            "writes": self._writes,
+            "evictions": self._evictions,
+            "errors": self._errors,
+            "by_prompt": {key: dict(value) for key, value in self._by_prompt.items()},
+        }
+
+    def close(self) -> None:
+        """关闭缓存文件"""
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._entries = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """获取大模型响应缓存实例"""
+    return LLMResponseCache()
@@ -10,9 +10,13 @@ from pathlib import Path
 
 # from app.api.routes import router as knowledge_graph_router  # 该模块不存在
 from app.api.kg_query_routes import register_routes as register_kg_query_routes
+from app.api.kg_analysis_routes import register_routes as register_kg_analysis_routes
 from app.api.kg_content_routes import register_routes as register_kg_content_routes
 from app.config.config_manager import ConfigManager
-from app.database.manager import init_database
+from app.database.manager import init_database, get_database_manager
+from app.store.graph_index_manage import get_graph_index_manager
+from app.store.entity_stats_manage import get_entity_stats_manager
+from app.store.import_signal_manage import get_import_signal_manager
 
 
 def create_app() -> FastAPI:
@@ -52,9 +56,22 @@ def create_app() -> FastAPI:
     # 注册知识图谱查询路由
     register_kg_query_routes(app)
     
+    # 注册知识图谱分析路由（路径、统计、导出）
+    register_kg_analysis_routes(app)
+    
     # 注册知识图谱内容处理路由
     register_kg_content_routes(app)
     
+    # 启动时升级数据库结构，然后在后台加载内存图索引和实体统计，加载完成前图查询走SQL、排序不使用重要性；
+    # 并定期检查批量导入进程写入的信号，导入完成后刷新缓存和索引
+    @app.on_event("startup")
+    async def load_graph_index():
+        await get_database_manager().create_tables()
+        engine = get_database_manager().engine
+        get_graph_index_manager().start_reload(engine)
+        get_entity_stats_manager().start_refresh(engine)
+        get_import_signal_manager().start_watching(engine)
+    
     # API根路径信息 - 必须在静态文件之前定义
     @app.get("/api")
     async def api_root():
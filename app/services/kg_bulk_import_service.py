@@ -0,0 +1,341 @@
+"""
+知识图谱批量导入服务 - 绕过LLM管道直接导入已抽取的数据
+从JSONL文件批量导入实体、关系和新闻，支持断点续传
+
+用法: python -m app.services.kg_bulk_import_service data.jsonl [--restart] [--no-vectors]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import update
+
+from app.config.config_manager import ConfigManager, BulkImportConfig
+from app.database.models import Entity, EntityStats
+from app.exceptions import IndexNotFoundError
+from app.exceptions.store_exceptions import StoreError
+from app.services.kg_bulk_import_upsert import chunks, upsert_entities, upsert_news, upsert_relations
+from app.store import HybridStoreCore
+from app.store.import_signal_manage import get_import_signal_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class KGBulkImportService:
+    """
+    知识图谱批量导入服务
+
+    输入为JSONL，每行一条记录，按type字段区分：
+    - {"type": "entity", "name": ..., "entity_type": ..., "description": ..., "meta_data": ...}
+    - {"type": "relation", "subject": ..., "predicate": ..., "object": ...,
+       "subject_type": ..., "object_type": ..., "description": ...}
+    - {"type": "news", "title": ..., "content": ..., "source": ..., "publish_time": ...,
+       "entities": [实体名称或 {"name": ..., "entity_type": ...}]}
+
+    实体按(名称, 类型)去重，关系和新闻按名称引用实体，引用的实体不存在时自动创建；
+    关系按(主体, 谓词, 客体)唯一约束写入或更新描述，新闻按标题去重。
+    每批记录在一个事务内写入数据库，然后批量生成嵌入并写入向量库，最后保存断点
+    """
+
+    # 导入统计项，没有发生的项也以0返回
+    STAT_KEYS = (
+        "invalid", "entities_created", "entities_updated", "relations_upserted",
+        "news_created", "news_updated", "news_links", "vectors"
+    )
+    # 导入写入的数据表
+    IMPORT_TABLES = ("entities", "relations", "news_events", "news_event_entity")
+
+    def __init__(self, store: HybridStoreCore, config: Optional[BulkImportConfig] = None):
+        """
+        初始化批量导入服务
+
+        Args:
+            store: 已初始化的存储实例（使用其数据库管理器和向量索引管理器）
+            config: 批量导入配置，为空时从配置文件读取
+        """
+        self.store = store
+        self.db_manager = store.db_manager
+        self.vector_manager = store.vector_manager
+        self.config = config or ConfigManager().get_bulk_import_config()
+
+    # ==================== 文件导入与断点 ====================
+
+    async def import_file(
+        self,
+        path: str,
+        checkpoint_path: Optional[str] = None,
+        resume: bool = True,
+        with_vectors: bool = True,
+        refresh_indexes: bool = True
+    ) -> Dict[str, int]:
+        """
+        从JSONL文件批量导入
+
+        每批写入完成后在断点文件中记录已处理的字节偏移，中断后再次运行时从该位置继续；
+        全部导入完成后删除断点文件
+
+        Args:
+            path: JSONL文件路径
+            checkpoint_path: 断点文件路径，默认为 <path>.checkpoint
+            resume: 是否从已有断点继续（否则从头导入）
+            with_vectors: 是否生成嵌入并写入向量库
+            refresh_indexes: 导入完成后是否重算实体统计，并通知运行中的服务重新加载图索引和实体统计
+
+        Returns:
+            Dict[str, int]: 导入统计（含断点之前已完成批次的统计）
+
+        Raises:
+            StoreError: 导入失败（已完成的批次和断点保留）
+        """
+        checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+        checkpoint = self._load_checkpoint(checkpoint_path, path) if resume else None
+        offset = checkpoint["offset"] if checkpoint else 0
+        stats = Counter(dict.fromkeys(self.STAT_KEYS, 0))
+        stats.update(checkpoint["stats"] if checkpoint else {})
+        if checkpoint:
+            logger.info(f"从断点继续导入: {path}, 偏移 {offset}, 已导入 {dict(stats)}")
+
+        start = time.perf_counter()
+        records_done = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                lines = [line for line in (f.readline() for _ in range(self.config.batch_size)) if line]
+                if not lines:
+                    break
+                records = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        stats["invalid"] += 1
+
+                stats.update(await self.import_records(records, with_vectors))
+                offset = f.tell()
+                self._save_checkpoint(checkpoint_path, path, offset, stats)
+
+                records_done += len(records)
+                elapsed = time.perf_counter() - start
+                logger.info(f"已导入 {records_done} 条记录，{records_done / elapsed:.0f} 条/秒")
+
+        await self._refresh_indexes(refresh_indexes)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        logger.info(f"批量导入完成: {path}, 耗时 {time.perf_counter() - start:.1f}s, {dict(stats)}")
+        return dict(stats)
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: str, path: str) -> Optional[Dict[str, Any]]:
+        """读取断点，文件不存在或属于其他输入文件时返回None"""
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, "rb") as f:
+            checkpoint = orjson.loads(f.read())
+        if checkpoint.get("source") != os.path.abspath(path):
+            logger.warning(f"断点文件不属于当前输入，忽略: {checkpoint_path}")
+            return None
+        return checkpoint
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: str, path: str, offset: int, stats: Counter) -> None:
+        """原子写入断点：先写临时文件再替换，避免中断时留下不完整的断点"""
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({
+                "source": os.path.abspath(path),
+                "offset": offset,
+                "stats": dict(stats),
+                "updated_at": datetime.now()
+            }))
+        os.replace(tmp_path, checkpoint_path)
+
+    async def _refresh_indexes(self, refresh_indexes: bool) -> None:
+        """
+        导入完成后通知运行中的服务
+
+        本进程内的图索引和缓存随进程退出失效，只需重算实体统计（写入entity_stats表），
+        再写入导入信号，由服务进程使响应缓存失效并重新加载图索引和实体统计
+        """
+        tables = list(self.IMPORT_TABLES)
+        if refresh_indexes and self.store.entity_stats.config.enabled:
+            await self.store.entity_stats.recompute(self.db_manager.engine)
+            tables.append(EntityStats.__tablename__)
+        get_import_signal_manager().publish(tables, refresh_indexes)
+
+    # ==================== 批量写入 ====================
+
+    async def import_records(self, records: List[Dict[str, Any]], with_vectors: bool = True) -> Counter:
+        """
+        导入一批记录
+
+        先在一个事务内写入实体、关系、新闻和新闻-实体关联，提交后再批量写入向量并回填vector_id。
+        向量写入前中断时，这些记录的vector_id为空，再次导入同一批记录会补写向量
+
+        Args:
+            records: 已解析的记录
+            with_vectors: 是否生成嵌入并写入向量库
+
+        Returns:
+            Counter: 本批导入统计
+
+        Raises:
+            StoreError: 写入失败
+        """
+        stats = Counter()
+        entity_records, relation_records, news_records = [], [], []
+        for record in records:
+            record_type = record.get("type") if isinstance(record, dict) else None
+            if record_type == "entity" and record.get("name") and record.get("entity_type"):
+                entity_records.append(record)
+            elif record_type == "relation" and record.get("subject") and record.get("object") \
+                    and record.get("predicate"):
+                relation_records.append(record)
+            elif record_type == "news" and record.get("title"):
+                news_records.append(record)
+            else:
+                stats["invalid"] += 1
+
+        try:
+            async with self.db_manager.get_session() as session:
+                entities, entity_vectors = await upsert_entities(
+                    session, entity_records, relation_records, news_records, stats, self.config.default_entity_type
+                )
+                await upsert_relations(session, relation_records, entities, stats)
+                news_vectors = await upsert_news(session, news_records, entities, stats)
+
+            if with_vectors:
+                await self._write_vectors(entity_vectors, news_vectors, stats)
+        except Exception as e:
+            logger.error(f"批量导入失败: {e}")
+            raise StoreError(f"批量导入失败: {str(e)}")
+
+        await self.store.response_cache.bump(*self.IMPORT_TABLES)
+        return stats
+
+    async def _write_vectors(
+        self,
+        entity_vectors: Dict[str, List[Dict[str, Any]]],
+        news_vectors: Dict[str, Any],
+        stats: Counter
+    ) -> None:
+        """批量生成嵌入并写入向量库，然后回填新增实体向量的vector_id"""
+        batch_options = {
+            "embed_batch_size": self.config.embed_batch_size,
+            "vector_batch_size": self.config.vector_batch_size
+        }
+
+        # 已有新闻：向量库中缺失的补写，内容变化的更新
+        news_add, news_update = list(news_vectors["add"]), []
+        if news_vectors["existing"]:
+            present = await self._existing_vector_ids(
+                [f"news_{item['id']}" for item in news_vectors["existing"]]
+            )
+            for item in news_vectors["existing"]:
+                if f"news_{item['id']}" not in present:
+                    news_add.append(item)
+                elif item["id"] in news_vectors["changed"]:
+                    news_update.append(item)
+
+        assigned = []
+        for content_type, items, build, is_update in (
+            ("entity", entity_vectors["add"], self.entity_vector_items, False),
+            ("entity", entity_vectors["update"], self.entity_vector_items, True),
+            ("news", news_add, self.news_vector_items, False),
+            ("news", news_update, self.news_vector_items, True),
+        ):
+            if not items:
+                continue
+            contents, content_ids, metadatas = build(items)
+            vector_ids = await self.vector_manager.add_batch_to_index(
+                contents, content_ids, content_type, metadatas, update=is_update, **batch_options
+            )
+            stats["vectors"] += len(vector_ids)
+            if content_type == "entity" and not is_update:
+                assigned.extend({"id": item["id"], "vector_id": vector_id} for item, vector_id in zip(items, vector_ids))
+
+        if assigned:
+            async with self.db_manager.get_session() as session:
+                await session.execute(update(Entity), assigned)
+
+    async def _existing_vector_ids(self, vector_ids: List[str]) -> set:
+        """查询向量库中已存在的向量ID"""
+        found = set()
+        index_name = self.vector_manager.collection_for("news")
+        for batch in chunks(vector_ids, self.config.vector_batch_size):
+            try:
+                results = await asyncio.to_thread(
+                    self.vector_manager.vector_store.get_vectors, index_name, batch, False, False, False
+                )
+            except IndexNotFoundError:
+                return found
+            found.update(result["id"] for result in results)
+        return found
+
+    # ==================== 工具方法 ====================
+
+    @classmethod
+    def entity_vector_items(cls, items: List[Dict[str, Any]]) -> Tuple[List[str], List[int], List[Dict[str, Any]]]:
+        """实体的向量文本、ID和元数据，与HybridStoreCore.create_entity一致"""
+        return (
+            [f"{item['name']}: {item['description']}" for item in items],
+            [item["id"] for item in items],
+            [cls._vector_metadata({"type": item["type"], "name": item["name"], "description": item["description"]})
+             for item in items]
+        )
+
+    @classmethod
+    def news_vector_items(cls, items: List[Dict[str, Any]]) -> Tuple[List[str], List[int], List[Dict[str, Any]]]:
+        """新闻的向量文本、ID和元数据，与HybridStoreCore.create_news_event一致"""
+        return (
+            [f"{item['title']}: {item['content']}" for item in items],
+            [item["id"] for item in items],
+            [cls._vector_metadata({
+                "type": "news", "title": item["title"], "source": item["source"],
+                "publish_time": item["publish_time"].isoformat() if item["publish_time"] else None
+            }) for item in items]
+        )
+
+    @staticmethod
+    def _vector_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉值为None的元数据（向量库不接受None）"""
+        return {key: value for key, value in metadata.items() if value is not None}
+
+
+async def main() -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="从JSONL文件批量导入实体、关系和新闻")
+    parser.add_argument("path", help="JSONL文件路径")
+    parser.add_argument("--checkpoint", help="断点文件路径（默认 <path>.checkpoint）")
+    parser.add_argument("--restart", action="store_true", help="忽略已有断点，从头导入")
+    parser.add_argument("--no-vectors", action="store_true", help="只写数据库，不生成嵌入")
+    parser.add_argument("--no-refresh", action="store_true", help="导入后不重算实体统计，运行中的服务不重新加载图索引")
+    args = parser.parse_args()
+
+    # 复用内容处理服务的存储初始化（数据库、向量库、嵌入服务）
+    from app.services.kg_core_impl import KGCoreImplService
+    kg_service = KGCoreImplService(auto_init_store=False)
+    await kg_service.initialize()
+    try:
+        stats = await KGBulkImportService(kg_service.store).import_file(
+            args.path,
+            checkpoint_path=args.checkpoint,
+            resume=not args.restart,
+            with_vectors=not args.no_vectors,
+            refresh_indexes=not args.no_refresh
+        )
+        print(orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode())
+    finally:
+        await kg_service.store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,303 @@
+"""
+知识图谱批量导入的数据库写入
+在调用方的事务内按批写入实体、关系、新闻和新闻-实体关联，实体按(名称, 类型)去重，关系和新闻按名称引用实体
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update, func
+
+from app.database.models import Entity, Relation, NewsEvent, news_event_entity
+from app.exceptions.store_exceptions import StoreError
+
+
+# (实体名称, 实体类型)，类型为None表示只按名称引用
+EntityKey = Tuple[str, Optional[str]]
+
+# IN查询每批的参数数量，低于SQLite默认参数上限
+LOOKUP_BATCH_SIZE = 900
+
+
+class EntityResolver:
+    """批量导入中按(名称, 类型)或仅按名称查找实体"""
+
+    def __init__(self):
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # 同名多个类型时，仅按名称引用解析为ID最小的实体
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, entity: Dict[str, Any]) -> None:
+        """登记实体"""
+        self.by_id[entity["id"]] = entity
+        self.by_key[(entity["name"], entity["type"])] = entity
+        current = self.by_name.get(entity["name"])
+        if current is None or entity["id"] < current["id"]:
+            self.by_name[entity["name"]] = entity
+
+    def get(self, key: EntityKey) -> Optional[Dict[str, Any]]:
+        """查找实体，类型为None时只按名称查找"""
+        name, entity_type = key
+        if entity_type is None:
+            return self.by_name.get(name)
+        return self.by_key.get((name, entity_type))
+
+
+async def upsert_entities(
+    session,
+    entity_records: List[Dict[str, Any]],
+    relation_records: List[Dict[str, Any]],
+    news_records: List[Dict[str, Any]],
+    stats: Counter,
+    default_entity_type: str
+) -> Tuple[EntityResolver, Dict[str, List[Dict[str, Any]]]]:
+    """
+    写入实体记录并创建被引用但不存在的实体
+
+    Returns:
+        (实体解析器, 需要写入向量的实体 {"add": [...], "update": [...]})
+    """
+    references: List[EntityKey] = []
+    for record in relation_records:
+        references.append((record["subject"], record.get("subject_type")))
+        references.append((record["object"], record.get("object_type")))
+    for record in news_records:
+        references.extend(news_entity_keys(record))
+
+    names = {record["name"] for record in entity_records} | {name for name, _ in references}
+    resolver = EntityResolver()
+    for batch in chunks(sorted(names), LOOKUP_BATCH_SIZE):
+        result = await session.execute(
+            select(Entity.id, Entity.name, Entity.type, Entity.description, Entity.vector_id)
+            .where(Entity.name.in_(batch))
+        )
+        for row in result.mappings():
+            resolver.add(dict(row))
+
+    # 新实体：显式记录优先（同一批内后出现的覆盖先出现的），再补充被引用但不存在的实体
+    pending: Dict[EntityKey, Dict[str, Any]] = {}
+    updates: Dict[int, Dict[str, Any]] = {}
+    redescribed = set()
+    for record in entity_records:
+        key = (record["name"], record["entity_type"])
+        existing = resolver.get(key)
+        values = {"name": key[0], "type": key[1], "description": record.get("description")}
+        if record.get("meta_data") is not None:
+            values["meta_data"] = record["meta_data"]
+        if existing is None:
+            pending[key] = values
+            continue
+        if values["description"] is not None and values["description"] != existing["description"]:
+            redescribed.add(existing["id"])
+        elif "meta_data" not in values:
+            continue
+        updates[existing["id"]] = {
+            **values, "id": existing["id"], "description": values["description"] or existing["description"],
+            "updated_at": datetime.now()
+        }
+    pending_names = {name for name, _ in pending}
+    for name, entity_type in references:
+        if resolver.get((name, entity_type)) is not None:
+            continue
+        if entity_type is None:
+            if name in pending_names:
+                continue
+            entity_type = default_entity_type
+        if (name, entity_type) not in pending:
+            pending[(name, entity_type)] = {"name": name, "type": entity_type, "description": None}
+            pending_names.add(name)
+
+    created = []
+    if pending:
+        # 待插入实体在批内按(名称, 类型)唯一，按返回的名称和类型对应ID；
+        # 不使用sort_by_parameter_order，否则SQLite会退化为逐行INSERT
+        result = await session.execute(
+            insert(Entity).returning(Entity.id, Entity.name, Entity.type), list(pending.values())
+        )
+        for entity_id, name, entity_type in result.all():
+            row = pending[(name, entity_type)]
+            entity = {"id": entity_id, "name": name, "type": entity_type,
+                      "description": row["description"], "vector_id": None}
+            resolver.add(entity)
+            created.append(entity)
+    if updates:
+        await session.execute(update(Entity), list(updates.values()))
+        for values in updates.values():
+            resolver.by_id[values["id"]]["description"] = values["description"]
+    stats["entities_created"] += len(created)
+    stats["entities_updated"] += len(updates)
+
+    # 本批涉及的已有实体如果还没有向量（上次导入在写入向量前中断），一并补写
+    touched = {resolver.get(key)["id"] for key in
+               [(record["name"], record["entity_type"]) for record in entity_records] + references}
+    vectors = {"add": [], "update": []}
+    for entity_id in touched:
+        entity = resolver.by_id[entity_id]
+        if entity["vector_id"] is None:
+            vectors["add"].append(entity)
+        elif entity_id in redescribed:
+            vectors["update"].append(entity)
+    return resolver, vectors
+
+
+async def upsert_relations(
+    session,
+    relation_records: List[Dict[str, Any]],
+    entities: EntityResolver,
+    stats: Counter
+) -> None:
+    """按(主体, 谓词, 客体)唯一约束写入关系，已存在时更新非空的描述和元数据"""
+    rows: Dict[Tuple[int, str, int], Dict[str, Any]] = {}
+    for record in relation_records:
+        subject_id = entities.get((record["subject"], record.get("subject_type")))["id"]
+        object_id = entities.get((record["object"], record.get("object_type")))["id"]
+        key = (subject_id, record["predicate"], object_id)
+        rows[key] = {
+            "subject_id": subject_id, "predicate": record["predicate"], "object_id": object_id,
+            "description": record.get("description"), "meta_data": record.get("meta_data")
+        }
+    if not rows:
+        return
+
+    table = Relation.__table__
+    stmt = dialect_insert(session, table)
+    if session.bind.dialect.name == "mysql":
+        stmt = stmt.on_duplicate_key_update(
+            description=func.coalesce(stmt.inserted.description, table.c.description),
+            meta_data=func.coalesce(stmt.inserted.meta_data, table.c.meta_data)
+        )
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["subject_id", "predicate", "object_id"],
+            set_={
+                "description": func.coalesce(stmt.excluded.description, table.c.description),
+                "meta_data": func.coalesce(stmt.excluded.meta_data, table.c.meta_data)
+            }
+        )
+    await session.execute(stmt, list(rows.values()))
+    stats["relations_upserted"] += len(rows)
+
+
+async def upsert_news(
+    session,
+    news_records: List[Dict[str, Any]],
+    entities: EntityResolver,
+    stats: Counter
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    按标题写入新闻并关联实体
+
+    新闻表没有vector_id列，已有新闻是否已写入向量在写入向量时向向量库确认
+
+    Returns:
+        需要写入向量的新闻 {"add": [新建], "existing": [已有], "changed": {内容变化的新闻ID}}
+    """
+    vectors = {"add": [], "existing": [], "changed": set()}
+    if not news_records:
+        return vectors
+
+    # 同一批内标题重复时后出现的覆盖先出现的
+    records = {record["title"]: record for record in news_records}
+    existing: Dict[str, Dict[str, Any]] = {}
+    for batch in chunks(list(records), LOOKUP_BATCH_SIZE):
+        result = await session.execute(
+            select(NewsEvent.id, NewsEvent.title, NewsEvent.content, NewsEvent.source,
+                   NewsEvent.publish_time)
+            .where(NewsEvent.title.in_(batch))
+        )
+        for row in result.mappings():
+            existing.setdefault(row["title"], dict(row))
+
+    new_rows, updates = [], []
+    for title, record in records.items():
+        values = {
+            "title": title,
+            "content": record.get("content"),
+            "source": record.get("source"),
+            "publish_time": parse_time(record.get("publish_time"))
+        }
+        current = existing.get(title)
+        if current is None:
+            new_rows.append(values)
+            continue
+        changed = {key: value for key, value in values.items() if value is not None and value != current[key]}
+        if changed:
+            current.update(changed)
+            updates.append({"id": current["id"], **changed, "updated_at": datetime.now()})
+            vectors["changed"].add(current["id"])
+        vectors["existing"].append(current)
+
+    if new_rows:
+        # 新闻在批内按标题唯一，按返回的标题对应ID
+        new_by_title = {values["title"]: values for values in new_rows}
+        result = await session.execute(insert(NewsEvent).returning(NewsEvent.id, NewsEvent.title), new_rows)
+        for news_id, title in result.all():
+            existing[title] = {**new_by_title[title], "id": news_id}
+            vectors["add"].append(existing[title])
+    if updates:
+        await session.execute(update(NewsEvent), updates)
+    stats["news_created"] += len(new_rows)
+    stats["news_updated"] += len(updates)
+
+    links = {
+        (existing[title]["id"], entities.get(key)["id"])
+        for title, record in records.items() for key in news_entity_keys(record)
+    }
+    if links:
+        stmt = dialect_insert(session, news_event_entity)
+        if session.bind.dialect.name == "mysql":
+            stmt = stmt.prefix_with("IGNORE")
+        else:
+            stmt = stmt.on_conflict_do_nothing()
+        now = datetime.now()
+        await session.execute(stmt, [
+            {"news_event_id": news_id, "entity_id": entity_id, "created_at": now} for news_id, entity_id in links
+        ])
+        stats["news_links"] += len(links)
+    return vectors
+
+
+def news_entity_keys(record: Dict[str, Any]) -> List[EntityKey]:
+    """新闻记录引用的实体，支持名称字符串或 {"name", "entity_type"}"""
+    keys = []
+    for item in record.get("entities") or []:
+        if isinstance(item, dict):
+            if item.get("name"):
+                keys.append((item["name"], item.get("entity_type")))
+        elif item:
+            keys.append((str(item), None))
+    return keys
+
+
+def parse_time(value: Any) -> Optional[datetime]:
+    """解析ISO格式时间，无法解析时返回None"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def dialect_insert(session, table):
+    """按数据库方言选择支持冲突处理的INSERT构造"""
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    else:
+        raise StoreError(f"批量导入不支持的数据库: {dialect}")
+    return dialect_insert(table)
+
+
+def chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    """按固定大小切分列表"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
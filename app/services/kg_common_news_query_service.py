@@ -0,0 +1,145 @@
+"""
+知识图谱多实体共同新闻查询
+在新闻-实体关联表上按新闻分组统计命中的实体数，借助实体新闻提及数选择枢轴实体缩小扫描范围
+"""
+
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+from sqlalchemy import select, func
+
+from app.database.models import NewsEvent, news_event_entity
+from app.utils.logging_utils import get_logger
+from app.services.kg_query_base_service import KGQueryBaseService
+
+logger = get_logger(__name__)
+
+
+class KGCommonNewsQueryService(KGQueryBaseService):
+    """
+    知识图谱多实体共同新闻查询服务
+    """
+    
+    # 共同新闻查询中枢轴实体每条关联的相对回查代价
+    COMMON_NEWS_PIVOT_COST = 4
+    
+    # ==================== 多实体共同新闻查询功能 ====================
+    
+    async def get_common_news_for_entities(
+        self,
+        entity_ids: List[int],
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        min_match: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        获取多个实体共同关联的新闻
+        
+        在关联表上按新闻分组，保留关联实体数达到要求的新闻；
+        总数通过窗口函数随当前页一并返回，只需一次查询
+        
+        Args:
+            entity_ids: 实体ID列表
+            page: 页码（提供cursor时忽略）
+            page_size: 每页数量
+            cursor: 游标，取自上一页返回的next_cursor
+            min_match: 至少关联其中多少个实体（模糊共现），默认要求关联全部实体
+            
+        Returns:
+            共同关联的新闻数据，每条新闻附带命中的实体数量
+            
+        Raises:
+            ValueError: min_match超出 [1, 实体数量] 范围
+        """
+        try:
+            entity_ids = sorted(set(entity_ids))
+            required = len(entity_ids) if min_match is None else min_match
+            if len(entity_ids) < 2:
+                return {
+                    **self._package_page([], 0, page, page_size, None, True),
+                    "entity_count": len(entity_ids),
+                    "min_match": required
+                }
+            
+            if not 1 <= required <= len(entity_ids):
+                raise ValueError(f"min_match 必须在 1 到 {len(entity_ids)} 之间: {min_match}")
+            
+            # 按新闻分组统计命中的实体数，窗口函数在分组之后计算满足条件的新闻总数
+            matched_count = func.count(func.distinct(news_event_entity.c.entity_id))
+            matched = select(
+                news_event_entity.c.news_event_id,
+                matched_count.label("matched_count"),
+                func.count().over().label("total")
+            ).where(
+                news_event_entity.c.entity_id.in_(entity_ids)
+            )
+            
+            pivot_ids = self._common_news_pivots(entity_ids, required)
+            if pivot_ids:
+                # 命中required个实体的新闻必然关联提及最少的 n-required+1 个实体之一，
+                # 只对这些实体关联的新闻分组，避免扫描热门实体的全部关联
+                matched = matched.where(news_event_entity.c.news_event_id.in_(
+                    select(news_event_entity.c.news_event_id)
+                    .where(news_event_entity.c.entity_id.in_(pivot_ids))
+                ))
+            
+            matched = matched.group_by(
+                news_event_entity.c.news_event_id
+            ).having(matched_count >= required).subquery()
+            
+            stmt = select(
+                *self._NEWS_ITEM_COLUMNS, matched.c.matched_count.label("matched_entities"), matched.c.total
+            ).join(matched, matched.c.news_event_id == NewsEvent.id)
+            rows, next_cursor = await self._fetch_page(
+                stmt, NewsEvent, "publish_time", True, page, page_size, cursor, sort_key="published_at"
+            )
+            
+            if rows:
+                total = rows[0]["total"]
+            elif page == 1 and not cursor:
+                total = 0
+            else:
+                # 页码或游标超出结果范围时当前页为空，单独计算总数
+                total = (await self.session.execute(select(func.count()).select_from(matched))).scalar() or 0
+            
+            items = []
+            for row in rows:
+                item = self._news_item(row)
+                del item["total"]
+                items.append(item)
+            
+            return {
+                **self._package_page(items, total, page, page_size, next_cursor, True),
+                "entity_count": len(entity_ids),
+                "min_match": required
+            }
+            
+        except Exception as e:
+            logger.error(f"获取多实体共同新闻失败: {e}")
+            raise
+    
+    def _common_news_pivots(self, entity_ids: List[int], required: int) -> Optional[List[int]]:
+        """
+        选择共同新闻查询的枢轴实体（新闻提及数最少的 n-required+1 个实体）
+        
+        枢轴实体的关联按(新闻, 实体)逐条回查，代价约为扫描同等行数的数倍，
+        只有枢轴实体的关联明显少于全部实体时才使用
+        
+        Args:
+            entity_ids: 去重后的实体ID列表
+            required: 至少需要命中的实体数量
+            
+        Returns:
+            Optional[List[int]]: 枢轴实体ID列表，统计未就绪或不划算时返回None
+        """
+        news_counts = self.entity_stats.get_news_counts(entity_ids)
+        if news_counts is None:
+            return None
+        
+        pivot_count = len(entity_ids) - required + 1
+        order = np.argsort(news_counts, kind="stable")[:pivot_count]
+        pivot_links = int(news_counts[order].sum())
+        if pivot_links * len(entity_ids) * self.COMMON_NEWS_PIVOT_COST >= int(news_counts.sum()):
+            return None
+        return [entity_ids[i] for i in order.tolist()]
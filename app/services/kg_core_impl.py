@@ -1,12 +1,13 @@
 """
 KG核心实现服务
 """
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, AsyncIterable, AsyncIterator, Union
 from datetime import datetime
 
 from app.core.base_service import BaseService
 from app.core.content_summarizer import ContentSummarizer
-from app.core.content_processor import ContentProcessor
+from app.core.content_processor import ContentProcessor, ExtractionStream
 from app.core.entity_analyzer import EntityAnalyzer
 from app.core.extract_models import Entity, Relation, KnowledgeGraph, ContentSummary
 from app.store.store_base_abstract import NewsEvent
@@ -222,7 +223,6 @@ class KGCoreImplService(BaseService,KGCoreAbstractService):
             ValueError: 当内容为空或无效时
             RuntimeError: 当处理过程中出现错误时
         """
-        import time
         total_start_time = time.time()
         
         try:
@@ -267,27 +267,51 @@ class KGCoreImplService(BaseService,KGCoreAbstractService):
             if not category_info:
                 raise ValueError(f"未知的分类: {category_name}")
 
-            # 2. 实体和关系提取
-            extract_time = time.time()
-            extraction_result = await self.content_processor.extract_entities_and_relations(
-                content, 
-                entity_types=category_info.get_entity_types_prompt(),
-                relation_types=category_info.get_relation_types_prompt()
-            )
-            extract_elapsed = time.time() - extract_time
-            entities_count = len(extraction_result.knowledge_graph.entities)
-            relations_count = len(extraction_result.knowledge_graph.relations)
-            logger.info(f"[EXTRACT] 实体关系提取完成，耗时: {extract_elapsed:.2f}秒, 实体数量: {entities_count}, 关系数量: {relations_count}")
-            
-            self._log_operation_start("提取结果", 
-                                    实体数量=entities_count,
-                                    关系数量=relations_count)
-            
-            # 3. 处理实体
-            process_entity_time = time.time()
-            processed_entities = await self._process_entities_with_vector_search(extraction_result.knowledge_graph.entities)
-            process_entity_elapsed = time.time() - process_entity_time
-            logger.info(f"[PROCESS ENTITY] 实体处理完成，耗时: {process_entity_elapsed:.2f}秒, 处理后实体数量: {len(processed_entities)}")
+            if knowledge_graph_config.streaming_extraction:
+                # 2+3. 流式实体关系提取：实体一生成完整就查找、消歧和存储，与大模型生成同时进行
+                process_entity_time = time.time()
+                extraction_stream = self.content_processor.stream_entities_and_relations(
+                    content,
+                    entity_types=category_info.get_entity_types_prompt(),
+                    relation_types=category_info.get_relation_types_prompt()
+                )
+                processed_entities = await self._process_streamed_entities(extraction_stream)
+                process_entity_elapsed = time.time() - process_entity_time
+                extraction_result = extraction_stream.result
+                entities_count = len(extraction_result.knowledge_graph.entities)
+                relations_count = len(extraction_result.knowledge_graph.relations)
+                first_entity = extraction_stream.first_entity_seconds
+                logger.info(f"[EXTRACT] 流式实体关系提取完成，首个实体: "
+                            f"{f'{first_entity:.2f}秒' if first_entity is not None else '无'}, "
+                            f"生成耗时: {extraction_stream.total_seconds:.2f}秒, 实体数量: {entities_count}, "
+                            f"关系数量: {relations_count}{', 已改为一次性调用' if extraction_stream.fallback else ''}")
+                self._log_operation_start("提取结果",
+                                        实体数量=entities_count,
+                                        关系数量=relations_count)
+                logger.info(f"[PROCESS ENTITY] 实体处理完成，耗时（含生成）: {process_entity_elapsed:.2f}秒, "
+                            f"处理后实体数量: {len(processed_entities)}")
+            else:
+                # 2. 实体和关系提取
+                extract_time = time.time()
+                extraction_result = await self.content_processor.extract_entities_and_relations(
+                    content, 
+                    entity_types=category_info.get_entity_types_prompt(),
+                    relation_types=category_info.get_relation_types_prompt()
+                )
+                extract_elapsed = time.time() - extract_time
+                entities_count = len(extraction_result.knowledge_graph.entities)
+                relations_count = len(extraction_result.knowledge_graph.relations)
+                logger.info(f"[EXTRACT] 实体关系提取完成，耗时: {extract_elapsed:.2f}秒, 实体数量: {entities_count}, 关系数量: {relations_count}")
+                
+                self._log_operation_start("提取结果", 
+                                        实体数量=entities_count,
+                                        关系数量=relations_count)
+                
+                # 3. 处理实体
+                process_entity_time = time.time()
+                processed_entities = await self._process_entities_with_vector_search(extraction_result.knowledge_graph.entities)
+                process_entity_elapsed = time.time() - process_entity_time
+                logger.info(f"[PROCESS ENTITY] 实体处理完成，耗时: {process_entity_elapsed:.2f}秒, 处理后实体数量: {len(processed_entities)}")
             
             # 4. 处理关系
             process_relation_time = time.time()
@@ -313,6 +337,9 @@ class KGCoreImplService(BaseService,KGCoreAbstractService):
             news_elapsed = time.time() - news_time
             logger.info(f"[NEWS] 新闻事件创建完成，耗时: {news_elapsed:.2f}秒")
             
+            # 本批实体、关系和新闻关联写入完成，后台增量刷新实体统计
+            self.store.refresh_entity_stats()
+            
             # 7. 构建并返回知识图谱
             build_time = time.time()
             knowledge_graph = await self._build_knowledge_graph(
@@ -383,81 +410,160 @@ class KGCoreImplService(BaseService,KGCoreAbstractService):
             metadata=metadata
         )
 
-    async def _process_entities_with_vector_search(self, entities: List[Entity]) -> Dict[str, Entity]:
+    async def _process_entities_with_vector_search(
+            self, entities: Union[List[Entity], AsyncIterable[Entity]],
+            staged: Optional[List[Entity]] = None) -> Dict[str, Entity]:
         """
         处理实体列表：严格按照todo要求实现向量查找、消歧、合并存储
         
         Args:
-            entities: 待处理的实体列表
+            entities: 待处理的实体列表，或流式提取返回的实体异步迭代器（实体一生成完整就开始处理）
+            staged: 暂存列表（可选），提供时新实体不存储，追加到其中并以未存储的实体返回
             
         Returns:
             处理后的实体映射（实体名称 -> 实体对象）
         """
         processed_entities = {}
-        total_entities = len(entities)
-        logger.info(f"开始处理实体列表，共 {total_entities} 个实体")
+        start_time = time.time()
+        if isinstance(entities, list):
+            logger.info(f"开始处理实体列表，共 {len(entities)} 个实体")
+        else:
+            logger.info("开始处理流式提取的实体")
         
-        for i, entity in enumerate(entities):
+        async for entity in self._iter_entities(entities):
+            entity_name = entity.name
+            # 检查是否已处理过该实体
+            if entity_name in processed_entities:
+                logger.debug(f"实体 '{entity_name}' 已处理，跳过")
+                continue
+            
             try:
-                entity_name = entity.name
-                # 检查是否已处理过该实体
-                if entity_name in processed_entities:
-                    logger.debug(f"实体 '{entity_name}' 已处理，跳过")
-                    continue
-                
-                # 根据store中存储的方法，根据向量查找，找到对应的相似向量
-                similar_entities = await self.store.search_entities(
-                    query=entity_name,
-                    entity_type=entity.type,
-                    top_k=5,
-                    include_vector_search=True,
-                    include_full_text_search=False
-                )
-                
-                if not similar_entities:
-                    # 未找到相似实体，创建新实体
-                    stored_entity = await self.store.create_entity(entity)
-                    logger.debug(f"成功存储新实体: {stored_entity.name} (ID: {stored_entity.id}, 类型: {stored_entity.type})")
-                    processed_entities[entity_name] = stored_entity
-                    continue
-
-                knowledge_config = self.config.get_knowledge_graph_config()
-                # 检查是否有完全匹配的实体
-                matched_entity = None
-                for result in similar_entities:
-                    if result.entity and (result.entity.name == entity_name or result.score > knowledge_config.similarity_threshold):
-                        matched_entity = result.entity
-                        break
-                
-                if matched_entity:
-                    logger.debug(f"已找到匹配实体: '{matched_entity.name}'")
-                    processed_entities[entity_name] = matched_entity
-                    continue
-
-                # 准备候选实体列表
-                candidate_entities = [result.entity for result in similar_entities]
-                
-                # 解析实体歧义
-                ambiguity_result = await self.entity_analyzer.resolve_entity_ambiguity(
-                        entity, candidate_entities
-                )
-
-                if ambiguity_result.selected_entity:
-                    selected_entity = ambiguity_result.selected_entity
-                    logger.debug(f"实体 '{entity_name}' 与选中实体 '{selected_entity.name}' 匹配 (置信度: {ambiguity_result.confidence})")
-                    processed_entities[entity_name] = selected_entity
-                else:
-                    # 如果没有选中的实体，创建新实体
-                    stored_entity = await self.store.create_entity(entity)
-                    logger.debug(f"成功存储新实体: {stored_entity.name} (ID: {stored_entity.id}, 类型: {stored_entity.type})")
-                    processed_entities[entity_name] = stored_entity
-
+                processed_entities[entity_name] = await self._resolve_entity(entity, staged)
             except Exception as e:
                 logger.error(f"处理实体 '{entity.name}' 失败: {e}")
                 continue
+            
+            if len(processed_entities) == 1:
+                logger.info(f"[FIRST ENTITY] 首个实体处理完成，耗时: {time.time() - start_time:.2f}秒")
         
         logger.info(f"实体处理完成，共处理 {len(processed_entities)} 个有效实体")
         return processed_entities
+    
+    async def _process_streamed_entities(self, extraction_stream: ExtractionStream) -> Dict[str, Entity]:
+        """
+        处理流式提取的实体，以最终提取结果为准
+
+        流式过程中只查找和消歧，没有对应已有实体的新实体暂存在内存中；最终结果确定后丢弃其中没有的实体
+        （如流式中断后一次性调用返回了不同的实体集合），再存储暂存的新实体。
+        提取失败时没有写入任何实体，不会删除可能已被并发处理引用的数据
+
+        Args:
+            extraction_stream: 流式提取结果
+
+        Returns:
+            处理后的实体映射（实体名称 -> 实体对象）
+
+        Raises:
+            RuntimeError: 实体关系提取失败
+        """
+        staged: List[Entity] = []
+        processed_entities = await self._process_entities_with_vector_search(extraction_stream, staged)
+
+        final_names = {entity.name for entity in extraction_stream.result.knowledge_graph.entities}
+        stale_names = [name for name in processed_entities if name not in final_names]
+        for name in stale_names:
+            del processed_entities[name]
+        if stale_names:
+            logger.info(f"移除不在最终提取结果中的实体: {stale_names}")
+
+        # 存储前重新查找：暂存期间本批其他实体或并发的处理可能已经存储了同一实体
+        staged_ids = {id(entity) for entity in staged}
+        for name, entity in list(processed_entities.items()):
+            if id(entity) not in staged_ids:
+                continue
+            try:
+                processed_entities[name] = await self._resolve_entity(entity)
+            except Exception as e:
+                logger.error(f"存储实体 '{name}' 失败: {e}")
+                del processed_entities[name]
+        return processed_entities
+
+    @staticmethod
+    async def _iter_entities(entities: Union[List[Entity], AsyncIterable[Entity]]) -> AsyncIterator[Entity]:
+        """以异步迭代的方式遍历实体列表或实体异步迭代器"""
+        if isinstance(entities, list):
+            for entity in entities:
+                yield entity
+        else:
+            async for entity in entities:
+                yield entity
+    
+    async def _resolve_entity(self, entity: Entity, staged: Optional[List[Entity]] = None) -> Entity:
+        """
+        查找相似实体并消歧，未找到对应实体时存储为新实体
+        
+        Args:
+            entity: 提取的实体
+            staged: 暂存列表（可选），提供时新实体不存储，追加到其中
+            
+        Returns:
+            Entity: 匹配的已有实体、新存储的实体或暂存的实体
+        """
+        entity_name = entity.name
+        # 根据store中存储的方法，根据向量查找，找到对应的相似向量
+        similar_entities = await self.store.search_entities(
+            query=entity_name,
+            entity_type=entity.type,
+            top_k=5,
+            include_vector_search=True,
+            include_full_text_search=False
+        )
+        
+        if not similar_entities:
+            # 未找到相似实体，创建新实体
+            return await self._create_entity(entity, staged)
+
+        knowledge_config = self.config.get_knowledge_graph_config()
+        # 检查是否有完全匹配的实体
+        for result in similar_entities:
+            if result.entity and (result.entity.name == entity_name or result.score > knowledge_config.similarity_threshold):
+                logger.debug(f"已找到匹配实体: '{result.entity.name}'")
+                return result.entity
+
+        # 准备候选实体列表
+        candidate_entities = [result.entity for result in similar_entities]
+        
+        # 解析实体歧义
+        ambiguity_result = await self.entity_analyzer.resolve_entity_ambiguity(
+                entity, candidate_entities
+        )
+
+        if ambiguity_result.selected_entity:
+            selected_entity = ambiguity_result.selected_entity
+            logger.debug(f"实体 '{entity_name}' 与选中实体 '{selected_entity.name}' 匹配 (置信度: {ambiguity_result.confidence})")
+            return selected_entity
+        
+        # 如果没有选中的实体，创建新实体
+        return await self._create_entity(entity, staged)
+
+    async def _create_entity(self, entity: Entity, staged: Optional[List[Entity]] = None) -> Entity:
+        """
+        存储新实体；提供暂存列表时只暂存，由调用方确认后再存储
+        
+        Args:
+            entity: 提取的实体
+            staged: 暂存列表（可选）
+            
+        Returns:
+            Entity: 新存储的实体或暂存的实体
+        """
+        if staged is not None:
+            staged.append(entity)
+            logger.debug(f"暂存新实体: {entity.name} (类型: {entity.type})")
+            return entity
+        stored_entity = await self.store.create_entity(entity)
+        logger.debug(f"成功存储新实体: {stored_entity.name} (ID: {stored_entity.id}, 类型: {stored_entity.type})")
+        return stored_entity
 
     async def _process_relations(self, relations: List[Relation], entity_map: Dict[str, Entity]) -> None:
         """
@@ -0,0 +1,158 @@
+"""
+知识图谱导出服务 - 流式导出全量或增量图谱数据
+为下游分析提供实体、关系和新闻-实体关联的批量导出，替代逐页调用列表接口
+"""
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Entity, Relation, news_event_entity
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class KGExportService:
+    """
+    知识图谱导出服务
+
+    通过服务端游标按主键顺序分批读取数据，每批序列化后立即输出，
+    内存占用只与批大小有关，与图谱规模无关。输出为按行分隔的JSON（NDJSON）：
+    - 首行为 {"type": "meta", "exported_at": ...}，exported_at可作为下一次增量导出的updated_since
+    - ndjson格式每行一条记录，columnar格式每行一批记录的并行数组
+    - 末行为 {"type": "end", "counts": {...}}，客户端可据此确认导出完整
+    """
+
+    # 可导出的数据类型 -> 记录的type字段
+    EXPORT_TYPES = {
+        "entities": "entity",
+        "relations": "relation",
+        "news_entities": "news_entity",
+    }
+    EXPORT_FORMATS = ("ndjson", "columnar")
+    DEFAULT_BATCH_SIZE = 1000
+
+    # 各类型导出的列；实体类型命名为entity_type，避免与记录的type字段冲突
+    _ENTITY_COLUMNS = (
+        Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description,
+        Entity.canonical_id, Entity.meta_data, Entity.created_at, Entity.updated_at
+    )
+    _RELATION_COLUMNS = (
+        Relation.id, Relation.subject_id, Relation.predicate, Relation.object_id,
+        Relation.description, Relation.meta_data, Relation.created_at
+    )
+    _NEWS_ENTITY_COLUMNS = (
+        news_event_entity.c.news_event_id, news_event_entity.c.entity_id, news_event_entity.c.created_at
+    )
+
+    def __init__(self, session: AsyncSession):
+        """初始化导出服务"""
+        self.session = session
+
+    @classmethod
+    def normalize_types(cls, types: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        校验并规范化导出类型
+
+        Args:
+            types: 导出类型列表，为空时导出全部类型
+
+        Returns:
+            List[str]: 按EXPORT_TYPES顺序排列的导出类型
+
+        Raises:
+            ValueError: 包含不支持的导出类型
+        """
+        if not types:
+            return list(cls.EXPORT_TYPES)
+        unknown = set(types) - set(cls.EXPORT_TYPES)
+        if unknown:
+            raise ValueError(f"不支持的导出类型: {', '.join(sorted(unknown))}")
+        return [export_type for export_type in cls.EXPORT_TYPES if export_type in types]
+
+    def _build_statement(self, export_type: str, updated_since: Optional[datetime]):
+        """构建按主键排序的导出查询，updated_since过滤此后创建或更新的记录"""
+        if export_type == "entities":
+            stmt = select(*self._ENTITY_COLUMNS).order_by(Entity.id)
+            if updated_since is not None:
+                stmt = stmt.where(or_(Entity.updated_at >= updated_since, Entity.created_at >= updated_since))
+        elif export_type == "relations":
+            # 关系没有更新时间，按创建时间增量导出
+            stmt = select(*self._RELATION_COLUMNS).order_by(Relation.id)
+            if updated_since is not None:
+                stmt = stmt.where(Relation.created_at >= updated_since)
+        else:
+            stmt = select(*self._NEWS_ENTITY_COLUMNS).order_by(
+                news_event_entity.c.news_event_id, news_event_entity.c.entity_id
+            )
+            if updated_since is not None:
+                stmt = stmt.where(news_event_entity.c.created_at >= updated_since)
+        return stmt
+
+    async def stream_export(
+        self,
+        types: Optional[Sequence[str]] = None,
+        updated_since: Optional[datetime] = None,
+        export_format: str = "ndjson",
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        流式导出图谱数据
+
+        Args:
+            types: 导出类型（entities/relations/news_entities），为空时全部导出
+            updated_since: 只导出此时间之后创建或更新的记录
+            export_format: ndjson（每行一条记录）或columnar（每行一批记录的并行数组）
+            batch_size: 每批从游标读取的行数
+
+        Yields:
+            bytes: 以换行结尾的一行或多行JSON
+
+        Raises:
+            ValueError: 导出类型或格式不支持
+        """
+        types = self.normalize_types(types)
+        if export_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+
+        exported_at = datetime.now()
+        yield self._dump({
+            "type": "meta",
+            "exported_at": exported_at,
+            "updated_since": updated_since,
+            "format": export_format,
+            "types": types
+        })
+
+        counts: Dict[str, int] = {}
+        for export_type in types:
+            record_type = self.EXPORT_TYPES[export_type]
+            counts[export_type] = 0
+            try:
+                result = await self.session.stream(
+                    self._build_statement(export_type, updated_since).execution_options(yield_per=batch_size)
+                )
+                async for rows in result.mappings().partitions(batch_size):
+                    counts[export_type] += len(rows)
+                    if export_format == "columnar":
+                        yield self._dump({
+                            "type": record_type,
+                            "columns": {key: [row[key] for row in rows] for key in rows[0].keys()}
+                        })
+                    else:
+                        yield b"".join(self._dump({"type": record_type, **row}) for row in rows)
+            except Exception as e:
+                logger.error(f"导出{export_type}失败: {e}")
+                raise
+
+        logger.info(f"图谱导出完成: {counts}")
+        yield self._dump({"type": "end", "exported_at": exported_at, "counts": counts})
+
+    @staticmethod
+    def _dump(record: Dict[str, Any]) -> bytes:
+        """序列化一行NDJSON（Table列名为str子类，需要OPT_NON_STR_KEYS）"""
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,295 @@
+"""
+知识图谱邻居网络查询
+逐层批量的广度优先搜索，优先使用内存图索引，不可用时回退到SQL；支持逐条记录和列式两种返回格式
+"""
+
+from typing import List, Optional, Dict, Any, Tuple
+
+from sqlalchemy import select, func, null, union_all
+
+from app.database.models import Entity, EntityStats, Relation
+from app.utils.logging_utils import get_logger
+from app.services.kg_query_base_service import KGQueryBaseService
+
+logger = get_logger(__name__)
+
+
+class KGNeighborQueryService(KGQueryBaseService):
+    """
+    知识图谱邻居网络查询服务
+    """
+    
+    # 列式格式的边只需要两端实体和关系类型
+    _EDGE_KEY_COLUMNS = (Relation.subject_id, Relation.object_id, Relation.predicate)
+    
+    # 邻居网络的返回格式：records为逐节点/逐边的字典，columnar为并行数组
+    NEIGHBOR_FORMATS = ("records", "columnar")
+    
+    # ==================== 实体深度遍历功能 ====================
+    
+    async def get_entity_neighbors(
+        self,
+        entity_id: int,
+        depth: int = 2,
+        relation_types: Optional[List[str]] = None,
+        max_entities: int = 100,
+        response_format: str = "records"
+    ) -> Dict[str, Any]:
+        """
+        获取实体的邻居网络 - 逐层批量的广度优先搜索
+        
+        每一层只发起一次批量邻居查询；当新实体数超出max_entities时，
+        优先保留与上一层连接数最多的实体，连接数相同时优先保留PageRank更高的实体。
+        返回的边为结果实体之间的全部关系
+        
+        Args:
+            entity_id: 起始实体ID
+            depth: 遍历深度（默认2层）
+            relation_types: 关系类型过滤
+            max_entities: 最大实体数量限制
+            response_format: 返回格式，records（默认）或columnar（见_build_columnar_graph）
+            
+        Returns:
+            {
+                "nodes": List[实体节点],
+                "edges": List[关系边],
+                "metadata": 遍历统计信息
+            }
+            
+        Raises:
+            ValueError: 返回格式不支持
+        """
+        if response_format not in self.NEIGHBOR_FORMATS:
+            raise ValueError(f"不支持的返回格式: {response_format}")
+        
+        try:
+            # 使用字典记录每个实体的层级信息
+            entity_levels = {}
+            nodes = []
+            
+            # 获取起始实体
+            start_entity = await self.entity_repo.get_by_id(entity_id)
+            if not start_entity:
+                if response_format == "columnar":
+                    return self._build_columnar_graph(entity_id, {}, [], [], {"total_nodes": 0, "total_edges": 0})
+                return {"nodes": [], "edges": [], "metadata": {"total_nodes": 0, "total_edges": 0}}
+            
+            # 初始化BFS - 每层一次批量查询整个前沿
+            current_level = [entity_id]
+            entity_levels[entity_id] = 0  # 中心实体为第0层
+            truncated = False
+            
+            logger.info(f"开始BFS遍历，起始实体: {entity_id}, 目标深度: {depth}, 最大实体数: {max_entities}")
+            
+            # 逐层遍历
+            for current_depth in range(depth):
+                remaining = max_entities - len(entity_levels)
+                if remaining <= 0:
+                    break
+                
+                # 候选邻居按与当前前沿的连接数降序排列，多取一个用于判断是否截断
+                candidates = await self._rank_frontier_neighbors(
+                    current_level, list(entity_levels.keys()), relation_types, limit=remaining + 1
+                )
+                if len(candidates) > remaining:
+                    truncated = True
+                    candidates = candidates[:remaining]
+                
+                next_level = [neighbor_id for neighbor_id, _ in candidates]
+                for neighbor_id in next_level:
+                    entity_levels[neighbor_id] = current_depth + 1
+                
+                logger.debug(
+                    f"第 {current_depth + 1} 层: 前沿实体 {len(current_level)}, 纳入 {len(next_level)}"
+                )
+                
+                current_level = next_level
+                
+                # 如果下一层没有新实体，提前结束
+                if not current_level:
+                    break
+            
+            if truncated:
+                logger.info(f"达到最大实体数限制: {max_entities}，已按连接数优先截断")
+            
+            # 统计各层级实体数量
+            level_stats = {}
+            for level in entity_levels.values():
+                level_stats[level] = level_stats.get(level, 0) + 1
+            
+            metadata = {
+                "total_nodes": len(entity_levels),
+                "center_entity_id": entity_id,
+                "max_depth": depth,
+                "visited_entities": len(entity_levels),
+                "level_distribution": level_stats,  # 各层级实体分布
+                "truncated": truncated
+            }
+            
+            if response_format == "columnar":
+                # 列式格式只查询编码所需的列
+                relation_rows = await self._get_relations_among(
+                    list(entity_levels.keys()), relation_types, columns=self._EDGE_KEY_COLUMNS
+                )
+                entity_rows = (await self.session.execute(
+                    select(Entity.id, Entity.name, Entity.type).where(Entity.id.in_(list(entity_levels.keys())))
+                )).all()
+                metadata["total_edges"] = len(relation_rows)
+                return self._build_columnar_graph(entity_id, entity_levels, entity_rows, relation_rows, metadata)
+            
+            # 返回结果实体之间的全部关系边，不包含指向未返回实体的悬空边
+            edges = []
+            for relation_id, source, target, relation_type, description in await self._get_relations_among(
+                list(entity_levels.keys()), relation_types
+            ):
+                edges.append({
+                    "id": relation_id,
+                    "source": source,
+                    "target": target,
+                    "relation_type": relation_type,
+                    "description": description,
+                    "confidence": None
+                })
+            
+            # 获取所有访问过的实体详细信息，包含层级信息
+            if entity_levels:
+                entities_stmt = select(
+                    Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description,
+                    null().label("confidence"), Entity.created_at
+                ).where(Entity.id.in_(list(entity_levels.keys())))
+                entities_result = await self.session.execute(entities_stmt)
+                
+                for row in entities_result.mappings():
+                    node = dict(row)
+                    node["is_center"] = row["id"] == entity_id  # 标记中心节点
+                    node["level"] = entity_levels.get(row["id"], 0)  # 添加层级信息
+                    nodes.append(node)
+            
+            metadata["total_nodes"] = len(nodes)
+            metadata["total_edges"] = len(edges)
+            return {"nodes": nodes, "edges": edges, "metadata": metadata}
+            
+        except Exception as e:
+            logger.error(f"获取实体邻居网络失败: {e}")
+            raise
+
+    @staticmethod
+    def _build_columnar_graph(
+        entity_id: int,
+        entity_levels: Dict[int, int],
+        entity_rows: List[Any],
+        relation_rows: List[Any],
+        metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        将邻居网络组装为列式格式
+        
+        节点和边各为一组等长的并行数组，实体类型和关系类型编码为整数，
+        编码即dictionaries中对应列表的下标；节点按(层级, ID)排序，中心实体在首位
+        
+        Args:
+            entity_id: 中心实体ID
+            entity_levels: 实体ID -> 层级
+            entity_rows: (id, name, type) 行
+            relation_rows: (subject_id, object_id, predicate) 行
+            metadata: 遍历统计信息
+            
+        Returns:
+            {
+                "format": "columnar",
+                "nodes": {"id": [...], "name": [...], "type": [类型编码], "level": [...]},
+                "edges": {"source": [...], "target": [...], "predicate": [关系类型编码]},
+                "dictionaries": {"type": [实体类型], "predicate": [关系类型]},
+                "metadata": 遍历统计信息
+            }
+        """
+        type_codes: Dict[Any, int] = {}
+        predicate_codes: Dict[Any, int] = {}
+        
+        entity_rows = sorted(entity_rows, key=lambda row: (entity_levels.get(row[0], 0), row[0]))
+        nodes = {
+            "id": [row[0] for row in entity_rows],
+            "name": [row[1] for row in entity_rows],
+            "type": [type_codes.setdefault(row[2], len(type_codes)) for row in entity_rows],
+            "level": [entity_levels.get(row[0], 0) for row in entity_rows]
+        }
+        edges = {
+            "source": [row[0] for row in relation_rows],
+            "target": [row[1] for row in relation_rows],
+            "predicate": [predicate_codes.setdefault(row[2], len(predicate_codes)) for row in relation_rows]
+        }
+        
+        return {
+            "format": "columnar",
+            "nodes": nodes,
+            "edges": edges,
+            # dict保持插入顺序，键的顺序即编码顺序
+            "dictionaries": {"type": list(type_codes), "predicate": list(predicate_codes)},
+            "metadata": {**metadata, "center_entity_id": entity_id}
+        }
+
+    async def _rank_frontier_neighbors(
+        self,
+        frontier: List[int],
+        visited: List[int],
+        relation_types: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        批量获取BFS前沿的未访问邻居，并按与前沿的连接数排序
+        
+        在数据库中完成邻居汇总和排序，每批前沿只发起一次查询，
+        避免逐个实体查询以及把枢纽实体的全部关系读入内存
+        
+        Args:
+            frontier: 当前层实体ID列表
+            visited: 已访问实体ID列表（排除在结果之外）
+            relation_types: 关系类型过滤
+            limit: 最多返回的邻居数量
+            
+        Returns:
+            List[Tuple[int, int]]: (邻居实体ID, 连接数)，按连接数降序、重要性（PageRank）降序、ID升序
+        """
+        graph = self.graph_index.graph
+        if graph is not None:
+            try:
+                return graph.rank_frontier_neighbors(
+                    frontier, visited, relation_types, limit, importance=self.entity_stats.get_scores
+                )
+            except Exception as e:
+                logger.warning(f"内存图索引查询邻居失败，回退到SQL: {e}")
+        
+        single_batch = len(frontier) <= self.FRONTIER_BATCH_SIZE
+        weights: Dict[int, int] = {}
+        importance: Dict[int, float] = {}
+        
+        for i in range(0, len(frontier), self.FRONTIER_BATCH_SIZE):
+            batch = frontier[i:i + self.FRONTIER_BATCH_SIZE]
+            outgoing = select(Relation.object_id.label("neighbor_id")).where(Relation.subject_id.in_(batch))
+            incoming = select(Relation.subject_id.label("neighbor_id")).where(Relation.object_id.in_(batch))
+            if relation_types:
+                outgoing = outgoing.where(Relation.predicate.in_(relation_types))
+                incoming = incoming.where(Relation.predicate.in_(relation_types))
+            
+            neighbors = union_all(outgoing, incoming).subquery()
+            weight = func.count().label("weight")
+            score = func.coalesce(func.max(EntityStats.pagerank), 0.0).label("score")
+            stmt = select(neighbors.c.neighbor_id, weight, score).outerjoin(
+                EntityStats, EntityStats.entity_id == neighbors.c.neighbor_id
+            ).where(
+                neighbors.c.neighbor_id.not_in(visited)
+            ).group_by(neighbors.c.neighbor_id)
+            
+            # 前沿只有一批时直接在数据库中排序截断
+            if single_batch:
+                stmt = stmt.order_by(weight.desc(), score.desc(), neighbors.c.neighbor_id)
+                if limit is not None:
+                    stmt = stmt.limit(limit)
+            
+            result = await self.session.execute(stmt)
+            for neighbor_id, count, pagerank in result.all():
+                weights[neighbor_id] = weights.get(neighbor_id, 0) + count
+                importance[neighbor_id] = pagerank
+        
+        ranked = sorted(weights.items(), key=lambda item: (-item[1], -importance[item[0]], item[0]))
+        return ranked[:limit] if limit is not None else ranked
@@ -0,0 +1,244 @@
+"""
+知识图谱新闻查询
+实体关联新闻、新闻相关实体和新闻列表的分页查询，总数使用缓存的近似值
+"""
+
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+from sqlalchemy import select, and_, or_, func, null
+
+from app.database.models import Entity, EntityStats, NewsEvent, news_event_entity
+from app.utils.logging_utils import get_logger
+from app.services.kg_query_base_service import KGQueryBaseService
+from app.services.query_pagination import count_cache
+
+logger = get_logger(__name__)
+
+
+class KGNewsQueryService(KGQueryBaseService):
+    """
+    知识图谱新闻查询服务
+    """
+    
+    # ==================== 实体-新闻关联查询功能 ====================
+    
+    async def get_entity_news(
+        self,
+        entity_id: int,
+        page: int = 1,
+        page_size: int = 10,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        exact_count: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取实体关联的新闻
+        
+        Args:
+            entity_id: 实体ID
+            page: 页码（提供cursor时忽略）
+            page_size: 每页数量
+            start_date: 开始日期过滤
+            end_date: 结束日期过滤
+            cursor: 游标，取自上一页返回的next_cursor
+            exact_count: 是否强制精确计算总数
+            
+        Returns:
+            分页的新闻数据
+        """
+        try:
+            # 通过关联表查询新闻
+            stmt = select(*self._NEWS_ITEM_COLUMNS).join(
+                news_event_entity, NewsEvent.id == news_event_entity.c.news_event_id
+            ).where(news_event_entity.c.entity_id == entity_id)
+            
+            # 应用日期过滤
+            if start_date:
+                stmt = stmt.where(NewsEvent.publish_time >= start_date)
+            if end_date:
+                stmt = stmt.where(NewsEvent.publish_time <= end_date)
+            
+            # 计算总数
+            count_stmt = select(func.count(NewsEvent.id)).join(
+                news_event_entity, NewsEvent.id == news_event_entity.c.news_event_id
+            ).where(news_event_entity.c.entity_id == entity_id)
+            
+            if start_date:
+                count_stmt = count_stmt.where(NewsEvent.publish_time >= start_date)
+            if end_date:
+                count_stmt = count_stmt.where(NewsEvent.publish_time <= end_date)
+            
+            total, total_is_exact, total_is_stale = await count_cache.get_total(
+                ("entity_news", entity_id, start_date, end_date), self.session, count_stmt, exact=exact_count,
+                tables=("news_events", "news_event_entity")
+            )
+            
+            # 分页查询
+            rows, next_cursor = await self._fetch_page(
+                stmt, NewsEvent, "publish_time", True, page, page_size, cursor, sort_key="published_at"
+            )
+
+            items = [self._news_item(row) for row in rows]
+            return self._package_page(items, total, page, page_size, next_cursor, total_is_exact, total_is_stale)
+
+        except Exception as e:
+            logger.error(f"获取实体关联新闻失败: {e}")
+            raise
+
+    # ==================== 新闻相关实体查询功能 ====================
+    
+    async def get_news_entities(
+        self,
+        news_id: int,
+        entity_type: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        获取新闻相关的实体
+        
+        Args:
+            news_id: 新闻ID
+            entity_type: 实体类型过滤
+            limit: 返回实体数量限制
+            
+        Returns:
+            相关实体数据，每个实体附带importance（PageRank）和news_count（新闻提及次数），
+            按重要性和新闻提及次数排序；confidence固定为null
+        """
+        try:
+            # 通过关联表查询实体，附带预计算的重要性和新闻提及次数（entity_stats中由关联表统计）
+            # 关联表不记录抽取置信度，confidence返回null
+            importance = func.coalesce(EntityStats.pagerank, 0.0).label("importance")
+            mentions = func.coalesce(EntityStats.news_count, 0).label("news_count")
+            stmt = select(
+                Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description,
+                null().label("confidence"),
+                mentions, importance, Entity.created_at
+            ).join(
+                news_event_entity, Entity.id == news_event_entity.c.entity_id
+            ).outerjoin(
+                EntityStats, EntityStats.entity_id == Entity.id
+            ).where(news_event_entity.c.news_event_id == news_id)
+            
+            # 应用实体类型过滤
+            if entity_type:
+                stmt = stmt.where(Entity.type == entity_type)
+            
+            # 按重要性、提及次数排序，限制数量
+            stmt = stmt.order_by(importance.desc(), mentions.desc(), Entity.id.desc()).limit(limit)
+            
+            result = await self.session.execute(stmt)
+            entity_data = [dict(row) for row in result.mappings()]
+            
+            return {
+                "entities": entity_data,
+                "total": len(entity_data),
+                "news_id": news_id,
+                "entity_type_filter": entity_type
+            }
+            
+        except Exception as e:
+            logger.error(f"获取新闻相关实体失败: {e}")
+            raise
+    
+    # ==================== 新闻列表查询功能 ====================
+    
+    async def get_news_list(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        search: Optional[str] = None,
+        source: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        sort_by: str = "publish_time",
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        exact_count: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取新闻列表 - 支持分页、搜索和时间过滤
+        
+        Args:
+            page: 页码，从1开始（提供cursor时忽略）
+            page_size: 每页数量
+            search: 搜索关键词（匹配标题和内容）
+            source: 新闻来源过滤
+            start_date: 开始日期过滤
+            end_date: 结束日期过滤
+            sort_by: 排序字段
+            sort_order: 排序方向 (asc/desc)
+            cursor: 游标，取自上一页返回的next_cursor
+            exact_count: 是否强制精确计算总数（默认使用缓存总数）
+            
+        Returns:
+            {
+                "items": List[新闻数据],
+                "total": 总数量,
+                "page": 当前页码,
+                "page_size": 每页数量,
+                "total_pages": 总页数,
+                "next_cursor": 下一页游标,
+                "has_more": 是否还有下一页,
+                "total_is_exact": 总数是否为本次精确计算,
+                "total_is_stale": 总数是否为写入前的缓存值（正在后台重新计算）
+            }
+        """
+        try:
+            # 构建基础查询
+            stmt = select(*self._NEWS_ITEM_COLUMNS)
+            
+            # 应用过滤条件
+            conditions = []
+            if search:
+                conditions.append(
+                    or_(
+                        NewsEvent.title.ilike(f"%{search}%"),
+                        NewsEvent.content.ilike(f"%{search}%")
+                    )
+                )
+            if source:
+                conditions.append(NewsEvent.source == source)
+            if start_date:
+                conditions.append(NewsEvent.publish_time >= start_date)
+            if end_date:
+                conditions.append(NewsEvent.publish_time <= end_date)
+
+            cache_key = ("news", search, source, start_date, end_date)
+            rows, total, next_cursor, total_is_exact, total_is_stale = await self._query_news_event(
+                conditions, page, page_size, sort_by, sort_order, stmt,
+                cursor=cursor, exact_count=exact_count, cache_key=cache_key
+            )
+
+            items = [self._news_item(row) for row in rows]
+            return self._package_page(items, total, page, page_size, next_cursor, total_is_exact, total_is_stale)
+
+        except Exception as e:
+            logger.error(f"获取新闻列表失败: {e}")
+            raise
+
+    async def _query_news_event(self, conditions: list[Any], page: int, page_size: int, sort_by: str, sort_order: str,
+                                stmt, cursor: Optional[str] = None, exact_count: bool = False,
+                                cache_key: Optional[tuple] = None) -> tuple[Any, Any, Optional[str], bool, bool]:
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+
+        # 计算总数
+        count_stmt = select(func.count(NewsEvent.id))
+        if conditions:
+            count_stmt = count_stmt.where(and_(*conditions))
+
+        total, total_is_exact, total_is_stale = await count_cache.get_total(
+            cache_key or ("news",), self.session, count_stmt, exact=exact_count, tables=("news_events",)
+        )
+
+        # 分页查询（按 排序键 + id 稳定排序）
+        if sort_by not in self._NEWS_SORT_KEYS:
+            sort_by = "publish_time"
+        rows, next_cursor = await self._fetch_page(
+            stmt, NewsEvent, sort_by, sort_order == "desc", page, page_size, cursor,
+            sort_key=self._NEWS_SORT_KEYS[sort_by]
+        )
+        return rows, total, next_cursor, total_is_exact, total_is_stale
@@ -0,0 +1,222 @@
+"""
+知识图谱实体路径查询
+双向广度优先搜索两个实体之间的最短路径，按扫描的邻接条数和耗时限制搜索规模
+"""
+
+import time
+from itertools import islice
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+
+from sqlalchemy import select
+
+from app.database.models import Entity
+from app.utils.logging_utils import get_logger
+from app.services.kg_query_base_service import KGQueryBaseService
+
+logger = get_logger(__name__)
+
+
+class KGPathQueryService(KGQueryBaseService):
+    """
+    知识图谱实体路径查询服务
+    """
+    
+    # 路径搜索默认最多扫描的邻接条数和超时秒数
+    PATH_EDGE_BUDGET = 200000
+    PATH_TIMEOUT_SECONDS = 2.0
+    
+    # ==================== 实体路径查询功能 ====================
+    
+    async def find_paths(
+        self,
+        from_id: int,
+        to_id: int,
+        max_hops: int = 4,
+        relation_types: Optional[List[str]] = None,
+        top_k: int = 5,
+        edge_budget: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        查找两个实体之间的最短路径 - 双向广度优先搜索
+
+        从两端交替扩展较小的一侧前沿，两侧相遇即得到最短路径长度，
+        然后从相遇点回溯出最多top_k条最短路径。关系按无向边遍历，
+        返回的关系保留原始方向。扫描的邻接条数超过edge_budget或耗时超过timeout时提前停止
+
+        Args:
+            from_id: 起点实体ID
+            to_id: 终点实体ID
+            max_hops: 最大跳数
+            relation_types: 关系类型过滤
+            top_k: 最多返回的路径数量
+            edge_budget: 最多扫描的邻接条数，默认PATH_EDGE_BUDGET
+            timeout: 超时秒数，默认PATH_TIMEOUT_SECONDS
+
+        Returns:
+            {
+                "paths": List[路径（实体ID序列与关系列表）],
+                "nodes": List[路径上的实体],
+                "metadata": 搜索统计信息
+            }，起点或终点不存在时返回None
+        """
+        try:
+            started = time.monotonic()
+            edge_budget = edge_budget or self.PATH_EDGE_BUDGET
+            deadline = started + (timeout or self.PATH_TIMEOUT_SECONDS)
+
+            endpoints = await self.session.execute(select(Entity.id).where(Entity.id.in_([from_id, to_id])))
+            if len(set(endpoints.scalars().all())) < len({from_id, to_id}):
+                return None
+
+            # 两侧各自记录 实体 -> 距离 与 实体 -> [(上一实体, 关系ID)]
+            forward = {"dist": {from_id: 0}, "parents": {from_id: []}, "frontier": [from_id], "hops": 0}
+            backward = {"dist": {to_id: 0}, "parents": {to_id: []}, "frontier": [to_id], "hops": 0}
+            meeting = [from_id] if from_id == to_id else []
+            edges_scanned = 0
+            stopped_by = None
+
+            while not meeting and forward["frontier"] and backward["frontier"]:
+                if forward["hops"] + backward["hops"] >= max_hops:
+                    break
+                if time.monotonic() > deadline:
+                    stopped_by = "timeout"
+                    break
+
+                side, other = (
+                    (forward, backward) if len(forward["frontier"]) <= len(backward["frontier"])
+                    else (backward, forward)
+                )
+                remaining = edge_budget - edges_scanned
+                adjacent = await self._expand_path_frontier(side["frontier"], relation_types, limit=remaining + 1)
+                edges_scanned += min(len(adjacent), remaining)
+                if len(adjacent) > remaining:
+                    stopped_by = "edge_budget"
+                    break
+
+                next_hops = side["hops"] + 1
+                dist, parents = side["dist"], side["parents"]
+                
+                # 先检查是否与另一侧相遇；相遇时本层只需记录相遇实体的父指针
+                other_dist = other["dist"]
+                hits = [edge for edge in adjacent if edge[1] in other_dist]
+                if hits:
+                    adjacent = hits
+                
+                next_frontier = []
+                for entity, neighbor, relation_id in adjacent:
+                    known = dist.get(neighbor)
+                    if known is None:
+                        dist[neighbor] = next_hops
+                        parents[neighbor] = [(entity, relation_id)]
+                        next_frontier.append(neighbor)
+                    elif known == next_hops:
+                        parents[neighbor].append((entity, relation_id))
+
+                side["frontier"], side["hops"] = next_frontier, next_hops
+                meeting = [n for n in next_frontier if n in other_dist]
+
+            paths = []
+            if meeting:
+                shortest = min(forward["dist"][n] + backward["dist"][n] for n in meeting)
+                meeting = sorted(n for n in meeting if forward["dist"][n] + backward["dist"][n] == shortest)
+                paths = self._assemble_paths(meeting, forward["parents"], backward["parents"], top_k)
+
+            result = await self._package_paths(paths)
+            result["metadata"] = {
+                "from_id": from_id,
+                "to_id": to_id,
+                "max_hops": max_hops,
+                "shortest_length": len(paths[0][1]) if paths else None,
+                "path_count": len(paths),
+                "edges_scanned": edges_scanned,
+                "stopped_by": stopped_by,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 2)
+            }
+            return result
+
+        except Exception as e:
+            logger.error(f"查找实体路径失败: {e}")
+            raise
+
+    async def _expand_path_frontier(
+        self, frontier: List[int], relation_types: Optional[List[str]], limit: int
+    ) -> List[Tuple[int, int, int]]:
+        """
+        路径搜索的一层扩展：获取前沿实体的双向邻接，最多limit条
+
+        Returns:
+            List[Tuple[int, int, int]]: (前沿实体ID, 邻居实体ID, 关系ID)
+        """
+        graph = self.graph_index.graph
+        if graph is not None:
+            try:
+                return graph.adjacent_triplets(frontier, relation_types, limit)
+            except Exception as e:
+                logger.warning(f"内存图索引扩展路径失败，回退到SQL: {e}")
+        
+        adjacent = []
+        for i in range(0, len(frontier), self.FRONTIER_BATCH_SIZE):
+            batch = frontier[i:i + self.FRONTIER_BATCH_SIZE]
+            adjacent.extend(await self.relation_repo.get_adjacent_triplets(
+                batch, relation_types, limit=limit - len(adjacent)
+            ))
+            if len(adjacent) >= limit:
+                break
+        return adjacent
+    
+    @staticmethod
+    def _walk_parents(entity_id: int, parents: Dict[int, List[Tuple[int, int]]]) -> Iterator[Tuple[list, list]]:
+        """沿BFS父指针回溯到搜索起点，依次生成 (起点到entity_id的实体序列, 关系ID序列)"""
+        if not parents[entity_id]:
+            yield [entity_id], []
+            return
+        for previous, relation_id in sorted(parents[entity_id]):
+            for entity_ids, relation_ids in KGPathQueryService._walk_parents(previous, parents):
+                yield entity_ids + [entity_id], relation_ids + [relation_id]
+    
+    def _assemble_paths(self, meeting: List[int], forward_parents: Dict[int, List[Tuple[int, int]]],
+                        backward_parents: Dict[int, List[Tuple[int, int]]], top_k: int) -> List[Tuple[list, list]]:
+        """由相遇点拼接两侧的半程路径，最多返回top_k条"""
+        def generate():
+            for entity_id in meeting:
+                for head_entities, head_relations in self._walk_parents(entity_id, forward_parents):
+                    for tail_entities, tail_relations in self._walk_parents(entity_id, backward_parents):
+                        yield head_entities + tail_entities[-2::-1], head_relations + tail_relations[::-1]
+        return list(islice(generate(), top_k))
+    
+    async def _package_paths(self, paths: List[Tuple[list, list]]) -> Dict[str, Any]:
+        """查询路径上的实体和关系详情，组装返回结构"""
+        entity_ids = sorted({entity_id for entity_ids, _ in paths for entity_id in entity_ids})
+        relation_ids = sorted({relation_id for _, relation_ids in paths for relation_id in relation_ids})
+        
+        relations = {row.id: row for row in await self._get_relations_by_ids(relation_ids)}
+        nodes = []
+        if entity_ids:
+            entities = await self.session.execute(
+                select(
+                    Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description
+                ).where(Entity.id.in_(entity_ids))
+            )
+            nodes = [dict(row) for row in entities.mappings()]
+        
+        return {
+            "paths": [
+                {
+                    "length": len(path_relations),
+                    "entity_ids": path_entities,
+                    "relations": [
+                        {
+                            "id": relations[relation_id].id,
+                            "source": relations[relation_id].subject_id,
+                            "target": relations[relation_id].object_id,
+                            "relation_type": relations[relation_id].predicate,
+                            "description": relations[relation_id].description
+                        }
+                        for relation_id in path_relations if relation_id in relations
+                    ]
+                }
+                for path_entities, path_relations in paths
+            ],
+            "nodes": nodes
+        }
@@ -0,0 +1,221 @@
+"""
+知识图谱查询服务的公共基类
+负责会话、仓储和内存索引的初始化，以及列表分页、关系批量读取和实体关联统计等各类查询共用的辅助方法
+"""
+
+from typing import List, Optional, Dict, Any, Tuple
+
+from sqlalchemy import select, and_, or_, func, literal, null
+
+from app.database.models import Entity, Relation, Attribute, NewsEvent, news_event_entity
+from app.database.repositories import EntityRepository, RelationRepository, NewsEventRepository
+from app.utils.logging_utils import get_logger
+from app.services.news_search_service import NewsSearchService
+from app.store.graph_index_manage import get_graph_index_manager
+from app.store.entity_stats_manage import get_entity_stats_manager
+from app.services.query_pagination import decode_cursor, encode_cursor, keyset_condition, keyset_order_by
+
+logger = get_logger(__name__)
+
+
+class KGQueryBaseService:
+    """
+    知识图谱查询服务基类
+    
+    提供各类查询共用的状态和辅助方法，具体查询由子类实现；
+    邻居、路径和共同新闻查询服务组合在KGQueryService中，共用同一个会话和仓储
+    """
+    
+    # BFS每批查询的前沿实体数量，避免IN列表超过数据库参数上限
+    FRONTIER_BATCH_SIZE = 500
+    
+    # 邻居网络返回边时需要的关系列
+    _EDGE_COLUMNS = (
+        Relation.id, Relation.subject_id, Relation.object_id,
+        Relation.predicate, Relation.description
+    )
+    
+    # 列表类接口按返回字段投影查询列，结果行经 mappings() 直接输出，不构建ORM对象；
+    # 时间字段保留datetime，由路由的JSON序列化统一转换
+    _ENTITY_ITEM_COLUMNS = (
+        Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description,
+        Entity.created_at, Entity.updated_at,
+        null().label("confidence"), literal("").label("source_text")
+    )
+    # 实体列表可用的排序字段 -> 结果行中对应的字段名
+    _ENTITY_SORT_KEYS = {
+        "id": "id", "name": "name", "type": "entity_type", "description": "description",
+        "created_at": "created_at", "updated_at": "updated_at"
+    }
+    _NEWS_ITEM_COLUMNS = (
+        NewsEvent.id, NewsEvent.title, NewsEvent.content, NewsEvent.source,
+        NewsEvent.publish_time.label("published_at"), NewsEvent.created_at, NewsEvent.updated_at
+    )
+    # 新闻列表可用的排序字段 -> 结果行中对应的字段名
+    _NEWS_SORT_KEYS = {
+        "id": "id", "title": "title", "source": "source", "publish_time": "published_at",
+        "created_at": "created_at", "updated_at": "updated_at"
+    }
+    # 列表中新闻正文的最大字符数
+    NEWS_CONTENT_PREVIEW = 300
+    
+    def __init__(self, session, shared: Optional["KGQueryBaseService"] = None):
+        """
+        初始化查询服务
+        
+        Args:
+            session: 数据库会话
+            shared: 组合在KGQueryService中的子查询服务传入外层服务，复用它的仓储和内存索引
+        """
+        self.session = session
+        if shared is not None:
+            self.entity_repo = shared.entity_repo
+            self.relation_repo = shared.relation_repo
+            self.news_repo = shared.news_repo
+            self.news_search_service = shared.news_search_service
+            self.graph_index = shared.graph_index
+            self.entity_stats = shared.entity_stats
+            return
+        self.entity_repo = EntityRepository(session)
+        self.relation_repo = RelationRepository(session)
+        self.news_repo = NewsEventRepository(session)
+        self.news_search_service = NewsSearchService(session)
+        self.graph_index = get_graph_index_manager()
+        self.entity_stats = get_entity_stats_manager()
+    
+    # ==================== 辅助方法 ====================
+    
+    async def _fetch_page(
+        self,
+        stmt,
+        model,
+        sort_by: str,
+        descending: bool,
+        page: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+        order_field=None,
+        sort_key: Optional[str] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        执行分页查询：提供游标时使用keyset分页，否则按页码OFFSET分页
+        
+        Args:
+            stmt: 已应用过滤条件的按列查询语句，结果需包含id列
+            model: 排序所属的ORM模型（需有id列）
+            sort_by: 排序字段名
+            descending: 是否降序
+            page: 页码（无游标时使用）
+            page_size: 每页数量
+            cursor: 游标
+            order_field: 排序表达式，为空时使用model上名为sort_by的列
+            sort_key: 结果行中排序键的字段名，默认与sort_by相同
+            
+        Returns:
+            Tuple[List[Any], Optional[str]]: (当前页的RowMapping列表, 下一页游标)
+            
+        Raises:
+            ValueError: 游标无效
+        """
+        if order_field is None:
+            order_field = getattr(model, sort_by)
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor, sort_by)
+            stmt = stmt.where(keyset_condition(order_field, model.id, sort_value, last_id, descending))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        
+        # 多取一条用于判断是否还有下一页
+        stmt = stmt.order_by(*keyset_order_by(order_field, model.id, descending)).limit(page_size + 1)
+        result = await self.session.execute(stmt)
+        rows = result.mappings().all()
+        
+        if len(rows) <= page_size:
+            return list(rows), None
+        
+        rows = list(rows[:page_size])
+        last = rows[-1]
+        return rows, encode_cursor(sort_by, last[sort_key or sort_by], last["id"])
+    
+    async def _get_relations_among(
+        self, entity_ids: List[int], relation_types: Optional[List[str]] = None, columns: Optional[tuple] = None
+    ) -> List[Any]:
+        """获取两端都在给定实体集合内的关系，只取展示所需的列（默认_EDGE_COLUMNS）"""
+        columns = columns or self._EDGE_COLUMNS
+        graph = self.graph_index.graph
+        if graph is not None:
+            try:
+                return await self._get_relations_by_ids(
+                    graph.relation_ids_among(entity_ids, relation_types), columns
+                )
+            except Exception as e:
+                logger.warning(f"内存图索引查询关系失败，回退到SQL: {e}")
+        
+        relations = []
+        for i in range(0, len(entity_ids), self.FRONTIER_BATCH_SIZE):
+            batch = entity_ids[i:i + self.FRONTIER_BATCH_SIZE]
+            stmt = select(*columns).where(
+                and_(Relation.subject_id.in_(batch), Relation.object_id.in_(entity_ids))
+            )
+            if relation_types:
+                stmt = stmt.where(Relation.predicate.in_(relation_types))
+            
+            result = await self.session.execute(stmt)
+            relations.extend(result.all())
+        return relations
+    
+    async def _get_relations_by_ids(self, relation_ids: List[int], columns: Optional[tuple] = None) -> List[Any]:
+        """按关系ID批量获取展示所需的列（默认_EDGE_COLUMNS）"""
+        columns = columns or self._EDGE_COLUMNS
+        relations = []
+        for i in range(0, len(relation_ids), self.FRONTIER_BATCH_SIZE):
+            batch = relation_ids[i:i + self.FRONTIER_BATCH_SIZE]
+            result = await self.session.execute(
+                select(*columns).where(Relation.id.in_(batch))
+            )
+            relations.extend(result.all())
+        return relations
+    
+    @staticmethod
+    def _entity_count_columns() -> tuple:
+        """实体关联统计的相关子查询列：(关系数量, 关联新闻数量, 属性数量)"""
+        relations_count = select(func.count(Relation.id)).where(
+            or_(Relation.subject_id == Entity.id, Relation.object_id == Entity.id)
+        ).scalar_subquery()
+        news_count = select(func.count(news_event_entity.c.news_event_id)).where(
+            news_event_entity.c.entity_id == Entity.id
+        ).scalar_subquery()
+        attributes_count = select(func.count(Attribute.id)).where(
+            Attribute.entity_id == Entity.id
+        ).scalar_subquery()
+        return (
+            relations_count.label("relations_count"),
+            news_count.label("news_count"),
+            attributes_count.label("attributes_count")
+        )
+    
+    @classmethod
+    def _news_item(cls, row) -> Dict[str, Any]:
+        """新闻列表项：正文超过预览长度时截断并追加省略号"""
+        item = dict(row)
+        content = item["content"]
+        if content and len(content) > cls.NEWS_CONTENT_PREVIEW:
+            item["content"] = content[:cls.NEWS_CONTENT_PREVIEW] + "..."
+        return item
+
+    @staticmethod
+    def _package_page(items: List[Dict[str, Any]], total: int, page: int, page_size: int,
+                      next_cursor: Optional[str], total_is_exact: bool,
+                      total_is_stale: bool = False) -> Dict[str, Any]:
+        """组装统一的分页返回结构"""
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "total_is_exact": total_is_exact,
+            "total_is_stale": total_is_stale
+        }
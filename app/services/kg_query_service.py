@@ -3,40 +3,90 @@
 提供知识图谱数据查询功能，专为前端展示优化设计
 """
 
-from typing import List, Optional, Dict, Any, Set, Tuple
+from typing import List, Optional, Dict, Any
 from datetime import datetime
-from sqlalchemy import select, and_, or_, func, text
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Entity, Relation, Attribute, NewsEvent, news_event_entity
-from app.database.repositories import EntityRepository, RelationRepository, NewsEventRepository
+from sqlalchemy import select, and_, or_, func, null
+
+from app.database.models import Entity, EntityStats, Relation
 from app.utils.logging_utils import get_logger
-from app.services.news_search_service import NewsSearchService
+from app.services.kg_common_news_query_service import KGCommonNewsQueryService
+from app.services.kg_neighbor_query_service import KGNeighborQueryService
+from app.services.kg_news_query_service import KGNewsQueryService
+from app.services.kg_path_query_service import KGPathQueryService
+from app.services.kg_query_base_service import KGQueryBaseService
+from app.services.query_pagination import count_cache
 
 logger = get_logger(__name__)
 
 
-class KGQueryService:
+class KGQueryService(KGQueryBaseService):
     """
     知识图谱查询服务
     
     专为前端展示设计的数据查询服务，提供：
     - 实体和关系的分页查询
     - 实体深度遍历和关联分析
+    - 实体之间的最短路径查询
     - 实体-新闻关联查询
     - 多实体共同新闻分析
     - 新闻相关实体推荐
     
     所有查询方法都返回前端友好的数据结构，支持分页、过滤和排序
+    
+    邻居网络、路径、多实体共同新闻和新闻查询由组合的KGNeighborQueryService、KGPathQueryService、
+    KGCommonNewsQueryService、KGNewsQueryService实现，与本服务共用会话和仓储
     """
     
     def __init__(self, session):
         """初始化查询服务"""
-        self.session = session
-        self.entity_repo = EntityRepository(session)
-        self.relation_repo = RelationRepository(session)
-        self.news_repo = NewsEventRepository(session)
-        self.news_search_service = NewsSearchService(session)
+        super().__init__(session)
+        self.neighbors = KGNeighborQueryService(session, shared=self)
+        self.paths = KGPathQueryService(session, shared=self)
+        self.common_news = KGCommonNewsQueryService(session, shared=self)
+        self.news = KGNewsQueryService(session, shared=self)
+    
+    # ==================== 实体深度遍历功能 ====================
+    
+    async def get_entity_neighbors(
+        self,
+        entity_id: int,
+        depth: int = 2,
+        relation_types: Optional[List[str]] = None,
+        max_entities: int = 100,
+        response_format: str = "records"
+    ) -> Dict[str, Any]:
+        """获取实体的邻居网络，参数和返回值见KGNeighborQueryService.get_entity_neighbors"""
+        return await self.neighbors.get_entity_neighbors(entity_id, depth, relation_types, max_entities,
+                                                         response_format)
+    
+    # ==================== 实体路径查询功能 ====================
+    
+    async def find_paths(
+        self,
+        from_id: int,
+        to_id: int,
+        max_hops: int = 4,
+        relation_types: Optional[List[str]] = None,
+        top_k: int = 5,
+        edge_budget: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """查找两个实体之间的最短路径，参数和返回值见KGPathQueryService.find_paths"""
+        return await self.paths.find_paths(from_id, to_id, max_hops, relation_types, top_k, edge_budget, timeout)
+    
+    # ==================== 多实体共同新闻查询功能 ====================
+    
+    async def get_common_news_for_entities(
+        self,
+        entity_ids: List[int],
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        min_match: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """获取多个实体共同关联的新闻，参数和返回值见KGCommonNewsQueryService.get_common_news_for_entities"""
+        return await self.common_news.get_common_news_for_entities(entity_ids, page, page_size, cursor, min_match)
     
     # ==================== 实体查询功能 ====================
     
@@ -47,18 +97,22 @@ class KGQueryService:
         search: Optional[str] = None,
         entity_type: Optional[str] = None,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        exact_count: bool = False
     ) -> Dict[str, Any]:
         """
         获取实体列表 - 支持分页、搜索和过滤
         
         Args:
-            page: 页码，从1开始
+            page: 页码，从1开始（提供cursor时忽略）
             page_size: 每页数量
             search: 搜索关键词（匹配名称和描述）
             entity_type: 实体类型过滤
-            sort_by: 排序字段
+            sort_by: 排序字段，importance表示按实体重要性（PageRank）排序
             sort_order: 排序方向 (asc/desc)
+            cursor: 游标，取自上一页返回的next_cursor
+            exact_count: 是否强制精确计算总数（默认使用缓存总数）
             
         Returns:
             {
@@ -66,12 +120,16 @@ class KGQueryService:
                 "total": 总数量,
                 "page": 当前页码,
                 "page_size": 每页数量,
-                "total_pages": 总页数
+                "total_pages": 总页数,
+                "next_cursor": 下一页游标（无更多数据时为None）,
+                "has_more": 是否还有下一页,
+                "total_is_exact": 总数是否为本次精确计算,
+                "total_is_stale": 总数是否为写入前的缓存值（正在后台重新计算）
             }
         """
         try:
             # 构建基础查询
-            stmt = select(Entity)
+            stmt = select(*self._ENTITY_ITEM_COLUMNS)
             
             # 应用过滤条件
             conditions = []
@@ -88,49 +146,35 @@ class KGQueryService:
             if conditions:
                 stmt = stmt.where(and_(*conditions))
 
-            # 应用排序
-            order_field = getattr(Entity, sort_by, Entity.created_at)
-            if sort_order == "desc":
-                stmt = stmt.order_by(order_field.desc())
-            else:
-                stmt = stmt.order_by(order_field)
-
             # 计算总数
             count_stmt = select(func.count(Entity.id))
             if conditions:
                 count_stmt = count_stmt.where(and_(*conditions))
 
-            total_result = await self.session.execute(count_stmt)
-            total = total_result.scalar()
-
-            # 分页查询
-            offset = (page - 1) * page_size
-            stmt = stmt.offset(offset).limit(page_size)
+            total, total_is_exact, total_is_stale = await count_cache.get_total(
+                ("entities", search, entity_type), self.session, count_stmt, exact=exact_count,
+                tables=("entities",)
+            )
 
-            result = await self.session.execute(stmt)
-            entities = result.scalars().all()
+            # 分页查询（按 排序键 + id 稳定排序）
+            if sort_by == "importance":
+                # 按预计算的PageRank排序，未统计的实体视为0
+                importance = func.coalesce(EntityStats.pagerank, 0.0).label("importance")
+                stmt = stmt.add_columns(importance).outerjoin(EntityStats, EntityStats.entity_id == Entity.id)
+                rows, next_cursor = await self._fetch_page(
+                    stmt, Entity, sort_by, sort_order == "desc", page, page_size, cursor,
+                    order_field=importance
+                )
+            else:
+                if sort_by not in self._ENTITY_SORT_KEYS:
+                    sort_by = "created_at"
+                rows, next_cursor = await self._fetch_page(
+                    stmt, Entity, sort_by, sort_order == "desc", page, page_size, cursor,
+                    sort_key=self._ENTITY_SORT_KEYS[sort_by]
+                )
 
-            # 转换为前端友好的格式
-            items = []
-            for entity in entities:
-                items.append({
-                    "id": entity.id,
-                    "name": entity.name,
-                    "entity_type": entity.type,
-                    "description": entity.description,
-                    "created_at": entity.created_at.isoformat() if entity.created_at else None,
-                    "updated_at": entity.updated_at.isoformat() if entity.updated_at else None,
-                    "confidence": getattr(entity, 'confidence', None),
-                    "source_text": getattr(entity, 'source_text', '')[:200] + "..." if getattr(entity, 'source_text', None) and len(getattr(entity, 'source_text', '')) > 200 else getattr(entity, 'source_text', '')
-                })
-            
-            return {
-                "items": items,
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": (total + page_size - 1) // page_size
-            }
+            items = [dict(row) for row in rows]
+            return self._package_page(items, total, page, page_size, next_cursor, total_is_exact, total_is_stale)
             
         except Exception as e:
             logger.error(f"获取实体列表失败: {e}")
@@ -147,32 +191,21 @@ class KGQueryService:
             实体详细信息，包含关联统计
         """
         try:
-            # 获取实体基本信息
-            entity = await self.entity_repo.get_by_id(entity_id)
-            if not entity:
+            # 实体基本信息与关联统计在一条语句中查询
+            stmt = select(
+                Entity.id, Entity.name, Entity.type.label("entity_type"), Entity.description,
+                Entity.created_at, Entity.updated_at, null().label("confidence"), null().label("source_text"),
+                Entity.meta_data.label("metadata"), *self._entity_count_columns()
+            ).where(Entity.id == entity_id)
+            row = (await self.session.execute(stmt)).mappings().first()
+            if not row:
                 return None
             
-            # 获取关联统计
-            relations_count = await self._get_entity_relations_count(entity_id)
-            news_count = await self._get_entity_news_count(entity_id)
-            attributes_count = await self._get_entity_attributes_count(entity_id)
-            
-            return {
-                "id": entity.id,
-                "name": entity.name,
-                "entity_type": entity.type,
-                "description": entity.description,
-                "created_at": entity.created_at.isoformat() if entity.created_at else None,
-                "updated_at": entity.updated_at.isoformat() if entity.updated_at else None,
-                "confidence": getattr(entity, 'confidence', None),
-                "source_text": getattr(entity, 'source_text', None),
-                "metadata": getattr(entity, 'meta_data', None),
-                "statistics": {
-                    "relations_count": relations_count,
-                    "news_count": news_count,
-                    "attributes_count": attributes_count
-                }
+            detail = dict(row)
+            detail["statistics"] = {
+                name: detail.pop(name) for name in ("relations_count", "news_count", "attributes_count")
             }
+            return detail
             
         except Exception as e:
             logger.error(f"获取实体详情失败: {e}")
@@ -186,17 +219,21 @@ class KGQueryService:
         page_size: int = 20,
         entity_id: Optional[int] = None,
         relation_type: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        exact_count: bool = False
     ) -> Dict[str, Any]:
         """
         获取关系列表 - 支持按实体和关系类型过滤
         
         Args:
-            page: 页码
+            page: 页码（提供cursor时忽略）
             page_size: 每页数量
             entity_id: 实体ID过滤（获取该实体的所有关系）
             relation_type: 关系类型过滤
             search: 搜索关键词（匹配关系类型和描述）
+            cursor: 游标，取自上一页返回的next_cursor
+            exact_count: 是否强制精确计算总数
             
         Returns:
             分页的关系数据，包含源实体和目标实体信息
@@ -207,7 +244,12 @@ class KGQueryService:
             target_entity = Entity.__table__.alias('target_entity')
             
             stmt = select(
-                Relation,
+                Relation.id,
+                Relation.predicate,
+                Relation.description,
+                Relation.created_at,
+                Relation.subject_id,
+                Relation.object_id,
                 source_entity.c.name.label("source_name"),
                 source_entity.c.type.label("source_type"),
                 target_entity.c.name.label("target_name"),
@@ -245,187 +287,43 @@ class KGQueryService:
             if conditions:
                 count_stmt = count_stmt.where(and_(*conditions))
             
-            total_result = await self.session.execute(count_stmt)
-            total = total_result.scalar()
+            total, total_is_exact, total_is_stale = await count_cache.get_total(
+                ("relations", entity_id, relation_type, search), self.session, count_stmt, exact=exact_count,
+                tables=("relations",)
+            )
             
             # 分页查询
-            offset = (page - 1) * page_size
-            stmt = stmt.order_by(Relation.created_at.desc()).offset(offset).limit(page_size)
-            
-            result = await self.session.execute(stmt)
-            rows = result.all()
+            rows, next_cursor = await self._fetch_page(
+                stmt, Relation, "created_at", True, page, page_size, cursor
+            )
             
             items = []
             for row in rows:
-                relation, source_name, source_type, target_name, target_type = row
                 items.append({
-                    "id": relation.id,
-                    "relation_type": relation.predicate,
-                    "description": relation.description,
-                    "confidence": getattr(relation, 'confidence', None),
-                    "created_at": relation.created_at.isoformat() if relation.created_at else None,
+                    "id": row["id"],
+                    "relation_type": row["predicate"],
+                    "description": row["description"],
+                    "confidence": None,
+                    "created_at": row["created_at"],
                     "source_entity": {
-                        "id": relation.subject_id,
-                        "name": source_name,
-                        "type": source_type
+                        "id": row["subject_id"],
+                        "name": row["source_name"],
+                        "type": row["source_type"]
                     },
                     "target_entity": {
-                        "id": relation.object_id,
-                        "name": target_name,
-                        "type": target_type
+                        "id": row["object_id"],
+                        "name": row["target_name"],
+                        "type": row["target_type"]
                     }
                 })
             
-            return {
-                "items": items,
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": (total + page_size - 1) // page_size
-            }
+            return self._package_page(items, total, page, page_size, next_cursor, total_is_exact, total_is_stale)
             
         except Exception as e:
             logger.error(f"获取关系列表失败: {e}")
             raise
     
-    # ==================== 实体深度遍历功能 ====================
-    
-    async def get_entity_neighbors(
-        self,
-        entity_id: int,
-        depth: int = 2,
-        relation_types: Optional[List[str]] = None,
-        max_entities: int = 100
-    ) -> Dict[str, Any]:
-        """
-        获取实体的邻居网络 - 正确的广度优先搜索实现
-        
-        Args:
-            entity_id: 起始实体ID
-            depth: 遍历深度（默认2层）
-            relation_types: 关系类型过滤
-            max_entities: 最大实体数量限制
-            
-        Returns:
-            {
-                "nodes": List[实体节点],
-                "edges": List[关系边],
-                "metadata": 遍历统计信息
-            }
-        """
-        try:
-            # 使用字典记录每个实体的层级信息
-            entity_levels = {}
-            visited_relations = set()
-            nodes = []
-            edges = []
-            
-            # 获取起始实体
-            start_entity = await self.entity_repo.get_by_id(entity_id)
-            if not start_entity:
-                return {"nodes": [], "edges": [], "metadata": {"total_nodes": 0, "total_edges": 0}}
-            
-            # 初始化BFS - 正确实现广度优先搜索
-            current_level = [entity_id]
-            entity_levels[entity_id] = 0  # 中心实体为第0层
-            
-            logger.info(f"开始BFS遍历，起始实体: {entity_id}, 目标深度: {depth}, 最大实体数: {max_entities}")
-            
-            # 逐层遍历
-            for current_depth in range(depth):
-                logger.info(f"处理第 {current_depth + 1} 层，当前层实体数: {len(current_level)}")
-                
-                if len(entity_levels) >= max_entities:
-                    logger.info(f"达到最大实体数限制: {max_entities}")
-                    break
-                    
-                next_level = []
-                
-                # 处理当前层的每个实体
-                for current_entity_id in current_level:
-                    # 获取当前实体的直接关系
-                    relations = await self._get_entity_direct_relations(
-                        current_entity_id, relation_types
-                    )
-                    
-                    logger.info(f"实体 {current_entity_id} 找到 {len(relations)} 个直接关系")
-                    
-                    for relation in relations:
-                        # 确定邻居实体ID
-                        if relation.subject_id == current_entity_id:
-                            neighbor_id = relation.object_id
-                        else:
-                            neighbor_id = relation.subject_id
-                        
-                        # 添加关系边（如果未添加过）
-                        if relation.id not in visited_relations:
-                            visited_relations.add(relation.id)
-                            edges.append({
-                                "id": relation.id,
-                                "source": relation.subject_id,
-                                "target": relation.object_id,
-                                "relation_type": relation.predicate,
-                                "description": relation.description,
-                                "confidence": getattr(relation, 'confidence', None)
-                            })
-                        
-                        # 如果邻居实体未访问过，添加到下一层
-                        if neighbor_id not in entity_levels:
-                            if len(entity_levels) < max_entities:
-                                entity_levels[neighbor_id] = current_depth + 1
-                                next_level.append(neighbor_id)
-                                logger.info(f"发现新邻居实体: {neighbor_id}, 层级: {current_depth + 1}")
-                
-                current_level = next_level
-                
-                # 如果下一层没有新实体，提前结束
-                if not current_level:
-                    logger.info(f"第 {current_depth + 1} 层没有新实体，提前结束")
-                    break
-                
-                logger.info(f"第 {current_depth + 1} 层处理完成，下一层实体数: {len(next_level)}")
-            
-            # 获取所有访问过的实体详细信息，包含层级信息
-            if entity_levels:
-                entities_stmt = select(Entity).where(Entity.id.in_(list(entity_levels.keys())))
-                entities_result = await self.session.execute(entities_stmt)
-                entities = entities_result.scalars().all()
-                
-                for entity in entities:
-                    nodes.append({
-                        "id": entity.id,
-                        "name": entity.name,
-                        "entity_type": entity.type,
-                        "description": entity.description,
-                        "confidence": getattr(entity, 'confidence', None),
-                        "is_center": entity.id == entity_id,  # 标记中心节点
-                        "level": entity_levels.get(entity.id, 0),  # 添加层级信息
-                        "created_at": entity.created_at.isoformat() if entity.created_at else None  # 添加创建时间
-                    })
-            
-            # 统计各层级实体数量
-            level_stats = {}
-            for level in entity_levels.values():
-                level_stats[level] = level_stats.get(level, 0) + 1
-            
-            return {
-                "nodes": nodes,
-                "edges": edges,
-                "metadata": {
-                    "total_nodes": len(nodes),
-                    "total_edges": len(edges),
-                    "center_entity_id": entity_id,
-                    "max_depth": depth,
-                    "visited_entities": len(entity_levels),
-                    "level_distribution": level_stats  # 各层级实体分布
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"获取实体邻居网络失败: {e}")
-            raise
-    
-    # ==================== 实体-新闻关联查询功能 ====================
+    # ==================== 新闻查询功能 ====================
     
     async def get_entity_news(
         self,
@@ -433,178 +331,12 @@ class KGQueryService:
         page: int = 1,
         page_size: int = 10,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> Dict[str, Any]:
-        """
-        获取实体关联的新闻
-        
-        Args:
-            entity_id: 实体ID
-            page: 页码
-            page_size: 每页数量
-            start_date: 开始日期过滤
-            end_date: 结束日期过滤
-            
-        Returns:
-            分页的新闻数据
-        """
-        try:
-            # 通过关联表查询新闻
-            stmt = select(NewsEvent).join(
-                news_event_entity, NewsEvent.id == news_event_entity.c.news_event_id
-            ).where(news_event_entity.c.entity_id == entity_id)
-            
-            # 应用日期过滤
-            if start_date:
-                stmt = stmt.where(NewsEvent.publish_time >= start_date)
-            if end_date:
-                stmt = stmt.where(NewsEvent.publish_time <= end_date)
-            
-            # 计算总数
-            count_stmt = select(func.count(NewsEvent.id)).join(
-                news_event_entity, NewsEvent.id == news_event_entity.c.news_event_id
-            ).where(news_event_entity.c.entity_id == entity_id)
-            
-            if start_date:
-                count_stmt = count_stmt.where(NewsEvent.publish_time >= start_date)
-            if end_date:
-                count_stmt = count_stmt.where(NewsEvent.publish_time <= end_date)
-            
-            total_result = await self.session.execute(count_stmt)
-            total = total_result.scalar()
-            
-            # 分页查询
-            offset = (page - 1) * page_size
-            stmt = stmt.order_by(NewsEvent.publish_time.desc()).offset(offset).limit(page_size)
-            
-            result = await self.session.execute(stmt)
-            news_list = result.scalars().all()
-
-            return await self._package_news_result(news_list, page, page_size, total)
-
-        except Exception as e:
-            logger.error(f"获取实体关联新闻失败: {e}")
-            raise
-
-    async def _package_news_result(self, news_list, page: int, page_size: int, total) -> dict[str, list[Any] | int | Any]:
-        items = []
-        for news in news_list:
-            items.append({
-                "id": getattr(news, 'id', None),
-                "title": getattr(news, 'title', None),
-                "content": (
-                    getattr(news, 'content', '')[:300] + "..." if len(getattr(news, 'content', '')) > 300 else getattr(
-                        news, 'content', '')),
-                "source": getattr(news, 'source', None),
-                "published_at": news.publish_time.isoformat() if news.publish_time else None,
-                "created_at": news.created_at.isoformat() if news.created_at else None,
-                "updated_at": news.updated_at.isoformat() if news.updated_at else None
-            })
-
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size
-        }
-
-    # ==================== 多实体共同新闻查询功能 ====================
-    
-    async def get_common_news_for_entities(
-        self,
-        entity_ids: List[int],
-        page: int = 1,
-        page_size: int = 10
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        exact_count: bool = False
     ) -> Dict[str, Any]:
-        """
-        获取多个实体共同关联的新闻
-        
-        Args:
-            entity_ids: 实体ID列表
-            page: 页码
-            page_size: 每页数量
-            
-        Returns:
-            共同关联的新闻数据
-        """
-        try:
-            if len(entity_ids) < 2:
-                return {
-                    "items": [],
-                    "total": 0,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": 0,
-                    "entity_count": len(entity_ids)
-                }
-            
-            # 构建查询：新闻必须关联所有指定实体
-            # 使用子查询确保新闻关联了所有实体
-            subqueries = []
-            for entity_id in entity_ids:
-                subquery = select(news_event_entity.c.news_event_id).where(
-                    news_event_entity.c.entity_id == entity_id
-                )
-                subqueries.append(subquery)
-            
-            # 获取所有实体都关联的新闻ID
-            if subqueries:
-                # 使用INTERSECT获取交集
-                intersect_query = subqueries[0]
-                for subquery in subqueries[1:]:
-                    intersect_query = intersect_query.intersect(subquery)
-                
-                # 主查询
-                stmt = select(NewsEvent).where(NewsEvent.id.in_(intersect_query))
-                
-                # 计算总数
-                count_stmt = select(func.count(NewsEvent.id)).where(NewsEvent.id.in_(intersect_query))
-                total_result = await self.session.execute(count_stmt)
-                total = total_result.scalar()
-                
-                # 分页查询
-                offset = (page - 1) * page_size
-                stmt = stmt.order_by(NewsEvent.publish_time.desc()).offset(offset).limit(page_size)
-                
-                result = await self.session.execute(stmt)
-                news_list = result.scalars().all()
-                
-                items = []
-                for news in news_list:
-                    items.append({
-                        "id": getattr(news, 'id', None),
-                        "title": getattr(news, 'title', None),
-                        "content": (getattr(news, 'content', '')[:300] + "..." if len(getattr(news, 'content', '')) > 300 else getattr(news, 'content', '')),
-                        "source": getattr(news, 'source', None),
-                        "published_at": news.publish_time.isoformat() if news.publish_time else None,
-                        "created_at": news.created_at.isoformat() if news.created_at else None,
-                        "updated_at": news.updated_at.isoformat() if news.updated_at else None
-                    })
-                
-                return {
-                    "items": items,
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "total_pages": (total + page_size - 1) // page_size,
-                    "entity_count": len(entity_ids)
-                }
-            
-            return {
-                "items": [],
-                "total": 0,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": 0,
-                "entity_count": len(entity_ids)
-            }
-            
-        except Exception as e:
-            logger.error(f"获取多实体共同新闻失败: {e}")
-            raise
-    
-    # ==================== 新闻相关实体查询功能 ====================
+        """获取实体关联的新闻，参数和返回值见KGNewsQueryService.get_entity_news"""
+        return await self.news.get_entity_news(entity_id, page, page_size, start_date, end_date, cursor, exact_count)
     
     async def get_news_entities(
         self,
@@ -612,113 +344,8 @@ class KGQueryService:
         entity_type: Optional[str] = None,
         limit: int = 50
     ) -> Dict[str, Any]:
-        """
-        获取新闻相关的实体
-        
-        Args:
-            news_id: 新闻ID
-            entity_type: 实体类型过滤
-            limit: 返回实体数量限制
-            
-        Returns:
-            相关实体数据，按重要性排序
-        """
-        try:
-            # 通过关联表查询实体
-            stmt = select(Entity).join(
-                news_event_entity, Entity.id == news_event_entity.c.entity_id
-            ).where(news_event_entity.c.news_event_id == news_id)
-            
-            # 应用实体类型过滤
-            if entity_type:
-                stmt = stmt.where(Entity.type == entity_type)
-            
-            # 按实体ID排序，限制数量
-            stmt = stmt.order_by(Entity.id.desc()).limit(limit)
-            
-            result = await self.session.execute(stmt)
-            entities = result.scalars().all()
-            
-            # 获取实体统计信息
-            entity_data = []
-            for entity in entities:
-                # 获取该实体在此新闻中的相关性分数（简化版本）
-                relevance_score = await self._calculate_entity_news_relevance(entity.id, news_id)
-                
-                entity_data.append({
-                    "id": entity.id,
-                    "name": entity.name,
-                    "entity_type": entity.type,
-                    "description": entity.description,
-                    "confidence": getattr(entity, 'confidence', 0.8),  # 默认置信度0.8
-                    "relevance_score": relevance_score,
-                    "created_at": entity.created_at.isoformat() if entity.created_at else None
-                })
-            
-            # 按相关性分数重新排序
-            entity_data.sort(key=lambda x: x["relevance_score"], reverse=True)
-            
-            return {
-                "entities": entity_data,
-                "total": len(entity_data),
-                "news_id": news_id,
-                "entity_type_filter": entity_type
-            }
-            
-        except Exception as e:
-            logger.error(f"获取新闻相关实体失败: {e}")
-            raise
-    
-    # ==================== 辅助方法 ====================
-    
-    async def _get_entity_direct_relations(
-        self, entity_id: int, relation_types: Optional[List[str]] = None
-    ) -> List[Relation]:
-        """获取实体的直接关系"""
-        stmt = select(Relation).where(
-            or_(Relation.subject_id == entity_id, Relation.object_id == entity_id)
-        )
-        
-        if relation_types:
-            stmt = stmt.where(Relation.predicate.in_(relation_types))
-        
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
-    
-    async def _get_entity_relations_count(self, entity_id: int) -> int:
-        """获取实体关系数量"""
-        stmt = select(func.count(Relation.id)).where(
-            or_(Relation.subject_id == entity_id, Relation.object_id == entity_id)
-        )
-        result = await self.session.execute(stmt)
-        return result.scalar() or 0
-    
-    async def _get_entity_news_count(self, entity_id: int) -> int:
-        """获取实体关联新闻数量"""
-        stmt = select(func.count(news_event_entity.c.news_event_id)).where(
-            news_event_entity.c.entity_id == entity_id
-        )
-        result = await self.session.execute(stmt)
-        return result.scalar() or 0
-    
-    async def _get_entity_attributes_count(self, entity_id: int) -> int:
-        """获取实体属性数量"""
-        # 这里需要根据实际的属性表结构调整
-        # 暂时返回0，后续根据实际模型实现
-        return 0
-    
-    async def _calculate_entity_news_relevance(self, entity_id: int, news_id: int) -> float:
-        """
-        计算实体在新闻中的相关性分数
-        简化实现：基于实体置信度和在新闻中的出现频率
-        """
-        try:
-            entity = await self.entity_repo.get_by_id(entity_id)
-            return getattr(entity, 'confidence', 0.0) if entity else 0.0
-        except:
-            return 0.0
-    
-    # ==================== 新闻列表查询功能 ====================
+        """获取新闻相关的实体，参数和返回值见KGNewsQueryService.get_news_entities"""
+        return await self.news.get_news_entities(news_id, entity_type, limit)
     
     async def get_news_list(
         self,
@@ -729,83 +356,10 @@ class KGQueryService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         sort_by: str = "publish_time",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        exact_count: bool = False
     ) -> Dict[str, Any]:
-        """
-        获取新闻列表 - 支持分页、搜索和时间过滤
-        
-        Args:
-            page: 页码，从1开始
-            page_size: 每页数量
-            search: 搜索关键词（匹配标题和内容）
-            source: 新闻来源过滤
-            start_date: 开始日期过滤
-            end_date: 结束日期过滤
-            sort_by: 排序字段
-            sort_order: 排序方向 (asc/desc)
-            
-        Returns:
-            {
-                "items": List[新闻数据],
-                "total": 总数量,
-                "page": 当前页码,
-                "page_size": 每页数量,
-                "total_pages": 总页数
-            }
-        """
-        try:
-            # 构建基础查询
-            stmt = select(NewsEvent)
-            
-            # 应用过滤条件
-            conditions = []
-            if search:
-                conditions.append(
-                    or_(
-                        NewsEvent.title.ilike(f"%{search}%"),
-                        NewsEvent.content.ilike(f"%{search}%")
-                    )
-                )
-            if source:
-                conditions.append(NewsEvent.source == source)
-            if start_date:
-                conditions.append(NewsEvent.publish_time >= start_date)
-            if end_date:
-                conditions.append(NewsEvent.publish_time <= end_date)
-
-            news_list, total = await self._query_news_event(conditions, page, page_size, sort_by, sort_order, stmt)
-
-            # 转换为前端友好的格式
-            return await self._package_news_result(news_list, page, page_size, total)
-
-        except Exception as e:
-            logger.error(f"获取新闻列表失败: {e}")
-            raise
-
-    async def _query_news_event(self, conditions: list[Any], page: int, page_size: int, sort_by: str, sort_order: str,
-                                stmt) -> tuple[Any, Any]:
-        if conditions:
-            stmt = stmt.where(and_(*conditions))
-
-        # 应用排序
-        order_field = getattr(NewsEvent, sort_by, NewsEvent.publish_time)
-        if sort_order == "desc":
-            stmt = stmt.order_by(order_field.desc())
-        else:
-            stmt = stmt.order_by(order_field)
-
-        # 计算总数
-        count_stmt = select(func.count(NewsEvent.id))
-        if conditions:
-            count_stmt = count_stmt.where(and_(*conditions))
-
-        total_result = await self.session.execute(count_stmt)
-        total = total_result.scalar()
-
-        # 分页查询
-        offset = (page - 1) * page_size
-        stmt = stmt.offset(offset).limit(page_size)
-
-        result = await self.session.execute(stmt)
-        news_list = result.scalars().all()
-        return news_list, total
\ No newline at end of file
+        """获取新闻列表，参数和返回值见KGNewsQueryService.get_news_list"""
+        return await self.news.get_news_list(page, page_size, search, source, start_date, end_date, sort_by,
+                                             sort_order, cursor, exact_count)
@@ -0,0 +1,395 @@
+"""
+向量索引重建服务 - 从关系库重新生成全部向量
+向量库损坏、更换嵌入模型或修改向量维度后，从entities和news_events重建向量索引
+
+用法: python -m app.services.kg_vector_rebuild_service [--restart] [--no-swap] [--split]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import orjson
+from sqlalchemy import String, cast, func, literal, select, update
+
+from app.config.config_manager import ConfigManager, VectorRebuildConfig
+from app.database.models import Entity, NewsEvent
+from app.exceptions.store_exceptions import StoreError
+from app.services.kg_bulk_import_service import KGBulkImportService
+from app.store import HybridStoreCore
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class KGVectorRebuildService:
+    """
+    向量索引重建服务
+
+    按主键分页读取实体和新闻，并发生成嵌入后按类型写入一组新集合，全部完成后原子切换生效集合：
+    - 重建期间查询和在线写入继续使用旧集合
+    - 每页写入后保存断点（目标集合、各类型已处理的最大ID），中断后从断点继续
+    - 主体完成后补写重建期间更新过的行，再切换集合
+    - 新集合的维度取自嵌入服务的实际输出，修改嵌入模型或维度后无需手动建集合
+
+    重建期间删除的实体和新闻不会从新集合中移除，可在低峰期重建或切换后再次重建
+    """
+
+    CONTENT_TYPES = ("entity", "news")
+    _MODELS = {"entity": Entity, "news": NewsEvent}
+    _COLUMNS = {
+        "entity": (Entity.id, Entity.name, Entity.type, Entity.description),
+        "news": (NewsEvent.id, NewsEvent.title, NewsEvent.content, NewsEvent.source, NewsEvent.publish_time),
+    }
+    _ITEM_BUILDERS = {
+        "entity": KGBulkImportService.entity_vector_items,
+        "news": KGBulkImportService.news_vector_items,
+    }
+
+    def __init__(self, store: HybridStoreCore, config: Optional[VectorRebuildConfig] = None):
+        """
+        初始化重建服务
+
+        Args:
+            store: 已初始化的存储实例（使用其数据库管理器和向量索引管理器）
+            config: 重建配置，为空时从配置文件读取
+        """
+        self.db_manager = store.db_manager
+        self.vector_manager = store.vector_manager
+        self.vector_store = store.vector_manager.vector_store
+        self.config = config or ConfigManager().get_vector_rebuild_config()
+
+    async def rebuild(
+        self,
+        checkpoint_path: Optional[str] = None,
+        resume: bool = True,
+        swap: bool = True
+    ) -> Dict[str, Any]:
+        """
+        重建向量索引
+
+        Args:
+            checkpoint_path: 断点文件路径，默认为状态文件路径加 .rebuild
+            resume: 存在断点且目标集合仍在时从断点继续，否则从头重建
+            swap: 完成后是否切换生效集合
+
+        Returns:
+            Dict[str, Any]: 重建报告（目标集合、各类型向量数、补写数、耗时、速率）
+
+        Raises:
+            StoreError: 重建失败（已完成的页和断点保留）
+        """
+        checkpoint_path = checkpoint_path or f"{self.vector_manager.state_path}.rebuild"
+        checkpoint = await self._load_checkpoint(checkpoint_path) if resume else None
+        if checkpoint is None:
+            now = datetime.now()
+            checkpoint = {
+                "source": self.vector_manager.index_name,
+                "target": f"kg_vectors_{now:%Y%m%d%H%M%S%f}",
+                # 模型的updated_at在插入和更新时分别取本地时间和UTC时间，取两者较早的作为补写起点
+                "started_at": min(now, datetime.utcnow()),
+                "last_ids": dict.fromkeys(self.CONTENT_TYPES, 0),
+                "counts": dict.fromkeys(self.CONTENT_TYPES, 0),
+            }
+        else:
+            checkpoint["started_at"] = datetime.fromisoformat(checkpoint["started_at"])
+            logger.info(f"从断点继续重建向量索引: {checkpoint['target']}, 已处理 {checkpoint['counts']}")
+
+        target = checkpoint["target"]
+        try:
+            total = await self._count_remaining(checkpoint["last_ids"])
+            logger.info(f"开始重建向量索引: {checkpoint['source']} -> {target}, 待处理 {total} 行")
+
+            start = time.perf_counter()
+            done = 0
+            for content_type in self.CONTENT_TYPES:
+                while True:
+                    rows = await self._fetch_rows(content_type, after_id=checkpoint["last_ids"][content_type])
+                    if not rows:
+                        break
+                    await self._write_rows(content_type, rows, target)
+                    checkpoint["last_ids"][content_type] = rows[-1]["id"]
+                    checkpoint["counts"][content_type] += len(rows)
+                    self._save_checkpoint(checkpoint_path, checkpoint)
+
+                    done += len(rows)
+                    elapsed = time.perf_counter() - start
+                    rate = done / elapsed if elapsed > 0 else 0.0
+                    eta = max(total - done, 0) / rate if rate > 0 else 0.0
+                    logger.info(f"重建向量索引: {done}/{total} 行，{rate:.0f} 行/秒，预计剩余 {eta:.0f} 秒")
+
+            await self._ensure_target(target, ConfigManager().get_embedding_config().dimension)
+
+            caught_up = await self._catch_up(checkpoint["started_at"], target)
+            await self._backfill_entity_vector_ids()
+        except Exception as e:
+            logger.error(f"重建向量索引失败: {e}")
+            raise StoreError(f"重建向量索引失败: {str(e)}")
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "source": checkpoint["source"],
+            "target": target,
+            "counts": dict(checkpoint["counts"]),
+            "caught_up": caught_up,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(done / elapsed, 1) if elapsed > 0 else 0.0,
+            "swapped": False,
+        }
+        if swap:
+            await self._swap(target)
+            report["swapped"] = True
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        logger.info(f"向量索引重建完成: {report}")
+        return report
+
+    async def split_collections(self, swap: bool = True) -> Dict[str, Any]:
+        """
+        把旧版单集合中的向量按内容类型（及entity_type_collections中的实体类型）复制到新的集合
+
+        直接复制已有的嵌入，不调用嵌入服务；迁移期间查询和写入继续使用旧集合，
+        复制完成后补齐分页遍历时可能漏掉的向量和迁移期间更新过的行，再切换集合
+
+        Args:
+            swap: 完成后是否切换生效集合
+
+        Returns:
+            Dict[str, Any]: 迁移报告（源集合、目标前缀、各类型向量数、耗时、速率）
+
+        Raises:
+            StoreError: 当前已是按类型拆分的集合，或迁移失败
+        """
+        if self.vector_manager.layout != self.vector_manager.LAYOUT_SINGLE:
+            raise StoreError("当前向量索引已按类型拆分，无需迁移")
+
+        source = self.vector_manager.index_name
+        now = datetime.now()
+        target = f"kg_vectors_{now:%Y%m%d%H%M%S%f}"
+        started_at = min(now, datetime.utcnow())
+        counts: Dict[str, int] = {}
+        copied = set()
+        created = set()
+        try:
+            total = await asyncio.to_thread(self.vector_store.count_vectors, source)
+            logger.info(f"开始拆分向量集合: {source} -> {target}.*, 共 {total} 条")
+
+            start = time.perf_counter()
+            batches = self.vector_store.scan_vectors(source, self.config.batch_size)
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                await self._copy_vectors(batch, target, created, counts)
+                copied.update(item["id"] for item in batch)
+
+                elapsed = time.perf_counter() - start
+                rate = len(copied) / elapsed if elapsed > 0 else 0.0
+                eta = max(total - len(copied), 0) / rate if rate > 0 else 0.0
+                logger.info(f"拆分向量集合: {len(copied)}/{total} 条，{rate:.0f} 条/秒，预计剩余 {eta:.0f} 秒")
+
+            # 按偏移分页遍历时，迁移期间的删除会使后续向量前移而被跳过，按ID补齐
+            missing = []
+            for batch in self.vector_store.scan_vectors(source, self.config.batch_size, include_vectors=False):
+                missing.extend(item["id"] for item in batch if item["id"] not in copied)
+            for ids in (missing[i:i + self.config.batch_size] for i in range(0, len(missing), self.config.batch_size)):
+                await self._copy_vectors(
+                    await asyncio.to_thread(self.vector_store.get_vectors, source, ids), target, created, counts
+                )
+
+            await self._ensure_target(target, ConfigManager().get_embedding_config().dimension)
+            caught_up = await self._catch_up(started_at, target)
+        except Exception as e:
+            logger.error(f"拆分向量集合失败: {e}")
+            raise StoreError(f"拆分向量集合失败: {str(e)}")
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "source": source,
+            "target": target,
+            "counts": counts,
+            "caught_up": caught_up,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(sum(counts.values()) / elapsed, 1) if elapsed > 0 else 0.0,
+            "swapped": False,
+        }
+        if swap:
+            await self._swap(target)
+            report["swapped"] = True
+        logger.info(f"向量集合拆分完成: {report}")
+        return report
+
+    async def _copy_vectors(self, items: List[Dict[str, Any]], target: str, created: set,
+                            counts: Dict[str, int]) -> None:
+        """把一批已有向量按类型写入目标集合"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            metadata = item.get("metadata") or {}
+            content_type = metadata.get("content_type") or item["id"].split("_", 1)[0]
+            item["metadata"] = metadata or {"content_type": content_type}
+            entity_type = metadata.get("type") if content_type == "entity" else None
+            groups.setdefault(self.vector_manager.collection_for(content_type, entity_type, target), []).append(item)
+
+        for index_name, group in groups.items():
+            if index_name not in created and index_name not in await self._collections_of(index_name):
+                await asyncio.to_thread(self.vector_store.create_index, index_name, len(group[0]["vector"]))
+            created.add(index_name)
+            await asyncio.to_thread(
+                self.vector_store.add_vectors,
+                index_name,
+                [item["vector"] for item in group],
+                [item["id"] for item in group],
+                [item["metadata"] for item in group],
+                [item.get("text") or "" for item in group]
+            )
+            content_type = index_name.split(".")[1]
+            counts[content_type] = counts.get(content_type, 0) + len(group)
+
+    async def _ensure_target(self, target: str, default_dimension: int) -> None:
+        """创建目标前缀下缺失的集合（没有数据的内容类型），维度与已写入的集合一致"""
+        existing = await self._collections_of(target)
+        dimension = default_dimension
+        if existing:
+            info = await asyncio.to_thread(self.vector_store.get_index_info, existing[0])
+            dimension = info["metadata"].get("dimension", default_dimension)
+        for index_name in self.vector_manager.collections_for(base=target):
+            if index_name not in existing:
+                await asyncio.to_thread(self.vector_store.create_index, index_name, dimension)
+
+    async def _load_checkpoint(self, checkpoint_path: str) -> Optional[Dict[str, Any]]:
+        """读取断点，文件不存在或目标集合已不存在时返回None"""
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, "rb") as f:
+            checkpoint = orjson.loads(f.read())
+        if any(checkpoint["counts"].values()) and not await self._collections_of(checkpoint["target"]):
+            logger.warning(f"断点的目标集合不存在，重新开始: {checkpoint['target']}")
+            return None
+        return checkpoint
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: str, checkpoint: Dict[str, Any]) -> None:
+        """原子写入断点：先写临时文件再替换"""
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({**checkpoint, "updated_at": datetime.now()}))
+        os.replace(tmp_path, checkpoint_path)
+
+    async def _collections_of(self, base: str) -> List[str]:
+        """以base为前缀的全部集合（per_type布局的 base.* 或单集合的 base）"""
+        indices = await asyncio.to_thread(self.vector_store.list_indices)
+        return [name for name in indices if name == base or name.startswith(f"{base}.")]
+
+    async def _count_remaining(self, last_ids: Dict[str, int]) -> int:
+        """统计断点之后待处理的行数，用于估算剩余时间"""
+        total = 0
+        async with self.db_manager.get_session() as session:
+            for content_type, model in self._MODELS.items():
+                total += (await session.execute(
+                    select(func.count()).select_from(model).where(model.id > last_ids[content_type])
+                )).scalar()
+        return total
+
+    async def _fetch_rows(
+        self,
+        content_type: str,
+        after_id: int = 0,
+        updated_since: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """按主键顺序读取一页行；每页使用独立的短会话，不长时间占用读事务"""
+        model = self._MODELS[content_type]
+        stmt = select(*self._COLUMNS[content_type]).where(model.id > after_id).order_by(model.id)
+        if updated_since is not None:
+            stmt = stmt.where(model.updated_at >= updated_since)
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(stmt.limit(self.config.batch_size))
+            return [dict(row) for row in result.mappings()]
+
+    async def _write_rows(self, content_type: str, rows: List[Dict[str, Any]], target: str,
+                          update: bool = False) -> None:
+        """生成一页行的嵌入并按类型写入目标集合，集合不存在时按嵌入维度创建"""
+        contents, content_ids, metadatas = self._ITEM_BUILDERS[content_type](rows)
+        await self.vector_manager.add_batch_to_index(
+            contents, content_ids, content_type, metadatas,
+            embed_batch_size=self.config.embed_batch_size,
+            vector_batch_size=self.config.batch_size,
+            update=update,
+            base=target,
+            concurrency=self.config.concurrency
+        )
+
+    async def _catch_up(self, started_at: datetime, target: str) -> int:
+        """重新生成重建开始后更新过的行的向量（这些行可能在更新前已写入目标集合）"""
+        caught_up = 0
+        for content_type in self.CONTENT_TYPES:
+            after_id = 0
+            while True:
+                rows = await self._fetch_rows(content_type, after_id=after_id, updated_since=started_at)
+                if not rows:
+                    break
+                await self._write_rows(content_type, rows, target, update=True)
+                after_id = rows[-1]["id"]
+                caught_up += len(rows)
+        if caught_up:
+            logger.info(f"补写重建期间更新的向量: {caught_up} 条")
+        return caught_up
+
+    async def _backfill_entity_vector_ids(self) -> None:
+        """为此前没有向量的实体补写vector_id（重建后所有实体都有向量）"""
+        async with self.db_manager.get_session() as session:
+            await session.execute(
+                update(Entity)
+                .where(Entity.vector_id.is_(None))
+                .values(vector_id=literal("entity_") + cast(Entity.id, String))
+            )
+
+    async def _swap(self, target: str) -> None:
+        """切换生效集合，并删除不再保留的旧集合"""
+        retired = self.vector_manager.read_state().get("previous")
+        replaced = self.vector_manager.switch_index(target, self.vector_manager.LAYOUT_PER_TYPE)
+
+        stale = [retired]
+        if not self.config.keep_previous:
+            stale.append(replaced)
+        for base in stale:
+            if not base or base == target:
+                continue
+            for index_name in await self._collections_of(base):
+                await asyncio.to_thread(self.vector_store.delete_index, index_name)
+                logger.info(f"删除旧向量集合: {index_name}")
+
+
+async def main() -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="从数据库重建向量索引")
+    parser.add_argument("--checkpoint", help="断点文件路径（默认为状态文件路径加 .rebuild）")
+    parser.add_argument("--restart", action="store_true", help="忽略已有断点，从头重建")
+    parser.add_argument("--no-swap", action="store_true", help="完成后不切换生效集合")
+    parser.add_argument("--split", action="store_true",
+                        help="不重新生成嵌入，把旧版单集合中的向量按类型复制到新集合")
+    args = parser.parse_args()
+
+    # 复用内容处理服务的存储初始化（数据库、向量库、嵌入服务）
+    from app.services.kg_core_impl import KGCoreImplService
+    kg_service = KGCoreImplService(auto_init_store=False)
+    await kg_service.initialize()
+    try:
+        service = KGVectorRebuildService(kg_service.store)
+        if args.split:
+            report = await service.split_collections(swap=not args.no_swap)
+        else:
+            report = await service.rebuild(
+                checkpoint_path=args.checkpoint,
+                resume=not args.restart,
+                swap=not args.no_swap
+            )
+        print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
+    finally:
+        await kg_service.store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,250 @@
+"""
+查询分页工具 - 游标分页与总数缓存
+
+为知识图谱查询服务的列表接口提供：
+- 基于 (排序键, id) 的游标（keyset）分页，避免深分页时 OFFSET 线性变慢
+- 带TTL的总数缓存，过期后先返回旧值并在后台异步刷新，精确总数需显式请求；
+  缓存条目记录计算时所依赖数据表的版本号，数据写入后先返回标记为陈旧的旧总数并在后台重新计算
+"""
+
+import asyncio
+import base64
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.store.response_cache_manage import get_response_cache_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+# ==================== 游标编解码 ====================
+
+def encode_cursor(sort_by: str, sort_value: Any, last_id: int) -> str:
+    """
+    将分页位置编码为不透明游标
+
+    Args:
+        sort_by: 排序字段名（用于校验游标与当前排序一致）
+        sort_value: 上一页最后一条记录的排序键值
+        last_id: 上一页最后一条记录的ID
+
+    Returns:
+        str: URL安全的base64游标字符串
+    """
+    if isinstance(sort_value, datetime):
+        value = {"t": "dt", "v": sort_value.isoformat()}
+    else:
+        value = {"t": "raw", "v": sort_value}
+
+    payload = json.dumps({"s": sort_by, "k": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[Any, int]:
+    """
+    解码游标
+
+    Args:
+        cursor: encode_cursor生成的游标
+        sort_by: 当前请求的排序字段名
+
+    Returns:
+        Tuple[Any, int]: (排序键值, 记录ID)
+
+    Raises:
+        ValueError: 游标格式无效或与当前排序字段不一致
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        value = payload["k"]
+        sort_value = datetime.fromisoformat(value["v"]) if value["t"] == "dt" else value["v"]
+        last_id = int(payload["id"])
+        cursor_sort_by = payload["s"]
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+    if cursor_sort_by != sort_by:
+        raise ValueError(f"分页游标与排序字段不匹配: 游标={cursor_sort_by}, 请求={sort_by}")
+
+    return sort_value, last_id
+
+
+# ==================== 排序与游标条件 ====================
+
+def keyset_order_by(order_field, id_field, descending: bool) -> list:
+    """
+    构建游标分页所需的稳定排序（排序键 + id，NULL统一排在最后）
+
+    Args:
+        order_field: 排序列
+        id_field: 主键列，用于打破排序键相同的并列
+        descending: 是否降序
+
+    Returns:
+        list: 可直接传给 order_by 的排序表达式
+    """
+    if descending:
+        return [order_field.desc().nulls_last(), id_field.desc()]
+    return [order_field.asc().nulls_last(), id_field.asc()]
+
+
+def keyset_condition(order_field, id_field, sort_value: Any, last_id: int, descending: bool):
+    """
+    构建"位于游标之后"的过滤条件，与 keyset_order_by 的排序保持一致
+
+    Args:
+        order_field: 排序列
+        id_field: 主键列
+        sort_value: 游标中的排序键值
+        last_id: 游标中的记录ID
+        descending: 是否降序
+
+    Returns:
+        SQLAlchemy 条件表达式
+    """
+    id_after = id_field < last_id if descending else id_field > last_id
+
+    # NULL 排在最后：游标已进入NULL段时只能继续在NULL段内按id前进
+    if sort_value is None:
+        return and_(order_field.is_(None), id_after)
+
+    value_after = order_field < sort_value if descending else order_field > sort_value
+    return or_(
+        value_after,
+        and_(order_field == sort_value, id_after),
+        order_field.is_(None)
+    )
+
+
+def row_cursor(sort_by: str, row: Any, id_attr: str = "id") -> str:
+    """根据ORM对象生成指向该行之后的游标"""
+    return encode_cursor(sort_by, getattr(row, sort_by, None), getattr(row, id_attr))
+
+
+# ==================== 总数缓存 ====================
+
+@dataclass
+class _CountEntry:
+    """缓存的总数记录"""
+    value: int
+    updated_at: float
+    versions: Optional[Tuple[Any, ...]] = None
+    refreshing: bool = False
+
+
+class CountCache:
+    """
+    列表总数缓存
+
+    - 未命中时同步执行COUNT并缓存
+    - 命中且未过期时直接返回缓存值
+    - 命中但已过期时返回旧值，并在后台用独立连接异步刷新
+    - exact=True 时始终执行COUNT并更新缓存
+    - 传入tables时条目记录这些数据表的版本号（与响应缓存共用）；版本号变化（发生写入）后返回旧值并标记为陈旧，
+      同时在后台刷新，持续写入期间读取也不会每次都同步执行COUNT；
+      过期只影响其他进程中不经过HybridStoreCore的写入
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 1024):
+        """
+        初始化总数缓存
+
+        Args:
+            ttl_seconds: 缓存有效期（秒）
+            max_entries: 最大缓存条目数，超出时淘汰最早更新的条目
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, _CountEntry] = {}
+        self._tasks: set = set()
+
+    async def get_total(
+        self,
+        key: Hashable,
+        session,
+        count_stmt,
+        exact: bool = False,
+        tables: Iterable[str] = ()
+    ) -> Tuple[int, bool, bool]:
+        """
+        获取总数
+
+        Args:
+            key: 缓存键（应包含查询类型和全部过滤条件）
+            session: 当前请求的数据库会话
+            count_stmt: COUNT查询语句
+            exact: 是否强制执行精确COUNT
+            tables: COUNT查询依赖的数据表，写入后缓存的总数视为陈旧
+
+        Returns:
+            Tuple[int, bool, bool]: (总数, 是否为本次精确计算的值, 是否为写入前的陈旧值)
+        """
+        tables = tuple(tables)
+        versions = await get_response_cache_manager().get_versions(tables) if tables else None
+        entry = self._entries.get(key)
+        engine = getattr(session, "bind", None)
+        stale = entry is not None and entry.versions != versions
+        if stale and not isinstance(engine, AsyncEngine):
+            # 无法在后台刷新时同步重新计算，避免一直返回写入前的总数
+            entry = None
+
+        if exact or entry is None:
+            result = await session.execute(count_stmt)
+            total = result.scalar() or 0
+            self._store(key, total, versions)
+            return total, True, False
+
+        expired = time.monotonic() - entry.updated_at > self.ttl_seconds
+        if (stale or expired) and not entry.refreshing and isinstance(engine, AsyncEngine):
+            entry.refreshing = True
+            task = asyncio.create_task(self._refresh(key, engine, count_stmt, versions))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        return entry.value, False, stale
+
+    async def _refresh(self, key: Hashable, engine: AsyncEngine, count_stmt,
+                       versions: Optional[Tuple[Any, ...]] = None) -> None:
+        """后台刷新过期或陈旧的总数，versions为刷新开始前读取的数据表版本号"""
+        try:
+            async with engine.connect() as conn:
+                result = await conn.execute(count_stmt)
+                self._store(key, result.scalar() or 0, versions)
+        except Exception as e:
+            logger.warning(f"后台刷新列表总数失败: key={key}, 错误: {e}")
+            entry = self._entries.get(key)
+            if entry:
+                entry.refreshing = False
+
+    def _store(self, key: Hashable, value: int, versions: Optional[Tuple[Any, ...]] = None) -> None:
+        """写入缓存并控制容量"""
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            oldest_key = min(self._entries, key=lambda k: self._entries[k].updated_at)
+            self._entries.pop(oldest_key, None)
+        self._entries[key] = _CountEntry(value=value, updated_at=time.monotonic(), versions=versions)
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        """
+        失效缓存
+
+        Args:
+            prefix: 只失效该查询类型（缓存键首元素）下的条目，为空时全部失效
+        """
+        if prefix is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == prefix]:
+            self._entries.pop(key, None)
+
+
+# 全局总数缓存实例
+count_cache = CountCache()
@@ -6,10 +6,25 @@ from app.store.hybrid_store_compat import HybridStore
 from app.store.hybrid_store_core_implement import HybridStoreCore
 from app.store.store_data_convert import DataConverter
 from app.store.vector_index_manage import VectorIndexManager
+from app.store.graph_index_manage import GraphIndexManager, get_graph_index_manager
+from app.store.entity_stats_manage import EntityStatsManager, get_entity_stats_manager
+from app.store.response_cache_manage import ResponseCacheManager, get_response_cache_manager
+from app.store.vector_breaker_manage import VectorBreakerManager, get_vector_breaker_manager
+from app.store.import_signal_manage import ImportSignalManager, get_import_signal_manager
 
 __all__ = [
     'HybridStore',
     'HybridStoreCore', 
     'DataConverter',
-    'VectorIndexManager'
+    'VectorIndexManager',
+    'GraphIndexManager',
+    'get_graph_index_manager',
+    'EntityStatsManager',
+    'get_entity_stats_manager',
+    'ResponseCacheManager',
+    'get_response_cache_manager',
+    'VectorBreakerManager',
+    'get_vector_breaker_manager',
+    'ImportSignalManager',
+    'get_import_signal_manager'
 ]
\ No newline at end of file
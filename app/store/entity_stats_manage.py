@@ -0,0 +1,455 @@
+"""
+实体统计管理 - 预计算实体重要性
+
+在后台计算每个实体的：
+- 度数（出边 + 入边）
+- 加权PageRank（沿关系方向从主体传递到客体，反向边按reverse_weight计入；
+  边权重由谓词权重配置决定，同一对实体间的多条关系累加权重）
+- 新闻提及次数
+
+结果写入entity_stats表，并在内存中保留PageRank和新闻数数组，供查询服务排序、截断和选择查询计划。
+数据写入后只增量刷新受影响实体的度数和新闻数（表和内存数组同时更新），PageRank由定期全量重算更新
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select, insert, delete, func, union_all
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.config_manager import ConfigManager, EntityStatsConfig
+from app.database.models import EntityStats, Relation, news_event_entity
+from app.store.graph_index_manage import get_graph_index_manager
+from app.store.response_cache_manage import get_response_cache_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def compute_pagerank(src: np.ndarray, dst: np.ndarray, weights: np.ndarray, node_count: int,
+                     damping: float = 0.85, max_iterations: int = 100,
+                     tolerance: float = 1e-8, normalized: bool = False) -> np.ndarray:
+    """
+    幂迭代计算加权PageRank
+
+    Args:
+        src: 边起点下标数组
+        dst: 边终点下标数组
+        weights: 边权重数组
+        node_count: 节点数量
+        damping: 阻尼系数
+        max_iterations: 最大迭代次数
+        tolerance: 收敛阈值（相邻两次迭代的L1距离）
+        normalized: weights是否已是转移概率（每个节点出边之和不超过1，不足的部分均匀分给所有节点）
+
+    Returns:
+        np.ndarray: 各节点的PageRank，总和为1
+    """
+    if node_count == 0:
+        return np.empty(0, dtype=np.float64)
+
+    if normalized:
+        edge_share = weights
+    else:
+        out_weight = np.bincount(src, weights=weights, minlength=node_count)
+        edge_share = weights / np.where(out_weight == 0, 1.0, out_weight)[src]
+    leftover = np.clip(1.0 - np.bincount(src, weights=edge_share, minlength=node_count), 0.0, 1.0)
+
+    rank = np.full(node_count, 1.0 / node_count)
+    for _ in range(max_iterations):
+        spread = np.bincount(dst, weights=rank[src] * edge_share, minlength=node_count)
+        # 没有出边的节点（以及出边概率之和不足1的部分）把分数均匀分给所有节点
+        new_rank = (1.0 - damping) / node_count + damping * (spread + rank @ leftover / node_count)
+        converged = np.abs(new_rank - rank).sum() < tolerance
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+
+class EntityStatsManager:
+    """
+    实体统计管理器
+
+    实现单例模式，负责全量重算、增量刷新，以及在内存中提供PageRank查找
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    # 写入entity_stats表时每批的行数
+    WRITE_BATCH_SIZE = 10000
+    # 增量刷新时每批查询的实体数量
+    REFRESH_BATCH_SIZE = 500
+
+    def __new__(cls, config: Optional[EntityStatsConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 实体统计配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(EntityStatsManager, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[EntityStatsConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_entity_stats_config()
+        self._engine: Optional[AsyncEngine] = None
+        self._compute_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._dirty: Set[int] = set()
+        # 按实体ID升序的PageRank和新闻提及数，用于向量化查找
+        self._entity_ids: Optional[np.ndarray] = None
+        self._scores: Optional[np.ndarray] = None
+        self._news_counts: Optional[np.ndarray] = None
+        self._computed_at: Optional[float] = None
+        self._last_compute_seconds: Optional[float] = None
+
+    # ==================== 查询 ====================
+
+    def get_scores(self, entity_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """
+        批量获取实体的PageRank，未统计的实体为0
+
+        超过重算间隔时在后台触发全量重算，期间继续使用旧值
+
+        Args:
+            entity_ids: 实体ID序列
+
+        Returns:
+            Optional[np.ndarray]: 与输入顺序一致的分数数组，统计未就绪或未启用时返回None
+        """
+        if not self.config.enabled or self._scores is None:
+            return None
+        if (self.config.refresh_interval and self._engine is not None
+                and time.monotonic() - self._computed_at > self.config.refresh_interval
+                and not self.is_computing):
+            self._compute_task = self._schedule(self.recompute(self._engine))
+
+        return self._lookup(self._scores, entity_ids)
+
+    def get_news_counts(self, entity_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """
+        批量获取实体的新闻提及数（全量计算或增量刷新后的值），未统计的实体为0
+
+        Args:
+            entity_ids: 实体ID序列
+
+        Returns:
+            Optional[np.ndarray]: 与输入顺序一致的新闻数数组，统计未就绪或未启用时返回None
+        """
+        if not self.config.enabled or self._news_counts is None:
+            return None
+        return self._lookup(self._news_counts, entity_ids)
+
+    def _lookup(self, values: np.ndarray, entity_ids: Iterable[int]) -> np.ndarray:
+        """按实体ID查找与_entity_ids对齐的数组，未统计的实体为0"""
+        ids = np.asarray(entity_ids if isinstance(entity_ids, np.ndarray) else list(entity_ids), dtype=np.int64)
+        if not len(self._entity_ids):
+            return np.zeros(len(ids), dtype=values.dtype)
+        positions = np.minimum(np.searchsorted(self._entity_ids, ids), len(self._entity_ids) - 1)
+        return np.where(self._entity_ids[positions] == ids, values[positions], 0)
+
+    @property
+    def is_computing(self) -> bool:
+        """是否正在全量重算"""
+        return self._compute_task is not None and not self._compute_task.done()
+
+    # ==================== 全量重算 ====================
+
+    @staticmethod
+    def _schedule(coro) -> Optional[asyncio.Task]:
+        """在后台启动任务"""
+        try:
+            return asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+            return None
+
+    def start_refresh(self, engine: AsyncEngine) -> Optional[asyncio.Task]:
+        """
+        在后台加载已有统计，过期或为空时全量重算（应用启动时调用）
+
+        Args:
+            engine: 异步数据库引擎
+        """
+        if not self.config.enabled or self.is_computing:
+            return self._compute_task
+        self._compute_task = self._schedule(self._load_or_recompute(engine))
+        return self._compute_task
+
+    async def _load_or_recompute(self, engine: AsyncEngine) -> None:
+        """加载entity_stats表中的PageRank和新闻数，表为空或最早一次全量计算已过期时重算"""
+        self._engine = engine
+        try:
+            async with engine.connect() as conn:
+                oldest = (await conn.execute(select(func.min(EntityStats.updated_at)))).scalar()
+                if oldest is not None:
+                    rows = (await conn.execute(
+                        select(EntityStats.entity_id, EntityStats.pagerank, EntityStats.news_count)
+                        .order_by(EntityStats.entity_id)
+                    )).all()
+                    self._set_scores(
+                        np.array([r[0] for r in rows], dtype=np.int64),
+                        np.array([r[1] for r in rows], dtype=np.float64),
+                        np.array([r[2] or 0 for r in rows], dtype=np.int64)
+                    )
+        except Exception as e:
+            logger.error(f"加载实体统计失败: {e}")
+            oldest = None
+
+        # 全量重算会重写全部行，最早的更新时间即上次全量计算时间
+        interval = self.config.refresh_interval
+        if oldest is None or (interval and datetime.now() - oldest > timedelta(seconds=interval)):
+            await self.recompute(engine)
+
+    async def recompute(self, engine: AsyncEngine) -> None:
+        """
+        全量重算所有实体的度数、PageRank和新闻提及数，并重写entity_stats表
+
+        内存图索引就绪时直接使用其中的边，否则从relations表读取
+
+        Args:
+            engine: 异步数据库引擎
+        """
+        self._engine = engine
+        start = time.perf_counter()
+        try:
+            graph = get_graph_index_manager().graph
+            if graph is not None:
+                snapshot = graph.snapshot()
+                _, subjects, objects, pred_codes = await asyncio.to_thread(graph.edge_arrays, snapshot)
+                predicates = snapshot["predicates"]
+            else:
+                async with engine.connect() as conn:
+                    rows = (await conn.execute(
+                        select(Relation.subject_id, Relation.object_id, Relation.predicate)
+                    )).all()
+                subjects = np.array([r[0] for r in rows], dtype=np.int64)
+                objects = np.array([r[1] for r in rows], dtype=np.int64)
+                predicates, pred_codes = np.unique(np.array([r[2] for r in rows], dtype=object),
+                                                   return_inverse=True)
+                predicates = predicates.tolist()
+
+            async with engine.connect() as conn:
+                news_rows = (await conn.execute(
+                    select(news_event_entity.c.entity_id, func.count())
+                    .group_by(news_event_entity.c.entity_id)
+                )).all()
+
+            entity_ids, degrees, pageranks, news_counts = await asyncio.to_thread(
+                self._compute, subjects, objects, pred_codes, predicates, news_rows
+            )
+
+            rows = [
+                {"entity_id": entity_id, "degree": degree, "pagerank": pagerank, "news_count": news_count}
+                for entity_id, degree, pagerank, news_count in zip(
+                    entity_ids.tolist(), degrees.tolist(), pageranks.tolist(), news_counts.tolist()
+                )
+            ]
+            async with engine.begin() as conn:
+                await conn.execute(delete(EntityStats))
+                for i in range(0, len(rows), self.WRITE_BATCH_SIZE):
+                    await conn.execute(insert(EntityStats), rows[i:i + self.WRITE_BATCH_SIZE])
+
+            self._set_scores(entity_ids, pageranks, news_counts)
+            await get_response_cache_manager().bump(EntityStats.__tablename__)
+            self._last_compute_seconds = time.perf_counter() - start
+            logger.info(f"实体统计全量计算完成: 实体数 {len(rows)}, 耗时 {self._last_compute_seconds:.2f}秒")
+        except Exception as e:
+            logger.error(f"实体统计全量计算失败: {e}")
+
+    def _compute(self, subjects: np.ndarray, objects: np.ndarray, pred_codes: np.ndarray,
+                 predicates: List[str], news_rows: List[Any]):
+        """计算统计值（在线程中执行），返回按实体ID升序的 (ID, 度数, PageRank, 新闻数)"""
+        news_ids = np.array([r[0] for r in news_rows], dtype=np.int64)
+        news_values = np.array([r[1] for r in news_rows], dtype=np.int64)
+
+        entity_ids = np.unique(np.concatenate([subjects, objects, news_ids]))
+        node_count = len(entity_ids)
+        src = np.searchsorted(entity_ids, subjects)
+        dst = np.searchsorted(entity_ids, objects)
+
+        degrees = np.bincount(src, minlength=node_count) + np.bincount(dst, minlength=node_count)
+
+        # 关系按谓词加权，同一对实体间的多条关系自然累加。随机游走以 1/(1+r) 的概率沿关系方向
+        # 走到客体、以 r/(1+r) 的概率反向走到主体（r为reverse_weight），该方向没有边时随机跳转，
+        # 因此被指向的实体比度数相同、只指向别人的实体得分高
+        predicate_weights = self.config.predicate_weights or {}
+        code_weights = np.array([predicate_weights.get(p, 1.0) for p in predicates] or [1.0], dtype=np.float64)
+        weights = code_weights[np.asarray(pred_codes, dtype=np.int64)]
+        reverse_share = self.config.reverse_weight / (1.0 + self.config.reverse_weight)
+        forward_total = np.bincount(src, weights=weights, minlength=node_count)
+        backward_total = np.bincount(dst, weights=weights, minlength=node_count)
+        pageranks = compute_pagerank(
+            np.concatenate([src, dst]), np.concatenate([dst, src]),
+            np.concatenate([
+                (1.0 - reverse_share) * weights / np.where(forward_total == 0, 1.0, forward_total)[src],
+                reverse_share * weights / np.where(backward_total == 0, 1.0, backward_total)[dst],
+            ]),
+            node_count, self.config.damping, self.config.max_iterations, self.config.tolerance,
+            normalized=True
+        )
+
+        news_counts = np.zeros(node_count, dtype=np.int64)
+        news_counts[np.searchsorted(entity_ids, news_ids)] = news_values
+        return entity_ids, degrees, pageranks, news_counts
+
+    def _set_scores(self, entity_ids: np.ndarray, scores: np.ndarray, news_counts: np.ndarray) -> None:
+        """替换内存中的PageRank和新闻数数组（entity_ids需升序）"""
+        self._entity_ids = entity_ids
+        self._scores = scores
+        self._news_counts = news_counts
+        self._computed_at = time.monotonic()
+
+    # ==================== 增量刷新 ====================
+
+    def mark_dirty(self, entity_ids: Iterable[int]) -> None:
+        """
+        标记统计需要刷新的实体（应在数据库提交之后调用）
+
+        Args:
+            entity_ids: 关系或新闻关联发生变化的实体ID
+        """
+        if self.config.enabled:
+            self._dirty.update(entity_ids)
+
+    def forget_entities(self, entity_ids: Iterable[int]) -> None:
+        """
+        将已删除实体在内存中的PageRank和新闻数置0（应在数据库提交之后调用）
+
+        删除后到下次全量重算之前，排序和共同新闻的计划选择不再使用这些实体的旧统计
+
+        Args:
+            entity_ids: 已删除的实体ID
+        """
+        entity_ids = list(entity_ids)
+        self._merge_scores(entity_ids, [0.0] * len(entity_ids), [0] * len(entity_ids))
+
+    def _merge_scores(self, entity_ids: List[int], scores: List[float], news_counts: List[int]) -> None:
+        """更新内存数组中指定实体的PageRank和新闻数，不在数组中的实体按ID顺序插入"""
+        if self._entity_ids is None or not entity_ids:
+            return
+        ids = np.asarray(entity_ids, dtype=np.int64)
+        merged_ids = np.union1d(self._entity_ids, ids)
+        # 复制后整体替换，查询中正在使用的旧数组不受影响
+        merged_scores = np.zeros(len(merged_ids), dtype=np.float64)
+        merged_news = np.zeros(len(merged_ids), dtype=np.int64)
+        old_positions = np.searchsorted(merged_ids, self._entity_ids)
+        merged_scores[old_positions] = self._scores
+        merged_news[old_positions] = self._news_counts
+        positions = np.searchsorted(merged_ids, ids)
+        merged_scores[positions] = scores
+        merged_news[positions] = news_counts
+        self._entity_ids, self._scores, self._news_counts = merged_ids, merged_scores, merged_news
+
+    def start_incremental_refresh(self, engine: AsyncEngine) -> Optional[asyncio.Task]:
+        """
+        在后台增量刷新被标记实体的度数和新闻数（每批数据写入完成后调用）
+
+        Args:
+            engine: 异步数据库引擎
+        """
+        if not self.config.enabled or not self._dirty:
+            return None
+        if self._refresh_task is not None and not self._refresh_task.done():
+            # 正在刷新的任务会继续处理新标记的实体
+            return self._refresh_task
+        self._engine = engine
+        self._refresh_task = self._schedule(self._refresh_dirty(engine))
+        return self._refresh_task
+
+    async def _refresh_dirty(self, engine: AsyncEngine) -> None:
+        """循环刷新被标记的实体，直到没有新的标记"""
+        while self._dirty:
+            entity_ids = sorted(self._dirty)
+            self._dirty.clear()
+            try:
+                await self.refresh_entities(engine, entity_ids)
+            except Exception as e:
+                # 放回标记，下次增量刷新时重试（事务已回滚，统计行未变化）
+                self._dirty.update(entity_ids)
+                logger.error(f"实体统计增量刷新失败，{len(entity_ids)}个实体保留标记: {e}")
+                return
+
+    async def refresh_entities(self, engine: AsyncEngine, entity_ids: List[int]) -> None:
+        """
+        重新统计指定实体的度数和新闻数，保留已有的PageRank，并同步更新内存中的新闻数数组
+
+        没有关系和新闻关联的实体删除统计行，内存中的PageRank和新闻数置0
+
+        Args:
+            engine: 异步数据库引擎
+            entity_ids: 实体ID列表
+        """
+        refreshed: Dict[int, Dict[str, Any]] = {}
+        async with engine.begin() as conn:
+            for i in range(0, len(entity_ids), self.REFRESH_BATCH_SIZE):
+                batch = entity_ids[i:i + self.REFRESH_BATCH_SIZE]
+
+                outgoing = select(Relation.subject_id.label("entity_id")).where(Relation.subject_id.in_(batch))
+                incoming = select(Relation.object_id.label("entity_id")).where(Relation.object_id.in_(batch))
+                edges = union_all(outgoing, incoming).subquery()
+                degrees = dict((await conn.execute(
+                    select(edges.c.entity_id, func.count()).group_by(edges.c.entity_id)
+                )).all())
+                news_counts = dict((await conn.execute(
+                    select(news_event_entity.c.entity_id, func.count())
+                    .where(news_event_entity.c.entity_id.in_(batch))
+                    .group_by(news_event_entity.c.entity_id)
+                )).all())
+                pageranks = dict((await conn.execute(
+                    select(EntityStats.entity_id, EntityStats.pagerank).where(EntityStats.entity_id.in_(batch))
+                )).all())
+
+                await conn.execute(delete(EntityStats).where(EntityStats.entity_id.in_(batch)))
+                rows = [
+                    {
+                        "entity_id": entity_id,
+                        "degree": degrees.get(entity_id, 0),
+                        "pagerank": pageranks.get(entity_id, 0.0),
+                        "news_count": news_counts.get(entity_id, 0)
+                    }
+                    for entity_id in batch if entity_id in degrees or entity_id in news_counts
+                ]
+                if rows:
+                    await conn.execute(insert(EntityStats), rows)
+                refreshed.update((row["entity_id"], row) for row in rows)
+
+        # 事务提交后再更新内存数组
+        self._merge_scores(
+            entity_ids,
+            [refreshed[entity_id]["pagerank"] if entity_id in refreshed else 0.0 for entity_id in entity_ids],
+            [refreshed[entity_id]["news_count"] if entity_id in refreshed else 0 for entity_id in entity_ids]
+        )
+        await get_response_cache_manager().bump(EntityStats.__tablename__)
+        logger.debug(f"实体统计增量刷新完成: {len(entity_ids)}个实体")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取统计任务状态
+
+        Returns:
+            Dict[str, Any]: 就绪状态、实体数、待刷新实体数和上次全量计算耗时
+        """
+        return {
+            "enabled": self.config.enabled,
+            "ready": self._scores is not None,
+            "computing": self.is_computing,
+            "entities": len(self._entity_ids) if self._entity_ids is not None else 0,
+            "dirty": len(self._dirty),
+            "last_compute_seconds": self._last_compute_seconds,
+        }
+
+
+def get_entity_stats_manager() -> EntityStatsManager:
+    """获取实体统计管理器实例"""
+    return EntityStatsManager()
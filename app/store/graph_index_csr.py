@@ -0,0 +1,362 @@
+"""
+CSR邻接图 - 内存图索引的数据结构
+
+将关系存储为NumPy压缩稀疏行（CSR）数组：
+- 正向邻接（subject -> object）与反向邻接（object -> subject）
+- 谓词编码为整数，按关系类型过滤时只比较整数
+- 新关系写入增量缓冲区、删除的关系记录为墓碑，查询时与CSR结果合并，合并后生成新图
+
+加载、增量维护和后台合并由GraphIndexManager负责
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+def _build_csr(src: np.ndarray, dst: np.ndarray, edge_ids: np.ndarray, pred_codes: np.ndarray,
+               node_count: int, edge_dtype, pred_dtype) -> Tuple[np.ndarray, ...]:
+    """
+    按源节点构建CSR数组
+
+    Returns:
+        Tuple: (indptr, 邻居节点下标, 边ID, 谓词编码)
+    """
+    # 同一节点内邻居顺序无关，使用非稳定排序
+    order = np.argsort(src)
+    counts = np.bincount(src, minlength=node_count)
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return (
+        indptr,
+        dst[order].astype(np.int32),
+        edge_ids[order].astype(edge_dtype),
+        pred_codes[order].astype(pred_dtype),
+    )
+
+
+class CSRGraph:
+    """
+    CSR邻接图
+
+    CSR部分构建后只读；新增关系写入增量缓冲区，删除的关系记录为墓碑，
+    两者在查询时与CSR结果合并
+    """
+
+    def __init__(self, edge_ids: np.ndarray, subjects: np.ndarray, objects: np.ndarray,
+                 pred_codes: np.ndarray, predicates: List[str]):
+        """
+        构建CSR邻接图
+
+        Args:
+            edge_ids: 关系ID数组
+            subjects: 主体实体ID数组
+            objects: 客体实体ID数组
+            pred_codes: 谓词编码数组（predicates的下标）
+            predicates: 谓词字典
+        """
+        self.predicates = list(predicates)
+        self.predicate_codes = {predicate: code for code, predicate in enumerate(self.predicates)}
+
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        subjects = np.asarray(subjects, dtype=np.int64)
+        objects = np.asarray(objects, dtype=np.int64)
+        pred_codes = np.asarray(pred_codes, dtype=np.int32)
+
+        self.node_ids = np.unique(np.concatenate([subjects, objects]))
+        node_count = len(self.node_ids)
+
+        # 实体ID为自增整数、分布稠密时使用查找表做ID到下标的映射，否则二分查找
+        self._lookup: Optional[np.ndarray] = None
+        if node_count and self.node_ids[0] >= 0 and self.node_ids[-1] <= 4 * node_count + 1024:
+            self._lookup = np.full(int(self.node_ids[-1]) + 1, -1, dtype=np.int32)
+            self._lookup[self.node_ids] = np.arange(node_count, dtype=np.int32)
+            src = self._lookup[subjects]
+            dst = self._lookup[objects]
+        else:
+            src = np.searchsorted(self.node_ids, subjects)
+            dst = np.searchsorted(self.node_ids, objects)
+
+        # 在取值范围允许时使用更窄的整数类型，10M边约占200MB
+        edge_dtype = np.int32 if not len(edge_ids) or edge_ids.max() < 2 ** 31 else np.int64
+        pred_dtype = np.int16 if len(self.predicates) < 2 ** 15 else np.int32
+
+        self.out_indptr, self.out_nbrs, self.out_edges, self.out_preds = _build_csr(
+            src, dst, edge_ids, pred_codes, node_count, edge_dtype, pred_dtype
+        )
+        self.in_indptr, self.in_nbrs, self.in_edges, self.in_preds = _build_csr(
+            dst, src, edge_ids, pred_codes, node_count, edge_dtype, pred_dtype
+        )
+
+        # 增量缓冲区：实体ID -> [(邻居实体ID, 关系ID, 谓词编码)]
+        self.delta_out: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.delta_in: Dict[int, List[Tuple[int, int, int]]] = {}
+        self.delta_edges: Dict[int, Tuple[int, int, int]] = {}
+        self.removed: Set[int] = set()
+
+    # ==================== 写入 ====================
+
+    def _node_slice(self, entity_id: int, indptr: np.ndarray) -> Optional[Tuple[int, int]]:
+        """实体在CSR数组中的区间，实体不在CSR中时返回None"""
+        if self._lookup is not None:
+            if 0 <= entity_id < len(self._lookup) and self._lookup[entity_id] >= 0:
+                pos = self._lookup[entity_id]
+                return int(indptr[pos]), int(indptr[pos + 1])
+            return None
+        pos = np.searchsorted(self.node_ids, entity_id)
+        if pos < len(self.node_ids) and self.node_ids[pos] == entity_id:
+            return int(indptr[pos]), int(indptr[pos + 1])
+        return None
+
+    def _positions(self, entity_ids: Iterable[int]) -> np.ndarray:
+        """批量将实体ID转换为CSR节点下标，忽略不在CSR中的实体"""
+        ids = np.fromiter(entity_ids, dtype=np.int64)
+        if self._lookup is not None:
+            ids = ids[(ids >= 0) & (ids < len(self._lookup))]
+            positions = self._lookup[ids]
+            return positions[positions >= 0]
+        positions = np.searchsorted(self.node_ids, ids)
+        found = positions < len(self.node_ids)
+        positions, ids = positions[found], ids[found]
+        return positions[self.node_ids[positions] == ids]
+
+    def has_edge(self, edge_id: int, subject_id: int) -> bool:
+        """关系是否已在索引中（不含已删除）"""
+        if edge_id in self.removed:
+            return False
+        if edge_id in self.delta_edges:
+            return True
+        bounds = self._node_slice(subject_id, self.out_indptr)
+        return bounds is not None and bool(np.any(self.out_edges[bounds[0]:bounds[1]] == edge_id))
+
+    def add_edge(self, edge_id: int, subject_id: int, object_id: int, predicate: str) -> None:
+        """增量添加关系（重复添加同一关系ID时忽略）"""
+        self.removed.discard(edge_id)
+        if self.has_edge(edge_id, subject_id):
+            return
+        code = self.predicate_codes.get(predicate)
+        if code is None:
+            code = len(self.predicates)
+            self.predicates.append(predicate)
+            self.predicate_codes[predicate] = code
+        self.delta_edges[edge_id] = (subject_id, object_id, code)
+        self.delta_out.setdefault(subject_id, []).append((object_id, edge_id, code))
+        self.delta_in.setdefault(object_id, []).append((subject_id, edge_id, code))
+
+    def remove_edge(self, edge_id: int) -> None:
+        """删除关系（记录墓碑，合并时清除）"""
+        self.removed.add(edge_id)
+
+    @property
+    def delta_size(self) -> int:
+        """增量缓冲区与墓碑的总规模"""
+        return len(self.delta_edges) + len(self.removed)
+
+    # ==================== 查询 ====================
+
+    def _codes_for(self, relation_types: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """关系类型转换为谓词编码数组，None表示不过滤"""
+        if not relation_types:
+            return None
+        return np.array(
+            [self.predicate_codes[t] for t in relation_types if t in self.predicate_codes],
+            dtype=np.int32
+        )
+
+    def _adjacent(self, entity_id: int, codes: Optional[np.ndarray],
+                  outgoing: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取实体单方向的邻接
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (邻居实体ID数组, 关系ID数组)
+        """
+        indptr, nbrs, edges, preds = (
+            (self.out_indptr, self.out_nbrs, self.out_edges, self.out_preds) if outgoing
+            else (self.in_indptr, self.in_nbrs, self.in_edges, self.in_preds)
+        )
+        bounds = self._node_slice(entity_id, indptr)
+        if bounds is not None:
+            start, end = bounds
+            nbr_ids = self.node_ids[nbrs[start:end]]
+            edge_ids = edges[start:end]
+            if codes is not None:
+                mask = np.isin(preds[start:end], codes)
+                nbr_ids, edge_ids = nbr_ids[mask], edge_ids[mask]
+        else:
+            nbr_ids = np.empty(0, dtype=np.int64)
+            edge_ids = np.empty(0, dtype=np.int64)
+
+        delta = (self.delta_out if outgoing else self.delta_in).get(entity_id)
+        if delta:
+            extra = [(n, e) for n, e, c in delta if codes is None or c in codes]
+            if extra:
+                nbr_ids = np.concatenate([nbr_ids, np.array([n for n, _ in extra], dtype=np.int64)])
+                edge_ids = np.concatenate([edge_ids, np.array([e for _, e in extra], dtype=np.int64)])
+
+        if self.removed and len(edge_ids):
+            keep = ~np.isin(edge_ids, np.fromiter(self.removed, dtype=np.int64))
+            nbr_ids, edge_ids = nbr_ids[keep], edge_ids[keep]
+        return nbr_ids, edge_ids
+
+    def neighbors(self, entity_id: int, relation_types: Optional[List[str]] = None) -> np.ndarray:
+        """获取实体的去重邻居ID（双向）"""
+        codes = self._codes_for(relation_types)
+        out_ids, _ = self._adjacent(entity_id, codes, outgoing=True)
+        in_ids, _ = self._adjacent(entity_id, codes, outgoing=False)
+        return np.unique(np.concatenate([out_ids, in_ids]))
+
+    def adjacent_triplets(self, entity_ids: Iterable[int], relation_types: Optional[List[str]] = None,
+                          limit: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """
+        批量获取一组实体的双向邻接，与 RelationRepository.get_adjacent_triplets 语义一致
+
+        Returns:
+            List[Tuple[int, int, int]]: (实体ID, 邻居实体ID, 关系ID)，超过limit时截断
+        """
+        codes = self._codes_for(relation_types)
+        result = []
+        for entity_id in entity_ids:
+            for outgoing in (True, False):
+                nbr_ids, edge_ids = self._adjacent(entity_id, codes, outgoing)
+                result.extend(zip([entity_id] * len(nbr_ids), nbr_ids.tolist(), edge_ids.tolist()))
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    def degree(self, entity_id: int) -> int:
+        """实体的度数（出边 + 入边）"""
+        out_ids, _ = self._adjacent(entity_id, None, outgoing=True)
+        in_ids, _ = self._adjacent(entity_id, None, outgoing=False)
+        return int(len(out_ids) + len(in_ids))
+
+    def rank_frontier_neighbors(
+        self,
+        frontier: List[int],
+        visited: Iterable[int],
+        relation_types: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        importance: Optional[Callable[[np.ndarray], Optional[np.ndarray]]] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        获取前沿的未访问邻居，按与前沿的连接数降序、重要性降序、ID升序排列
+
+        与 KGQueryService 的SQL实现语义一致；importance 为实体ID数组到重要性分数的映射，
+        为空或返回None时不按重要性排序
+        """
+        codes = self._codes_for(relation_types)
+        parts = []
+        for entity_id in frontier:
+            parts.append(self._adjacent(entity_id, codes, outgoing=True)[0])
+            parts.append(self._adjacent(entity_id, codes, outgoing=False)[0])
+        if not parts:
+            return []
+
+        candidates = np.concatenate(parts)
+        visited_arr = np.fromiter(visited, dtype=np.int64)
+        if len(visited_arr):
+            candidates = candidates[~np.isin(candidates, visited_arr)]
+        if not len(candidates):
+            return []
+
+        ids, counts = np.unique(candidates, return_counts=True)
+        # np.unique 已按ID升序，稳定排序保证前面的键相同时ID升序
+        scores = importance(ids) if importance is not None else None
+        if scores is not None:
+            order = np.lexsort((-scores, -counts))
+        else:
+            order = np.argsort(-counts, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [(int(ids[i]), int(counts[i])) for i in order]
+
+    def relation_ids_among(self, entity_ids: List[int],
+                           relation_types: Optional[List[str]] = None) -> List[int]:
+        """获取两端都在给定实体集合内的关系ID"""
+        codes = self._codes_for(relation_types)
+
+        # CSR部分：用节点下标上的布尔掩码判断邻居是否在集合内
+        positions = self._positions(entity_ids)
+        in_set = np.zeros(len(self.node_ids), dtype=bool)
+        in_set[positions] = True
+        result = []
+        for pos in positions:
+            start, end = self.out_indptr[pos], self.out_indptr[pos + 1]
+            selected = in_set[self.out_nbrs[start:end]]
+            if codes is not None:
+                selected &= np.isin(self.out_preds[start:end], codes)
+            result.extend(self.out_edges[start:end][selected].tolist())
+
+        # 增量部分
+        members = set(entity_ids)
+        for edge_id, (subject_id, object_id, code) in self.delta_edges.items():
+            if subject_id in members and object_id in members and (codes is None or code in codes):
+                result.append(edge_id)
+
+        if self.removed:
+            result = [edge_id for edge_id in result if edge_id not in self.removed]
+        return result
+
+    # ==================== 合并与统计 ====================
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        拷贝增量部分，供后台线程合并使用
+
+        CSR数组只读，可直接共享；增量和墓碑在事件循环中可能继续变化，需要拷贝
+        """
+        return {
+            "delta_edges": dict(self.delta_edges),
+            "removed": set(self.removed),
+            "predicates": list(self.predicates),
+        }
+
+    def edge_arrays(self, snapshot: Dict[str, Any]) -> Tuple[np.ndarray, ...]:
+        """
+        基于快照导出全部有效边（可在线程中执行）
+
+        Returns:
+            Tuple: (关系ID, 主体实体ID, 客体实体ID, 谓词编码) 四个数组
+        """
+        out_counts = np.diff(self.out_indptr)
+        subjects = np.repeat(self.node_ids, out_counts)
+        objects = self.node_ids[self.out_nbrs]
+        edge_ids = self.out_edges.astype(np.int64)
+        pred_codes = self.out_preds.astype(np.int32)
+
+        delta_edges = snapshot["delta_edges"]
+        if delta_edges:
+            delta = np.array(
+                [(e, s, o, c) for e, (s, o, c) in delta_edges.items()], dtype=np.int64
+            )
+            edge_ids = np.concatenate([edge_ids, delta[:, 0]])
+            subjects = np.concatenate([subjects, delta[:, 1]])
+            objects = np.concatenate([objects, delta[:, 2]])
+            pred_codes = np.concatenate([pred_codes, delta[:, 3].astype(np.int32)])
+
+        removed = snapshot["removed"]
+        if removed:
+            keep = ~np.isin(edge_ids, np.fromiter(removed, dtype=np.int64))
+            edge_ids, subjects, objects, pred_codes = (
+                edge_ids[keep], subjects[keep], objects[keep], pred_codes[keep]
+            )
+        return edge_ids, subjects, objects, pred_codes
+
+    def compacted(self, snapshot: Dict[str, Any]) -> "CSRGraph":
+        """基于快照生成合并后的新图（可在线程中执行）"""
+        return CSRGraph(*self.edge_arrays(snapshot), snapshot["predicates"])
+
+    @property
+    def edge_count(self) -> int:
+        """当前有效边数（近似：墓碑可能指向增量中的边）"""
+        return len(self.out_edges) + len(self.delta_edges) - len(self.removed)
+
+    def memory_bytes(self) -> int:
+        """CSR数组占用的内存字节数（不含增量缓冲区）"""
+        arrays = (
+            self.node_ids,
+            self._lookup if self._lookup is not None else np.empty(0),
+            self.out_indptr, self.out_nbrs, self.out_edges, self.out_preds,
+            self.in_indptr, self.in_nbrs, self.in_edges, self.in_preds,
+        )
+        return int(sum(a.nbytes for a in arrays))
@@ -0,0 +1,267 @@
+"""
+内存图索引管理 - 基于CSR邻接数组的图遍历加速
+
+将relations表加载为CSR邻接图（见graph_index_csr）：
+- 新关系通过增量缓冲区即时生效，超过阈值后在后台线程合并进CSR数组
+- 全量加载或合并期间到达的写操作在新图替换旧图后重放
+
+邻居、路径、度数查询优先走内存索引，索引未就绪时由调用方回退到SQL
+"""
+
+import asyncio
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.config_manager import ConfigManager, GraphIndexConfig
+from app.database.models import Relation
+from app.store.graph_index_csr import CSRGraph
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class GraphIndexManager:
+    """
+    内存图索引管理器
+
+    实现单例模式，负责全量加载、增量更新和后台合并。
+    全量加载或合并期间到达的写操作会被记录，新图替换旧图后重放
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, config: Optional[GraphIndexConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 图索引配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(GraphIndexManager, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[GraphIndexConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_graph_index_config()
+        self._graph: Optional[CSRGraph] = None
+        self._engine: Optional[AsyncEngine] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        # 全量加载与合并都会替换当前图并重放_pending_ops，必须串行执行
+        self._rebuild_lock = asyncio.Lock()
+        self._pending_ops: Optional[List[Tuple[str, tuple]]] = None
+        self._loaded_at: Optional[float] = None
+        self._last_load_seconds: Optional[float] = None
+
+    @property
+    def graph(self) -> Optional[CSRGraph]:
+        """
+        获取当前可用的图，未就绪或未启用时返回None（调用方应回退到SQL）
+
+        超过重载间隔时在后台触发全量重载，期间继续使用旧图
+        """
+        if not self.config.enabled or self._graph is None:
+            return None
+        if (self.config.reload_interval and self._engine is not None
+                and time.monotonic() - self._loaded_at > self.config.reload_interval
+                and not self.is_rebuilding):
+            self._schedule(self.reload(self._engine))
+        return self._graph
+
+    @property
+    def is_rebuilding(self) -> bool:
+        """是否正在全量加载或合并"""
+        return self._rebuild_task is not None and not self._rebuild_task.done()
+
+    def _schedule(self, coro) -> Optional[asyncio.Task]:
+        """在后台启动加载/合并任务"""
+        try:
+            self._rebuild_task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+            return None
+        return self._rebuild_task
+
+    def start_reload(self, engine: AsyncEngine) -> Optional[asyncio.Task]:
+        """
+        在后台启动全量加载（应用启动或批量导入后调用）
+
+        正在合并时同样启动，加载会等待合并完成后再执行
+        """
+        if not self.config.enabled:
+            return None
+        return self._schedule(self.reload(engine))
+
+    async def reload(self, engine: AsyncEngine) -> None:
+        """
+        从数据库全量加载关系并构建CSR索引
+
+        与后台合并串行执行，正在合并时等待其完成
+
+        Args:
+            engine: 异步数据库引擎
+        """
+        async with self._rebuild_lock:
+            await self._load(engine)
+
+    async def _load(self, engine: AsyncEngine) -> None:
+        """全量加载（调用方持有_rebuild_lock）"""
+        self._engine = engine
+        self._pending_ops = []
+        start = time.perf_counter()
+        try:
+            batch_size = self.config.load_batch_size
+            predicates: List[str] = []
+            predicate_codes: Dict[str, int] = {}
+            id_parts, subject_parts, object_parts, code_parts = [], [], [], []
+
+            stmt = select(Relation.id, Relation.subject_id, Relation.object_id, Relation.predicate)
+            async with engine.connect() as conn:
+                result = await conn.stream(stmt.execution_options(yield_per=batch_size))
+                async for rows in result.partitions(batch_size):
+                    ids, subjects, objects, preds = zip(*rows)
+                    codes = []
+                    for predicate in preds:
+                        code = predicate_codes.get(predicate)
+                        if code is None:
+                            code = predicate_codes[predicate] = len(predicates)
+                            predicates.append(predicate)
+                        codes.append(code)
+                    id_parts.append(np.array(ids, dtype=np.int64))
+                    subject_parts.append(np.array(subjects, dtype=np.int64))
+                    object_parts.append(np.array(objects, dtype=np.int64))
+                    code_parts.append(np.array(codes, dtype=np.int32))
+
+            def build() -> CSRGraph:
+                def merge(parts, dtype):
+                    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+                return CSRGraph(
+                    merge(id_parts, np.int64), merge(subject_parts, np.int64),
+                    merge(object_parts, np.int64), merge(code_parts, np.int32), predicates
+                )
+
+            graph = await asyncio.to_thread(build)
+            self._swap(graph)
+            self._last_load_seconds = time.perf_counter() - start
+            logger.info(
+                f"内存图索引加载完成: 边数 {graph.edge_count}, 节点数 {len(graph.node_ids)}, "
+                f"内存 {graph.memory_bytes() / 1024 / 1024:.1f}MB, 耗时 {self._last_load_seconds:.2f}秒"
+            )
+        except Exception as e:
+            logger.error(f"内存图索引加载失败: {e}")
+        finally:
+            self._pending_ops = None
+
+    async def _compact(self) -> None:
+        """后台合并增量缓冲区到CSR数组（与全量加载串行执行）"""
+        async with self._rebuild_lock:
+            await self._compact_locked()
+
+    async def _compact_locked(self) -> None:
+        """合并当前图（调用方持有_rebuild_lock）"""
+        graph = self._graph
+        # 等待期间图可能已被丢弃或被全量加载替换，增量不再超过阈值
+        if graph is None or graph.delta_size < self.config.compact_threshold:
+            return
+        self._pending_ops = []
+        try:
+            snapshot = graph.snapshot()
+            new_graph = await asyncio.to_thread(graph.compacted, snapshot)
+            if self._graph is not graph:
+                # 合并期间索引被丢弃（批量导入），合并结果已过期
+                return
+            # 快照之后到达的写操作仍在旧图的增量中，也会通过重放应用到新图
+            self._swap(new_graph, keep_loaded_at=True)
+            logger.debug(f"内存图索引合并完成: 边数 {new_graph.edge_count}")
+        except Exception as e:
+            logger.error(f"内存图索引合并失败: {e}")
+        finally:
+            self._pending_ops = None
+
+    def _swap(self, graph: CSRGraph, keep_loaded_at: bool = False) -> None:
+        """替换当前图并重放构建期间的写操作"""
+        for op, args in self._pending_ops or []:
+            if op == "add":
+                graph.add_edge(*args)
+            else:
+                graph.remove_edge(*args)
+        self._graph = graph
+        if not keep_loaded_at or self._loaded_at is None:
+            self._loaded_at = time.monotonic()
+
+    # ==================== 增量更新 ====================
+
+    def add_relation(self, relation_id: int, subject_id: int, object_id: int, predicate: str) -> None:
+        """
+        增量添加关系（应在数据库提交之后调用）
+
+        Args:
+            relation_id: 关系ID
+            subject_id: 主体实体ID
+            object_id: 客体实体ID
+            predicate: 谓词
+        """
+        if not self.config.enabled:
+            return
+        if self._pending_ops is not None:
+            self._pending_ops.append(("add", (relation_id, subject_id, object_id, predicate)))
+        if self._graph is not None:
+            self._graph.add_edge(relation_id, subject_id, object_id, predicate)
+            self._maybe_compact()
+
+    def remove_relation(self, relation_id: int) -> None:
+        """
+        增量删除关系（应在数据库提交之后调用）
+
+        Args:
+            relation_id: 关系ID
+        """
+        if not self.config.enabled:
+            return
+        if self._pending_ops is not None:
+            self._pending_ops.append(("remove", (relation_id,)))
+        if self._graph is not None:
+            self._graph.remove_edge(relation_id)
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        """增量超过阈值时触发后台合并"""
+        if self._graph.delta_size >= self.config.compact_threshold and not self.is_rebuilding:
+            self._schedule(self._compact())
+
+    def invalidate(self) -> None:
+        """丢弃当前索引（批量改写关系后调用），下次加载前查询回退到SQL"""
+        self._graph = None
+        self._loaded_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+
+        Returns:
+            Dict[str, Any]: 就绪状态、节点数、边数、增量规模、内存占用和加载耗时
+        """
+        graph = self._graph
+        return {
+            "enabled": self.config.enabled,
+            "ready": graph is not None,
+            "rebuilding": self.is_rebuilding,
+            "nodes": len(graph.node_ids) if graph is not None else 0,
+            "edges": graph.edge_count if graph is not None else 0,
+            "delta_size": graph.delta_size if graph is not None else 0,
+            "memory_bytes": graph.memory_bytes() if graph is not None else 0,
+            "last_load_seconds": self._last_load_seconds,
+        }
+
+
+def get_graph_index_manager() -> GraphIndexManager:
+    """获取内存图索引管理器实例"""
+    return GraphIndexManager()
@@ -6,6 +6,7 @@ HybridStore核心模块 - 专注基础存储能力
 - 向量索引管理
 - 事务管理
 - 健康检查
+- 降级搜索：向量存储熔断时实体按名称精确匹配、新闻按内容关键词搜索数据库
 
 设计原则：
 - 单一职责：只提供基础存储能力
@@ -20,9 +21,13 @@ from app.database.manager import DatabaseManager
 from app.database.repositories import EntityRepository, RelationRepository, NewsEventRepository
 from app.exceptions import EntityNotFoundError, RelationNotFoundError
 from app.exceptions.store_exceptions import StoreError
+from app.exceptions.vector_exceptions import VectorStoreUnavailableError
 from app.store.store_base_abstract import StoreBase, Entity, Relation, NewsEvent, SearchResult, StoreConfig
 from app.store.store_data_convert import DataConverter
 from app.store.vector_index_manage import VectorIndexManager
+from app.store.graph_index_manage import get_graph_index_manager
+from app.store.entity_stats_manage import get_entity_stats_manager
+from app.store.response_cache_manage import get_response_cache_manager
 from app.vector.vector_search_abstract import VectorSearchBase
 from app.embedding import EmbeddingService
 from app.utils.logging_utils import get_logger
@@ -63,6 +68,9 @@ class HybridStoreCore(StoreBase):
         
         # 初始化工具
         self.vector_manager = VectorIndexManager(vector_store, embedding_service)
+        self.graph_index = get_graph_index_manager()
+        self.entity_stats = get_entity_stats_manager()
+        self.response_cache = get_response_cache_manager()
         self.data_converter = DataConverter()
         
         self._initialized = False
@@ -154,7 +162,11 @@ class HybridStoreCore(StoreBase):
                 await session.flush()
                 
                 # 转换回业务实体
-                return self.data_converter.db_entity_to_entity(created_entity, vector_id)
+                result = self.data_converter.db_entity_to_entity(created_entity, vector_id)
+            
+            # 事务提交后再递增数据版本，使依赖该表的响应缓存失效
+            await self.response_cache.bump("entities")
+            return result
                 
         except Exception as e:
             logger.error(f"创建实体失败: {e}")
@@ -213,8 +225,8 @@ class HybridStoreCore(StoreBase):
                 # 更新实体
                 updated_entity = await entity_repository.update(entity_id, updates)
                 
-                # 如果更新了名称或描述，需要更新向量索引
-                if 'name' in updates or 'description' in updates:
+                # 如果更新了名称、描述或类型，需要更新向量索引（类型变化时向量移到对应的实体类型集合）
+                if 'name' in updates or 'description' in updates or 'type' in updates:
                     content = f"{updated_entity.name}: {updated_entity.description}"
                     metadata = {
                         "type": updated_entity.type,
@@ -228,7 +240,10 @@ class HybridStoreCore(StoreBase):
                         )
                 
                 vector_id = getattr(updated_entity, 'vector_id', None)
-                return self.data_converter.db_entity_to_entity(updated_entity, vector_id)
+                result = self.data_converter.db_entity_to_entity(updated_entity, vector_id)
+            
+            await self.response_cache.bump("entities")
+            return result
                 
         except EntityNotFoundError:
             raise
@@ -258,13 +273,26 @@ class HybridStoreCore(StoreBase):
                 if not existing_entity:
                     raise EntityNotFoundError(f"实体未找到: {entity_id}")
                 
-                # 删除向量索引
-                if hasattr(existing_entity, 'vector_id') and existing_entity.vector_id:
-                    await self.vector_manager.delete_vector(existing_entity.vector_id)
-                
-                # 删除实体
-                success = await entity_repository.delete(entity_id)
-                return success
+                # 删除实体及其关系、新闻关联、属性和统计（外键没有级联删除）
+                relations = await entity_repository.delete_with_dependents(entity_id)
+
+            # 事务提交后再更新内存图索引、实体统计、向量索引和数据版本
+            for relation_id, *_ in relations:
+                self.graph_index.remove_relation(relation_id)
+            self.entity_stats.forget_entities([entity_id])
+            self.entity_stats.mark_dirty(
+                {endpoint for relation in relations for endpoint in relation[1:3]} - {entity_id}
+            )
+            self.refresh_entity_stats()
+
+            for vector_id in [existing_entity.vector_id] + [relation[3] for relation in relations]:
+                if vector_id:
+                    await self.vector_manager.delete_vector(vector_id)
+
+            await self.response_cache.bump(
+                "entities", "relations", "news_event_entity", "attributes", "entity_stats"
+            )
+            return True
                 
         except EntityNotFoundError:
             raise
@@ -280,6 +308,8 @@ class HybridStoreCore(StoreBase):
                             include_full_text_search: bool = False) -> List[SearchResult]:
         """搜索实体 - 仅使用向量搜索，提高搜索效率
         
+        向量存储熔断中或超时时降级为按名称精确匹配（结果metadata中fallback为exact_name）
+        
         Args:
             query: 搜索查询
             entity_type: 实体类型过滤
@@ -303,10 +333,14 @@ class HybridStoreCore(StoreBase):
                 if entity_type:
                     search_query = f"{query} type:{entity_type}"
                     
-                vector_results = await self.vector_manager.search_vectors(
-                    search_query, "entity", top_k, 
-                    {"type": entity_type} if entity_type else None
-                )
+                try:
+                    vector_results = await self.vector_manager.search_vectors(
+                        search_query, "entity", top_k, 
+                        {"type": entity_type} if entity_type else None
+                    )
+                except VectorStoreUnavailableError as e:
+                    logger.warning(f"向量存储不可用，实体搜索降级为名称匹配: {str(e)}")
+                    return await self._search_entities_by_name(query, entity_type, top_k)
                 
                 for vector_result in vector_results:
                     entity_id = vector_result.get('metadata', {}).get('content_id')
@@ -327,6 +361,20 @@ class HybridStoreCore(StoreBase):
             logger.error(f"搜索实体失败: {e}")
             raise StoreError(f"搜索实体失败: {str(e)}")
     
+    async def _search_entities_by_name(self, query: str, entity_type: Optional[str],
+                                       top_k: int) -> List[SearchResult]:
+        """降级搜索：按名称精确匹配实体"""
+        async with self.db_manager.get_session() as session:
+            db_entities = await EntityRepository(session).find_by_name(query.strip(), entity_type, top_k)
+            return [
+                SearchResult(
+                    entity=self.data_converter.db_entity_to_entity(db_entity, db_entity.vector_id),
+                    score=1.0,
+                    metadata={"content_id": str(db_entity.id), "content_type": "entity", "fallback": "exact_name"}
+                )
+                for db_entity in db_entities
+            ]
+    
     # 关系操作
     async def create_relation(self, relation: Relation) -> Relation:
         """创建关系
@@ -352,18 +400,33 @@ class HybridStoreCore(StoreBase):
                 if existing_relation:
                     logger.info(f"关系已存在，跳过创建: {relation.subject_id} -> {relation.predicate} -> {relation.object_id}")
                     # 如果描述不同，可以选择更新描述
-                    if relation.description and relation.description != existing_relation.description:
+                    description_updated = bool(
+                        relation.description and relation.description != existing_relation.description
+                    )
+                    if description_updated:
                         existing_relation.description = relation.description
                         await session.flush()
                         logger.info(f"更新已存在关系的描述: {existing_relation.id}")
                     
-                    return self.data_converter.db_relation_to_relation(existing_relation)
-                
-                # 关系不存在，创建新关系
-                db_relation_data = self.data_converter.relation_to_db_relation(relation)
-                created_relation = await relation_repository.create(db_relation_data)
-                
-                return self.data_converter.db_relation_to_relation(created_relation)
+                    result = self.data_converter.db_relation_to_relation(existing_relation)
+                else:
+                    # 关系不存在，创建新关系
+                    db_relation_data = self.data_converter.relation_to_db_relation(relation)
+                    created_relation = await relation_repository.create(db_relation_data)
+            
+            if existing_relation:
+                if description_updated:
+                    await self.response_cache.bump("relations")
+                return result
+            
+            # 事务提交后再更新内存图索引、实体统计和数据版本
+            self.graph_index.add_relation(
+                created_relation.id, created_relation.subject_id,
+                created_relation.object_id, created_relation.predicate
+            )
+            self.entity_stats.mark_dirty([created_relation.subject_id, created_relation.object_id])
+            await self.response_cache.bump("relations")
+            return self.data_converter.db_relation_to_relation(created_relation)
                 
         except Exception as e:
             logger.error(f"创建关系失败: {e}")
@@ -442,8 +505,16 @@ class HybridStoreCore(StoreBase):
                     raise RelationNotFoundError(f"关系未找到: {relation_id}")
                 
                 # 删除关系
+                endpoints = [existing_relation.subject_id, existing_relation.object_id]
                 success = await relation_repository.delete(relation_id)
-                return success
+            
+            # 事务提交后再更新内存图索引、实体统计和数据版本
+            if success:
+                self.graph_index.remove_relation(relation_id)
+                self.entity_stats.mark_dirty(endpoints)
+                self.refresh_entity_stats()
+                await self.response_cache.bump("relations")
+            return success
                 
         except RelationNotFoundError:
             raise
@@ -487,7 +558,10 @@ class HybridStoreCore(StoreBase):
                 created_news.vector_id = vector_id
                 await session.flush()
                 
-                return self.data_converter.db_news_event_to_news_event(created_news, vector_id)
+                result = self.data_converter.db_news_event_to_news_event(created_news, vector_id)
+            
+            await self.response_cache.bump("news_events")
+            return result
                 
         except Exception as e:
             logger.error(f"创建新闻事件失败: {e}")
@@ -525,6 +599,8 @@ class HybridStoreCore(StoreBase):
                                time_range: Optional[tuple] = None) -> List[SearchResult]:
         """搜索新闻事件
         
+        向量存储熔断中或超时时降级为按内容关键词搜索（结果metadata中fallback为keyword）
+        
         Args:
             query: 搜索查询
             top_k: 返回结果数量
@@ -545,9 +621,13 @@ class HybridStoreCore(StoreBase):
                     "$lte": time_range[1].isoformat()
                 }
             
-            vector_results = await self.vector_manager.search_vectors(
-                query, "news", top_k, filter_dict
-            )
+            try:
+                vector_results = await self.vector_manager.search_vectors(
+                    query, "news", top_k, filter_dict
+                )
+            except VectorStoreUnavailableError as e:
+                logger.warning(f"向量存储不可用，新闻搜索降级为关键词搜索: {str(e)}")
+                return await self._search_news_by_keyword(query, top_k, time_range)
             
             results = []
             for vector_result in vector_results:
@@ -567,6 +647,27 @@ class HybridStoreCore(StoreBase):
             logger.error(f"搜索新闻事件失败: {e}")
             raise StoreError(f"搜索新闻事件失败: {str(e)}")
     
+    async def _search_news_by_keyword(self, query: str, top_k: int,
+                                      time_range: Optional[tuple]) -> List[SearchResult]:
+        """降级搜索：按内容关键词搜索新闻事件，内容与查询完全相同的排在前面"""
+        start_time, end_time = time_range if time_range else (None, None)
+        async with self.db_manager.get_session() as session:
+            db_news_events = await NewsEventRepository(session).search_by_content(
+                query.strip(), limit=top_k, start_time=start_time, end_time=end_time
+            )
+            results = [
+                SearchResult(
+                    news_event=self.data_converter.db_news_event_to_news_event(
+                        db_news, getattr(db_news, 'vector_id', None)
+                    ),
+                    score=1.0 if db_news.content == query.strip() else 0.5,
+                    metadata={"content_id": str(db_news.id), "content_type": "news", "fallback": "keyword"}
+                )
+                for db_news in db_news_events
+            ]
+        results.sort(key=lambda x: x.score, reverse=True)
+        return results
+    
     async def add_entity_relation(self, news_event_id: int, entity_id: int) -> bool:
         """添加新闻事件与实体的关联
         
@@ -584,12 +685,20 @@ class HybridStoreCore(StoreBase):
             async with self.db_manager.get_session() as session:
                 news_repository = NewsEventRepository(session)
                 success = await news_repository.add_entity_relation(news_event_id, entity_id)
-                return success
+            
+            if success:
+                self.entity_stats.mark_dirty([entity_id])
+                await self.response_cache.bump("news_event_entity")
+            return success
                 
         except Exception as e:
             logger.error(f"添加新闻事件与实体关联失败: {e}")
             raise StoreError(f"添加新闻事件与实体关联失败: {str(e)}")
     
+    def refresh_entity_stats(self) -> None:
+        """一批数据写入完成后，在后台增量刷新受影响实体的统计"""
+        self.entity_stats.start_incremental_refresh(self.db_manager.engine)
+    
     # 向量操作
     async def add_to_vector_index(self, 
                                 content: str,
@@ -728,6 +837,11 @@ class HybridStoreCore(StoreBase):
                 status["vector_store"] = f"unhealthy: {str(e)}"
                 status["status"] = "unhealthy"
             
+            # 向量存储熔断器状态和待重放队列长度
+            status["vector_breaker"] = self.vector_manager.get_breaker_stats()
+            if status["vector_breaker"]["state"] != "closed" and status["status"] == "healthy":
+                status["status"] = "degraded"
+            
             return status
             
         except Exception as e:
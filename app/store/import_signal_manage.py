@@ -0,0 +1,157 @@
+"""
+批量导入信号管理 - 跨进程通知批量写入
+
+批量导入在独立的命令行进程中运行，它对响应缓存版本号、内存图索引和实体统计的更新只发生在该进程内。
+导入完成后写入信号文件（数据表、是否需要刷新索引），运行中的服务定期检查文件的修改时间，变化时：
+- 递增本进程中这些数据表的响应缓存版本号（Redis后端的版本号已由导入进程递增，不重复递增）
+- 丢弃内存图索引并在后台重新加载
+- 从entity_stats表重新加载实体统计
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.config_manager import ConfigManager, BulkImportConfig
+from app.store.entity_stats_manage import get_entity_stats_manager
+from app.store.graph_index_manage import get_graph_index_manager
+from app.store.response_cache_manage import get_response_cache_manager
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class ImportSignalManager:
+    """
+    批量导入信号管理器
+
+    实现单例模式，导入进程调用publish写入信号，服务进程调用start_watching定期检查信号
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, config: Optional[BulkImportConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 批量导入配置（使用其中的信号文件路径和检查间隔），为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ImportSignalManager, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[BulkImportConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_bulk_import_config()
+        self.path = self.config.signal_path
+        # 启动前已存在的信号不需要处理：服务启动时会全量加载图索引和实体统计
+        self._mtime = self._stat()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Optional[int]:
+        """信号文件的修改时间，不存在时返回None"""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def publish(self, tables: Iterable[str], refresh_indexes: bool) -> None:
+        """
+        写入信号文件（导入进程在数据库提交之后调用）
+
+        先写临时文件再替换，服务进程不会读到不完整的信号
+
+        Args:
+            tables: 发生写入的数据表名
+            refresh_indexes: 服务进程是否需要重新加载图索引和实体统计
+        """
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps({
+                    "tables": sorted(set(tables)),
+                    "refresh_indexes": refresh_indexes,
+                    "updated_at": datetime.now()
+                }))
+            os.replace(tmp_path, self.path)
+            self._mtime = self._stat()
+        except OSError as e:
+            logger.error(f"写入批量导入信号失败，运行中的服务需等待缓存过期或定期重载: {e}")
+
+    def _read(self) -> Dict[str, Any]:
+        """读取信号文件，不存在或损坏时返回空字典"""
+        try:
+            with open(self.path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning(f"读取批量导入信号失败: {e}")
+            return {}
+
+    async def check(self, engine: AsyncEngine) -> bool:
+        """
+        检查信号文件，变化时使本进程的缓存和索引失效
+
+        Args:
+            engine: 异步数据库引擎（用于重新加载图索引和实体统计）
+
+        Returns:
+            bool: 是否处理了新的信号
+        """
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        signal = self._read()
+        if not signal:
+            return False
+
+        tables = signal.get("tables") or []
+        response_cache = get_response_cache_manager()
+        if tables and response_cache.backend == "memory":
+            await response_cache.bump(*tables)
+        if signal.get("refresh_indexes"):
+            graph_index = get_graph_index_manager()
+            if graph_index.config.enabled:
+                graph_index.invalidate()
+                graph_index.start_reload(engine)
+            get_entity_stats_manager().start_refresh(engine)
+        logger.info(f"检测到批量导入: 数据表 {tables}, 刷新索引 {bool(signal.get('refresh_indexes'))}")
+        return True
+
+    def start_watching(self, engine: AsyncEngine) -> Optional[asyncio.Task]:
+        """
+        在后台定期检查信号文件（应用启动时调用）
+
+        Args:
+            engine: 异步数据库引擎
+        """
+        if not self.config.signal_poll_interval or self._watch_task is not None:
+            return self._watch_task
+        self._watch_task = asyncio.get_running_loop().create_task(self._watch(engine))
+        return self._watch_task
+
+    async def _watch(self, engine: AsyncEngine) -> None:
+        """检查循环"""
+        while True:
+            await asyncio.sleep(self.config.signal_poll_interval)
+            try:
+                await self.check(engine)
+            except Exception as e:
+                logger.warning(f"处理批量导入信号失败: {e}")
+
+
+def get_import_signal_manager() -> ImportSignalManager:
+    """获取批量导入信号管理器实例"""
+    return ImportSignalManager()
@@ -0,0 +1,333 @@
+"""
+响应缓存管理 - 基于数据版本的查询结果缓存
+
+为只读查询接口缓存序列化后的响应：
+- 缓存键由路由、规范化后的请求参数和所依赖数据表的版本号组成
+- HybridStoreCore 写入数据表后递增该表的版本号，依赖该表的旧缓存键自然失效，
+  不依赖该表的缓存不受影响
+- 内存后端按LRU淘汰，同时限制条目数和内存占用；可选Redis后端在多进程间共享缓存和版本号
+- 由同一缓存键生成ETag，客户端数据未变化时无需查询即可返回304
+"""
+
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.config.config_manager import ConfigManager, CacheConfig
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResponseCacheManager:
+    """
+    响应缓存管理器
+
+    实现单例模式，维护各数据表的版本号和按LRU淘汰的响应缓存
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    # Redis中缓存条目和版本号的键前缀
+    REDIS_KEY_PREFIX = "kg:response:"
+    REDIS_VERSION_PREFIX = "kg:version:"
+
+    def __new__(cls, config: Optional[CacheConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 缓存配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ResponseCacheManager, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[CacheConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_cache_config()
+        # 缓存键 -> (响应体, 过期时间)，按最近使用顺序排列
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._versions: Dict[str, int] = {}
+        # 递增Redis版本号失败、其他进程尚未感知写入的数据表
+        self._unsynced: set = set()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # ETag匹配直接返回304的次数（不访问缓存，不计入命中统计）
+        self._not_modified = 0
+        self._redis = self._create_redis_client() if self.config.type == "redis" else None
+        # 内存后端的版本号只在本进程内有效，ETag中加入进程标识避免与其他进程的相同版本号混淆
+        self._process_id = uuid.uuid4().hex
+        self._process_token = self._process_id if self._redis is None else ""
+
+    def _create_redis_client(self):
+        """创建Redis客户端，未安装redis包或配置无效时回退到内存缓存"""
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("未安装redis包，响应缓存使用内存后端")
+            return None
+        try:
+            settings = self.config.redis or {}
+            return redis.Redis(
+                host=settings.get("host", "localhost"),
+                port=settings.get("port", 6379),
+                db=settings.get("db", 0),
+                password=settings.get("password")
+            )
+        except Exception as e:
+            logger.error(f"创建Redis客户端失败: {e}")
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用响应缓存"""
+        return self.config.response_enabled
+
+    @property
+    def backend(self) -> str:
+        """实际使用的缓存后端"""
+        return "redis" if self._redis is not None else "memory"
+
+    # ==================== 数据版本 ====================
+
+    async def bump(self, *tables: str) -> None:
+        """
+        递增数据表的版本号（应在数据库提交之后调用）
+
+        使用Redis时等待版本号递增完成后返回，写入之后的读取一定能看到新版本；
+        递增失败的数据表在本进程中改用本地版本号生成缓存键，并在之后读取版本号时重试
+
+        Args:
+            tables: 发生写入的数据表名
+        """
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+        if self._redis is not None and tables:
+            self._unsynced.update(tables)
+            await self._sync_versions()
+
+    async def get_versions(self, tables: Iterable[str]) -> Tuple[Any, ...]:
+        """
+        获取数据表的当前版本号
+
+        Args:
+            tables: 数据表名序列
+
+        Returns:
+            Tuple[Any, ...]: 与输入顺序一致的版本号
+        """
+        tables = list(tables)
+        if self._redis is not None:
+            if self._unsynced:
+                await self._sync_versions()
+            try:
+                values = await self._redis.mget([self.REDIS_VERSION_PREFIX + table for table in tables])
+            except Exception as e:
+                logger.warning(f"读取Redis数据版本失败，使用本地版本: {e}")
+            else:
+                # 未同步到Redis的写入：加入本进程的版本号，避免本进程读到写入前的缓存
+                return tuple(
+                    f"{int(value or 0)}+{self._process_id}:{self._versions[table]}"
+                    if table in self._unsynced else int(value or 0)
+                    for table, value in zip(tables, values)
+                )
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    async def _sync_versions(self) -> None:
+        """在Redis中递增未同步数据表的版本号，供其他进程感知写入"""
+        tables = tuple(self._unsynced)
+        try:
+            pipe = self._redis.pipeline()
+            for table in tables:
+                pipe.incr(self.REDIS_VERSION_PREFIX + table)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"递增Redis数据版本失败，稍后重试: {e}")
+            return
+        self._unsynced.difference_update(tables)
+
+    # ==================== 缓存读写 ====================
+
+    @staticmethod
+    def make_key(route: str, params: Mapping[str, Any], versions: Tuple[int, ...]) -> str:
+        """
+        生成缓存键
+
+        参数按名称排序，忽略值为None的参数，列表参数排序后展开，
+        使参数顺序不同的等价请求共用缓存
+
+        Args:
+            route: 路由标识
+            params: 请求参数
+            versions: 依赖数据表的版本号
+
+        Returns:
+            str: 缓存键
+        """
+        items = []
+        for name in sorted(params):
+            value = params[name]
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                items.extend((name, str(v)) for v in sorted(value, key=str))
+            else:
+                items.append((name, str(value)))
+        return f"{route}?{urlencode(items)}#v={'.'.join(map(str, versions))}"
+
+    def make_etag(self, key: str) -> str:
+        """
+        根据缓存键生成弱ETag
+
+        配置了TTL时按TTL划分时间段，绕过存储层的写入最多在一个TTL后反映到ETag
+
+        Args:
+            key: make_key生成的缓存键
+
+        Returns:
+            str: 形如 W/"..." 的ETag
+        """
+        period = int(time.time() // self.config.ttl) if self.config.ttl else 0
+        digest = hashlib.sha1(f"{key}|{self._process_token}|{period}".encode("utf-8")).hexdigest()
+        return f'W/"{digest[:24]}"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """
+        判断If-None-Match请求头是否与ETag匹配（弱比较）
+
+        Args:
+            if_none_match: If-None-Match请求头，可包含逗号分隔的多个ETag或*
+            etag: 当前ETag
+
+        Returns:
+            bool: 是否匹配
+        """
+        if not if_none_match:
+            return False
+        opaque = etag[2:] if etag.startswith("W/") else etag
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+                return True
+        return False
+
+    def record_not_modified(self) -> None:
+        """记录一次304响应"""
+        self._not_modified += 1
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        读取缓存的响应体
+
+        Args:
+            key: make_key生成的缓存键
+
+        Returns:
+            Optional[bytes]: 响应体，未命中或已过期时返回None
+        """
+        body = None
+        if self._redis is not None:
+            try:
+                body = await self._redis.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"读取Redis响应缓存失败: {e}")
+        else:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] is not None and entry[1] < time.monotonic():
+                    self._remove(key)
+                else:
+                    self._entries.move_to_end(key)
+                    body = entry[0]
+
+        if body is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        """
+        写入响应体
+
+        Args:
+            key: make_key生成的缓存键
+            body: 序列化后的响应体
+        """
+        ttl = self.config.ttl
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._redis_key(key), body, ex=ttl or None)
+            except Exception as e:
+                logger.warning(f"写入Redis响应缓存失败: {e}")
+            return
+
+        size = len(body) + len(key)
+        if size > self.config.max_memory_mb * 1024 * 1024:
+            return
+        self._remove(key)
+        self._entries[key] = (body, time.monotonic() + ttl if ttl else None)
+        self._memory_bytes += size
+        # 超过条目数或内存上限时淘汰最久未使用的条目
+        while self._entries and (len(self._entries) > self.config.max_size
+                                 or self._memory_bytes > self.config.max_memory_mb * 1024 * 1024):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """移除内存缓存条目并更新内存占用"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0]) + len(key)
+
+    def _redis_key(self, key: str) -> str:
+        """将缓存键压缩为固定长度的Redis键"""
+        return self.REDIS_KEY_PREFIX + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def clear(self) -> None:
+        """清空内存缓存和命中统计（Redis中的条目由其TTL淘汰）"""
+        self._entries.clear()
+        self._memory_bytes = 0
+        self._hits = self._misses = self._evictions = self._not_modified = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 后端类型、条目数、内存占用、命中率、淘汰次数、304次数和本地数据版本
+        """
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "memory_bytes": self._memory_bytes,
+            "max_size": self.config.max_size,
+            "max_memory_mb": self.config.max_memory_mb,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "not_modified": self._not_modified,
+            "versions": dict(self._versions),
+            "unsynced_tables": sorted(self._unsynced),
+        }
+
+
+def get_response_cache_manager() -> ResponseCacheManager:
+    """获取响应缓存管理器实例"""
+    return ResponseCacheManager()
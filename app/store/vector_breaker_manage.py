@@ -0,0 +1,358 @@
+"""
+向量存储熔断管理 - 向量存储变慢或不可用时快速失败并缓存写操作
+
+- 向量存储的同步调用放到线程池中执行并设置超时，事件循环不会被卡住的调用阻塞
+- 最近若干次调用中失败比例或慢调用比例达到阈值时熔断，熔断期间调用直接抛出
+  VectorStoreUnavailableError，由调用方走降级路径（读操作按名称/关键词查询数据库）
+- 熔断一段时间后放行一次探测调用，成功则恢复，失败则继续熔断
+- 熔断期间的写操作写入本地SQLite待重放队列，恢复后由VectorWriteRouter按顺序重放
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.config.config_manager import ConfigManager, VectorBreakerConfig
+from app.exceptions.vector_exceptions import (
+    DimensionMismatchError,
+    IndexAlreadyExistsError,
+    IndexNotFoundError,
+    InvalidVectorError,
+    VectorStoreUnavailableError
+)
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 说明向量存储可用的业务错误，不计为失败
+BUSINESS_ERRORS = (IndexNotFoundError, IndexAlreadyExistsError, InvalidVectorError, DimensionMismatchError)
+
+
+class VectorOutbox:
+    """
+    向量写操作的本地待重放队列
+
+    SQLite文件在第一次写入时创建；队列长度缓存在内存中，写入和删除时更新
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化待重放队列
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._depth: Optional[int] = None
+        self._lock = Lock()
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """打开队列文件，文件不存在且create为False时返回None"""
+        if self._conn is None:
+            if not create and not os.path.exists(self.path):
+                return None
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, operation TEXT NOT NULL, payload BLOB NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS replay_lease ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+            self._depth = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        return self._conn
+
+    def append(self, operation: str, payload: Dict[str, Any]) -> int:
+        """
+        追加一个写操作
+
+        Args:
+            operation: 操作类型（add / update / delete）
+            payload: 操作参数
+
+        Returns:
+            int: 队列中的操作ID
+        """
+        with self._lock:
+            conn = self._connect(create=True)
+            cursor = conn.execute(
+                "INSERT INTO outbox (operation, payload, created_at) VALUES (?, ?, ?)",
+                (operation, orjson.dumps(payload), time.time())
+            )
+            self._depth += 1
+            return cursor.lastrowid
+
+    def peek(self, limit: int = 100) -> List[Tuple[int, str, Dict[str, Any], int]]:
+        """
+        按写入顺序读取最早的若干个操作（不删除）
+
+        Returns:
+            List[Tuple[int, str, Dict[str, Any], int]]: (操作ID, 操作类型, 操作参数, 已重试次数)
+        """
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT id, operation, payload, attempts FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row[0], row[1], orjson.loads(row[2]), row[3]) for row in rows]
+
+    def remove(self, entry_id: int) -> None:
+        """删除已重放（或放弃）的操作"""
+        with self._lock:
+            conn = self._connect()
+            if conn is not None and conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,)).rowcount:
+                self._depth -= 1
+
+    def mark_failed(self, entry_id: int) -> None:
+        """记录一次重放失败"""
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", (entry_id,))
+
+    def acquire_lease(self, owner: str, seconds: float) -> bool:
+        """
+        获取（或续期）重放租约，保证多个进程共用队列文件时按顺序重放
+
+        Args:
+            owner: 租约持有者标识
+            seconds: 租约有效期（秒）
+
+        Returns:
+            bool: 是否持有租约
+        """
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO replay_lease (id, owner, expires_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE replay_lease.owner = excluded.owner OR replay_lease.expires_at < ?",
+                (owner, now + seconds, now)
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, owner: str) -> None:
+        """释放重放租约"""
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM replay_lease WHERE owner = ?", (owner,))
+
+    def depth(self, refresh: bool = False) -> int:
+        """
+        队列中的操作数
+
+        Args:
+            refresh: 是否重新统计（其他进程也可能重放了同一个队列文件）
+        """
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            if refresh:
+                self._depth = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            return self._depth
+
+    def close(self) -> None:
+        """关闭队列文件"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._depth = None
+
+
+class VectorBreakerManager:
+    """
+    向量存储熔断管理器
+
+    实现单例模式，同一进程中的向量索引管理器共用熔断状态和待重放队列
+    """
+
+    _instance = None
+    _lock = Lock()
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __new__(cls, config: Optional[VectorBreakerConfig] = None):
+        """
+        单例模式实现
+
+        Args:
+            config: 熔断配置，为空时从配置文件读取
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(VectorBreakerManager, cls).__new__(cls)
+                cls._instance._initialize(config)
+            return cls._instance
+
+    def _initialize(self, config: Optional[VectorBreakerConfig] = None):
+        """初始化服务状态"""
+        self.config = config or ConfigManager().get_vector_breaker_config()
+        self.outbox = VectorOutbox(self.config.outbox_path)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        # 最近调用的 (是否成功, 是否慢调用)
+        self._calls: deque = deque(maxlen=self.config.window_size)
+        self._probing = False
+        self._trips = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用熔断"""
+        return self.config.enabled
+
+    @property
+    def state(self) -> str:
+        """熔断器状态，熔断时间到期后变为half_open"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.config.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        是否放行一次调用：关闭状态全部放行，半开状态同一时间只放行一次探测调用
+
+        Returns:
+            bool: 是否放行
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self._rejected += 1
+        return False
+
+    def record(self, success: bool, elapsed: float) -> None:
+        """
+        记录一次调用结果，按最近调用的失败比例和慢调用比例判断是否熔断
+
+        Args:
+            success: 调用是否成功
+            elapsed: 调用耗时（秒）
+        """
+        slow = elapsed >= self.config.slow_call_seconds
+        if self._state == self.HALF_OPEN:
+            self._probing = False
+            if success and not slow:
+                self._state = self.CLOSED
+                self._calls.clear()
+                logger.info("向量存储探测调用成功，熔断器关闭")
+            else:
+                self._open("探测调用" + ("超时或失败" if not success else f"耗时 {elapsed:.2f}秒"))
+            return
+
+        self._calls.append((success, slow))
+        if self._state != self.CLOSED or len(self._calls) < self.config.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+        slow_calls = sum(1 for _, is_slow in self._calls if is_slow) / len(self._calls)
+        if failures >= self.config.failure_rate:
+            self._open(f"最近 {len(self._calls)} 次调用失败比例 {failures:.0%}")
+        elif slow_calls >= self.config.slow_call_rate:
+            self._open(f"最近 {len(self._calls)} 次调用慢调用比例 {slow_calls:.0%}")
+
+    def _open(self, reason: str) -> None:
+        """打开熔断器"""
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self._trips += 1
+        logger.warning(f"向量存储熔断（{reason}），{self.config.open_seconds}秒后探测")
+
+    async def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在熔断保护下调用向量存储的同步方法
+
+        Args:
+            func: 向量存储的同步方法
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: func的返回值
+
+        Raises:
+            VectorStoreUnavailableError: 熔断中或调用超时
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        if not self.allow_request():
+            raise VectorStoreUnavailableError("向量存储熔断中", breaker_state=self._state)
+
+        start = time.monotonic()
+        try:
+            # 超时后线程中的调用仍会继续，直到向量存储客户端自身超时；调用方不再等待
+            result = await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), self.config.call_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            self.record(False, time.monotonic() - start)
+            raise VectorStoreUnavailableError(
+                f"向量存储调用超时（{self.config.call_timeout}秒）", breaker_state=self._state
+            )
+        except BUSINESS_ERRORS:
+            self.record(True, time.monotonic() - start)
+            raise
+        except asyncio.CancelledError:
+            self._probing = False
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - start)
+            raise
+        self.record(True, time.monotonic() - start)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器状态和待重放队列长度
+
+        Returns:
+            Dict[str, Any]: 状态信息
+        """
+        calls = list(self._calls)
+        state = self.state
+        return {
+            "enabled": self.enabled,
+            "state": state,
+            "window_calls": len(calls),
+            "failure_rate": sum(1 for ok, _ in calls if not ok) / len(calls) if calls else 0.0,
+            "slow_call_rate": sum(1 for _, slow in calls if slow) / len(calls) if calls else 0.0,
+            "trips": self._trips,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "retry_in_seconds": max(0.0, self.config.open_seconds - (time.monotonic() - self._opened_at))
+            if state == self.OPEN else 0.0,
+            "outbox_depth": self.outbox.depth(),
+        }
+
+
+def get_vector_breaker_manager() -> VectorBreakerManager:
+    """获取向量存储熔断管理器实例"""
+    return VectorBreakerManager()
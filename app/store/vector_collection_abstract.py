@@ -0,0 +1,230 @@
+"""
+向量索引集合管理基类
+
+负责按内容类型拆分的集合布局：
+- 生效集合前缀和布局记录在状态文件中，重建或迁移时写入新集合后调用switch_index原子切换，
+  其他进程在下一次操作时检测到状态文件变化并切换
+- 内容类型、实体类型到集合名称的映射
+- 初始化时确保生效集合存在
+
+向量的读写和搜索由VectorIndexManager实现
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import orjson
+
+from app.config.config_manager import ConfigManager
+from app.exceptions.store_exceptions import StoreError
+from app.vector.vector_search_abstract import VectorSearchBase
+from app.exceptions import IndexNotFoundError
+from app.exceptions.vector_exceptions import VectorStoreUnavailableError
+from app.store.vector_breaker_manage import VectorBreakerManager, get_vector_breaker_manager
+from app.utils.logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class VectorCollectionBase:
+    """向量索引集合管理基类
+    
+    集合布局：
+    - per_type：实体、新闻、关系分别存放在 <前缀>.entity / .news / .relation 集合中，
+      entity_type_collections中的实体类型存放在 <前缀>.entity.<后缀> 集合中，
+      按类型搜索时只搜索对应集合，不再在混合的HNSW图上过滤
+    - single：旧版的单个集合，按content_type元数据过滤（迁移前的部署）
+    
+    生效的集合前缀和布局记录在状态文件中，重建或迁移时写入新集合并调用switch_index切换；
+    其他进程在下一次操作时检测到状态文件变化并切换，无需重启
+    """
+    
+    DEFAULT_INDEX = "default"  # 旧版单集合名称
+    DEFAULT_BASE = "kg"  # 新部署按类型拆分的集合前缀
+    CONTENT_TYPES = ("entity", "news", "relation")
+    LAYOUT_SINGLE = "single"
+    LAYOUT_PER_TYPE = "per_type"
+    
+    def __init__(self, vector_store: VectorSearchBase,
+                 state_path: Optional[str] = None,
+                 entity_type_collections: Optional[Dict[str, str]] = None,
+                 breaker: Optional[VectorBreakerManager] = None) -> None:
+        """初始化集合管理
+        
+        Args:
+            vector_store: 向量存储实例
+            state_path: 生效集合状态文件路径，为空时从配置文件读取
+            entity_type_collections: 单独建集合的实体类型 -> 集合名后缀，为空时从配置文件读取
+            breaker: 向量存储熔断管理器，为空时使用全局实例
+        """
+        self.vector_store = vector_store
+        config = ConfigManager()
+        self.state_path = state_path or config.get_vector_rebuild_config().state_path
+        if entity_type_collections is None:
+            entity_type_collections = config.get_vector_search_config().entity_type_collections or {}
+        self.entity_type_collections = entity_type_collections
+        self._index_name = self.DEFAULT_INDEX
+        self._layout = self.LAYOUT_SINGLE
+        self._state_mtime: Optional[float] = None
+        self._ensured = set()
+        self._initialized = False
+        self.breaker = breaker or get_vector_breaker_manager()
+    
+    def _refresh_state(self) -> None:
+        """状态文件变化时重新读取生效集合和布局"""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._state_mtime:
+            self._state_mtime = mtime
+            state = self.read_state()
+            self._index_name = state.get("active") or self.DEFAULT_INDEX
+            self._layout = state.get("layout") or self.LAYOUT_SINGLE
+    
+    @property
+    def index_name(self) -> str:
+        """当前生效的集合名称（per_type布局下为集合前缀）"""
+        self._refresh_state()
+        return self._index_name
+    
+    @property
+    def layout(self) -> str:
+        """当前生效的集合布局"""
+        self._refresh_state()
+        return self._layout
+    
+    def read_state(self) -> Dict[str, Any]:
+        """读取状态文件，不存在或损坏时返回空字典"""
+        try:
+            with open(self.state_path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning(f"读取向量索引状态失败，使用默认集合: {e}")
+            return {}
+    
+    def switch_index(self, index_name: str, layout: str = LAYOUT_PER_TYPE) -> Optional[str]:
+        """切换生效集合
+        
+        先写临时文件再替换状态文件，切换是原子的：查询要么使用旧集合，要么使用新集合
+        
+        Args:
+            index_name: 新的生效集合（per_type布局下为集合前缀）
+            layout: 新集合的布局
+            
+        Returns:
+            Optional[str]: 切换前的生效集合
+            
+        Raises:
+            StoreError: 写入状态文件失败
+        """
+        previous = self.index_name
+        try:
+            directory = os.path.dirname(os.path.abspath(self.state_path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps({
+                    "active": index_name,
+                    "layout": layout,
+                    "previous": previous if previous != index_name else None,
+                    "updated_at": datetime.now()
+                }))
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"切换向量集合失败: {e}")
+            raise StoreError(f"切换向量集合失败: {str(e)}")
+        
+        self._index_name = index_name
+        self._layout = layout
+        logger.info(f"向量集合已切换: {previous} -> {index_name} ({layout})")
+        return previous
+    
+    def collection_for(self, content_type: str, entity_type: Optional[str] = None,
+                       base: Optional[str] = None) -> str:
+        """内容写入的集合
+        
+        Args:
+            content_type: 内容类型（entity, relation, news）
+            entity_type: 实体类型，决定实体是否写入单独的类型集合
+            base: 集合前缀，为空时使用当前生效集合及其布局；指定时按per_type布局命名（重建和迁移使用）
+        
+        Returns:
+            str: 集合名称
+        """
+        if base is None:
+            if self.layout == self.LAYOUT_SINGLE:
+                return self.index_name
+            base = self.index_name
+        suffix = self.entity_type_collections.get(entity_type) if content_type == "entity" and entity_type else None
+        return f"{base}.{content_type}.{suffix}" if suffix else f"{base}.{content_type}"
+    
+    def collections_for(self, content_type: Optional[str] = None, base: Optional[str] = None) -> List[str]:
+        """内容类型对应的全部集合（包括实体类型集合），content_type为空时返回所有集合"""
+        if base is None and self.layout == self.LAYOUT_SINGLE:
+            return [self.index_name]
+        names = []
+        for current in ([content_type] if content_type else self.CONTENT_TYPES):
+            names.append(self.collection_for(current, base=base))
+            if current == "entity":
+                names.extend(self.collection_for(current, entity_type, base=base)
+                             for entity_type in self.entity_type_collections)
+        return names
+    
+    def _entity_type_of(self, content_type: str, metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+        """实体元数据中的实体类型，其他内容类型返回None"""
+        return (metadata or {}).get("type") if content_type == "entity" else None
+    
+    async def initialize(self) -> None:
+        """初始化向量索引管理器 - 确保生效集合存在
+        
+        新部署（没有状态文件，也没有旧版default集合）直接使用按类型拆分的集合；
+        已有default集合的部署继续使用单集合，迁移后切换
+        """
+        if self._initialized:
+            return
+        
+        try:
+            if not os.path.exists(self.state_path):
+                indices = await asyncio.to_thread(self.vector_store.list_indices)
+                if self.DEFAULT_INDEX not in indices:
+                    self.switch_index(self.DEFAULT_BASE, self.LAYOUT_PER_TYPE)
+                else:
+                    logger.info("使用单集合向量索引，可运行 python -m app.services.kg_vector_rebuild_service --split 迁移")
+            
+            # 确保生效集合存在
+            for index_name in self.collections_for():
+                await self._ensure_collection(index_name, dimension=1536)  # OpenAI embedding dimension
+            self._initialized = True
+            logger.info("向量索引管理器初始化成功")
+        except Exception as e:
+            logger.error(f"向量索引管理器初始化失败: {e}")
+            raise StoreError(f"向量索引管理器初始化失败: {str(e)}")
+    
+    async def _ensure_collection(self, index_name: str, dimension: int) -> None:
+        """确保集合存在，每个集合在进程内只检查一次"""
+        if index_name in self._ensured:
+            return
+        await self._ensure_index_exists(index_name, dimension)
+        self._ensured.add(index_name)
+    
+    async def _ensure_index_exists(self, index_name: str, dimension: int = 1536) -> None:
+        """确保索引存在，如果不存在则创建"""
+        try:
+            # 尝试获取索引信息，如果不存在则创建
+            try:
+                await self.breaker.call(self.vector_store.get_index_info, index_name)
+                logger.debug(f"索引已存在: {index_name}")
+            except IndexNotFoundError:
+                await self.breaker.call(self.vector_store.create_index, index_name, dimension)
+                logger.info(f"创建索引成功: {index_name}, 维度: {dimension}")
+        except VectorStoreUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"确保索引存在失败: {e}")
+            raise StoreError(f"确保索引存在失败: {str(e)}")
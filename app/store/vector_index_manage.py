@@ -4,12 +4,12 @@
 核心功能：
 - 向量添加、更新、删除
 - 向量搜索
-- 索引管理
 
 设计原则：
-- 单一职责：只处理向量相关操作
+- 单一职责：只处理向量相关操作，集合布局和切换由VectorCollectionBase负责
 - 接口简洁：明确定义的API
 - 异常处理：统一的异常处理
+- 熔断降级：向量存储调用经过熔断器，熔断期间写操作写入本地待重放队列，恢复后按顺序重放
 """
 
 import asyncio
@@ -18,72 +18,98 @@ from typing import List, Dict, Any, Optional
 from app.exceptions.store_exceptions import StoreError
 from app.vector.vector_search_abstract import VectorSearchBase
 from app.exceptions import IndexNotFoundError
+from app.exceptions.vector_exceptions import VectorStoreUnavailableError
 from app.embedding import EmbeddingService
+from app.store.vector_breaker_manage import VectorBreakerManager
+from app.store.vector_collection_abstract import VectorCollectionBase
+from app.store.vector_write_route_manage import VectorWriteRouter
 from app.utils.logging_utils import get_logger
 
 
 logger = get_logger(__name__)
 
 
-class VectorIndexManager:
-    """向量索引管理器 - 提供核心向量操作能力"""
+class VectorIndexManager(VectorCollectionBase):
+    """向量索引管理器 - 提供核心向量操作能力
     
-    def __init__(self, vector_store: VectorSearchBase, 
-                 embedding_service: EmbeddingService) -> None:
+    写入、搜索和统计按VectorCollectionBase的集合布局路由到对应集合
+    
+    向量存储熔断时，搜索抛出VectorStoreUnavailableError由调用方降级；单条的新增、更新、删除写入
+    待重放队列（队列非空时新的写操作也排在队列后面，保证顺序），熔断器恢复后在后台重放
+    """
+    
+    def __init__(self, vector_store: VectorSearchBase,
+                 embedding_service: EmbeddingService,
+                 state_path: Optional[str] = None,
+                 entity_type_collections: Optional[Dict[str, str]] = None,
+                 breaker: Optional[VectorBreakerManager] = None) -> None:
         """初始化向量索引管理器
         
         Args:
             vector_store: 向量存储实例
             embedding_service: 嵌入服务
+            state_path: 生效集合状态文件路径，为空时从配置文件读取
+            entity_type_collections: 单独建集合的实体类型 -> 集合名后缀，为空时从配置文件读取
+            breaker: 向量存储熔断管理器，为空时使用全局实例
         """
-        self.vector_store = vector_store
+        super().__init__(vector_store, state_path, entity_type_collections, breaker)
         self.embedding_service = embedding_service
-        self._initialized = False
+        self.write_router = VectorWriteRouter(self.breaker, self._apply)
     
-    async def initialize(self) -> None:
-        """初始化向量索引管理器 - 确保默认索引存在"""
-        if self._initialized:
-            return
+    async def _apply(self, operation: str, vector_id: str, vector: Optional[List[float]] = None,
+                     metadata: Optional[Dict[str, Any]] = None, text: Optional[str] = None) -> bool:
+        """把一个写操作写入向量存储（直接写入和重放共用）
         
-        try:
-            # 确保默认索引存在
-            await self._ensure_index_exists("default", dimension=1536)  # OpenAI embedding dimension
-            self._initialized = True
-            logger.info("向量索引管理器初始化成功")
-        except Exception as e:
-            logger.error(f"向量索引管理器初始化失败: {e}")
-            raise StoreError(f"向量索引管理器初始化失败: {str(e)}")
-    
-    async def _ensure_index_exists(self, index_name: str, dimension: int = 1536) -> None:
-        """确保索引存在，如果不存在则创建"""
-        try:
-            # 尝试获取索引信息，如果不存在则创建
-            try:
-                # 使用线程池执行同步方法get_index_info
-                await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self.vector_store.get_index_info,
-                    index_name
-                )
-                logger.debug(f"索引已存在: {index_name}")
-            except IndexNotFoundError:
-                # 使用线程池执行同步方法create_index
-                await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self.vector_store.create_index,
-                    index_name,
-                    dimension
-                )
-                logger.info(f"创建索引成功: {index_name}, 维度: {dimension}")
-        except Exception as e:
-            logger.error(f"确保索引存在失败: {e}")
-            raise StoreError(f"确保索引存在失败: {str(e)}")
+        Args:
+            operation: add（新增）、upsert（覆盖写入，重放的新增使用）、update（更新）或delete（删除）
+            vector_id: 向量ID（<内容类型>_<内容ID>）
+            vector: 嵌入向量
+            metadata: 元数据
+            text: 原始文本
+            
+        Returns:
+            bool: 向量存储的返回值
+        """
+        content_type = vector_id.split("_", 1)[0]
+        if operation == "delete":
+            success = True
+            for index_name in self.collections_for(content_type):
+                success = await self._delete_from(index_name, [vector_id]) and success
+            return success
+        
+        index_name = self.collection_for(content_type, self._entity_type_of(content_type, metadata))
+        if operation in ("add", "upsert"):
+            await self._ensure_collection(index_name, len(vector))
+            write = self.vector_store.add_vectors if operation == "add" else self.vector_store.upsert_vectors
+        elif content_type == "entity" and self.entity_type_collections and self.layout != self.LAYOUT_SINGLE:
+            # 实体类型可能已变化：从其他实体集合中移除，并写入（而非更新）目标集合
+            for other in self.collections_for("entity"):
+                if other != index_name:
+                    await self._delete_from(other, [vector_id])
+            metadata = dict(metadata or {})
+            metadata.setdefault("content_id", vector_id.split("_", 1)[-1])
+            metadata.setdefault("content_type", content_type)
+            await self._ensure_collection(index_name, len(vector))
+            write = self.vector_store.upsert_vectors
+        else:
+            write = self.vector_store.update_vectors
+        
+        return await self.breaker.call(
+            write,
+            index_name=index_name,
+            vectors=[vector],
+            ids=[vector_id],
+            metadatas=[metadata],
+            texts=[text]
+        )
     
-    async def add_to_index(self, content: str, content_id: str, 
-                          content_type: str, 
+    async def add_to_index(self, content: str, content_id: str,
+                          content_type: str,
                           metadata: Optional[Dict[str, Any]] = None) -> str:
         """添加到向量索引
         
+        向量存储不可用时写入待重放队列，返回的向量ID不变
+        
         Args:
             content: 内容文本
             content_id: 内容ID
@@ -106,18 +132,13 @@ class VectorIndexManager:
             metadata["content_id"] = str(content_id)
             metadata["content_type"] = content_type
             
-            # 添加到向量存储 - add_vectors 是同步方法
-            success = self.vector_store.add_vectors(
-                index_name="default",
-                vectors=[embedding],
-                ids=[f"{content_type}_{content_id}"],
-                metadatas=[metadata],
-                texts=[content]
-            )
+            vector_id = f"{content_type}_{content_id}"
+            success = await self.write_router.write_or_enqueue("add", vector_id, vector=embedding,
+                                                               metadata=metadata, text=content)
             
             if success:
-                logger.debug(f"成功添加向量到索引: {content_type}_{content_id}")
-                return f"{content_type}_{content_id}"
+                logger.debug(f"成功添加向量到索引: {vector_id}")
+                return vector_id
             else:
                 raise StoreError("添加向量到索引失败")
             
@@ -125,33 +146,113 @@ class VectorIndexManager:
             logger.error(f"添加到向量索引失败: {e}")
             raise StoreError(f"添加到向量索引失败: {str(e)}")
     
-    async def update_vector(self, vector_id: str, content: str, 
+    async def add_batch_to_index(self, contents: List[str], content_ids: List[Any],
+                                 content_type: str,
+                                 metadatas: Optional[List[Dict[str, Any]]] = None,
+                                 embed_batch_size: int = 256,
+                                 vector_batch_size: int = 4000,
+                                 update: bool = False,
+                                 base: Optional[str] = None,
+                                 concurrency: int = 1) -> List[str]:
+        """批量添加到向量索引（批量导入和索引重建使用）
+        
+        按目标集合分组后，按embed_batch_size分批生成嵌入（最多concurrency个请求同时进行），
+        按vector_batch_size分批写入向量存储；不使用嵌入缓存，避免大批量导入挤占在线请求的缓存
+        
+        Args:
+            contents: 内容文本列表
+            content_ids: 内容ID列表
+            content_type: 内容类型（entity, relation, news）
+            metadatas: 元数据列表
+            embed_batch_size: 每次调用嵌入服务的文本数
+            vector_batch_size: 每次写入向量存储的向量数
+            update: 是否覆盖已存在的向量（否则为新增）
+            base: 写入的集合前缀（按per_type布局），为空时写入当前生效集合
+            concurrency: 同时进行的嵌入请求数
+            
+        Returns:
+            List[str]: 与输入顺序一致的向量ID列表
+            
+        Raises:
+            StoreError: 添加失败
+        """
+        if not contents:
+            return []
+        try:
+            vector_ids = [f"{content_type}_{content_id}" for content_id in content_ids]
+            metadatas = [dict(metadata) for metadata in metadatas] if metadatas else [{} for _ in contents]
+            for metadata, content_id in zip(metadatas, content_ids):
+                metadata["content_id"] = str(content_id)
+                metadata["content_type"] = content_type
+            
+            groups: Dict[str, List[int]] = {}
+            for position, metadata in enumerate(metadatas):
+                index_name = self.collection_for(content_type, self._entity_type_of(content_type, metadata), base)
+                groups.setdefault(index_name, []).append(position)
+            
+            write = self.vector_store.upsert_vectors if update else self.vector_store.add_vectors
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+            
+            async def embed(texts: List[str]) -> List[List[float]]:
+                async with semaphore:
+                    return await self.embedding_service.aembed_batch(texts, use_cache=False)
+            
+            for index_name, positions in groups.items():
+                for start in range(0, len(positions), vector_batch_size):
+                    chunk = positions[start:start + vector_batch_size]
+                    texts = [contents[i] for i in chunk]
+                    batches = await asyncio.gather(*(
+                        embed(texts[i:i + embed_batch_size]) for i in range(0, len(texts), embed_batch_size)
+                    ))
+                    embeddings = [embedding for batch in batches for embedding in batch]
+                    await self._ensure_collection(index_name, len(embeddings[0]))
+                
+                    # 向量存储的写入是同步方法，放到线程池中执行
+                    success = await asyncio.to_thread(
+                        write,
+                        index_name=index_name,
+                        vectors=embeddings,
+                        ids=[vector_ids[i] for i in chunk],
+                        metadatas=[metadatas[i] for i in chunk],
+                        texts=texts
+                    )
+                    if not success:
+                        raise StoreError("批量写入向量索引失败")
+            
+            logger.debug(f"批量写入向量索引: {content_type} {len(vector_ids)} 条")
+            return vector_ids
+            
+        except Exception as e:
+            logger.error(f"批量添加到向量索引失败: {e}")
+            raise StoreError(f"批量添加到向量索引失败: {str(e)}")
+    
+    async def update_vector(self, vector_id: str, content: str,
                            metadata: Optional[Dict[str, Any]] = None) -> bool:
         """更新向量
         
+        向量存储不可用时写入待重放队列
+        
         Args:
             vector_id: 向量ID
             content: 新内容
-            metadata: 新元数据
+            metadata: 新元数据；实体类型单独建集合时，实体向量的元数据必须包含type，
+                用于确定目标集合并从其他实体集合中移除
             
         Returns:
             bool: 是否成功更新
             
         Raises:
-            StoreError: 更新失败
+            StoreError: 更新失败，或实体向量的元数据缺少type
         """
+        if (vector_id.split("_", 1)[0] == "entity" and self.entity_type_collections
+                and self.layout != self.LAYOUT_SINGLE and not (metadata or {}).get("type")):
+            raise StoreError(f"更新实体向量需要在元数据中提供实体类型: {vector_id}")
         try:
             # 生成新的嵌入向量
             embedding = await self.embedding_service.aembed_text(content)
             
-            # 更新向量 - update_vectors 是同步方法
-            success = self.vector_store.update_vectors(
-                index_name="default",
-                vectors=[embedding],
-                ids=[vector_id],
-                metadatas=[metadata],
-                texts=[content]
-            )
+            success = await self.write_router.write_or_enqueue("update", vector_id, vector=embedding,
+                                                               metadata=metadata, text=content)
             
             logger.debug(f"成功更新向量: {vector_id}")
             return success
@@ -163,6 +264,8 @@ class VectorIndexManager:
     async def delete_vector(self, vector_id: str) -> bool:
         """删除向量
         
+        向量存储不可用时写入待重放队列
+        
         Args:
             vector_id: 向量ID
             
@@ -173,10 +276,7 @@ class VectorIndexManager:
             StoreError: 删除失败
         """
         try:
-            success = self.vector_store.delete_vectors(
-                index_name="default",
-                ids=[vector_id]
-            )
+            success = await self.write_router.write_or_enqueue("delete", vector_id)
             logger.debug(f"成功删除向量: {vector_id}")
             return success
             
@@ -184,42 +284,80 @@ class VectorIndexManager:
             logger.error(f"删除向量失败: {e}")
             raise StoreError(f"删除向量失败: {str(e)}")
     
-    async def search_vectors(self, query: str, 
+    async def _delete_from(self, index_name: str, ids: List[str]) -> bool:
+        """从集合中删除向量，集合不存在时忽略"""
+        try:
+            return await self.breaker.call(self.vector_store.delete_vectors, index_name=index_name, ids=ids)
+        except IndexNotFoundError:
+            return True
+    
+    async def search_vectors(self, query: str,
                            content_type: Optional[str] = None,
                            top_k: int = 10,
-                           filter_dict: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                           filter_dict: Optional[Dict[str, Any]] = None,
+                           include_content: bool = False,
+                           metadata_keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """搜索向量
         
+        per_type布局下只搜索内容类型对应的集合；指定了单独建集合的实体类型时只搜索该类型集合，
+        搜索多个集合时按距离合并结果。默认只取ID、距离和元数据，不读取向量和原始文本
+        
         Args:
             query: 查询文本
             content_type: 内容类型过滤
             top_k: 返回结果数量
             filter_dict: 过滤条件
+            include_content: 是否返回索引中的原始文本（content字段）
+            metadata_keys: 只返回这些元数据字段，为空时返回全部
             
         Returns:
             List[Dict[str, Any]]: 搜索结果列表
             
         Raises:
+            VectorStoreUnavailableError: 向量存储熔断中或调用超时
             StoreError: 搜索失败
         """
         try:
             # 生成查询向量
             query_embedding = await self.embedding_service.aembed_text(query)
             
-            # 准备过滤条件
-            where_clause = {}
-            if content_type:
-                where_clause["content_type"] = content_type
-            if filter_dict:
-                where_clause.update(filter_dict)
-            
-            # 执行向量搜索 - search_vectors 是同步方法
-            results = self.vector_store.search_vectors(
-                index_name="default",
-                query_vector=query_embedding,
-                top_k=top_k,
-                filter_dict=where_clause if where_clause else None
-            )
+            # 准备过滤条件和搜索的集合
+            where_clause = dict(filter_dict) if filter_dict else {}
+            if self.layout == self.LAYOUT_SINGLE:
+                index_names = [self.index_name]
+                if content_type:
+                    where_clause["content_type"] = content_type
+            else:
+                entity_type = where_clause.get("type") if content_type == "entity" else None
+                if isinstance(entity_type, str):
+                    index_names = [self.collection_for("entity", entity_type)]
+                    if entity_type in self.entity_type_collections:
+                        # 类型集合中只有该类型的实体，不需要再过滤
+                        where_clause.pop("type")
+                else:
+                    index_names = self.collections_for(content_type)
+            
+            # 执行向量搜索 - search_vectors 是同步方法，经过熔断器在线程池中执行
+            include = ['metadatas', 'distances'] + (['documents'] if include_content else [])
+            results = []
+            for index_name in index_names:
+                try:
+                    results.extend(await self.breaker.call(
+                        self.vector_store.search_vectors,
+                        index_name=index_name,
+                        query_vector=query_embedding,
+                        top_k=top_k,
+                        filter_dict=where_clause if where_clause else None,
+                        include=include,
+                        metadata_keys=metadata_keys
+                    ))
+                except IndexNotFoundError:
+                    continue
+            if self.breaker.enabled:
+                self.write_router.schedule_replay()
+            if len(index_names) > 1:
+                results.sort(key=lambda result: float("inf") if result.get('score') is None else result['score'])
+                results = results[:top_k]
             
             # 格式化结果
             formatted_results = []
@@ -228,15 +366,19 @@ class VectorIndexManager:
                     # 将距离转换为相似度分数 (Chroma返回的是距离)
                     score = 1.0 - result.get('score', 0) if result.get('score') is not None else 0.0
                     
-                    formatted_results.append({
-                        "content": result.get('text', ''),
+                    formatted_result = {
                         "score": score,
                         "metadata": result.get('metadata', {}),
                         "vector_id": result.get('id', '')
-                    })
+                    }
+                    if include_content:
+                        formatted_result["content"] = result.get('text', '')
+                    formatted_results.append(formatted_result)
             
             return formatted_results
             
+        except VectorStoreUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"向量搜索失败: {e}")
             raise StoreError(f"向量搜索失败: {str(e)}")
@@ -254,13 +396,38 @@ class VectorIndexManager:
             StoreError: 获取失败
         """
         try:
-            filter_dict = {}
-            if content_type:
-                filter_dict["content_type"] = content_type
+            if self.layout == self.LAYOUT_SINGLE:
+                filter_dict = {}
+                if content_type:
+                    filter_dict["content_type"] = content_type
+            
+                # count_vectors 是同步方法
+                return await self.breaker.call(self.vector_store.count_vectors, self.index_name,
+                                               filter_dict if filter_dict else None)
             
-            # count_vectors 是同步方法
-            return self.vector_store.count_vectors("default", filter_dict if filter_dict else None)
+            total = 0
+            for index_name in self.collections_for(content_type):
+                try:
+                    total += await self.breaker.call(self.vector_store.count_vectors, index_name)
+                except IndexNotFoundError:
+                    continue
+            return total
             
         except Exception as e:
             logger.error(f"获取向量数量失败: {e}")
-            raise StoreError(f"获取向量数量失败: {str(e)}")
\ No newline at end of file
+            raise StoreError(f"获取向量数量失败: {str(e)}")
+    
+    async def replay_outbox(self, batch_size: int = 100) -> int:
+        """按写入顺序重放待重放队列（见VectorWriteRouter.replay）
+        
+        Args:
+            batch_size: 每次从队列读取的操作数
+            
+        Returns:
+            int: 重放成功的操作数
+        """
+        return await self.write_router.replay(batch_size)
+    
+    def get_breaker_stats(self) -> Dict[str, Any]:
+        """获取向量存储熔断器状态和待重放队列长度"""
+        return self.breaker.get_stats()
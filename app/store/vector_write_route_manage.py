@@ -0,0 +1,125 @@
+"""
+向量写操作路由 - 熔断期间把写操作写入待重放队列并在恢复后重放
+
+- 熔断中，或队列中还有未重放的写操作时，新的写操作写入队列（排在已有操作后面，保证顺序）
+- 直接写入超时（VectorStoreUnavailableError）的写操作同样写入队列
+- 熔断器未打开且队列非空时在后台按写入顺序重放，多个进程通过重放租约保证同一时间只有一个进程重放
+
+写操作如何落到集合由VectorIndexManager的写入函数决定，直接写入和重放共用
+"""
+
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.exceptions.vector_exceptions import VectorStoreUnavailableError
+from app.store.vector_breaker_manage import VectorBreakerManager
+from app.utils.logging_utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class VectorWriteRouter:
+    """向量写操作路由器：决定写操作直接写入向量存储还是写入待重放队列，并负责重放"""
+    
+    def __init__(self, breaker: VectorBreakerManager, apply: Callable[..., Awaitable[bool]]) -> None:
+        """初始化写操作路由器
+        
+        Args:
+            breaker: 向量存储熔断管理器（包含待重放队列）
+            apply: 把一个写操作写入向量存储的函数，参数为(operation, vector_id, **payload)
+        """
+        self.breaker = breaker
+        self._apply = apply
+        self._replay_owner = uuid.uuid4().hex
+        self._replay_task: Optional[asyncio.Task] = None
+    
+    @property
+    def replay_task(self) -> Optional[asyncio.Task]:
+        """最近一次启动的后台重放任务"""
+        return self._replay_task
+    
+    def _should_queue(self) -> bool:
+        """写操作是否写入待重放队列：熔断中，或队列中还有未重放的写操作（保证顺序）"""
+        if not self.breaker.enabled:
+            return False
+        if self.breaker.outbox.depth() > 0:
+            self.schedule_replay()
+            return True
+        return self.breaker.state == VectorBreakerManager.OPEN
+    
+    def _enqueue(self, operation: str, payload: Dict[str, Any]) -> None:
+        """写操作写入待重放队列"""
+        self.breaker.outbox.append(operation, payload)
+        logger.warning(f"向量存储不可用，写操作进入待重放队列: {operation} {payload['vector_id']}")
+    
+    def schedule_replay(self) -> None:
+        """熔断器未打开且队列非空时在后台重放队列"""
+        if self._replay_task is not None and not self._replay_task.done():
+            return
+        if self.breaker.state == VectorBreakerManager.OPEN or self.breaker.outbox.depth() == 0:
+            return
+        self._replay_task = asyncio.get_running_loop().create_task(self.replay())
+    
+    async def write_or_enqueue(self, operation: str, vector_id: str, **payload) -> bool:
+        """写入向量存储，向量存储不可用时写入待重放队列（返回True）"""
+        if self._should_queue():
+            self._enqueue(operation, {"vector_id": vector_id, **payload})
+            return True
+        try:
+            return await self._apply(operation, vector_id, **payload)
+        except VectorStoreUnavailableError:
+            # 超时的写操作可能已经生效，重放的新增按覆盖写入执行，重复写入没有影响
+            self._enqueue(operation, {"vector_id": vector_id, **payload})
+            return True
+    
+    async def replay(self, batch_size: int = 100) -> int:
+        """按写入顺序重放待重放队列
+        
+        多个进程共用同一个队列文件时，同一时间只有持有重放租约的进程重放；向量存储再次不可用时停止，
+        其他错误重试max_replay_attempts次后丢弃该操作
+        
+        Args:
+            batch_size: 每次从队列读取的操作数
+            
+        Returns:
+            int: 重放成功的操作数
+        """
+        outbox = self.breaker.outbox
+        lease_seconds = self.breaker.config.call_timeout * 4 + 10
+        replayed = 0
+        try:
+            while outbox.acquire_lease(self._replay_owner, lease_seconds):
+                entries = outbox.peek(batch_size)
+                if not entries:
+                    break
+                for entry_id, operation, payload, attempts in entries:
+                    if not outbox.acquire_lease(self._replay_owner, lease_seconds):
+                        return replayed
+                    try:
+                        # 新增按覆盖写入重放：超时的写操作可能已经生效
+                        await self._apply("upsert" if operation == "add" else operation, **payload)
+                    except VectorStoreUnavailableError as e:
+                        logger.warning(f"重放待重放队列时向量存储不可用，稍后重试: {str(e)}")
+                        return replayed
+                    except Exception as e:
+                        if attempts + 1 >= self.breaker.config.max_replay_attempts:
+                            logger.error(f"重放写操作失败，已重试 {attempts + 1} 次，丢弃: "
+                                         f"{operation} {payload.get('vector_id')}: {str(e)}")
+                            outbox.remove(entry_id)
+                            continue
+                        outbox.mark_failed(entry_id)
+                        logger.warning(f"重放写操作失败，稍后重试: {operation} {payload.get('vector_id')}: {str(e)}")
+                        return replayed
+                    outbox.remove(entry_id)
+                    replayed += 1
+            return replayed
+        except Exception as e:
+            logger.error(f"重放待重放队列失败: {str(e)}")
+            return replayed
+        finally:
+            outbox.release_lease(self._replay_owner)
+            outbox.depth(refresh=True)
+            if replayed:
+                logger.info(f"已重放 {replayed} 个向量写操作，队列剩余 {outbox.depth()} 个")
@@ -0,0 +1,148 @@
+"""
+增量JSON解析器
+在大模型流式输出的过程中解析JSON，顶层对象中指定数组的每个元素对象一闭合就返回，
+不必等待整个响应生成完毕
+
+只做括号和字符串的状态跟踪，不校验整体语法；元素对象本身用json.loads解析，
+解析失败的元素跳过并记录日志，完整响应仍由调用方按原有方式解析
+"""
+
+import json
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
+
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Frame:
+    """解析栈中的一个对象或数组"""
+
+    __slots__ = ("kind", "key", "start", "expect_key", "pending_key")
+
+    def __init__(self, kind: str, key: Optional[str], start: int):
+        self.kind = kind
+        # 该容器在父对象中的键
+        self.key = key
+        self.start = start
+        self.expect_key = kind == "{"
+        self.pending_key: Optional[str] = None
+
+
+class JsonStreamParser:
+    """
+    增量JSON解析器
+
+    使用方式：
+        parser = JsonStreamParser(["entities"])
+        for chunk in chunks:
+            for key, item in parser.feed(chunk):
+                ...  # key为数组的键，item为已闭合的元素对象
+        full_text = parser.text
+    """
+
+    def __init__(self, array_keys: Iterable[str]):
+        """
+        初始化解析器
+
+        Args:
+            array_keys: 需要逐个返回元素的顶层数组键
+        """
+        self.array_keys = set(array_keys)
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """目前收到的完整文本"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        输入一段文本
+
+        Args:
+            chunk: 流式输出的文本块
+
+        Returns:
+            List[Tuple[str, Any]]: 本段文本中闭合的 (数组键, 元素对象)
+        """
+        self._text += chunk
+        if self.done:
+            return []
+        text = self._text
+        items = []
+        stack = self._stack
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = stack[-1]
+                    if frame.kind == "{" and frame.expect_key:
+                        try:
+                            frame.pending_key = json.loads(text[self._string_start:i + 1])
+                        except ValueError:
+                            frame.pending_key = None
+                continue
+            if not stack:
+                # 跳过JSON之前的说明文字和代码块标记
+                if c == "{":
+                    stack.append(_Frame("{", None, i))
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                parent = stack[-1]
+                stack.append(_Frame(c, parent.pending_key if parent.kind == "{" else None, i))
+            elif c in "}]":
+                frame = stack.pop()
+                if not stack:
+                    self.done = True
+                    self._pos = i + 1
+                    return items
+                parent = stack[-1]
+                if (frame.kind == "{" and parent.kind == "[" and len(stack) == 2
+                        and parent.key in self.array_keys):
+                    try:
+                        items.append((parent.key, json.loads(text[frame.start:i + 1])))
+                    except ValueError as e:
+                        logger.warning(f"解析流式JSON元素失败: {str(e)}")
+            elif c == ":":
+                stack[-1].expect_key = False
+            elif c == ",":
+                frame = stack[-1]
+                if frame.kind == "{":
+                    frame.expect_key = True
+                    frame.pending_key = None
+        self._pos = len(text)
+        return items
+
+
+async def aiter_json_array_items(chunks: AsyncIterator[str], array_keys: Iterable[str],
+                                 parser: Optional[JsonStreamParser] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    从异步文本流中逐个返回顶层数组的元素对象
+
+    Args:
+        chunks: 异步文本流（如LLMClient.astream）
+        array_keys: 需要逐个返回元素的顶层数组键
+        parser: 解析器（可选），传入时可在迭代结束后通过parser.text获取完整文本
+
+    Yields:
+        Tuple[str, Any]: (数组键, 元素对象)
+    """
+    parser = parser or JsonStreamParser(array_keys)
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
@@ -1,6 +1,6 @@
 """
 向量搜索模块
-提供统一的向量搜索接口和基于Chroma的实现
+提供统一的向量搜索接口和基于Chroma、NumPy、FAISS/hnswlib的实现
 """
 
 # 导出抽象基类
@@ -10,6 +10,12 @@ from app.vector.vector_search_abstract import VectorSearchBase
 from app.vector.chroma_vector_search import ChromaVectorSearch
 from app.vector.chroma_remote_vector_search import ChromaRemoteVectorSearch
 
+# 导出NumPy内存映射实现
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+# 导出FAISS/hnswlib近似索引实现
+from app.vector.ann_vector_search import AnnVectorSearch
+
 # 导出服务管理类
 from app.vector.vector_service import VectorSearchService
 
@@ -38,6 +44,8 @@ __all__ = [
     "VectorSearchBase",
     "ChromaVectorSearch",
     "ChromaRemoteVectorSearch",
+    "NumpyVectorSearch",
+    "AnnVectorSearch",
     "VectorSearchService",
 ]
 
@@ -0,0 +1,140 @@
+"""
+近似向量搜索的子索引引擎：hnswlib HNSW和FAISS HNSW / IVF-PQ
+统一提供 add / remove / search / save 接口，以矩阵行号作为整数标签，距离定义与Chroma一致
+"""
+
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# FAISS为可选依赖（IVF-PQ索引需要）；hnswlib随chromadb安装
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    faiss = None
+    FAISS_AVAILABLE = False
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSWLIB_AVAILABLE = False
+
+
+class _HnswlibEngine:
+    """hnswlib HNSW子索引，距离定义与Chroma一致"""
+
+    name = "hnswlib"
+
+    def __init__(self, dimension: int, metric: str, params: Dict[str, Any], path: Optional[Path] = None):
+        self.params = params
+        self.index = hnswlib.Index(space=metric, dim=dimension)
+        if path is None:
+            self.index.init_index(max_elements=1024, M=params["hnsw_m"],
+                                  ef_construction=params["hnsw_ef_construction"], random_seed=100)
+        else:
+            self.index.load_index(str(path))
+        self.index.set_ef(params["hnsw_ef_search"])
+
+    @property
+    def ready(self) -> bool:
+        return True
+
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        required = self.index.element_count + len(labels)
+        if required > self.index.max_elements:
+            self.index.resize_index(max(required, 2 * self.index.max_elements))
+        self.index.add_items(vectors, labels)
+
+    def remove(self, labels: np.ndarray) -> int:
+        removed = 0
+        for label in labels.tolist():
+            try:
+                self.index.mark_deleted(label)
+                removed += 1
+            except RuntimeError:
+                # 已标记删除
+                pass
+        return removed
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        self.index.set_ef(max(self.params["hnsw_ef_search"], k))
+        labels, distances = self.index.knn_query(queries, k=k)
+        return labels.astype(np.int64), distances
+
+    def save(self, path: Path) -> None:
+        self.index.save_index(str(path))
+
+
+class _FaissEngine:
+    """FAISS子索引（HNSW或IVF-PQ），余弦距离通过归一化后的内积计算，HNSW可使用float16/int8标量量化存储"""
+
+    name = "faiss"
+
+    def __init__(self, dimension: int, metric: str, params: Dict[str, Any], path: Optional[Path] = None,
+                 index_type: str = "hnsw", quantization: str = "none"):
+        self.metric = metric
+        self.params = params
+        self.index_type = index_type
+        if path is not None:
+            self.index = faiss.read_index(str(path))
+        else:
+            faiss_metric = faiss.METRIC_L2 if metric == "l2" else faiss.METRIC_INNER_PRODUCT
+            if index_type == "hnsw" and quantization != "none":
+                qtype = faiss.ScalarQuantizer.QT_fp16 if quantization == "float16" else faiss.ScalarQuantizer.QT_8bit
+                base = faiss.IndexHNSWSQ(dimension, qtype, params["hnsw_m"], faiss_metric)
+                base.hnsw.efConstruction = params["hnsw_ef_construction"]
+                self.index = faiss.IndexIDMap2(base)
+            elif index_type == "hnsw":
+                base = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], faiss_metric)
+                base.hnsw.efConstruction = params["hnsw_ef_construction"]
+                self.index = faiss.IndexIDMap2(base)
+            else:
+                self.index = faiss.index_factory(
+                    dimension, f"IVF{params['ivf_nlist']},PQ{params['pq_m']}", faiss_metric
+                )
+        if index_type == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = params["hnsw_ef_search"]
+        else:
+            faiss.extract_index_ivf(self.index).nprobe = params["ivf_nprobe"]
+
+    @property
+    def ready(self) -> bool:
+        return self.index.is_trained
+
+    @property
+    def train_size(self) -> int:
+        if self.index_type == "hnsw":
+            # 标量量化只需少量样本统计取值范围
+            return 256
+        return max(self.params["ivf_nlist"] * 39, 256)
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.metric == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def train(self, vectors: np.ndarray) -> None:
+        self.index.train(self._prepare(vectors))
+
+    def add(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        self.index.add_with_ids(self._prepare(vectors), labels.astype(np.int64))
+
+    def remove(self, labels: np.ndarray) -> int:
+        try:
+            return int(self.index.remove_ids(labels.astype(np.int64)))
+        except RuntimeError:
+            # HNSW不支持删除，已删除的行在结果中按存活标记过滤
+            return 0
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        similarities, labels = self.index.search(self._prepare(queries), k)
+        distances = similarities if self.metric == "l2" else 1.0 - similarities
+        return labels, distances
+
+    def save(self, path: Path) -> None:
+        faiss.write_index(self.index, str(path))
@@ -0,0 +1,484 @@
+"""
+基于FAISS/hnswlib的近似向量搜索实现
+向量、ID和元数据沿用NumPy后端的追加写入文件（数据的唯一来源），
+近似索引按元数据字段（默认type）拆分为子索引，以矩阵行号作为整数标签，从日志增量构建并持久化
+"""
+
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.exceptions.vector_exceptions import VectorSearchError
+from app.utils.logging_utils import get_logger
+from app.vector.ann_index_engine import FAISS_AVAILABLE, HNSWLIB_AVAILABLE, _FaissEngine, _HnswlibEngine
+from app.vector.numpy_memmap_index import _CompactCodec, _MemmapIndex
+from app.vector.numpy_vector_scan import format_result, prepare_queries, rerank_rows, to_distance
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+logger = get_logger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_pq")
+
+# 除分区字段外还有其他过滤条件时，匹配行数不超过该值直接精确计算，否则近似搜索后再过滤
+EXACT_FILTER_MAX = 20000
+
+# 自上次保存后新增的行数超过该值时自动保存近似索引文件
+SAVE_EVERY_ROWS = 50000
+
+
+class _AnnState:
+    """一个索引（一个文件代号）的近似子索引集合"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        # 分区取值（posting_key）-> [原始取值, 子索引, 子索引中可返回的条目数]
+        self.partitions: Dict[Any, List[Any]] = {}
+        self.indexed = np.zeros(0, dtype=bool)
+        self.watermark = 0
+        self.saved_watermark = 0
+        self.dirty = False
+        self.stamp = None
+
+
+class AnnVectorSearch(NumpyVectorSearch):
+    """
+    基于FAISS/hnswlib的近似向量搜索实现
+    索引类型：flat（精确，等同NumPy后端）、hnsw、ivf_pq（需要faiss）
+    只按分区字段过滤时只搜索对应的子索引；其他过滤条件匹配行较少时精确计算，较多时近似搜索后过滤
+    """
+
+    def __init__(self, **kwargs):
+        """
+        初始化近似向量搜索
+
+        Args:
+            **kwargs:
+                path: 本地存储路径
+                metric: 默认距离度量方式，如 'cosine', 'l2', 'ip'
+                index_type: 索引类型 'flat' / 'hnsw' / 'ivf_pq'
+                engine: 'auto'（优先faiss）/ 'faiss' / 'hnswlib'
+                partition_key: 按该元数据字段拆分子索引，为空时不拆分
+                hnsw_m / hnsw_ef_construction / hnsw_ef_search: HNSW参数
+                ivf_nlist / ivf_nprobe / pq_m: IVF-PQ参数
+                index_hnsw: 索引名（或后缀，如 'entity'） -> 覆盖的HNSW/IVF-PQ参数
+                compact_dimension: 子索引只使用向量的前N维，为空时使用完整维度
+                quantization: 子索引的标量量化方式 'none' / 'float16' / 'int8'（需要faiss）
+                rerank_factor: 子索引存储降维、量化或PQ压缩向量时，近似检索 top_k × rerank_factor 个候选后
+                    用完整向量精排
+        """
+        self.index_type = kwargs.get('index_type', 'hnsw').lower()
+        if self.index_type not in INDEX_TYPES:
+            raise VectorSearchError(f"不支持的近似索引类型: {self.index_type}")
+        self.engine = self._select_engine(kwargs.get('engine', 'auto').lower())
+        self.partition_key = kwargs.get('partition_key', 'type')
+        self.params = {
+            'hnsw_m': kwargs.get('hnsw_m', 16),
+            'hnsw_ef_construction': kwargs.get('hnsw_ef_construction', 200),
+            'hnsw_ef_search': kwargs.get('hnsw_ef_search', 64),
+            'ivf_nlist': kwargs.get('ivf_nlist', 1024),
+            'ivf_nprobe': kwargs.get('ivf_nprobe', 16),
+            'pq_m': kwargs.get('pq_m', 16),
+        }
+        self.index_hnsw = kwargs.get('index_hnsw') or {}
+        self.ann_states: Dict[Path, _AnnState] = {}
+        super().__init__(**kwargs)
+        if self.quantization != "none" and self.engine == "hnswlib":
+            logger.warning(f"hnswlib不支持量化存储，忽略quantization={self.quantization}")
+        # 子索引中的向量不是完整精度时需要精排
+        self.rerank = self.index_type == "ivf_pq" or (
+            self.engine != "numpy" and (bool(self.compact_dimension) or
+                                        (self.quantization != "none" and self.engine == "faiss"))
+        )
+        logger.info(f"近似向量搜索使用 {self.engine} {self.index_type} 索引，分区字段: {self.partition_key}")
+
+    def _select_engine(self, engine: str) -> str:
+        if self.index_type == "flat":
+            return "numpy"
+        if engine == "auto":
+            engine = "faiss" if FAISS_AVAILABLE else "hnswlib"
+        if engine == "faiss" and not FAISS_AVAILABLE:
+            raise VectorSearchError("未安装faiss-cpu，无法使用faiss引擎")
+        if engine == "hnswlib" and not HNSWLIB_AVAILABLE:
+            raise VectorSearchError("未安装hnswlib，无法使用hnswlib引擎")
+        if engine not in ("faiss", "hnswlib"):
+            raise VectorSearchError(f"不支持的近似索引引擎: {engine}")
+        if self.index_type == "ivf_pq" and engine != "faiss":
+            raise VectorSearchError("IVF-PQ索引需要安装faiss-cpu")
+        return engine
+
+    def _codec_factory(self):
+        """只有flat索引在内存中维护紧凑向量，近似索引的降维和量化由子索引完成"""
+        return super()._codec_factory() if self.index_type == "flat" else None
+
+    def _engine_codec(self, index: _MemmapIndex) -> Optional[_CompactCodec]:
+        """子索引使用的降维方式，不降维时为None"""
+        if not self.compact_dimension or self.compact_dimension >= index.dimension:
+            return None
+        return _CompactCodec(index.dimension, index.metric, self.compact_dimension)
+
+    def _engine_vectors(self, index: _MemmapIndex, vectors: np.ndarray) -> np.ndarray:
+        codec = self._engine_codec(index)
+        return codec.reduce(vectors) if codec else np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _index_params(self, index: _MemmapIndex) -> Dict[str, Any]:
+        """全局索引参数加上该索引的覆盖参数"""
+        overrides = self._index_overrides(index.directory.name, self.index_hnsw)
+        return {**self.params, **{key: value for key, value in overrides.items() if key in self.params}}
+
+    def _new_engine(self, index: _MemmapIndex, path: Optional[Path] = None):
+        codec = self._engine_codec(index)
+        dimension = codec.dimension if codec else index.dimension
+        params = self._index_params(index)
+        if self.engine == "faiss":
+            return _FaissEngine(dimension, index.metric, params, path, self.index_type, self.quantization)
+        return _HnswlibEngine(dimension, index.metric, params, path)
+
+    def _partition_of(self, metadata: Dict[str, Any]) -> Any:
+        return metadata.get(self.partition_key) if self.partition_key else None
+
+    # ------------------------------------------------------------------
+    # 近似索引的构建与持久化
+    # ------------------------------------------------------------------
+
+    def _state_path(self, index: _MemmapIndex) -> Path:
+        return index.directory / "ann.json"
+
+    def _state_signature(self, index: _MemmapIndex) -> Dict[str, Any]:
+        return {
+            "generation": index.generation, "engine": self.engine, "index_type": self.index_type,
+            "partition_key": self.partition_key, "params": self._index_params(index),
+            "compact_dimension": self.compact_dimension, "quantization": self.quantization
+        }
+
+    def _load_state(self, index: _MemmapIndex) -> _AnnState:
+        """加载与当前文件代号和参数一致的近似索引文件，否则从空索引开始"""
+        state = _AnnState(index.generation)
+        state_path = self._state_path(index)
+        if not state_path.exists():
+            return state
+        try:
+            with open(state_path, "rb") as f:
+                saved = orjson.loads(f.read())
+            if saved["signature"] != self._state_signature(index):
+                return state
+            for partition in saved["partitions"]:
+                engine = self._new_engine(index, index.directory / partition["file"])
+                state.partitions[index.posting_key(partition["value"])] = [
+                    partition["value"], engine, partition["live"]
+                ]
+            state.watermark = state.saved_watermark = saved["watermark"]
+            indexed = np.unpackbits(np.load(index.directory / saved["indexed"]))[:state.watermark].astype(bool)
+            state.indexed = np.zeros(max(index.rows, state.watermark), dtype=bool)
+            state.indexed[:state.watermark] = indexed
+            logger.info(f"加载近似索引 {index.directory.name}，已索引 {state.watermark} 行")
+        except Exception as e:
+            logger.warning(f"加载近似索引失败，将重新构建: {e}")
+            state = _AnnState(index.generation)
+        return state
+
+    def _sync(self, index: _MemmapIndex) -> _AnnState:
+        """把日志中新增和删除的行同步到子索引（调用方持有index.lock）"""
+        state = self.ann_states.get(index.directory)
+        if state is None or state.generation != index.generation:
+            state = self._load_state(index)
+            self.ann_states[index.directory] = state
+        stamp = (index.generation, index.log_offset)
+        if state.stamp == stamp:
+            return state
+
+        rows = index.rows
+        if len(state.indexed) < rows:
+            indexed = np.zeros(max(rows, 2 * len(state.indexed)), dtype=bool)
+            indexed[:len(state.indexed)] = state.indexed
+            state.indexed = indexed
+
+        # 已索引但失效（删除或被覆盖）的行
+        dead = np.flatnonzero(state.indexed[:state.watermark] & ~index.alive[:state.watermark])
+        if len(dead):
+            groups: Dict[Any, List[int]] = {}
+            for row in dead.tolist():
+                groups.setdefault(index.posting_key(self._partition_of(index.metadatas[row])), []).append(row)
+            for key, labels in groups.items():
+                partition = state.partitions.get(key)
+                if partition is not None:
+                    partition[2] -= partition[1].remove(np.asarray(labels, dtype=np.int64))
+            state.indexed[dead] = False
+            state.dirty = True
+
+        # 新增的存活行按分区写入子索引
+        if rows > state.watermark:
+            new_rows = state.watermark + np.flatnonzero(index.alive[state.watermark:rows])
+            groups = {}
+            for row in new_rows.tolist():
+                value = self._partition_of(index.metadatas[row])
+                groups.setdefault(index.posting_key(value), (value, []))[1].append(row)
+            matrix = index.matrix_view()
+            for key, (value, labels) in groups.items():
+                partition = state.partitions.get(key)
+                if partition is None:
+                    partition = state.partitions[key] = [value, self._new_engine(index), 0]
+                engine = partition[1]
+                labels = np.asarray(labels, dtype=np.int64)
+                if not engine.ready:
+                    # IVF-PQ在分区行数足够时用该分区的全部存活行训练后一次性写入
+                    members = self._partition_rows(index, value)
+                    if len(members) < engine.train_size:
+                        continue
+                    engine.train(self._engine_vectors(index, matrix[members[:engine.params["ivf_nlist"] * 256]]))
+                    labels = members[~state.indexed[members]]
+                engine.add(self._engine_vectors(index, matrix[labels]), labels)
+                partition[2] += len(labels)
+                state.indexed[labels] = True
+            state.watermark = rows
+            state.dirty = True
+
+        state.stamp = stamp
+        if state.watermark - state.saved_watermark >= SAVE_EVERY_ROWS:
+            self._save_state(index, state)
+        return state
+
+    def _partition_rows(self, index: _MemmapIndex, value: Any) -> np.ndarray:
+        if not self.partition_key:
+            return np.flatnonzero(index.alive[:index.rows])
+        if value is None:
+            keyed = np.zeros(index.rows, dtype=bool)
+            for row, metadata in enumerate(index.metadatas):
+                keyed[row] = self.partition_key in metadata
+            return np.flatnonzero(index.alive[:index.rows] & ~keyed)
+        return index.filter_rows({self.partition_key: value})
+
+    def _save_state(self, index: _MemmapIndex, state: _AnnState) -> None:
+        """写入子索引文件和ann.json，并删除不再引用的旧文件"""
+        partitions = []
+        for slot, (value, engine, live) in enumerate(state.partitions.values()):
+            if not engine.ready:
+                continue
+            name = f"ann.{index.generation}.{slot}.bin"
+            engine.save(index.directory / f"{name}.tmp")
+            os.replace(index.directory / f"{name}.tmp", index.directory / name)
+            partitions.append({"value": value, "file": name, "live": live})
+        indexed_name = f"ann.{index.generation}.indexed.npy"
+        with open(index.directory / f"{indexed_name}.tmp", "wb") as f:
+            np.save(f, np.packbits(state.indexed[:state.watermark]))
+        os.replace(index.directory / f"{indexed_name}.tmp", index.directory / indexed_name)
+        tmp_path = index.directory / "ann.json.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({
+                "signature": self._state_signature(index), "watermark": state.watermark,
+                "indexed": indexed_name, "partitions": partitions
+            }))
+        os.replace(tmp_path, self._state_path(index))
+        referenced = {partition["file"] for partition in partitions} | {indexed_name}
+        for path in list(index.directory.glob("ann.*.bin")) + list(index.directory.glob("ann.*.npy")):
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+        state.saved_watermark = state.watermark
+        state.dirty = False
+
+    def save_index(self, index_name: str) -> bool:
+        """
+        同步并保存近似索引文件
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            bool: 保存是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        if self.index_type == "flat":
+            return True
+        index = self._get_index(index_name)
+        with index.lock:
+            self._save_state(index, self._sync(index))
+        logger.info(f"已保存近似索引: {index_name}")
+        return True
+
+    # ------------------------------------------------------------------
+    # 搜索
+    # ------------------------------------------------------------------
+
+    def _split_filter(self, filter_dict: Optional[Dict[str, Any]]) -> Tuple[Optional[List[Any]], bool]:
+        """
+        拆出分区字段的取值
+
+        Returns:
+            Tuple[Optional[List[Any]], bool]: (分区取值列表，None表示所有分区; 是否还有其他过滤条件)
+        """
+        if not filter_dict:
+            return None, False
+        conditions = []
+        for key, condition in filter_dict.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    conditions.extend(sub_filter.items())
+            else:
+                conditions.append((key, condition))
+
+        values, residual = None, False
+        for key, condition in conditions:
+            if key != self.partition_key or values is not None:
+                residual = True
+            elif isinstance(condition, dict) and set(condition) == {"$eq"}:
+                values = [condition["$eq"]]
+            elif isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = list(condition["$in"])
+            elif isinstance(condition, dict):
+                residual = True
+            else:
+                values = [condition]
+        return values, residual
+
+    def _search(
+        self,
+        index: _MemmapIndex,
+        queries: np.ndarray,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include: List[str],
+        metadata_keys: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        近似搜索：在选中的子索引中各取Top-k，按存活和过滤条件筛掉后合并
+
+        结果不足k个时扩大候选数重试；IVF-PQ尚未训练的分区和匹配行较少的复杂过滤走精确计算；
+        子索引存储降维或量化向量时取 top_k × rerank_factor 个候选，用完整向量重新计算距离后取Top-k
+        """
+        if self.index_type == "flat":
+            return super()._search(index, queries, top_k, filter_dict, include, metadata_keys)
+
+        with index.lock:
+            values, residual = self._split_filter(filter_dict)
+            allowed = None
+            if residual:
+                candidates = index.filter_rows(filter_dict)
+                if len(candidates) <= EXACT_FILTER_MAX:
+                    return super()._search(index, queries, top_k, filter_dict, include, metadata_keys)
+                allowed = np.zeros(index.rows, dtype=bool)
+                allowed[candidates] = True
+
+            state = self._sync(index)
+            if allowed is None:
+                allowed = index.alive[:index.rows].copy()
+            if values is None:
+                partitions = list(state.partitions.values())
+            else:
+                partitions = [state.partitions[index.posting_key(value)] for value in values
+                              if index.posting_key(value) in state.partitions]
+
+            query_count = len(queries)
+            wanted = top_k * self.rerank_factor if self.rerank else top_k
+            engine_queries = self._engine_vectors(index, queries)
+            merged: List[List[Tuple[float, int]]] = [[] for _ in range(query_count)]
+            exact_values = []
+            for value, engine, live in partitions:
+                if not engine.ready:
+                    exact_values.append(value)
+                    continue
+                if live <= 0:
+                    continue
+                k = wanted
+                while True:
+                    k = min(k, live)
+                    labels, distances = engine.search(engine_queries, k)
+                    valid = labels >= 0
+                    valid[valid] = allowed[labels[valid]]
+                    if k >= live or valid.sum(axis=1).min() >= wanted:
+                        break
+                    k *= 4
+                for q in range(query_count):
+                    merged[q].extend(zip(distances[q][valid[q]].tolist(), labels[q][valid[q]].tolist()))
+            matrix = index.matrix_view()
+            if self.rerank:
+                merged = self._rerank_merged(index, matrix, queries, merged)
+            results = []
+            for q in range(query_count):
+                best = sorted(merged[q])[:top_k]
+                results.append([format_result(index, matrix, row, distance, include, metadata_keys)
+                                for distance, row in best])
+
+        for value in exact_values:
+            # 未训练的分区较小，精确计算后合并
+            exact_filter = {"$and": [{self.partition_key: value}] + ([filter_dict] if filter_dict else [])}
+            exact = super()._search(index, queries, top_k, exact_filter, include, metadata_keys)
+            for q in range(query_count):
+                results[q] = sorted(results[q] + exact[q], key=lambda result: result['score'])[:top_k]
+        return results
+
+    def _rerank_merged(
+        self,
+        index: _MemmapIndex,
+        matrix: np.ndarray,
+        queries: np.ndarray,
+        merged: List[List[Tuple[float, int]]]
+    ) -> List[List[Tuple[float, int]]]:
+        """用完整向量重新计算各查询候选行的距离（调用方持有index.lock）"""
+        prepared, q_sq = prepare_queries(queries, index.metric)
+        sq_norms = index.sq_norms[:index.rows]
+        reranked = []
+        for q, candidates in enumerate(merged):
+            rows = np.asarray([row for _, row in candidates], dtype=np.int64)
+            sims = rerank_rows(matrix, sq_norms, prepared[q], q_sq[q], rows, index.metric)
+            reranked.append([(to_distance(float(sim), index.metric), int(row))
+                             for sim, row in zip(sims, rows)])
+        return reranked
+
+    def get_index_info(self, index_name: str) -> Dict[str, Any]:
+        """
+        获取索引信息（附加近似索引类型和子索引数）
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            Dict[str, Any]: 索引信息
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        info = super().get_index_info(index_name)
+        info.update({'type': 'ann', 'index_type': self.index_type, 'engine': self.engine})
+        if self.engine != "numpy":
+            info.update({'compact_dimension': self.compact_dimension, 'quantization': self.quantization,
+                         'rerank': self.rerank})
+        state = self.ann_states.get(self._index_dir(index_name))
+        if state is not None:
+            info['partitions'] = len(state.partitions)
+        return info
+
+    def delete_index(self, index_name: str) -> bool:
+        """
+        删除索引及其近似索引文件
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            bool: 删除是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        self.ann_states.pop(self._index_dir(index_name), None)
+        return super().delete_index(index_name)
+
+    def close(self) -> None:
+        """
+        保存有未保存改动的近似索引后释放资源
+        """
+        with self._lock:
+            for index in self.indices.values():
+                state = self.ann_states.get(index.directory)
+                if state is not None and state.dirty and state.generation == index.generation:
+                    try:
+                        with index.lock:
+                            self._save_state(index, state)
+                    except Exception as e:
+                        logger.error(f"保存近似索引失败: {index.directory.name}, 错误: {str(e)}")
+            self.ann_states.clear()
+        super().close()
@@ -0,0 +1,376 @@
+"""
+Chroma远程向量搜索的原生异步连接管理
+维护绑定事件循环的异步Chroma客户端和httpx连接池，限制并发请求数，
+按操作截止时间执行请求并对可重试的错误做带抖动的指数退避，并把并发的小批量添加合并为一个请求
+"""
+
+import asyncio
+import random
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+
+import httpx
+from chromadb.api.async_fastapi import AsyncFastAPI
+from chromadb.errors import ChromaError, InvalidCollectionException
+
+from app.exceptions.vector_exceptions import IndexNotFoundError, VectorSearchTimeoutError
+from app.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 可重试的HTTP状态码（限流、服务端错误、网关错误）
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ChromaRemoteAsyncPool:
+    """
+    异步Chroma客户端、连接池与请求重试
+
+    异步客户端、集合句柄和同步原语都绑定创建时的事件循环，在其他事件循环中使用时重新创建
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Awaitable[Any]],
+        timeout: float = 30,
+        max_connections: int = 16,
+        max_keepalive: Optional[int] = None,
+        operation_timeouts: Optional[Dict[str, float]] = None,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 2.0,
+        add_batch_size: int = 256,
+        add_flush_interval: float = 0.02
+    ):
+        """
+        初始化异步连接管理
+
+        Args:
+            client_factory: 创建异步Chroma客户端的协程函数
+            timeout: 未配置截止时间的操作使用的超时时间（秒）
+            max_connections: 最多同时进行的请求数（连接池大小）
+            max_keepalive: 保持的空闲连接数，默认与max_connections相同
+            operation_timeouts: 操作名 -> 截止时间（秒），包含重试在内的总耗时
+            max_retries: 连接错误、超时和可重试状态码的最大重试次数
+            retry_base_delay: 重试退避基数（秒），第n次重试在 [0, base × 2^(n-1)] 内随机等待
+            retry_max_delay: 单次重试等待的上限（秒）
+            add_batch_size: 合并到一个添加请求的最大向量数，0表示不合并
+            add_flush_interval: 待添加的向量最多等待多久（秒）后发送
+        """
+        self.client_factory = client_factory
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive or max_connections
+        self.operation_timeouts = operation_timeouts or {}
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.add_batch_size = add_batch_size
+        self.add_flush_interval = add_flush_interval
+        self.client = None
+        self.loop = None
+        self.collections = {}
+        self._http = None
+        self._semaphore = None
+        self._lock = None
+        # (索引名, 是否有元数据, 是否有文本) -> 等待合并发送的添加请求
+        self._pending_adds: Dict[Tuple[str, bool, bool], List[Tuple]] = {}
+        self._flush_tasks: Dict[Tuple[str, bool, bool], asyncio.Task] = {}
+        self.stats = {"requests": 0, "retries": 0, "add_batches": 0}
+
+    def _install_http_pool(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        为当前事件循环放入按max_connections/max_keepalive配置的httpx连接池
+
+        chromadb的AsyncFastAPI按事件循环缓存httpx.AsyncClient（类属性，同一事件循环中的异步客户端共用），
+        且不暴露连接池参数；如果当前事件循环已经有连接池，则沿用，只用信号量限制并发请求数
+
+        Args:
+            loop: 当前事件循环
+        """
+        clients = getattr(AsyncFastAPI, '_clients', None)
+        loop_hash = loop.__hash__()
+        if not isinstance(clients, dict) or loop_hash in clients:
+            return
+        self._http = httpx.AsyncClient(
+            timeout=None,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive
+            ),
+            verify=False
+        )
+        clients[loop_hash] = self._http
+
+    async def ensure_client(self):
+        """
+        获取当前事件循环的异步Chroma客户端，首次调用（或事件循环变化）时创建
+
+        Returns:
+            AsyncClientAPI: 异步Chroma客户端
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+            self.client = None
+            self._http = None
+            self.collections = {}
+            self._pending_adds = {}
+            self._flush_tasks = {}
+        if self.client is None:
+            async with self._lock:
+                if self.client is None:
+                    self._install_http_pool(loop)
+                    self.client = await self.client_factory()
+                    logger.info(f"创建异步Chroma客户端，最大连接数: {self.max_connections}")
+        return self.client
+
+    async def get_collection(self, index_name: str):
+        """
+        获取异步集合对象，句柄在首次获取后缓存
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            AsyncCollection: 异步集合对象
+
+        Raises:
+            IndexNotFoundError: 当集合不存在时
+        """
+        client = await self.ensure_client()
+        collection = self.collections.get(index_name)
+        if collection is None:
+            try:
+                collection = await client.get_collection(name=index_name)
+            except InvalidCollectionException:
+                raise IndexNotFoundError(index_name)
+            self.collections[index_name] = collection
+        return collection
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """
+        判断异步请求的错误是否可以重试（连接错误、网络超时、限流和服务端错误）
+
+        Args:
+            error: 请求抛出的异常
+
+        Returns:
+            bool: 是否可以重试
+        """
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        if isinstance(error, ChromaError):
+            return error.code() in RETRYABLE_STATUS
+        return False
+
+    async def _attempt(self, index_name: str, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """
+        在并发请求数限制内执行一次请求（等待连接的时间计入操作截止时间）
+
+        Args:
+            index_name: 索引名称
+            func: 接收异步集合对象、返回请求协程的函数
+
+        Returns:
+            Any: func的返回值
+        """
+        await self.ensure_client()
+        async with self._semaphore:
+            collection = await self.get_collection(index_name)
+            self.stats["requests"] += 1
+            try:
+                return await func(collection)
+            except InvalidCollectionException:
+                # 集合已在服务端被删除，丢弃缓存的句柄
+                self.collections.pop(index_name, None)
+                raise IndexNotFoundError(index_name)
+
+    async def call(self, operation: str, index_name: str, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """
+        在操作截止时间内执行异步请求，可重试的错误按带抖动的指数退避重试
+
+        Args:
+            operation: 操作名称（search / add / delete），用于查找operation_timeouts中的截止时间
+            index_name: 索引名称
+            func: 接收异步集合对象、返回请求协程的函数
+
+        Returns:
+            Any: func的返回值
+
+        Raises:
+            VectorSearchTimeoutError: 包含重试在内超过操作截止时间
+            IndexNotFoundError: 当集合不存在时
+        """
+        loop = asyncio.get_running_loop()
+        timeout = self.operation_timeouts.get(operation, self.timeout)
+        deadline = loop.time() + timeout
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(self._attempt(index_name, func), deadline - loop.time())
+            except asyncio.TimeoutError:
+                logger.error(f"远程{operation}操作超过截止时间 {timeout}秒，索引: {index_name}")
+                raise VectorSearchTimeoutError(
+                    f"远程{operation}操作超过截止时间 {timeout}秒",
+                    operation=operation, index_name=index_name, timeout=timeout
+                )
+            except Exception as e:
+                if not self.is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                # 全抖动退避：并发请求同时失败时错开重试时间
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+                if loop.time() + delay >= deadline:
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"远程{operation}请求失败，{delay:.2f}秒后重试 (尝试 {attempt}/{self.max_retries}): {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def add(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        texts: Optional[List[str]]
+    ) -> bool:
+        """
+        添加向量：并发调用的小批量添加（同一索引，且同样带或不带元数据、文本）合并为一个请求，
+        累计达到add_batch_size或等待add_flush_interval后发送，所有调用在请求完成后返回
+
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+
+        Returns:
+            bool: 添加是否成功
+        """
+        loop = asyncio.get_running_loop()
+        await self.ensure_client()
+        if self.add_batch_size <= 0 or len(ids) >= self.add_batch_size:
+            await self._send_adds(index_name, vectors, ids, metadatas or None, texts)
+            return True
+
+        key = (index_name, bool(metadatas), texts is not None)
+        pending = self._pending_adds.get(key, [])
+        # 同一批次中ID重复会导致整批失败，先发送已有的部分
+        pending_ids = {vector_id for item in pending for vector_id in item[1]}
+        if any(vector_id in pending_ids for vector_id in ids):
+            await self._flush_adds(key)
+
+        future = loop.create_future()
+        pending = self._pending_adds.setdefault(key, [])
+        pending.append((vectors, ids, metadatas or None, texts, future))
+        if sum(len(item[1]) for item in pending) >= self.add_batch_size:
+            await self._flush_adds(key)
+        elif key not in self._flush_tasks:
+            self._flush_tasks[key] = loop.create_task(self._flush_later(key))
+        return await future
+
+    async def _send_adds(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        texts: Optional[List[str]]
+    ) -> None:
+        """
+        发送一个添加请求
+
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+        """
+        await self.call("add", index_name, lambda collection: collection.add(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=metadatas,
+            documents=texts
+        ))
+        self.stats["add_batches"] += 1
+        logger.debug(f"异步添加 {len(ids)} 个向量到远程索引: {index_name}")
+
+    async def _flush_later(self, key: Tuple[str, bool, bool]) -> None:
+        """
+        等待add_flush_interval后发送累积的添加请求
+
+        Args:
+            key: (索引名, 是否有元数据, 是否有文本)
+        """
+        await asyncio.sleep(self.add_flush_interval)
+        await self._flush_adds(key)
+
+    async def _flush_adds(self, key: Tuple[str, bool, bool]) -> None:
+        """
+        把累积的添加请求合并发送，并通知等待的调用方（失败时每个调用方都收到同一个异常）
+
+        Args:
+            key: (索引名, 是否有元数据, 是否有文本)
+        """
+        batch = self._pending_adds.pop(key, None)
+        task = self._flush_tasks.pop(key, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        if not batch:
+            return
+
+        index_name, has_metadatas, has_texts = key
+        vectors, ids, metadatas, texts = [], [], [], []
+        for item_vectors, item_ids, item_metadatas, item_texts, _ in batch:
+            vectors.extend(item_vectors)
+            ids.extend(item_ids)
+            if has_metadatas:
+                metadatas.extend(item_metadatas)
+            if has_texts:
+                texts.extend(item_texts)
+
+        try:
+            await self._send_adds(index_name, vectors, ids, metadatas if has_metadatas else None,
+                                  texts if has_texts else None)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_result(True)
+
+    async def flush(self, index_name: Optional[str] = None) -> None:
+        """
+        发送尚未发送的添加请求
+
+        Args:
+            index_name: 只发送该索引的请求，为空时发送全部
+        """
+        for key in [key for key in self._pending_adds if index_name is None or key[0] == index_name]:
+            await self._flush_adds(key)
+
+    async def aclose(self) -> None:
+        """
+        发送尚未发送的添加请求，关闭当前事件循环的连接池
+        """
+        if self.loop is asyncio.get_running_loop():
+            await self.flush()
+            if self._http is not None:
+                clients = getattr(AsyncFastAPI, '_clients', {})
+                loop_hash = self.loop.__hash__()
+                if clients.get(loop_hash) is self._http:
+                    del clients[loop_hash]
+                await self._http.aclose()
+        self.client = None
+        self._http = None
+        self.loop = None
+        self.collections = {}
@@ -1,172 +1,53 @@
 """
 基于Chroma远程服务器的向量搜索实现
 提供Chroma远程向量数据库的操作接口，使用外部embedding服务
-"""
 
-import asyncio
-from typing import List, Dict, Any, Optional
+连接和索引管理见chroma_remote_index_abstract，原生异步模式的连接池和重试见chroma_remote_async_manage
+"""
 
-import chromadb
-from chromadb.config import Settings
+from typing import List, Dict, Any, Iterator, Optional, Callable, Awaitable
 
 from app.exceptions.vector_exceptions import (
     IndexNotFoundError,
-    IndexAlreadyExistsError,
-    DimensionMismatchError,
     InvalidVectorError,
-    VectorSearchConnectionError,
-    VectorStoreConnectionError,
     QueryError,
-    IndexOperationError,
     VectorOperationError,
-    MetadataError
+    VectorSearchTimeoutError
 )
 from app.utils.logging_utils import get_logger
-from app.vector.vector_search_abstract import VectorSearchBase
-from app.embedding.embedding_service import EmbeddingService
+from app.vector.chroma_remote_index_abstract import ChromaRemoteIndexBase
 
 logger = get_logger(__name__)
 
 
-class ChromaRemoteVectorSearch(VectorSearchBase):
+class ChromaRemoteVectorSearch(ChromaRemoteIndexBase):
     """
     基于Chroma远程服务器的向量搜索实现
     使用外部embedding服务，不依赖Chroma内置的embedding功能
     """
 
-    def __init__(self, **kwargs):
-        """
-        初始化Chroma远程向量搜索客户端
-        
-        Args:
-            **kwargs:
-                host: 远程服务器主机地址 (必需)
-                port: 远程服务器端口号 (必需)
-                collection_name: 默认集合名称
-                metric: 距离度量方式，如 'cosine', 'l2', 'ip'
-                timeout: 超时时间（秒）
-                auth_provider: 认证提供者
-                auth_credentials: 认证凭据
-                anonymized_telemetry: 是否启用匿名遥测
-                embedding_service: EmbeddingService实例（可选，如果不提供则自动创建）
-        """
-        try:
-            # 必需参数验证
-            self.host = kwargs.get('host')
-            self.port = kwargs.get('port')
-            
-            if not self.host or not self.port:
-                raise ValueError("远程Chroma服务器需要指定host和port参数")
-            
-            # 配置参数
-            self.metric = kwargs.get('metric', 'cosine')
-            self.timeout = kwargs.get('timeout', 30)
-            anonymized_telemetry = kwargs.get('anonymized_telemetry', False)
-            
-            # 创建远程Chroma客户端
-            self.client = chromadb.HttpClient(
-                host=self.host,
-                port=self.port,
-                settings=Settings(
-                    anonymized_telemetry=anonymized_telemetry,
-                    chroma_client_auth_provider=kwargs.get('auth_provider'),
-                    chroma_client_auth_credentials=kwargs.get('auth_credentials'),
-                )
-            )
-            
-            logger.info(f"连接到远程Chroma服务: {self.host}:{self.port}")
-            
-            # 获取或创建embedding服务
-            self.embedding_service = kwargs.get('embedding_service')
-            if not self.embedding_service:
-                self.embedding_service = EmbeddingService()
-                logger.info("自动创建EmbeddingService实例")
-            
-            # 存储集合映射
-            self.collections = {}
-            
-        except Exception as e:
-            logger.error(f"初始化Chroma远程客户端失败: {str(e)}")
-            raise VectorSearchConnectionError(f"无法初始化Chroma远程客户端: {str(e)}")
-
-    def _get_collection(self, index_name: str) -> chromadb.Collection:
-        """
-        获取或创建集合
-        
-        Args:
-            index_name: 索引名称
-            
-        Returns:
-            chromadb.Collection: 集合对象
-            
-        Raises:
-            IndexNotFoundError: 当集合不存在时
+    def _write(
+        self,
+        operation: str,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        texts: Optional[List[str]]
+    ) -> None:
         """
-        try:
-            if index_name in self.collections:
-                return self.collections[index_name]
-            
-            # 检查集合是否存在
-            collections = self.client.list_collections()
-            collection_names = [col.name for col in collections]
-            
-            if index_name in collection_names:
-                # 获取现有集合（不指定embedding_function）
-                collection = self.client.get_collection(name=index_name)
-                self.collections[index_name] = collection
-                return collection
-            else:
-                raise IndexNotFoundError(index_name)
-                
-        except IndexNotFoundError:
-            raise
-        except Exception as e:
-            logger.error(f"获取集合失败: {str(e)}")
-            raise VectorStoreConnectionError(f"获取集合失败: {str(e)}")
+        校验参数后调用集合的add / update / upsert
 
-    def create_index(self, index_name: str, dimension: int, **kwargs) -> bool:
-        """
-        创建向量索引（Chroma中称为集合）
-        
-        Args:
-            index_name: 索引名称
-            dimension: 向量维度
-            **kwargs: 其他索引配置参数
-                metadata: 索引元数据
-                
-        Returns:
-            bool: 创建是否成功
-            
         Raises:
-            IndexAlreadyExistsError: 当索引已存在时
-        """
-        try:
-            # 检查索引是否已存在
-            collections = self.client.list_collections()
-            collection_names = [col.name for col in collections]
-            
-            if index_name in collection_names:
-                raise IndexAlreadyExistsError(index_name)
-            
-            # 创建集合（不指定embedding_function，使用外部embedding）
-            metadata = kwargs.get('metadata', {})
-            metadata["hnsw:space"] = kwargs.get('metric', self.metric)
-            metadata["dimension"] = dimension
-            
-            # 创建集合时不提供embedding_function
-            self.client.create_collection(
-                name=index_name,
-                metadata=metadata
-            )
-            
-            logger.info(f"成功创建远程索引: {index_name}，维度: {dimension}")
-            return True
-            
-        except IndexAlreadyExistsError:
-            raise
-        except Exception as e:
-            logger.error(f"创建远程索引失败: {str(e)}")
-            raise IndexOperationError(f"create远程索引操作失败: {str(e)}", operation="create", index_name=index_name)
+            IndexNotFoundError: 当索引不存在时
+            InvalidVectorError: 当向量与ID或元数据数量不匹配时
+        """
+        collection = self._get_collection(index_name)
+        if len(vectors) != len(ids):
+            raise InvalidVectorError("向量和ID数量不匹配")
+        if metadatas and len(metadatas) != len(vectors):
+            raise InvalidVectorError("元数据数量与向量数量不匹配")
+        getattr(collection, operation)(embeddings=vectors, ids=ids, metadatas=metadatas, documents=texts)
 
     def add_vectors(
         self,
@@ -192,24 +73,7 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
             bool: 添加是否成功
         """
         try:
-            # 获取集合
-            collection = self._get_collection(index_name)
-            
-            # 验证输入参数
-            if len(vectors) != len(ids):
-                raise InvalidVectorError("向量和ID数量不匹配")
-            
-            if metadatas and len(metadatas) != len(vectors):
-                raise InvalidVectorError("元数据数量与向量数量不匹配")
-            
-            # 添加向量到集合
-            collection.add(
-                embeddings=vectors,
-                ids=ids,
-                metadatas=metadatas,
-                documents=texts
-            )
-            
+            self._write("add", index_name, vectors, ids, metadatas, texts)
             logger.info(f"成功添加 {len(vectors)} 个向量到远程索引: {index_name}")
             return True
             
@@ -252,22 +116,7 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
                 include=["metadatas", "documents", "distances"]
             )
             
-            # 格式化结果
-            formatted_results = []
-            
-            if results['ids'] and results['ids'][0]:
-                for i, vector_id in enumerate(results['ids'][0]):
-                    result = {
-                        "id": vector_id,
-                        "score": 1.0 - results['distances'][0][i] if results['distances'] and results['distances'][0] else 0.0,  # 转换为相似度分数
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                    }
-                    
-                    # 如果有文档内容，也包含在结果中
-                    if results['documents'] and results['documents'][0] and i < len(results['documents'][0]):
-                        result["text"] = results['documents'][0][i]
-                    
-                    formatted_results.append(result)
+            formatted_results = self._format_query_results(results)
             
             logger.info(f"远程向量搜索完成，索引: {index_name}，返回 {len(formatted_results)} 个结果")
             return formatted_results
@@ -278,6 +127,35 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
             logger.error(f"远程向量搜索失败: {str(e)}")
             raise QueryError(f"远程向量搜索失败: {str(e)}", query=f"index:{index_name}")
 
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        把Chroma单个查询的返回值转换为搜索结果列表
+        
+        Args:
+            results: collection.query的返回值（只包含一个查询向量）
+            
+        Returns:
+            List[Dict[str, Any]]: 搜索结果列表
+        """
+        formatted_results = []
+        
+        if results['ids'] and results['ids'][0]:
+            for i, vector_id in enumerate(results['ids'][0]):
+                result = {
+                    "id": vector_id,
+                    "score": 1.0 - results['distances'][0][i] if results['distances'] and results['distances'][0] else 0.0,  # 转换为相似度分数
+                    "metadata": results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
+                }
+                
+                # 如果有文档内容，也包含在结果中
+                if results['documents'] and results['documents'][0] and i < len(results['documents'][0]):
+                    result["text"] = results['documents'][0][i]
+                
+                formatted_results.append(result)
+        
+        return formatted_results
+
     def delete_vectors(self, index_name: str, ids: List[str]) -> bool:
         """
         删除向量
@@ -327,24 +205,7 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
             bool: 更新是否成功
         """
         try:
-            # 获取集合
-            collection = self._get_collection(index_name)
-            
-            # 验证输入参数
-            if len(vectors) != len(ids):
-                raise InvalidVectorError("向量和ID数量不匹配")
-            
-            if metadatas and len(metadatas) != len(vectors):
-                raise InvalidVectorError("元数据数量与向量数量不匹配")
-            
-            # 更新向量
-            collection.update(
-                embeddings=vectors,
-                ids=ids,
-                metadatas=metadatas,
-                documents=texts
-            )
-            
+            self._write("update", index_name, vectors, ids, metadatas, texts)
             logger.info(f"成功更新远程索引 {index_name} 中的 {len(vectors)} 个向量")
             return True
             
@@ -354,6 +215,81 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
             logger.error(f"更新远程索引中的向量失败: {str(e)}")
             raise VectorOperationError(f"update向量在远程索引操作失败: {str(e)}", operation="update", index_name=index_name)
 
+    def upsert_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        写入向量，已存在的ID覆盖，不存在的新增
+        
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表（已生成的向量）
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+            
+        Returns:
+            bool: 写入是否成功
+        """
+        try:
+            self._write("upsert", index_name, vectors, ids, metadatas, texts)
+            logger.info(f"成功写入远程索引 {index_name} 中的 {len(vectors)} 个向量")
+            return True
+            
+        except IndexNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"写入远程索引中的向量失败: {str(e)}")
+            raise VectorOperationError(f"upsert向量在远程索引操作失败: {str(e)}", operation="upsert", index_name=index_name)
+
+    def scan_vectors(
+        self,
+        index_name: str,
+        batch_size: int = 1000,
+        include_vectors: bool = True,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按批遍历远程索引中的全部向量（迁移集合时使用）
+        
+        Args:
+            index_name: 索引名称
+            batch_size: 每批返回的向量数
+            include_vectors: 是否包含向量数据
+            
+        Yields:
+            List[Dict[str, Any]]: 一批向量信息，每项包含id、vector、metadata、text
+        """
+        collection = self._get_collection(index_name)
+        include = ['metadatas', 'documents'] + (['embeddings'] if include_vectors else [])
+        offset = 0
+        while True:
+            try:
+                results = collection.get(limit=batch_size, offset=offset, include=include)
+            except Exception as e:
+                logger.error(f"遍历远程索引向量失败: {str(e)}")
+                raise VectorOperationError(f"scan远程索引操作失败: {str(e)}", operation="scan", index_name=index_name)
+            
+            ids = results['ids']
+            if not ids:
+                return
+            embeddings = results.get('embeddings') if include_vectors else None
+            yield [
+                {
+                    'id': vec_id,
+                    'vector': (embeddings[i].tolist() if hasattr(embeddings[i], 'tolist') else list(embeddings[i]))
+                    if embeddings is not None else None,
+                    'metadata': results['metadatas'][i],
+                    'text': results['documents'][i]
+                }
+                for i, vec_id in enumerate(ids)
+            ]
+            offset += len(ids)
+
     def get_vectors(
         self,
         index_name: str,
@@ -407,8 +343,9 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
                     if include_texts and results['documents'] and i < len(results['documents']):
                         result["text"] = results['documents'][i]
                     
-                    if include_vectors and results['embeddings'] and i < len(results['embeddings']):
-                        result["vector"] = results['embeddings'][i]
+                    if include_vectors and results['embeddings'] is not None and i < len(results['embeddings']):
+                        vector = results['embeddings'][i]
+                        result["vector"] = vector.tolist() if hasattr(vector, 'tolist') else vector
                     
                     formatted_results.append(result)
             
@@ -421,278 +358,129 @@ class ChromaRemoteVectorSearch(VectorSearchBase):
             logger.error(f"从远程索引获取向量信息失败: {str(e)}")
             raise VectorOperationError(f"get向量信息从远程索引失败: {str(e)}", operation="get", index_name=index_name)
 
-    def get_index_info(self, index_name: str) -> Dict[str, Any]:
-        """
-        获取索引信息
-        
-        Args:
-            index_name: 索引名称
-            
-        Returns:
-            Dict[str, Any]: 索引信息
-        """
-        try:
-            # 获取集合
-            collection = self._get_collection(index_name)
-            
-            # 获取集合统计信息
-            count = collection.count()
-            
-            info = {
-                "name": index_name,
-                "count": count,
-                "dimension": None,  # Chroma不直接提供维度信息
-                "metric": self.metric
-            }
-            
-            # 尝试从元数据获取维度信息
-            if hasattr(collection, 'metadata') and collection.metadata:
-                info["dimension"] = collection.metadata.get("dimension")
-            
-            logger.info(f"成功获取远程索引 {index_name} 的信息: {info}")
-            return info
-            
-        except IndexNotFoundError:
-            raise
-        except Exception as e:
-            logger.error(f"获取远程索引信息失败: {str(e)}")
-            raise VectorOperationError(f"获取远程索引信息失败: {str(e)}", operation="info", index_name=index_name)
+    # ==================== 原生异步接口 ====================
 
-    def list_indices(self) -> List[str]:
-        """
-        列出所有索引
-        
-        Returns:
-            List[str]: 索引名称列表
-        """
-        try:
-            collections = self.client.list_collections()
-            index_names = [col.name for col in collections]
-            
-            logger.info(f"成功列出 {len(index_names)} 个远程索引")
-            return index_names
-            
-        except Exception as e:
-            logger.error(f"列出远程索引失败: {str(e)}")
-            raise VectorOperationError(f"列出远程索引失败: {str(e)}", operation="list")
+    @property
+    def async_stats(self) -> Dict[str, int]:
+        """异步模式的请求数、重试次数和合并后的添加请求数"""
+        return self._async_pool.stats
 
-    def delete_index(self, index_name: str) -> bool:
-        """
-        删除索引
-        
-        Args:
-            index_name: 索引名称
-            
-        Returns:
-            bool: 删除是否成功
-        """
-        try:
-            # 检查索引是否存在
-            self._get_collection(index_name)
-            
-            # 删除索引
-            self.client.delete_collection(name=index_name)
-            
-            # 从缓存中移除
-            if index_name in self.collections:
-                del self.collections[index_name]
-            
-            logger.info(f"成功删除远程索引: {index_name}")
-            return True
-            
-        except IndexNotFoundError:
-            raise
-        except Exception as e:
-            logger.error(f"删除远程索引失败: {str(e)}")
-            raise VectorOperationError(f"删除远程索引失败: {str(e)}", operation="delete", index_name=index_name)
+    async def _acall(self, operation: str, index_name: str, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """在操作截止时间内执行异步请求，可重试的错误按退避重试（见ChromaRemoteAsyncPool.call）"""
+        return await self._async_pool.call(operation, index_name, func)
 
-    def count_vectors(self, index_name: str) -> int:
+    async def asearch_vectors(
+        self,
+        index_name: str,
+        query_vector: List[float],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
         """
-        统计索引中的向量数量
+        异步搜索相似向量（使用原生异步HTTP客户端）
         
         Args:
             index_name: 索引名称
+            query_vector: 查询向量
+            top_k: 返回结果数量
+            filter_dict: 过滤条件
+            **kwargs: 其他搜索参数
             
         Returns:
-            int: 向量数量
+            List[Dict[str, Any]]: 搜索结果列表
         """
         try:
-            collection = self._get_collection(index_name)
-            count = collection.count()
-            
-            logger.info(f"远程索引 {index_name} 中的向量数量: {count}")
-            return count
+            results = await self._acall("search", index_name, lambda collection: collection.query(
+                query_embeddings=[query_vector],
+                n_results=top_k,
+                where=filter_dict,
+                include=["metadatas", "documents", "distances"]
+            ))
+            return self._format_query_results(results)
             
-        except IndexNotFoundError:
+        except (IndexNotFoundError, VectorSearchTimeoutError):
             raise
         except Exception as e:
-            logger.error(f"统计远程索引向量数量失败: {str(e)}")
-            raise VectorOperationError(f"统计远程索引向量数量失败: {str(e)}", operation="count", index_name=index_name)
+            logger.error(f"异步远程向量搜索失败: {str(e)}")
+            raise QueryError(f"异步远程向量搜索失败: {str(e)}", query=f"index:{index_name}")
 
-    def close(self) -> None:
-        """
-        关闭连接，释放资源
-        """
-        try:
-            # Chroma HTTP客户端没有显式的close方法
-            self.collections.clear()
-            logger.info("Chroma远程客户端连接已关闭")
-        except Exception as e:
-            logger.error(f"关闭Chroma远程客户端连接失败: {str(e)}")
-
-    # ==================== 便捷方法 ====================
-    
-    def add_texts(
+    async def aadd_vectors(
         self,
         index_name: str,
-        texts: List[str],
+        vectors: List[List[float]],
         ids: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
         **kwargs
     ) -> bool:
         """
-        添加文本（自动调用embedding服务生成向量）
+        异步添加向量，并发调用的小批量添加合并为一个请求（见ChromaRemoteAsyncPool.add）
         
         Args:
             index_name: 索引名称
-            texts: 文本列表
-            ids: 文本ID列表
+            vectors: 向量列表
+            ids: 向量ID列表
             metadatas: 元数据列表
+            texts: 原始文本列表
             **kwargs: 其他参数
-                
+            
         Returns:
             bool: 添加是否成功
         """
         try:
-            # 批量生成嵌入向量
-            embeddings = self.embedding_service.embed_batch(texts)
+            if len(vectors) != len(ids):
+                raise InvalidVectorError("向量和ID数量不匹配")
             
-            # 添加向量
-            return self.add_vectors(
-                index_name=index_name,
-                vectors=embeddings,
-                ids=ids,
-                metadatas=metadatas,
-                texts=texts
-            )
+            if metadatas and len(metadatas) != len(vectors):
+                raise InvalidVectorError("元数据数量与向量数量不匹配")
             
+            if not ids:
+                return True
+            return await self._async_pool.add(index_name, vectors, ids, metadatas, texts)
+            
+        except (IndexNotFoundError, VectorSearchTimeoutError):
+            raise
         except Exception as e:
-            logger.error(f"添加文本到远程索引失败: {str(e)}")
-            raise VectorOperationError(f"添加文本到远程索引失败: {str(e)}", operation="add_texts", index_name=index_name)
+            logger.error(f"异步添加向量到远程索引失败: {str(e)}")
+            raise VectorOperationError(f"异步add向量到远程索引操作失败: {str(e)}", operation="add", index_name=index_name)
 
-    async def aadd_texts(
-        self,
-        index_name: str,
-        texts: List[str],
-        ids: List[str],
-        metadatas: Optional[List[Dict[str, Any]]] = None,
-        **kwargs
-    ) -> bool:
+    async def adelete_vectors(self, index_name: str, ids: List[str]) -> bool:
         """
-        异步添加文本（自动调用embedding服务生成向量）
+        异步删除向量（先发送该索引尚未发送的添加请求）
         
         Args:
             index_name: 索引名称
-            texts: 文本列表
-            ids: 文本ID列表
-            metadatas: 元数据列表
-            **kwargs: 其他参数
-                
+            ids: 要删除的向量ID列表
+            
         Returns:
-            bool: 添加是否成功
+            bool: 删除是否成功
         """
         try:
-            # 异步生成嵌入向量
-            embeddings = []
-            for text in texts:
-                embedding = await self.embedding_service.aembed_text(text)
-                embeddings.append(embedding)
-            
-            # 在事件循环中运行同步添加方法
-            return await asyncio.to_thread(
-                self.add_vectors,
-                index_name=index_name,
-                vectors=embeddings,
-                ids=ids,
-                metadatas=metadatas,
-                texts=texts
-            )
+            await self._async_pool.ensure_client()
+            await self._async_pool.flush(index_name)
+            await self._acall("delete", index_name, lambda collection: collection.delete(ids=ids))
+            logger.info(f"成功从远程索引 {index_name} 异步删除 {len(ids)} 个向量")
+            return True
             
+        except (IndexNotFoundError, VectorSearchTimeoutError):
+            raise
         except Exception as e:
-            logger.error(f"异步添加文本到远程索引失败: {str(e)}")
-            raise VectorOperationError(f"异步添加文本到远程索引失败: {str(e)}", operation="aadd_texts", index_name=index_name)
+            logger.error(f"从远程索引异步删除向量失败: {str(e)}")
+            raise VectorOperationError(f"异步delete向量从远程索引操作失败: {str(e)}", operation="delete", index_name=index_name)
 
-    def search_texts(
-        self,
-        index_name: str,
-        query_text: str,
-        top_k: int = 10,
-        filter_dict: Optional[Dict[str, Any]] = None,
-        **kwargs
-    ) -> List[Dict[str, Any]]:
+    async def aflush(self) -> None:
         """
-        搜索相似文本（自动调用embedding服务生成查询向量）
-        
-        Args:
-            index_name: 索引名称
-            query_text: 查询文本
-            top_k: 返回结果数量
-            filter_dict: 过滤条件
-            **kwargs: 其他搜索参数
-            
-        Returns:
-            List[Dict[str, Any]]: 搜索结果列表
+        发送所有尚未发送的异步添加请求
         """
-        try:
-            # 生成查询向量
-            query_embedding = self.embedding_service.embed_text(query_text)
-            
-            # 执行向量搜索
-            return self.search_vectors(
-                index_name=index_name,
-                query_vector=query_embedding,
-                top_k=top_k,
-                filter_dict=filter_dict
-            )
-            
-        except Exception as e:
-            logger.error(f"远程文本搜索失败: {str(e)}")
-            raise QueryError(f"远程文本搜索失败: {str(e)}", query=query_text)
+        await self._async_pool.flush()
 
-    async def asearch_texts(
-        self,
-        index_name: str,
-        query_text: str,
-        top_k: int = 10,
-        filter_dict: Optional[Dict[str, Any]] = None,
-        **kwargs
-    ) -> List[Dict[str, Any]]:
+    async def aclose(self) -> None:
         """
-        异步搜索相似文本（自动调用embedding服务生成查询向量）
-        
-        Args:
-            index_name: 索引名称
-            query_text: 查询文本
-            top_k: 返回结果数量
-            filter_dict: 过滤条件
-            **kwargs: 其他搜索参数
-            
-        Returns:
-            List[Dict[str, Any]]: 搜索结果列表
+        发送尚未发送的添加请求，关闭异步客户端的连接池
         """
         try:
-            # 异步生成查询向量
-            query_embedding = await self.embedding_service.aembed_text(query_text)
-            
-            # 在事件循环中运行同步搜索方法
-            return await asyncio.to_thread(
-                self.search_vectors,
-                index_name=index_name,
-                query_vector=query_embedding,
-                top_k=top_k,
-                filter_dict=filter_dict
-            )
-            
+            await self._async_pool.aclose()
+            logger.info("Chroma远程异步客户端已关闭")
         except Exception as e:
-            logger.error(f"异步远程文本搜索失败: {str(e)}")
-            raise QueryError(f"异步远程文本搜索失败: {str(e)}", query=query_text)
\ No newline at end of file
+            logger.error(f"关闭Chroma远程异步客户端失败: {str(e)}")
@@ -5,10 +5,11 @@
 
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
 import chromadb
 from chromadb.config import Settings
+from chromadb.errors import InvalidCollectionException
 
 from app.exceptions.vector_exceptions import (
     IndexNotFoundError,
@@ -23,7 +24,7 @@ from app.exceptions.vector_exceptions import (
     MetadataError
 )
 from app.utils.logging_utils import get_logger
-from app.vector.vector_search_abstract import VectorSearchBase
+from app.vector.vector_search_abstract import DEFAULT_SEARCH_INCLUDE, VectorSearchBase
 
 logger = get_logger(__name__)
 
@@ -48,6 +49,8 @@ class ChromaVectorSearch(VectorSearchBase):
                 embedding_function: 嵌入函数（可选）
                 timeout: 超时时间（秒）
                 anonymized_telemetry: 是否启用匿名遥测
+                hnsw_m / hnsw_ef_construction / hnsw_ef_search: 新建集合的HNSW参数，为空时使用Chroma默认值
+                index_hnsw: 索引名（或后缀，如 'entity'） -> 覆盖的HNSW参数
         """
         try:
             # 配置参数
@@ -56,6 +59,12 @@ class ChromaVectorSearch(VectorSearchBase):
             port = kwargs.get('port')
             self.metric = kwargs.get('metric', 'cosine')
             self.timeout = kwargs.get('timeout', 30)
+            self.hnsw_params = {
+                'hnsw_m': kwargs.get('hnsw_m'),
+                'hnsw_ef_construction': kwargs.get('hnsw_ef_construction'),
+                'hnsw_ef_search': kwargs.get('hnsw_ef_search'),
+            }
+            self.index_hnsw = kwargs.get('index_hnsw') or {}
             anonymized_telemetry = kwargs.get('anonymized_telemetry', False)
             
             # 确保路径存在
@@ -95,7 +104,7 @@ class ChromaVectorSearch(VectorSearchBase):
 
     def _get_collection(self, index_name: str) -> chromadb.Collection:
         """
-        获取或创建集合
+        获取集合，集合句柄在创建或首次获取后缓存
         
         Args:
             index_name: 索引名称
@@ -107,23 +116,17 @@ class ChromaVectorSearch(VectorSearchBase):
             IndexNotFoundError: 当集合不存在时
         """
         try:
-            if index_name in self.collections:
-                return self.collections[index_name]
-            
-            # 检查集合是否存在
-            collections = self.client.list_collections()
-            collection_names = [col.name for col in collections]
-            
-            if index_name in collection_names:
-                # 获取现有集合
-                collection = self.client.get_collection(name=index_name)
-                self.collections[index_name] = collection
+            collection = self.collections.get(index_name)
+            if collection is not None:
                 return collection
-            else:
-                raise IndexNotFoundError(index_name)
+            
+            # 直接按名称获取，不存在时Chroma抛出InvalidCollectionException（不必先列出全部集合）
+            collection = self.client.get_collection(name=index_name)
+            self.collections[index_name] = collection
+            return collection
                 
-        except IndexNotFoundError:
-            raise
+        except InvalidCollectionException:
+            raise IndexNotFoundError(index_name)
         except Exception as e:
             logger.error(f"获取集合失败: {str(e)}")
             raise VectorStoreConnectionError(f"获取集合失败: {str(e)}")
@@ -138,6 +141,7 @@ class ChromaVectorSearch(VectorSearchBase):
             **kwargs: 其他索引配置参数
                 embedding_function: 嵌入函数
                 metadata: 索引元数据
+                hnsw_m / hnsw_ef_construction / hnsw_ef_search: 覆盖配置中的HNSW参数
                 
         Returns:
             bool: 创建是否成功
@@ -157,10 +161,12 @@ class ChromaVectorSearch(VectorSearchBase):
             metadata = kwargs.get('metadata', {})
             metadata["hnsw:space"] = kwargs.get('metric', self.metric)
             metadata["dimension"] = dimension
+            # HNSW参数在集合创建后不能修改，调整后需要重建集合
+            metadata.update(self._hnsw_metadata(index_name, **kwargs))
             
             embedding_function = kwargs.get('embedding_function')
             
-            self.client.create_collection(
+            self.collections[index_name] = self.client.create_collection(
                 name=index_name,
                 metadata=metadata,
                 embedding_function=embedding_function
@@ -175,6 +181,22 @@ class ChromaVectorSearch(VectorSearchBase):
             logger.error(f"创建索引失败: {str(e)}")
             raise IndexOperationError(f"create操作失败: {str(e)}", operation="create", index_name=index_name)
 
+    def _hnsw_metadata(self, index_name: str, **kwargs) -> Dict[str, int]:
+        """
+        新建集合的HNSW参数：create_index参数 > 按索引覆盖 > 全局配置
+
+        Args:
+            index_name: 索引名称
+            **kwargs: create_index的参数
+
+        Returns:
+            Dict[str, int]: Chroma集合元数据中的 hnsw:M / hnsw:construction_ef / hnsw:search_ef
+        """
+        params = {**self.hnsw_params, **self._index_overrides(index_name, self.index_hnsw)}
+        params.update({key: kwargs[key] for key in self.hnsw_params if kwargs.get(key) is not None})
+        keys = {'hnsw_m': 'hnsw:M', 'hnsw_ef_construction': 'hnsw:construction_ef', 'hnsw_ef_search': 'hnsw:search_ef'}
+        return {keys[key]: int(value) for key, value in params.items() if key in keys and value is not None}
+
     def add_vectors(
         self,
         index_name: str,
@@ -267,10 +289,12 @@ class ChromaVectorSearch(VectorSearchBase):
             top_k: 返回结果数量
             filter_dict: 过滤条件
             **kwargs: 其他搜索参数
-                include: 要包含的字段，如 ['embeddings', 'metadatas', 'documents']
+                include: 要包含的字段，默认只取 ['metadatas', 'distances']，
+                    需要向量或原始文本时加入 'embeddings' / 'documents'（或之后用get_vectors按ID获取）
+                metadata_keys: 只返回这些元数据字段，为空时返回全部
                 
         Returns:
-            List[Dict[str, Any]]: 搜索结果列表，每个结果包含id、向量、元数据、文档、相似度分数等
+            List[Dict[str, Any]]: 搜索结果列表，每个结果包含id和距离，以及include中请求的元数据、向量、文档
             
         Raises:
             IndexNotFoundError: 当索引不存在时
@@ -290,7 +314,8 @@ class ChromaVectorSearch(VectorSearchBase):
             logger.debug(f"查询向量验证通过: 维度={len(query_vector)}")
             
             # 设置包含字段
-            include = kwargs.get('include', ['embeddings', 'metadatas', 'documents', 'distances'])
+            include = kwargs.get('include', DEFAULT_SEARCH_INCLUDE)
+            metadata_keys = kwargs.get('metadata_keys')
             
             # 执行搜索
             logger.debug(f"执行Chroma查询: n_results={top_k}, filter={filter_dict}")
@@ -316,34 +341,38 @@ class ChromaVectorSearch(VectorSearchBase):
             logger.debug(f"Chroma查询完成: results.keys()={list(results.keys())}")
             
             # 检查搜索结果
-            if 'ids' not in results or results['ids'] is None or len(results['ids'][0]) == 0:
+            if not results.get('ids') or len(results['ids'][0]) == 0:
                 logger.debug("搜索结果为空")
                 return []
             
-            # 格式化结果
+            # 格式化结果（每个字段只判断一次）
+            ids = results['ids'][0]
+            distances = results['distances'][0] if results.get('distances') else None
+            embeddings = results['embeddings'][0] if 'embeddings' in include and results.get('embeddings') is not None \
+                else None
+            metadatas = results['metadatas'][0] if results.get('metadatas') else None
+            documents = results['documents'][0] if results.get('documents') else None
+            
             formatted_results = []
-            for i in range(len(results['ids'][0])):
-                result = {
-                    'id': results['ids'][0][i],
-                    'score': results['distances'][0][i] if 'distances' in results and results['distances'] is not None else None
-                }
-                
-                if 'embeddings' in results and results['embeddings'] is not None and len(results['embeddings']) > 0 and results['embeddings'][0] is not None:
-                    result['vector'] = results['embeddings'][0][i]
-                
-                if 'metadatas' in results and results['metadatas'] is not None and len(results['metadatas']) > 0 and results['metadatas'][0] is not None:
-                    result['metadata'] = results['metadatas'][0][i]
-                
-                if 'documents' in results and results['documents'] is not None and len(results['documents']) > 0 and results['documents'][0] is not None:
-                    result['text'] = results['documents'][0][i]
-                
+            for i, vector_id in enumerate(ids):
+                result = {'id': vector_id, 'score': distances[i] if distances is not None else None}
+                if embeddings is not None:
+                    result['vector'] = embeddings[i]
+                if metadatas is not None:
+                    result['metadata'] = self._project_metadata(metadatas[i], metadata_keys)
+                if documents is not None:
+                    result['text'] = documents[i]
                 formatted_results.append(result)
             
-            logger.info(f"搜索完成，在索引 {index_name} 中找到 {len(formatted_results)} 个结果")
+            logger.debug(f"搜索完成，在索引 {index_name} 中找到 {len(formatted_results)} 个结果")
             return formatted_results
             
         except IndexNotFoundError:
             raise
+        except InvalidCollectionException:
+            # 集合已被其他进程删除，丢弃缓存的句柄
+            self.collections.pop(index_name, None)
+            raise IndexNotFoundError(index_name)
         except Exception as e:
             logger.error(f"搜索向量失败: {str(e)}")
             raise QueryError(f"搜索失败: {str(e)}")
@@ -440,6 +469,106 @@ class ChromaVectorSearch(VectorSearchBase):
             logger.error(f"更新向量失败: {str(e)}")
             raise VectorOperationError("update", str(e))
 
+    def upsert_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        写入向量，已存在的ID覆盖，不存在的新增
+        
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+            
+        Returns:
+            bool: 写入是否成功
+            
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            InvalidVectorError: 当向量数据无效时
+        """
+        try:
+            collection = self._get_collection(index_name)
+            
+            if len(vectors) != len(ids):
+                raise InvalidVectorError("向量数量与ID数量不匹配")
+            
+            if metadatas and len(metadatas) != len(ids):
+                raise MetadataError("元数据数量与ID数量不匹配")
+            
+            collection.upsert(
+                embeddings=vectors,
+                ids=ids,
+                metadatas=metadatas,
+                documents=texts
+            )
+            
+            logger.info(f"成功写入索引 {index_name} 中的 {len(vectors)} 个向量")
+            return True
+            
+        except (IndexNotFoundError, InvalidVectorError, MetadataError):
+            raise
+        except Exception as e:
+            logger.error(f"写入向量失败: {str(e)}")
+            raise VectorOperationError("upsert", str(e))
+
+    def scan_vectors(
+        self,
+        index_name: str,
+        batch_size: int = 1000,
+        include_vectors: bool = True,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按批遍历索引中的全部向量（迁移集合时使用）
+        
+        Args:
+            index_name: 索引名称
+            batch_size: 每批返回的向量数
+            include_vectors: 是否包含向量数据
+            
+        Yields:
+            List[Dict[str, Any]]: 一批向量信息，每项包含id、vector、metadata、text
+            
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        collection = self._get_collection(index_name)
+        include = ['metadatas', 'documents'] + (['embeddings'] if include_vectors else [])
+        offset = 0
+        while True:
+            try:
+                results = collection.get(limit=batch_size, offset=offset, include=include)
+            except Exception as e:
+                logger.error(f"遍历向量失败: {str(e)}")
+                raise VectorOperationError("scan", str(e))
+            
+            ids = results['ids']
+            if not ids:
+                return
+            embeddings = results.get('embeddings') if include_vectors else None
+            yield [
+                {
+                    'id': vec_id,
+                    'vector': self._to_list(embeddings[i]) if embeddings is not None else None,
+                    'metadata': results['metadatas'][i],
+                    'text': results['documents'][i]
+                }
+                for i, vec_id in enumerate(ids)
+            ]
+            offset += len(ids)
+
+    @staticmethod
+    def _to_list(vector: Any) -> List[float]:
+        """Chroma返回的向量可能是numpy数组，转为float列表以便写回"""
+        return vector.tolist() if hasattr(vector, 'tolist') else list(vector)
+
     def get_vectors(
         self,
         index_name: str,
@@ -495,8 +624,8 @@ class ChromaVectorSearch(VectorSearchBase):
                 idx = id_to_index[vec_id]
                 result = {'id': vec_id}
                 
-                if include_vectors and 'embeddings' in results and results['embeddings']:
-                    result['vector'] = results['embeddings'][idx]
+                if include_vectors and 'embeddings' in results and results['embeddings'] is not None:
+                    result['vector'] = self._to_list(results['embeddings'][idx])
                 
                 if include_metadatas and 'metadatas' in results and results['metadatas']:
                     result['metadata'] = results['metadatas'][idx]
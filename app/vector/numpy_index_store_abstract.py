@@ -0,0 +1,274 @@
+"""
+NumPy内存映射向量后端的索引管理基类
+负责存储路径、距离度量和紧凑向量配置，以及索引的创建、加载（同步其他进程的写入）、压缩、删除和统计，
+向量的读写和搜索由NumpyVectorSearch实现
+"""
+
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+from app.exceptions.vector_exceptions import (
+    VectorSearchError,
+    IndexNotFoundError,
+    IndexAlreadyExistsError,
+    DistanceMetricError,
+    IndexOperationError
+)
+from app.utils.logging_utils import get_logger
+from app.vector.numpy_memmap_index import QUANTIZATIONS, _CompactCodec, _MemmapIndex
+from app.vector.vector_search_abstract import VectorSearchBase
+
+logger = get_logger(__name__)
+
+# 支持的距离度量（euclidean与l2相同），距离的定义与Chroma一致
+METRIC_ALIASES = {"cosine": "cosine", "ip": "ip", "l2": "l2", "euclidean": "l2"}
+
+
+class NumpyIndexStoreBase(VectorSearchBase):
+    """
+    NumPy内存映射索引的管理基类
+    每个索引对应存储路径下的一个目录，同一索引只允许一个进程写入，其他进程可以只读访问并看到增量写入
+    """
+
+    def __init__(self, **kwargs):
+        """
+        初始化NumPy向量搜索
+
+        Args:
+            **kwargs:
+                path: 本地存储路径
+                metric: 默认距离度量方式，如 'cosine', 'l2', 'ip'
+                compact_dimension: 粗排使用的紧凑向量维度（截取前N维），为空时使用完整维度
+                quantization: 紧凑向量的量化方式 'none' / 'float16' / 'int8'
+                rerank_factor: 启用紧凑向量时粗排取 top_k × rerank_factor 个候选，再用完整向量精排
+        """
+        try:
+            self.path = Path(kwargs.get('path', './data/vectors'))
+            self.metric = self._normalize_metric(kwargs.get('metric', 'cosine'))
+            self.compact_dimension = kwargs.get('compact_dimension')
+            self.quantization = (kwargs.get('quantization') or 'none').lower()
+            if self.quantization not in QUANTIZATIONS:
+                raise VectorSearchError(f"不支持的量化方式: {self.quantization}")
+            self.rerank_factor = max(1, kwargs.get('rerank_factor', 4))
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.indices: Dict[str, _MemmapIndex] = {}
+            self._lock = threading.RLock()
+            logger.info(f"初始化NumPy向量搜索，存储路径: {self.path}")
+        except (DistanceMetricError, VectorSearchError):
+            raise
+        except Exception as e:
+            logger.error(f"初始化NumPy向量搜索失败: {str(e)}")
+            raise IndexOperationError(f"初始化失败: {str(e)}", operation="init")
+
+    @staticmethod
+    def _normalize_metric(metric: str) -> str:
+        if metric.lower() not in METRIC_ALIASES:
+            raise DistanceMetricError(f"不支持的距离度量方式: {metric}", metric=metric)
+        return METRIC_ALIASES[metric.lower()]
+
+    def _make_codec(self, dimension: int, metric: str) -> Optional[_CompactCodec]:
+        """按配置创建紧凑向量编码，未启用时返回None"""
+        if not self.compact_dimension and self.quantization == "none":
+            return None
+        return _CompactCodec(dimension, metric, self.compact_dimension, self.quantization)
+
+    def _codec_factory(self) -> Optional[Callable[[int, str], Optional[_CompactCodec]]]:
+        """索引在内存中维护紧凑向量时使用的编码工厂"""
+        return self._make_codec
+
+    def _index_dir(self, index_name: str) -> Path:
+        if not index_name or index_name.startswith(".") or "/" in index_name or os.sep in index_name:
+            raise IndexOperationError(f"非法索引名称: {index_name}", operation="resolve", index_name=index_name)
+        return self.path / index_name
+
+    def _get_index(self, index_name: str) -> _MemmapIndex:
+        """
+        获取索引并同步其他进程的写入
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        with self._lock:
+            index = self.indices.get(index_name)
+            try:
+                if index is not None:
+                    with index.lock:
+                        index.refresh()
+                    return index
+                directory = self._index_dir(index_name)
+                if not (directory / "meta.json").exists():
+                    raise IndexNotFoundError(index_name)
+                index = _MemmapIndex(directory, self._codec_factory())
+            except FileNotFoundError:
+                # 索引已被其他进程删除
+                self.indices.pop(index_name, None)
+                raise IndexNotFoundError(index_name)
+            self.indices[index_name] = index
+            return index
+
+    def create_index(self, index_name: str, dimension: int, **kwargs) -> bool:
+        """
+        创建向量索引
+
+        Args:
+            index_name: 索引名称
+            dimension: 向量维度
+            **kwargs: 其他索引配置参数
+                metric: 距离度量方式（默认使用实例配置）
+                metadata: 索引元数据
+
+        Returns:
+            bool: 创建是否成功
+
+        Raises:
+            IndexAlreadyExistsError: 当索引已存在时
+        """
+        try:
+            directory = self._index_dir(index_name)
+            if (directory / "meta.json").exists():
+                raise IndexAlreadyExistsError(index_name)
+            metric = self._normalize_metric(kwargs.get('metric', self.metric))
+
+            directory.mkdir(parents=True, exist_ok=True)
+            for name in ("vectors.0.f32", "log.0.jsonl"):
+                (directory / name).write_bytes(b"")
+            _MemmapIndex.write_meta(directory, {
+                "dimension": dimension, "metric": metric,
+                "metadata": kwargs.get('metadata') or {}, "generation": 0
+            })
+
+            logger.info(f"成功创建索引: {index_name}，维度: {dimension}")
+            return True
+
+        except (IndexAlreadyExistsError, DistanceMetricError):
+            raise
+        except Exception as e:
+            logger.error(f"创建索引失败: {str(e)}")
+            raise IndexOperationError(f"create操作失败: {str(e)}", operation="create", index_name=index_name)
+
+    def compact_index(self, index_name: str) -> bool:
+        """
+        压缩索引文件，去掉已删除和被覆盖的行
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            bool: 压缩是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        try:
+            index = self._get_index(index_name)
+            with index.lock:
+                dead = index.rows - index.live
+                index.compact()
+            logger.info(f"成功压缩索引 {index_name}，移除 {dead} 行")
+            return True
+
+        except IndexNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"压缩索引失败: {str(e)}")
+            raise IndexOperationError(f"compact操作失败: {str(e)}", operation="compact", index_name=index_name)
+
+    def get_index_info(self, index_name: str) -> Dict[str, Any]:
+        """
+        获取索引信息
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            Dict[str, Any]: 索引信息，包括名称、向量数量、维度、元数据等
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        index = self._get_index(index_name)
+        info = {
+            'name': index_name,
+            'count': index.live,
+            'metadata': {**index.metadata, 'dimension': index.dimension},
+            'type': 'numpy',
+            'metric': index.metric,
+            'rows': index.rows
+        }
+        if index.codec is not None:
+            # 紧凑向量常驻内存，完整向量只在精排时从内存映射文件读取
+            info.update({
+                'compact_dimension': index.codec.dimension,
+                'quantization': index.codec.quantization,
+                'compact_bytes': index.rows * index.codec.bytes_per_vector
+            })
+        return info
+
+    def list_indices(self) -> List[str]:
+        """
+        列出所有索引
+
+        Returns:
+            List[str]: 索引名称列表
+        """
+        try:
+            return sorted(child.name for child in self.path.iterdir() if (child / "meta.json").exists())
+        except Exception as e:
+            logger.error(f"列出索引失败: {str(e)}")
+            raise IndexOperationError(f"list操作失败: {str(e)}", operation="list")
+
+    def delete_index(self, index_name: str) -> bool:
+        """
+        删除索引
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            bool: 删除是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        try:
+            directory = self._index_dir(index_name)
+            if not (directory / "meta.json").exists():
+                raise IndexNotFoundError(index_name)
+            with self._lock:
+                self.indices.pop(index_name, None)
+                shutil.rmtree(directory)
+
+            logger.info(f"成功删除索引: {index_name}")
+            return True
+
+        except IndexNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"删除索引失败: {str(e)}")
+            raise IndexOperationError(f"delete操作失败: {str(e)}", operation="delete", index_name=index_name)
+
+    def count_vectors(self, index_name: str) -> int:
+        """
+        统计索引中的向量数量
+
+        Args:
+            index_name: 索引名称
+
+        Returns:
+            int: 向量数量
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        return self._get_index(index_name).live
+
+    def close(self) -> None:
+        """
+        关闭索引，释放内存映射
+        """
+        with self._lock:
+            self.indices.clear()
+        logger.info("NumPy向量搜索资源已释放")
@@ -0,0 +1,346 @@
+"""
+NumPy向量后端的磁盘存储：float32内存映射矩阵、追加写入的行日志和常驻内存的紧凑向量
+每个索引对应一个目录，由_MemmapIndex维护文件与内存状态，_CompactCodec负责紧凑向量的截取和量化
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.exceptions.vector_exceptions import FilterError
+
+# 每个计算块最多读取的矩阵字节数，限制批量查询和过滤后取行时的内存占用
+BLOCK_BYTES = 64 * 1024 * 1024
+
+# 紧凑向量的量化方式
+QUANTIZATIONS = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+class _CompactCodec:
+    """
+    紧凑向量编码：截取前compact_dimension维（余弦度量下重新归一化），再按float16/int8量化
+
+    紧凑向量常驻内存用于粗排，完整float32向量留在内存映射文件中用于精排
+    """
+
+    def __init__(self, dimension: int, metric: str, compact_dimension: Optional[int] = None,
+                 quantization: str = "none"):
+        self.dimension = min(compact_dimension or dimension, dimension)
+        self.metric = metric
+        self.quantization = quantization
+        self.dtype = QUANTIZATIONS[quantization]
+
+    @property
+    def bytes_per_vector(self) -> int:
+        # int8每行额外保存一个float32缩放系数
+        return self.dimension * np.dtype(self.dtype).itemsize + (4 if self.quantization == "int8" else 0)
+
+    def reduce(self, vectors: np.ndarray) -> np.ndarray:
+        """截取维度（余弦度量下重新归一化），返回float32"""
+        reduced = np.array(vectors[:, :self.dimension], dtype=np.float32)
+        if self.metric == "cosine":
+            reduced /= np.maximum(np.linalg.norm(reduced, axis=1, keepdims=True), 1e-12)
+        return reduced
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """编码为 (紧凑向量, 每行缩放系数)"""
+        reduced = self.reduce(vectors)
+        if self.quantization != "int8":
+            return reduced.astype(self.dtype), np.ones(len(reduced), dtype=np.float32)
+        scales = np.abs(reduced).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        return np.rint(reduced / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def decode(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        if self.quantization == "none":
+            return codes
+        block = codes.astype(np.float32)
+        if self.quantization == "int8":
+            block *= scales[:, None]
+        return block
+
+
+
+
+class _MemmapIndex:
+    """
+    单个索引的磁盘文件与内存状态
+
+    目录结构：
+        meta.json             维度、度量、索引元数据和当前文件代号（原子替换写入）
+        vectors.<代号>.f32    按行追加的float32矩阵
+        log.<代号>.jsonl      与矩阵行一一对应的行记录（id/metadata/text）以及删除记录
+
+    同一ID再次写入时追加新行，旧行标记为失效；删除只追加删除记录。
+    其他进程（如离线重建）追加的记录在下次访问时按日志偏移增量读取。
+    """
+
+    def __init__(self, directory: Path, codec_factory: Optional[Callable[[int, str], _CompactCodec]] = None):
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.codec_factory = codec_factory
+        self.load()
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / f"vectors.{self.generation}.f32"
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / f"log.{self.generation}.jsonl"
+
+    @staticmethod
+    def write_meta(directory: Path, meta: Dict[str, Any]) -> None:
+        """原子写入meta.json"""
+        tmp_path = directory / "meta.json.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(meta))
+        os.replace(tmp_path, directory / "meta.json")
+
+    def _meta_stamp(self) -> tuple:
+        """meta.json总是原子替换写入，inode变化即表示元数据或文件代号变化"""
+        stat = os.stat(self.meta_path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def load(self) -> None:
+        """从磁盘完整加载索引"""
+        self.meta_stamp = self._meta_stamp()
+        with open(self.meta_path, "rb") as f:
+            meta = orjson.loads(f.read())
+        self.dimension = meta["dimension"]
+        self.metric = meta["metric"]
+        self.metadata = meta.get("metadata") or {}
+        self.generation = meta.get("generation", 0)
+
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.texts: List[Optional[str]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.rows = 0
+        self.live = 0
+        # 元数据字段 -> 取值 -> 行号列表，只为查询中用过的字段建立
+        self.postings: Dict[str, Dict[Any, List[int]]] = {}
+        self.log_offset = 0
+        self.matrix: Optional[np.ndarray] = None
+        # 紧凑向量（未配置时为None）
+        self.codec = self.codec_factory(self.dimension, self.metric) if self.codec_factory else None
+        self.codes = np.zeros((0, self.codec.dimension), dtype=self.codec.dtype) if self.codec else None
+        self.code_scales = np.zeros(0, dtype=np.float32)
+        self.code_sq = np.zeros(0, dtype=np.float32)
+        self._replay_tail()
+
+    def refresh(self) -> None:
+        """检查其他进程的写入：文件代号变化时完整重载，日志增长时增量读取"""
+        if self._meta_stamp() != self.meta_stamp:
+            self.load()
+            return
+        if os.path.getsize(self.log_path) > self.log_offset:
+            self._replay_tail()
+
+    def _replay_tail(self) -> None:
+        """读取日志中尚未处理的完整行"""
+        with open(self.log_path, "rb") as f:
+            f.seek(self.log_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        first_row = self.rows
+        for line in data[:end].splitlines():
+            record = orjson.loads(line)
+            if "delete" in record:
+                self._apply_delete(record["delete"])
+            else:
+                self._apply_row(record["id"], record.get("metadata") or {}, record.get("text"))
+        self.log_offset += end
+        if self.rows > first_row:
+            self._set_vectors(first_row, self.matrix_view()[first_row:self.rows])
+
+    def _set_vectors(self, first_row: int, vectors: np.ndarray) -> None:
+        """计算新增行的范数和紧凑向量"""
+        block_rows = max(1, BLOCK_BYTES // (self.dimension * 4))
+        for start in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[start:start + block_rows])
+            rows = slice(first_row + start, first_row + start + len(block))
+            self.sq_norms[rows] = np.einsum("ij,ij->i", block, block)
+            if self.codec is not None:
+                codes, scales = self.codec.encode(block)
+                self.codes[rows] = codes
+                self.code_scales[rows] = scales
+                decoded = self.codec.decode(codes, scales)
+                self.code_sq[rows] = np.einsum("ij,ij->i", decoded, decoded)
+
+    def _reserve(self, rows: int) -> None:
+        """按倍数扩容存活标记、范数和紧凑向量数组"""
+        if rows <= len(self.alive):
+            return
+        capacity = max(rows, 2 * len(self.alive), 1024)
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.rows] = array[:self.rows]
+            return grown
+
+        self.alive, self.sq_norms = grow(self.alive), grow(self.sq_norms)
+        if self.codec is not None:
+            self.codes, self.code_scales, self.code_sq = grow(self.codes), grow(self.code_scales), grow(self.code_sq)
+
+    @staticmethod
+    def posting_key(value: Any) -> Any:
+        """True与1的哈希相同，布尔值单独区分"""
+        return ("__bool__", value) if isinstance(value, bool) else value
+
+    def _apply_row(self, vec_id: str, metadata: Dict[str, Any], text: Optional[str]) -> None:
+        row = self.rows
+        self._reserve(row + 1)
+        old_row = self.id_to_row.get(vec_id)
+        if old_row is not None:
+            self.alive[old_row] = False
+        else:
+            self.live += 1
+        self.ids.append(vec_id)
+        self.metadatas.append(metadata)
+        self.texts.append(text)
+        self.id_to_row[vec_id] = row
+        self.alive[row] = True
+        for key, postings in self.postings.items():
+            if key in metadata:
+                postings.setdefault(self.posting_key(metadata[key]), []).append(row)
+        self.rows += 1
+
+    def _apply_delete(self, ids: List[str]) -> None:
+        for vec_id in ids:
+            row = self.id_to_row.pop(vec_id, None)
+            if row is not None:
+                self.alive[row] = False
+                self.live -= 1
+
+    def matrix_view(self) -> np.ndarray:
+        """当前全部行的只读内存映射视图"""
+        if self.rows == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self.matrix is None or len(self.matrix) < self.rows:
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                    shape=(self.rows, self.dimension))
+        return self.matrix
+
+    def append(
+        self,
+        vectors: np.ndarray,
+        ids: List[str],
+        metadatas: List[Dict[str, Any]],
+        texts: List[Optional[str]]
+    ) -> None:
+        """
+        追加写入一批行：先写向量，再写日志
+
+        日志是行数的唯一依据，写向量后崩溃留下的多余字节会在下次追加时被覆盖
+        """
+        with open(self.vectors_path, "r+b") as f:
+            f.seek(self.rows * self.dimension * 4)
+            f.write(vectors.tobytes())
+            f.truncate()
+        payload = b"".join(
+            orjson.dumps({"id": vec_id, "metadata": metadata, "text": text}) + b"\n"
+            for vec_id, metadata, text in zip(ids, metadatas, texts)
+        )
+        with open(self.log_path, "ab") as f:
+            f.write(payload)
+
+        first_row = self.rows
+        for vec_id, metadata, text in zip(ids, metadatas, texts):
+            self._apply_row(vec_id, metadata, text)
+        self._set_vectors(first_row, vectors)
+        self.log_offset += len(payload)
+
+    def delete(self, ids: List[str]) -> None:
+        """追加删除记录"""
+        payload = orjson.dumps({"delete": ids}) + b"\n"
+        with open(self.log_path, "ab") as f:
+            f.write(payload)
+        self._apply_delete(ids)
+        self.log_offset += len(payload)
+
+    def needs_compaction(self, min_dead: int) -> bool:
+        """已删除（或被覆盖）的行数超过min_dead且超过存活行数时需要压缩"""
+        dead = self.rows - self.live
+        return dead > min_dead and dead > self.live
+
+    def compact(self) -> None:
+        """只保留存活行，写入新代号的文件后原子切换meta.json并删除旧文件"""
+        old_vectors, old_log = self.vectors_path, self.log_path
+        generation = self.generation + 1
+        live_rows = np.flatnonzero(self.alive[:self.rows])
+        matrix = self.matrix_view()
+        block_rows = max(1, BLOCK_BYTES // (self.dimension * 4))
+        with open(self.directory / f"vectors.{generation}.f32", "wb") as vf, \
+                open(self.directory / f"log.{generation}.jsonl", "wb") as lf:
+            for start in range(0, len(live_rows), block_rows):
+                rows = live_rows[start:start + block_rows]
+                vf.write(np.ascontiguousarray(matrix[rows]).tobytes())
+                lf.write(b"".join(
+                    orjson.dumps({"id": self.ids[row], "metadata": self.metadatas[row],
+                                  "text": self.texts[row]}) + b"\n"
+                    for row in rows.tolist()
+                ))
+        self.write_meta(self.directory, {
+            "dimension": self.dimension, "metric": self.metric,
+            "metadata": self.metadata, "generation": generation
+        })
+        self.matrix = None
+        self.load()
+        for path in (old_vectors, old_log):
+            path.unlink(missing_ok=True)
+
+    def filter_rows(self, filter_dict: Dict[str, Any]) -> np.ndarray:
+        """
+        按元数据等值条件筛选存活行
+
+        支持 {字段: 值}、{字段: {"$eq": 值}}、{字段: {"$in": [值, ...]}} 以及 {"$and": [条件, ...]}
+        """
+        conditions = []
+        for key, condition in filter_dict.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    conditions.extend(sub_filter.items())
+            elif key.startswith("$"):
+                raise FilterError(f"不支持的过滤操作符: {key}", filter_condition=str(filter_dict))
+            else:
+                conditions.append((key, condition))
+
+        rows = None
+        for key, condition in conditions:
+            if isinstance(condition, dict):
+                if set(condition) == {"$eq"}:
+                    values = [condition["$eq"]]
+                elif set(condition) == {"$in"}:
+                    values = list(condition["$in"])
+                else:
+                    raise FilterError(f"不支持的过滤条件: {condition}", filter_condition=str(filter_dict))
+            else:
+                values = [condition]
+
+            postings = self.postings.get(key)
+            if postings is None:
+                postings = {}
+                for row, metadata in enumerate(self.metadatas):
+                    if key in metadata:
+                        postings.setdefault(self.posting_key(metadata[key]), []).append(row)
+                self.postings[key] = postings
+            matched = np.unique(np.concatenate(
+                [np.asarray(postings.get(self.posting_key(value), []), dtype=np.int64) for value in values]
+            ))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if len(rows) == 0:
+                break
+        return rows[self.alive[rows]]
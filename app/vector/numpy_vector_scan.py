@@ -0,0 +1,228 @@
+"""
+NumPy向量后端的分块扫描与精排
+在完整矩阵或内存中的紧凑向量上按块计算相似度并用argpartition取Top-k，启用紧凑向量时再读取完整向量精排
+"""
+
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from app.vector.numpy_memmap_index import BLOCK_BYTES, _MemmapIndex
+from app.vector.vector_search_abstract import VectorSearchBase
+
+# 紧凑向量每块解码出的float32字节数，较小的块可以复用已分配的内存
+DECODE_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def similarities(
+    queries: np.ndarray,
+    q_sq: np.ndarray,
+    block: np.ndarray,
+    block_sq: np.ndarray,
+    metric: str
+) -> np.ndarray:
+    """
+    计算 查询×行 的相似度（越大越相似）
+
+    余弦度量要求查询已归一化；距离 = 1 - 相似度（cosine/ip）或 -相似度（l2）
+    """
+    sims = queries @ block.T
+    if metric == "cosine":
+        sims *= 1.0 / np.sqrt(np.maximum(block_sq, 1e-24))
+    elif metric == "l2":
+        sims *= 2
+        sims -= block_sq
+        sims -= q_sq[:, None]
+    return sims
+
+
+def prepare_queries(queries: np.ndarray, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+    """计算查询的平方范数，余弦度量下预先归一化（之后每块只需再乘以行范数的倒数）"""
+    q_sq = np.einsum("ij,ij->i", queries, queries)
+    if metric == "cosine":
+        queries = queries / np.maximum(np.sqrt(q_sq), 1e-12)[:, None]
+    return queries, q_sq
+
+
+def to_distance(sim: float, metric: str) -> float:
+    """相似度转换为与Chroma一致的距离"""
+    return -sim if metric == "l2" else 1.0 - sim
+
+
+def scan_blocks(
+    queries: np.ndarray,
+    q_sq: np.ndarray,
+    load_block: Callable[[Any], Tuple[np.ndarray, np.ndarray]],
+    rows: int,
+    block_rows: int,
+    alive: Optional[np.ndarray],
+    candidates: Optional[np.ndarray],
+    top_k: int,
+    metric: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按块计算 查询×行 的相似度矩阵，每块用argpartition保留Top-k后合并
+
+    Args:
+        queries: 已预处理的查询矩阵
+        q_sq: 查询的平方范数
+        load_block: 按切片或行号数组取出 (float32向量块, 平方范数)
+        rows: 总行数
+        block_rows: 每块的行数
+        alive: 存活标记，没有失效行时为None
+        candidates: 过滤后的候选行号，不过滤时为None
+        top_k: 每个查询保留的行数
+        metric: 距离度量
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (行号, 相似度)，形状为 查询数 × 不超过top_k，按相似度降序，
+        不足时以-inf补齐
+    """
+    query_count = len(queries)
+    total = rows if candidates is None else len(candidates)
+
+    best_rows, best_sims = [], []
+    for start in range(0, total, block_rows):
+        if candidates is None:
+            end = min(start + block_rows, total)
+            block_ids = np.arange(start, end)
+            block, block_sq = load_block(slice(start, end))
+        else:
+            block_ids = candidates[start:start + block_rows]
+            block, block_sq = load_block(block_ids)
+
+        sims = similarities(queries, q_sq, block, block_sq, metric)
+        if alive is not None and candidates is None:
+            sims[:, ~alive[start:end]] = -np.inf
+
+        width = len(block_ids)
+        if width > top_k:
+            part = np.argpartition(sims, width - top_k, axis=1)[:, width - top_k:]
+            best_rows.append(block_ids[part])
+            best_sims.append(np.take_along_axis(sims, part, axis=1))
+        else:
+            best_rows.append(np.broadcast_to(block_ids, (query_count, width)))
+            best_sims.append(sims)
+
+    if not best_rows:
+        return np.zeros((query_count, 0), dtype=np.int64), np.zeros((query_count, 0), dtype=np.float32)
+    all_rows = np.concatenate(best_rows, axis=1)
+    all_sims = np.concatenate(best_sims, axis=1)
+    order = np.argsort(-all_sims, axis=1, kind="stable")[:, :top_k]
+    return np.take_along_axis(all_rows, order, axis=1), np.take_along_axis(all_sims, order, axis=1)
+
+
+def rerank_rows(
+    matrix: np.ndarray,
+    sq_norms: np.ndarray,
+    query: np.ndarray,
+    q_sq: float,
+    rows: np.ndarray,
+    metric: str
+) -> np.ndarray:
+    """
+    用内存映射中的完整向量重新计算候选行的相似度
+
+    Args:
+        matrix: 完整向量矩阵
+        sq_norms: 完整向量的平方范数
+        query: 已预处理的完整查询向量
+        q_sq: 查询的平方范数
+        rows: 候选行号
+        metric: 距离度量
+
+    Returns:
+        np.ndarray: 与rows对应的相似度
+    """
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.float32)
+    # 按行号顺序读取，减少内存映射上的随机访问
+    order = np.argsort(rows)
+    sims = np.empty(len(rows), dtype=np.float32)
+    sims[order] = similarities(query[None, :], np.array([q_sq]), matrix[rows[order]], sq_norms[rows[order]],
+                               metric)[0]
+    return sims
+
+
+def format_result(
+    index: _MemmapIndex,
+    matrix: np.ndarray,
+    row: int,
+    score: float,
+    include: List[str],
+    metadata_keys: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """按include组装单条搜索结果，score为距离"""
+    result = {'id': index.ids[row], 'score': score}
+    if 'embeddings' in include:
+        result['vector'] = matrix[row].tolist()
+    if 'metadatas' in include:
+        result['metadata'] = VectorSearchBase._project_metadata(index.metadatas[row], metadata_keys)
+    if 'documents' in include:
+        result['text'] = index.texts[row]
+    return result
+
+
+def search_index(
+    index: _MemmapIndex,
+    queries: np.ndarray,
+    top_k: int,
+    filter_dict: Optional[Dict[str, Any]],
+    include: List[str],
+    metadata_keys: Optional[List[str]] = None,
+    rerank_factor: int = 1
+) -> List[List[Dict[str, Any]]]:
+    """
+    批量搜索：未启用紧凑向量时在完整矩阵上精确计算Top-k；
+    启用时先在内存中的紧凑向量上粗排 top_k × rerank_factor 个候选，再读取完整向量精排
+
+    Args:
+        index: 索引
+        queries: 查询矩阵（查询数 × 维度）
+        top_k: 每个查询返回的结果数
+        filter_dict: 元数据过滤条件
+        include: 要包含的字段
+        metadata_keys: 只返回这些元数据字段，为空时返回全部
+        rerank_factor: 启用紧凑向量时粗排候选数相对top_k的倍数
+
+    Returns:
+        List[List[Dict[str, Any]]]: 每个查询的结果列表，按距离升序
+    """
+    with index.lock:
+        rows = index.rows
+        matrix = index.matrix_view()
+        alive = index.alive[:rows].copy() if index.live < rows else None
+        sq_norms = index.sq_norms[:rows]
+        codec = index.codec
+        if codec is not None:
+            codes, code_scales, code_sq = index.codes[:rows], index.code_scales[:rows], index.code_sq[:rows]
+        candidates = index.filter_rows(filter_dict) if filter_dict else None
+
+    metric = index.metric
+    queries, q_sq = prepare_queries(queries, metric)
+    if codec is None:
+        best_rows, best_sims = scan_blocks(
+            queries, q_sq, lambda selector: (matrix[selector], sq_norms[selector]),
+            rows, max(1, BLOCK_BYTES // (index.dimension * 4)), alive, candidates, top_k, metric
+        )
+    else:
+        compact_queries, compact_sq = prepare_queries(codec.reduce(queries), metric)
+        approx_rows, approx_sims = scan_blocks(
+            compact_queries, compact_sq,
+            lambda selector: (codec.decode(codes[selector], code_scales[selector]), code_sq[selector]),
+            rows, max(1, DECODE_BLOCK_BYTES // (codec.dimension * 4)), alive, candidates,
+            top_k * rerank_factor, metric
+        )
+        best_rows, best_sims = [], []
+        for q in range(len(queries)):
+            found = approx_rows[q][approx_sims[q] > -np.inf]
+            sims = rerank_rows(matrix, sq_norms, queries[q], q_sq[q], found, metric)
+            order = np.argsort(-sims, kind="stable")[:top_k]
+            best_rows.append(found[order])
+            best_sims.append(sims[order])
+
+    return [
+        [format_result(index, matrix, int(row), to_distance(float(sim), metric), include, metadata_keys)
+         for row, sim in zip(best_rows[q], best_sims[q]) if sim > -np.inf]
+        for q in range(len(queries))
+    ]
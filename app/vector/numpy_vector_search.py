@@ -0,0 +1,452 @@
+"""
+基于NumPy内存映射矩阵的向量搜索实现
+进程内精确检索：向量追加写入float32内存映射文件，ID、元数据和文本追加写入旁路日志，
+搜索为一次矩阵-向量乘法加argpartition取Top-k，结果完全确定
+
+磁盘存储见numpy_memmap_index，分块扫描与精排见numpy_vector_scan，索引管理见numpy_index_store_abstract
+"""
+
+from typing import List, Dict, Any, Iterator, Optional
+
+import numpy as np
+
+from app.exceptions.vector_exceptions import (
+    IndexNotFoundError,
+    DimensionMismatchError,
+    FilterError,
+    InvalidVectorError,
+    QueryError,
+    VectorOperationError,
+    MetadataError
+)
+from app.utils.logging_utils import get_logger
+from app.vector.numpy_index_store_abstract import NumpyIndexStoreBase
+from app.vector.numpy_memmap_index import _MemmapIndex
+from app.vector.numpy_vector_scan import search_index
+from app.vector.vector_search_abstract import DEFAULT_SEARCH_INCLUDE
+
+logger = get_logger(__name__)
+
+# 已删除（或被覆盖）的行数超过该值且超过存活行数时自动压缩文件
+COMPACT_MIN_DEAD = 10000
+
+
+class NumpyVectorSearch(NumpyIndexStoreBase):
+    """
+    基于NumPy内存映射矩阵的向量搜索实现
+    每个索引对应存储路径下的一个目录，适合数万到百万级向量的精确检索和测试
+    同一索引只允许一个进程写入，其他进程可以只读访问并看到增量写入
+    """
+
+    @staticmethod
+    def _as_matrix(vectors: List[List[float]], dimension: int) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise InvalidVectorError("向量维度不一致")
+        if matrix.shape[1] != dimension:
+            raise DimensionMismatchError(
+                f"向量维度 {matrix.shape[1]} 与索引维度 {dimension} 不一致",
+                expected_dim=dimension, actual_dim=matrix.shape[1]
+            )
+        return np.ascontiguousarray(matrix)
+
+    @staticmethod
+    def _check_lengths(vectors, ids, metadatas, texts) -> None:
+        if len(vectors) != len(ids):
+            raise InvalidVectorError("向量数量与ID数量不匹配")
+        if metadatas and len(metadatas) != len(ids):
+            raise MetadataError("元数据数量与ID数量不匹配")
+        if texts and len(texts) != len(ids):
+            raise InvalidVectorError("文本数量与ID数量不匹配")
+
+    def add_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+        **kwargs
+    ) -> bool:
+        """
+        向索引中添加向量，已存在的ID与Chroma一致跳过
+
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+            **kwargs: 其他参数
+
+        Returns:
+            bool: 添加是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            DimensionMismatchError: 当向量维度不匹配时
+            InvalidVectorError: 当向量数据无效时
+        """
+        try:
+            if not vectors:
+                raise InvalidVectorError("向量列表不能为空")
+            self._check_lengths(vectors, ids, metadatas, texts)
+            index = self._get_index(index_name)
+            matrix = self._as_matrix(vectors, index.dimension)
+
+            with index.lock:
+                keep = []
+                seen = set()
+                for i, vec_id in enumerate(ids):
+                    if vec_id in index.id_to_row or vec_id in seen:
+                        continue
+                    seen.add(vec_id)
+                    keep.append(i)
+                if len(keep) < len(ids):
+                    logger.warning(f"索引 {index_name} 中已存在 {len(ids) - len(keep)} 个ID，已跳过")
+                if keep:
+                    index.append(
+                        matrix[keep] if len(keep) < len(ids) else matrix,
+                        [ids[i] for i in keep],
+                        [dict(metadatas[i]) if metadatas and metadatas[i] else {} for i in keep],
+                        [texts[i] if texts else None for i in keep]
+                    )
+
+            logger.info(f"成功添加 {len(keep)} 个向量到索引: {index_name}")
+            return True
+
+        except (IndexNotFoundError, DimensionMismatchError, InvalidVectorError, MetadataError):
+            raise
+        except Exception as e:
+            logger.error(f"添加向量失败: {str(e)}")
+            raise VectorOperationError(f"添加向量失败: {str(e)}", operation="add")
+    def _search(
+        self,
+        index: _MemmapIndex,
+        queries: np.ndarray,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        include: List[str],
+        metadata_keys: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索：未启用紧凑向量时在完整矩阵上精确计算Top-k；
+        启用时先在内存中的紧凑向量上粗排 top_k × rerank_factor 个候选，再读取完整向量精排
+
+        Returns:
+            List[List[Dict[str, Any]]]: 每个查询的结果列表，按距离升序
+        """
+        return search_index(index, queries, top_k, filter_dict, include, metadata_keys, self.rerank_factor)
+
+    def search_vectors(
+        self,
+        index_name: str,
+        query_vector: List[float],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索相似向量
+
+        Args:
+            index_name: 索引名称
+            query_vector: 查询向量
+            top_k: 返回结果数量
+            filter_dict: 元数据等值过滤条件
+            **kwargs: 其他搜索参数
+                include: 要包含的字段，默认为 ['metadatas', 'distances']
+                metadata_keys: 只返回这些元数据字段，为空时返回全部
+
+        Returns:
+            List[Dict[str, Any]]: 搜索结果列表，score为距离（越小越相似）
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            QueryError: 当查询参数无效时
+        """
+        if not query_vector or not isinstance(query_vector, list):
+            raise QueryError("无效的查询向量")
+        return self.search_vectors_batch(index_name, [query_vector], top_k, filter_dict, **kwargs)[0]
+
+    def search_vectors_batch(
+        self,
+        index_name: str,
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量，所有查询共用一次矩阵乘法
+
+        Args:
+            index_name: 索引名称
+            query_vectors: 查询向量列表
+            top_k: 每个查询返回的结果数量
+            filter_dict: 元数据等值过滤条件（所有查询共用）
+            **kwargs: 其他搜索参数
+                include: 要包含的字段，默认为 ['metadatas', 'distances']
+                metadata_keys: 只返回这些元数据字段，为空时返回全部
+
+        Returns:
+            List[List[Dict[str, Any]]]: 与查询顺序对应的结果列表
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            QueryError: 当查询参数无效时
+        """
+        try:
+            index = self._get_index(index_name)
+            if top_k <= 0:
+                raise QueryError("top_k必须大于0")
+            try:
+                queries = self._as_matrix(query_vectors, index.dimension)
+            except (InvalidVectorError, DimensionMismatchError) as e:
+                raise QueryError(f"无效的查询向量: {e}")
+            include = kwargs.get('include', DEFAULT_SEARCH_INCLUDE)
+
+            results = self._search(index, queries, top_k, filter_dict, include, kwargs.get('metadata_keys'))
+            logger.debug(f"搜索完成，在索引 {index_name} 中执行 {len(queries)} 个查询")
+            return results
+
+        except (IndexNotFoundError, QueryError, FilterError):
+            raise
+        except Exception as e:
+            logger.error(f"搜索向量失败: {str(e)}")
+            raise QueryError(f"搜索失败: {str(e)}")
+
+    def delete_vectors(self, index_name: str, ids: List[str]) -> bool:
+        """
+        删除向量
+
+        Args:
+            index_name: 索引名称
+            ids: 要删除的向量ID列表
+
+        Returns:
+            bool: 删除是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        try:
+            if not ids:
+                raise InvalidVectorError("ID列表不能为空")
+            index = self._get_index(index_name)
+            with index.lock:
+                existing = [vec_id for vec_id in dict.fromkeys(ids) if vec_id in index.id_to_row]
+                if existing:
+                    index.delete(existing)
+                    if index.needs_compaction(COMPACT_MIN_DEAD):
+                        index.compact()
+
+            logger.info(f"成功从索引 {index_name} 删除 {len(existing)} 个向量")
+            return True
+
+        except (IndexNotFoundError, InvalidVectorError):
+            raise
+        except Exception as e:
+            logger.error(f"删除向量失败: {str(e)}")
+            raise VectorOperationError(f"删除向量失败: {str(e)}", operation="delete")
+
+    def _write(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        texts: Optional[List[str]],
+        insert_missing: bool
+    ) -> int:
+        """
+        覆盖写入：已存在的ID追加新行并合并元数据（与Chroma一致），缺少的文本沿用旧值
+
+        Returns:
+            int: 写入的向量数
+        """
+        self._check_lengths(vectors, ids, metadatas, texts)
+        index = self._get_index(index_name)
+        matrix = self._as_matrix(vectors, index.dimension)
+
+        with index.lock:
+            # 同一批内重复的ID以最后一次为准
+            positions = {vec_id: i for i, vec_id in enumerate(ids)}
+            keep, new_metadatas, new_texts = [], [], []
+            for vec_id, i in positions.items():
+                row = index.id_to_row.get(vec_id)
+                if row is None and not insert_missing:
+                    continue
+                metadata = dict(index.metadatas[row]) if row is not None else {}
+                if metadatas and metadatas[i]:
+                    metadata.update(metadatas[i])
+                text = texts[i] if texts and texts[i] is not None else (
+                    index.texts[row] if row is not None else None
+                )
+                keep.append(i)
+                new_metadatas.append(metadata)
+                new_texts.append(text)
+            if keep:
+                index.append(matrix[keep], [ids[i] for i in keep], new_metadatas, new_texts)
+                if index.needs_compaction(COMPACT_MIN_DEAD):
+                    index.compact()
+        return len(keep)
+
+    def update_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        更新向量，不存在的ID与Chroma一致忽略
+
+        Args:
+            index_name: 索引名称
+            vectors: 新向量列表
+            ids: 向量ID列表
+            metadatas: 新元数据列表
+            texts: 新原始文本列表
+
+        Returns:
+            bool: 更新是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            InvalidVectorError: 当向量数据无效时
+        """
+        try:
+            count = self._write(index_name, vectors, ids, metadatas, texts, insert_missing=False)
+            logger.info(f"成功更新索引 {index_name} 中的 {count} 个向量")
+            return True
+
+        except (IndexNotFoundError, DimensionMismatchError, InvalidVectorError, MetadataError):
+            raise
+        except Exception as e:
+            logger.error(f"更新向量失败: {str(e)}")
+            raise VectorOperationError(f"更新向量失败: {str(e)}", operation="update")
+
+    def upsert_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        写入向量，已存在的ID覆盖，不存在的新增
+
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+
+        Returns:
+            bool: 写入是否成功
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+            InvalidVectorError: 当向量数据无效时
+        """
+        try:
+            count = self._write(index_name, vectors, ids, metadatas, texts, insert_missing=True)
+            logger.info(f"成功写入索引 {index_name} 中的 {count} 个向量")
+            return True
+
+        except (IndexNotFoundError, DimensionMismatchError, InvalidVectorError, MetadataError):
+            raise
+        except Exception as e:
+            logger.error(f"写入向量失败: {str(e)}")
+            raise VectorOperationError(f"写入向量失败: {str(e)}", operation="upsert")
+
+    def scan_vectors(
+        self,
+        index_name: str,
+        batch_size: int = 1000,
+        include_vectors: bool = True,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按批遍历索引中的全部向量（迁移集合时使用）
+
+        Args:
+            index_name: 索引名称
+            batch_size: 每批返回的向量数
+            include_vectors: 是否包含向量数据
+
+        Yields:
+            List[Dict[str, Any]]: 一批向量信息，每项包含id、vector、metadata、text
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        index = self._get_index(index_name)
+        with index.lock:
+            live_rows = np.flatnonzero(index.alive[:index.rows])
+            matrix = index.matrix_view()
+            ids, metadatas, texts = index.ids, index.metadatas, index.texts
+        for start in range(0, len(live_rows), batch_size):
+            rows = live_rows[start:start + batch_size]
+            vectors = matrix[rows].tolist() if include_vectors else None
+            yield [
+                {
+                    'id': ids[row],
+                    'vector': vectors[i] if vectors is not None else None,
+                    'metadata': dict(metadatas[row]),
+                    'text': texts[row]
+                }
+                for i, row in enumerate(rows.tolist())
+            ]
+
+    def get_vectors(
+        self,
+        index_name: str,
+        ids: List[str],
+        include_vectors: bool = True,
+        include_metadatas: bool = True,
+        include_texts: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取向量信息，不存在的ID跳过
+
+        Args:
+            index_name: 索引名称
+            ids: 向量ID列表
+            include_vectors: 是否包含向量数据
+            include_metadatas: 是否包含元数据
+            include_texts: 是否包含原始文本
+
+        Returns:
+            List[Dict[str, Any]]: 向量信息列表
+
+        Raises:
+            IndexNotFoundError: 当索引不存在时
+        """
+        try:
+            index = self._get_index(index_name)
+            with index.lock:
+                matrix = index.matrix_view()
+                formatted_results = []
+                for vec_id in ids:
+                    row = index.id_to_row.get(vec_id)
+                    if row is None:
+                        continue
+                    result = {'id': vec_id}
+                    if include_vectors:
+                        result['vector'] = matrix[row].tolist()
+                    if include_metadatas:
+                        result['metadata'] = dict(index.metadatas[row])
+                    if include_texts:
+                        result['text'] = index.texts[row]
+                    formatted_results.append(result)
+            return formatted_results
+
+        except IndexNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"获取向量失败: {str(e)}")
+            raise VectorOperationError(f"获取向量失败: {str(e)}", operation="get")
@@ -4,7 +4,10 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
+
+# 搜索结果默认只取ID、距离和元数据，向量和原始文本需要时显式通过include或get_vectors获取
+DEFAULT_SEARCH_INCLUDE = ['metadatas', 'distances']
 
 
 class VectorSearchBase(ABC):
@@ -72,12 +75,84 @@ class VectorSearchBase(ABC):
             top_k: 返回结果数量
             filter_dict: 过滤条件
             **kwargs: 其他搜索参数
+                include: 要包含的字段，默认为 DEFAULT_SEARCH_INCLUDE
+                metadata_keys: 只返回这些元数据字段，为空时返回全部
             
         Returns:
             List[Dict[str, Any]]: 搜索结果列表，每个结果包含id、向量、元数据、相似度分数等
         """
         pass
 
+    def search_vectors_batch(
+        self,
+        index_name: str,
+        query_vectors: List[List[float]],
+        top_k: int = 10,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量
+
+        默认实现逐个调用search_vectors，支持一次计算多个查询的后端应覆盖此方法
+
+        Args:
+            index_name: 索引名称
+            query_vectors: 查询向量列表
+            top_k: 每个查询返回的结果数量
+            filter_dict: 过滤条件（所有查询共用）
+            **kwargs: 其他搜索参数
+
+        Returns:
+            List[List[Dict[str, Any]]]: 与查询顺序对应的结果列表
+        """
+        return [
+            self.search_vectors(index_name, query_vector, top_k, filter_dict, **kwargs)
+            for query_vector in query_vectors
+        ]
+
+    @staticmethod
+    def _index_overrides(index_name: str, index_params: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        查找单个索引的参数覆盖
+
+        键可以是完整索引名，也可以是索引名中最后若干段（如 'entity' 匹配 'kg.entity'，
+        'entity.company' 匹配 'kg.entity.company'），完整索引名优先
+
+        Args:
+            index_name: 索引名称
+            index_params: 索引名（或后缀） -> 参数
+
+        Returns:
+            Dict[str, Any]: 该索引的覆盖参数，没有时为空字典
+        """
+        if not index_params:
+            return {}
+        if index_name in index_params:
+            return dict(index_params[index_name])
+        for key, params in index_params.items():
+            if index_name.endswith("." + key):
+                return dict(params)
+        return {}
+
+    @staticmethod
+    def _project_metadata(metadata: Optional[Dict[str, Any]], metadata_keys: Optional[List[str]]) -> Dict[str, Any]:
+        """
+        按metadata_keys裁剪元数据
+
+        Args:
+            metadata: 原始元数据
+            metadata_keys: 要保留的字段，为空时保留全部
+
+        Returns:
+            Dict[str, Any]: 元数据副本
+        """
+        if not metadata:
+            return {}
+        if metadata_keys is None:
+            return dict(metadata)
+        return {key: metadata[key] for key in metadata_keys if key in metadata}
+
     @abstractmethod
     def delete_vectors(self, index_name: str, ids: List[str]) -> bool:
         """
@@ -140,6 +215,51 @@ class VectorSearchBase(ABC):
         """
         pass
 
+    def upsert_vectors(
+        self,
+        index_name: str,
+        vectors: List[List[float]],
+        ids: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        texts: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        写入向量，已存在的ID覆盖，不存在的新增
+
+        默认实现先删除再添加，支持原生upsert的后端应覆盖此方法
+
+        Args:
+            index_name: 索引名称
+            vectors: 向量列表
+            ids: 向量ID列表
+            metadatas: 元数据列表
+            texts: 原始文本列表
+
+        Returns:
+            bool: 写入是否成功
+        """
+        self.delete_vectors(index_name, ids)
+        return self.add_vectors(index_name, vectors, ids, metadatas, texts)
+
+    def scan_vectors(
+        self,
+        index_name: str,
+        batch_size: int = 1000,
+        include_vectors: bool = True,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按批遍历索引中的全部向量（迁移集合时使用）
+
+        Args:
+            index_name: 索引名称
+            batch_size: 每批返回的向量数
+            include_vectors: 是否包含向量数据
+
+        Yields:
+            List[Dict[str, Any]]: 一批向量信息，每项包含id、vector、metadata、text
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持遍历向量")
+
     @abstractmethod
     def get_index_info(self, index_name: str) -> Dict[str, Any]:
         """
@@ -11,6 +11,8 @@ from app.exceptions import VectorSearchError
 from app.utils.logging_utils import get_logger
 from app.vector.chroma_vector_search import ChromaVectorSearch
 from app.vector.chroma_remote_vector_search import ChromaRemoteVectorSearch
+from app.vector.numpy_vector_search import NumpyVectorSearch
+from app.vector.ann_vector_search import AnnVectorSearch
 from app.vector.vector_search_abstract import VectorSearchBase
 
 logger = get_logger(__name__)
@@ -131,6 +133,10 @@ class VectorSearchService:
             return self._create_chroma_instance(config, instance_name)
         elif config.type.lower() == 'chroma_remote':
             return self._create_chroma_remote_instance(config, instance_name)
+        elif config.type.lower() == 'numpy':
+            return self._create_numpy_instance(config, instance_name)
+        elif config.type.lower() == 'ann':
+            return self._create_ann_instance(config, instance_name)
         elif config.type.lower() == 'pinecone':
             # 预留支持Pinecone的接口
             raise VectorSearchError("Pinecone支持尚未实现")
@@ -156,7 +162,11 @@ class VectorSearchService:
             'path': config.path,
             'metric': config.metric,
             'timeout': config.timeout,
-            'anonymized_telemetry': False
+            'anonymized_telemetry': False,
+            'hnsw_m': config.hnsw_m,
+            'hnsw_ef_construction': config.hnsw_ef_construction,
+            'hnsw_ef_search': config.hnsw_ef_search,
+            'index_hnsw': config.index_hnsw
         }
         
         # 添加远程连接参数（如果有）
@@ -189,12 +199,69 @@ class VectorSearchService:
             'port': config.port,
             'metric': config.metric,
             'timeout': config.timeout,
-            'anonymized_telemetry': False
+            'anonymized_telemetry': False,
+            'async_mode': config.async_mode,
+            'pool_max_connections': config.pool_max_connections,
+            'pool_max_keepalive': config.pool_max_keepalive,
+            'operation_timeouts': config.operation_timeouts,
+            'max_retries': config.max_retries,
+            'retry_base_delay': config.retry_base_delay,
+            'retry_max_delay': config.retry_max_delay,
+            'add_batch_size': config.add_batch_size,
+            'add_flush_interval': config.add_flush_interval
         }
         
         # 创建并返回实例
         return ChromaRemoteVectorSearch(**chroma_kwargs)
 
+    def _create_numpy_instance(self, config: VectorSearchConfig, instance_name: str) -> NumpyVectorSearch:
+        """
+        创建NumPy内存映射向量搜索实例（进程内精确检索）
+        
+        Args:
+            config: 向量搜索配置
+            instance_name: 实例名称
+            
+        Returns:
+            NumpyVectorSearch: NumPy向量搜索实例
+        """
+        return NumpyVectorSearch(
+            path=config.path,
+            metric=config.metric,
+            compact_dimension=config.compact_dimension,
+            quantization=config.quantization,
+            rerank_factor=config.rerank_factor
+        )
+
+    def _create_ann_instance(self, config: VectorSearchConfig, instance_name: str) -> AnnVectorSearch:
+        """
+        创建FAISS/hnswlib近似向量搜索实例
+        
+        Args:
+            config: 向量搜索配置
+            instance_name: 实例名称
+            
+        Returns:
+            AnnVectorSearch: 近似向量搜索实例
+        """
+        return AnnVectorSearch(
+            path=config.path,
+            metric=config.metric,
+            index_type=config.index_type,
+            engine=config.ann_engine,
+            partition_key=config.partition_key,
+            hnsw_m=config.hnsw_m,
+            hnsw_ef_construction=config.hnsw_ef_construction,
+            hnsw_ef_search=config.hnsw_ef_search,
+            ivf_nlist=config.ivf_nlist,
+            ivf_nprobe=config.ivf_nprobe,
+            pq_m=config.pq_m,
+            index_hnsw=config.index_hnsw,
+            compact_dimension=config.compact_dimension,
+            quantization=config.quantization,
+            rerank_factor=config.rerank_factor
+        )
+
     def create_index(self, index_name: str, dimension: int, **kwargs) -> bool:
         """
         创建向量索引的便捷方法
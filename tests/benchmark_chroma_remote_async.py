@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Chroma远程客户端基准：同步客户端 + 线程池（原 asearch_texts / aadd_texts 的做法）与原生异步模式对比
+
+在本地启动 chroma run 服务器作为远程Chroma（也可用 --port 指定已运行的服务器），
+并发发起 --concurrency 个搜索，统计吞吐和单请求P50/P99延迟；再对比并发的单条添加
+（线程池逐条发送 vs 异步模式合并发送）的耗时和请求数
+
+用法: PYTHONPATH=. python tests/benchmark_chroma_remote_async.py [--size 20000] [--dimension 256]
+      [--concurrency 100] [--rounds 10] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from app.vector.chroma_remote_vector_search import ChromaRemoteVectorSearch
+
+
+# chroma run；服务端遥测的事件合并不是线程安全的，并发查询时会报KeyError，启动前关闭遥测上报
+SERVER_MAIN = ("from chromadb.telemetry.product.posthog import Posthog; Posthog.capture = lambda self, event: None; "
+               "from chromadb.cli.cli import app; app()")
+
+
+def start_server(path: str):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_MAIN, "run", "--path", path, "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/v1/heartbeat", timeout=1)
+            return process, port
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("chroma服务器未能启动")
+
+
+async def run_searches(search, queries, concurrency: int, rounds: int):
+    """每轮并发发起concurrency个搜索，返回 (每秒请求数, 单请求延迟列表ms, 每请求客户端CPU时间ms)"""
+    latencies = []
+
+    async def timed(query):
+        start = time.perf_counter()
+        await search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    for round_index in range(rounds):
+        batch = queries[round_index * concurrency:(round_index + 1) * concurrency]
+        await asyncio.gather(*(timed(query) for query in batch))
+    cpu = (time.process_time() - cpu_start) * 1000 / len(latencies)
+    return len(latencies) / (time.perf_counter() - start), latencies, cpu
+
+
+async def run(args, port: int) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.size, args.dimension)).astype(np.float32)
+    queries = rng.normal(size=(args.concurrency * args.rounds, args.dimension)).astype(np.float32).tolist()
+
+    sync_store = ChromaRemoteVectorSearch(host="127.0.0.1", port=port, embedding_service=object())
+    async_store = ChromaRemoteVectorSearch(host="127.0.0.1", port=port, embedding_service=object(), async_mode=True,
+                                           pool_max_connections=args.pool)
+    if "bench" in sync_store.list_indices():
+        sync_store.delete_index("bench")
+    sync_store.create_index("bench", args.dimension)
+    for offset in range(0, args.size, 2000):
+        chunk = vectors[offset:offset + 2000]
+        sync_store.add_vectors("bench", chunk.tolist(), [f"v_{i}" for i in range(offset, offset + len(chunk))],
+                               [{"n": i} for i in range(offset, offset + len(chunk))])
+
+    def threaded(query):
+        return asyncio.to_thread(sync_store.search_vectors, "bench", query, args.top_k)
+
+    def native(query):
+        return async_store.asearch_vectors("bench", query, args.top_k)
+
+    print(f"{args.size} 条 × {args.dimension} 维，并发 {args.concurrency} × {args.rounds} 轮，Top-{args.top_k}")
+    # 服务器在单独的进程中，CPU时间只统计客户端
+    print(f"{'方式':<20}{'QPS':>8}{'P50(ms)':>10}{'P99(ms)':>10}{'客户端CPU(ms/请求)':>20}")
+    for name, search in (("同步客户端+线程池", threaded), ("原生异步", native)):
+        await run_searches(search, queries, args.concurrency, 1)
+        qps, latencies, cpu = await run_searches(search, queries, args.concurrency, args.rounds)
+        print(f"{name:<20}{qps:>8.0f}{np.percentile(latencies, 50):>10.1f}{np.percentile(latencies, 99):>10.1f}"
+              f"{cpu:>20.2f}", flush=True)
+
+    # 并发的单条添加
+    extra = rng.normal(size=(args.adds, args.dimension)).astype(np.float32).tolist()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        asyncio.to_thread(sync_store.add_vectors, "bench", [extra[i]], [f"t_{i}"], [{"n": i}])
+        for i in range(args.adds)
+    ))
+    threaded_seconds = time.perf_counter() - start
+    batches = async_store.async_stats["add_batches"]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        async_store.aadd_vectors("bench", [extra[i]], [f"a_{i}"], [{"n": i}]) for i in range(args.adds)
+    ))
+    native_seconds = time.perf_counter() - start
+    print(f"并发添加 {args.adds} 条：线程池逐条 {threaded_seconds:.2f}s（{args.adds} 个请求），"
+          f"异步合并 {native_seconds:.2f}s（{async_store.async_stats['add_batches'] - batches} 个请求）")
+
+    await async_store.aclose()
+    sync_store.delete_index("bench")
+    sync_store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chroma远程客户端同步/异步基准")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=16, help="异步模式的最大连接数")
+    parser.add_argument("--adds", type=int, default=1000, help="并发单条添加的数量")
+    parser.add_argument("--port", type=int, default=None, help="已运行的Chroma服务器端口（不指定时在本地启动）")
+    args = parser.parse_args()
+
+    if args.port:
+        asyncio.run(run(args, args.port))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        process, port = start_server(tmp)
+        try:
+            asyncio.run(run(args, port))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+HNSW参数调优：在实际（或合成）向量上对比一组 M / ef_construction / ef_search 的召回率与延迟
+
+从已有向量库的索引中读取向量（不指定时生成聚类分布的合成向量），随机抽取已存储的向量加小扰动作为查询，
+暴力计算精确Top-k作为基准；对参数网格中的每一组参数，把向量写入临时目录中新建的集合（Chroma）
+或近似索引（ann），统计构建耗时、Recall@k和单查询P50/P99延迟
+
+用法: PYTHONPATH=. python tests/benchmark_hnsw_tuning.py [--source-type chroma --source-path ./data/chroma
+      --source-index kg.entity] [--backend chroma|ann] [--m 16,32] [--ef-construction 100,200]
+      [--ef-search 10,64,128]
+"""
+
+import argparse
+import itertools
+import tempfile
+import time
+
+import numpy as np
+
+from app.vector.ann_vector_search import AnnVectorSearch
+from app.vector.chroma_vector_search import ChromaVectorSearch
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+SOURCES = {"chroma": ChromaVectorSearch, "numpy": NumpyVectorSearch, "ann": AnnVectorSearch}
+
+
+def read_source(source_type: str, path: str, index_name: str, limit: int) -> np.ndarray:
+    """读取已有索引中的向量（最多limit条）"""
+    vector_store = SOURCES[source_type](path=path)
+    vectors = []
+    for batch in vector_store.scan_vectors(index_name, batch_size=5000):
+        vectors.extend(record["vector"] for record in batch if record.get("vector") is not None)
+        if len(vectors) >= limit:
+            break
+    vector_store.close()
+    return np.asarray(vectors[:limit], dtype=np.float32)
+
+
+def synthetic(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(200, dimension)).astype(np.float32)
+    return centers[rng.integers(0, len(centers), count)] + \
+        rng.normal(scale=0.6, size=(count, dimension)).astype(np.float32)
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, top_k: int, metric: str):
+    """暴力计算精确Top-k（每次计算64个查询）"""
+    if metric == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    truth = []
+    for start in range(0, len(queries), 64):
+        block = queries[start:start + 64]
+        scores = block @ vectors.T
+        if metric == "l2":
+            scores = 2 * scores - sq_norms
+        part = np.argpartition(-scores, top_k, axis=1)[:, :top_k]
+        truth.extend(set(row.tolist()) for row in part)
+    return truth
+
+
+def build(backend: str, path: str, vectors: np.ndarray, metric: str, m: int, ef_construction: int,
+          ef_search: int):
+    params = {"hnsw_m": m, "hnsw_ef_construction": ef_construction, "hnsw_ef_search": ef_search}
+    if backend == "chroma":
+        vector_store = ChromaVectorSearch(path=path, metric=metric, **params)
+    else:
+        vector_store = AnnVectorSearch(path=path, metric=metric, engine="hnswlib", partition_key=None, **params)
+    vector_store.create_index("tuning", vectors.shape[1])
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), 5000):
+        chunk = vectors[offset:offset + 5000]
+        vector_store.add_vectors("tuning", chunk.tolist(), [f"v_{i}" for i in range(offset, offset + len(chunk))])
+    if backend == "ann":
+        vector_store.save_index("tuning")
+    return vector_store, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HNSW参数调优")
+    parser.add_argument("--source-type", choices=sorted(SOURCES), default=None)
+    parser.add_argument("--source-path", default=None)
+    parser.add_argument("--source-index", default="kg.entity")
+    parser.add_argument("--limit", type=int, default=50000, help="最多读取的向量数")
+    parser.add_argument("--size", type=int, default=20000, help="未指定来源时合成的向量数")
+    parser.add_argument("--dimension", type=int, default=128, help="未指定来源时合成的向量维度")
+    parser.add_argument("--metric", default="cosine")
+    parser.add_argument("--backend", choices=["chroma", "ann"], default="chroma")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.01, help="查询相对向量范数的扰动比例")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--m", default="16,32")
+    parser.add_argument("--ef-construction", default="100,200")
+    parser.add_argument("--ef-search", default="10,64,128")
+    args = parser.parse_args()
+
+    if args.source_type:
+        vectors = read_source(args.source_type, args.source_path, args.source_index, args.limit)
+        source = f"{args.source_type}:{args.source_path}/{args.source_index}"
+    else:
+        vectors = synthetic(args.size, args.dimension)
+        source = "合成聚类向量"
+    if len(vectors) <= args.top_k:
+        raise SystemExit(f"向量数量不足: {len(vectors)}")
+
+    # 从已存储的向量中抽样作为查询，加小扰动避免查询与向量完全相同
+    rng = np.random.default_rng(1)
+    sampled = vectors[rng.choice(len(vectors), size=args.queries, replace=len(vectors) < args.queries)]
+    norms = np.linalg.norm(sampled, axis=1, keepdims=True)
+    queries = sampled + rng.normal(size=sampled.shape).astype(np.float32) * norms * args.noise / np.sqrt(
+        vectors.shape[1])
+    truth = ground_truth(vectors, queries, args.top_k, args.metric)
+
+    print(f"{source}：{len(vectors)} 条 × {vectors.shape[1]} 维，{args.backend}，查询 {args.queries}，"
+          f"Top-{args.top_k}")
+    print(f"{'M':>4}{'ef_c':>6}{'ef_s':>6}{'构建(s)':>9}{'Recall':>8}{'P50(ms)':>9}{'P99(ms)':>9}")
+    grid = itertools.product(
+        (int(value) for value in args.m.split(",")),
+        [int(value) for value in args.ef_construction.split(",")],
+        [int(value) for value in args.ef_search.split(",")]
+    )
+    for m, ef_construction, ef_search in grid:
+        with tempfile.TemporaryDirectory() as tmp:
+            vector_store, build_seconds = build(args.backend, tmp, vectors, args.metric, m, ef_construction,
+                                                ef_search)
+            vector_store.search_vectors("tuning", queries[0].tolist(), args.top_k, include=[])
+            latencies, recalls = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                results = vector_store.search_vectors("tuning", query.tolist(), args.top_k, include=['distances'])
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = {int(result["id"].split("_")[1]) for result in results}
+                recalls.append(len(found & expected) / args.top_k)
+            vector_store.close()
+        print(f"{m:>4}{ef_construction:>6}{ef_search:>6}{build_seconds:>9.1f}{np.mean(recalls):>8.3f}"
+              f"{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 99):>9.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+查询接口序列化基准
+
+在临时SQLite数据库中生成模拟数据，逐个接口统计：
+- 查询耗时（KGQueryService方法，含结果组装）
+- 序列化耗时：FastAPI默认路径（jsonable_encoder + json.dumps）与路由实际使用的render_json
+- 响应体大小
+
+用法: PYTHONPATH=. python tests/benchmark_serialization.py [--entities 5000] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.api.kg_route_utils import render_json
+from app.config.config_manager import EntityStatsConfig, GraphIndexConfig
+from app.database.models import Base, Entity, Relation, NewsEvent, news_event_entity
+from app.services.kg_query_service import KGQueryService
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+
+
+async def populate(engine, entity_count: int) -> None:
+    """生成实体、关系、新闻和新闻-实体关联"""
+    random.seed(0)
+    base_time = datetime(2024, 1, 1)
+    news_count = entity_count
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Entity), [
+            {"id": i, "name": f"实体{i}", "type": random.choice(["公司", "人物", "产品", "地点"]),
+             "description": "描述" * 20, "created_at": base_time + timedelta(minutes=i)}
+            for i in range(1, entity_count + 1)
+        ])
+        edges = set()
+        while len(edges) < entity_count * 4:
+            subject_id, object_id = random.randint(1, entity_count), random.randint(1, entity_count)
+            if subject_id != object_id:
+                edges.add((subject_id, object_id, random.choice(["投资", "合作", "竞争", "隶属"])))
+        await conn.execute(insert(Relation), [
+            {"subject_id": s, "object_id": o, "predicate": p, "description": "关系描述",
+             "created_at": base_time + timedelta(seconds=i)}
+            for i, (s, o, p) in enumerate(edges)
+        ])
+        await conn.execute(insert(NewsEvent), [
+            {"id": i, "title": f"新闻{i}", "content": "正文" * 200, "source": "来源",
+             "publish_time": base_time + timedelta(minutes=i)}
+            for i in range(1, news_count + 1)
+        ])
+        links = {(n, random.randint(1, 50)) for n in range(1, news_count + 1)}
+        links |= {(n, random.randint(1, entity_count)) for n in range(1, news_count + 1) for _ in range(3)}
+        await conn.execute(insert(news_event_entity), [
+            {"news_event_id": n, "entity_id": e} for n, e in links
+        ])
+
+
+ENDPOINTS = {
+    "entities(100)": lambda s: s.get_entity_list(page_size=100),
+    "relations(100)": lambda s: s.get_relation_list(page_size=100),
+    "news(100)": lambda s: s.get_news_list(page_size=100),
+    "entity_news(50)": lambda s: s.get_entity_news(1, page_size=50),
+    "neighbors(200)": lambda s: s.get_entity_neighbors(1, depth=2, max_entities=200),
+    "neighbors(500)": lambda s: s.get_entity_neighbors(1, depth=2, max_entities=500),
+    "columnar(500)": lambda s: s.get_entity_neighbors(1, depth=2, max_entities=500, response_format="columnar"),
+}
+
+
+def timed(func, rounds: int) -> float:
+    """同步函数的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def stdlib_render(content) -> bytes:
+    """FastAPI默认JSONResponse路径"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def main(entity_count: int, rounds: int) -> None:
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    EntityStatsManager(EntityStatsConfig(enabled=False))
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    await populate(engine, entity_count)
+
+    print(f"{'endpoint':<18}{'query ms':>10}{'stdlib ms':>11}{'render ms':>11}{'bytes':>10}")
+    async with AsyncSession(engine) as session:
+        service = KGQueryService(session)
+        for name, call in ENDPOINTS.items():
+            result = await call(service)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                result = await call(service)
+            query_ms = (time.perf_counter() - start) * 1000 / rounds
+
+            stdlib_ms = timed(lambda: stdlib_render(result), rounds)
+            render_ms = timed(lambda: render_json(result), rounds)
+            print(f"{name:<18}{query_ms:>10.2f}{stdlib_ms:>11.3f}{render_ms:>11.3f}{len(render_json(result)):>10}")
+
+    await engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查询接口序列化基准")
+    parser.add_argument("--entities", type=int, default=5000, help="模拟实体数量")
+    parser.add_argument("--rounds", type=int, default=20, help="每个接口的重复次数")
+    args = parser.parse_args()
+    asyncio.run(main(args.entities, args.rounds))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+流式实体关系提取基准：一次性调用后再逐个处理实体（原做法）与流式提取、实体生成完整就处理的对比
+
+模拟大模型按 --chars-per-second 的速度输出提取结果（--entities 个实体、--relations 个关系），
+每个实体的查找和存储耗时 --resolve-ms；统计第一个实体存储完成的时间和实体全部处理完的总耗时
+
+用法: PYTHONPATH=. python tests/benchmark_streaming_extraction.py [--entities 30] [--relations 20]
+      [--chars-per-second 400] [--resolve-ms 150] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from unittest.mock import Mock
+
+from app.core.content_processor import ContentProcessor
+from app.llm.base import LLMResponse
+from app.services.kg_core_impl import KGCoreImplService
+
+
+def build_response(entities: int, relations: int) -> str:
+    data = {
+        "is_financial_content": True,
+        "confidence": 0.9,
+        "entities": [{"name": f"实体{i}", "type": "公司", "description": f"第{i}个实体的描述，包含业务范围和所在地区"}
+                     for i in range(entities)],
+        "relations": [{"subject": f"实体{i}", "predicate": "合作", "object": f"实体{i + 1}",
+                       "description": "双方签署战略合作协议"} for i in range(relations)],
+    }
+    return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+
+
+class SimulatedLLMService:
+    """按固定速度输出的大模型服务"""
+
+    CHUNK = 8
+
+    def __init__(self, response: str, chars_per_second: float):
+        self.response = response
+        self.delay = self.CHUNK / chars_per_second
+
+    async def astream(self, prompt, **kwargs):
+        for offset in range(0, len(self.response), self.CHUNK):
+            await asyncio.sleep(self.delay)
+            yield self.response[offset:offset + self.CHUNK]
+
+    async def generate_async(self, prompt, **kwargs):
+        await asyncio.sleep(self.delay * len(range(0, len(self.response), self.CHUNK)))
+        return LLMResponse(content=self.response)
+
+
+class SimulatedStore:
+    """没有已有实体、查找和存储每个实体需要固定时间的存储"""
+
+    def __init__(self, resolve_seconds: float):
+        self.resolve_seconds = resolve_seconds
+        self.first_created_at = None
+
+    async def search_entities(self, **kwargs):
+        await asyncio.sleep(self.resolve_seconds / 2)
+        return []
+
+    async def create_entity(self, entity):
+        await asyncio.sleep(self.resolve_seconds / 2)
+        if self.first_created_at is None:
+            self.first_created_at = time.perf_counter()
+        return entity
+
+
+async def run_once(args, response: str, streaming: bool):
+    """返回 (第一个实体存储完成的秒数, 总秒数)"""
+    llm = SimulatedLLMService(response, args.chars_per_second)
+    processor = ContentProcessor(llm_service=llm)
+    service = KGCoreImplService(content_processor=processor, entity_analyzer=Mock(), content_summarizer=Mock(),
+                                llm_service=llm, auto_init_store=False)
+    service.store = SimulatedStore(args.resolve_ms / 1000)
+
+    start = time.perf_counter()
+    if streaming:
+        stream = processor.stream_entities_and_relations("基准文本", entity_types="公司", relation_types="合作")
+        processed = await service._process_entities_with_vector_search(stream)
+    else:
+        result = await processor.extract_entities_and_relations("基准文本", entity_types="公司", relation_types="合作")
+        processed = await service._process_entities_with_vector_search(result.knowledge_graph.entities)
+    total = time.perf_counter() - start
+    assert len(processed) == args.entities
+    return service.store.first_created_at - start, total
+
+
+async def run(args) -> None:
+    response = build_response(args.entities, args.relations)
+    generation = len(response) / args.chars_per_second
+    print(f"{args.entities} 个实体、{args.relations} 个关系，响应 {len(response)} 字符，"
+          f"生成约 {generation:.1f}s，每个实体处理 {args.resolve_ms}ms")
+    print(f"{'方式':<16}{'首个实体存储(s)':>16}{'总耗时(s)':>12}")
+    for name, streaming in (("一次性调用", False), ("流式提取", True)):
+        results = [await run_once(args, response, streaming) for _ in range(args.rounds)]
+        first = sum(r[0] for r in results) / len(results)
+        total = sum(r[1] for r in results) / len(results)
+        print(f"{name:<16}{first:>16.2f}{total:>12.2f}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="流式实体关系提取基准")
+    parser.add_argument("--entities", type=int, default=30)
+    parser.add_argument("--relations", type=int, default=20)
+    parser.add_argument("--chars-per-second", type=float, default=400, help="模拟的大模型输出速度")
+    parser.add_argument("--resolve-ms", type=float, default=150, help="每个实体的查找和存储耗时")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+向量后端基准：NumPy内存映射精确检索、FAISS/hnswlib近似索引（ann） 与 Chroma（HNSW）
+
+对每个规模在临时目录中写入同一批聚类分布的向量，统计写入速度（ann含建索引）、单查询平均/P95耗时、
+批量查询的每查询耗时和Recall@k（以精确余弦Top-k为基准），以及带元数据过滤的单查询耗时
+
+用法: PYTHONPATH=. python tests/benchmark_vector_backends.py [--sizes 10000,100000,1000000]
+      [--backends numpy,ann,chroma] [--chroma-max 1000000]
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.vector.ann_vector_search import AnnVectorSearch
+from app.vector.chroma_vector_search import ChromaVectorSearch
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+
+def generate(count: int, query_count: int, dimension: int, seed: int = 0):
+    """向量来自200个聚类中心，查询为已有向量加小扰动"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(200, dimension)).astype(np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, 100000):
+        end = min(start + 100000, count)
+        vectors[start:end] = centers[rng.integers(0, len(centers), end - start)] + \
+            rng.normal(scale=0.6, size=(end - start, dimension)).astype(np.float32)
+    queries = vectors[rng.integers(0, count, query_count)] + \
+        rng.normal(scale=0.05, size=(query_count, dimension)).astype(np.float32)
+    return vectors, queries
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int):
+    normalized_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1)
+    truth = []
+    for query in normalized_queries:
+        scores = (vectors @ query) / norms
+        part = np.argpartition(-scores, top_k)[:top_k]
+        truth.append(set(part.tolist()))
+    return truth
+
+
+def load(vector_store, vectors: np.ndarray, batch_size: int = 5000) -> float:
+    vector_store.create_index("bench", vectors.shape[1])
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        chunk = vectors[offset:offset + batch_size]
+        vector_store.add_vectors(
+            "bench", chunk.tolist(), [f"v_{i}" for i in range(offset, offset + len(chunk))],
+            [{"content_type": "entity", "type": f"t{i % 10}"} for i in range(offset, offset + len(chunk))]
+        )
+    if isinstance(vector_store, AnnVectorSearch):
+        vector_store.save_index("bench")
+    return len(vectors) / (time.perf_counter() - start)
+
+
+def measure(vector_store, queries, truth, top_k, batch_size):
+    include = ['metadatas', 'distances']
+    latencies, recalls = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        results = vector_store.search_vectors("bench", query.tolist(), top_k, include=include)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {int(result["id"].split("_")[1]) for result in results}
+        recalls.append(len(found & truth[i]) / top_k)
+
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        vector_store.search_vectors_batch("bench", queries[offset:offset + batch_size].tolist(), top_k,
+                                          include=include)
+    batch_latency = (time.perf_counter() - start) * 1000 / len(queries)
+
+    filtered = []
+    for query in queries[:50]:
+        start = time.perf_counter()
+        vector_store.search_vectors("bench", query.tolist(), top_k, {"type": "t3"}, include=include)
+        filtered.append((time.perf_counter() - start) * 1000)
+    return np.mean(latencies), np.percentile(latencies, 95), batch_latency, np.mean(filtered), np.mean(recalls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="向量后端基准")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--backends", default="numpy,ann,chroma")
+    parser.add_argument("--chroma-max", type=int, default=None, help="超过该规模时跳过Chroma（写入耗时较长）")
+    args = parser.parse_args()
+
+    print(f"维度 {args.dimension}，查询 {args.queries}，批量 {args.batch_size}，Top-{args.top_k}")
+    print(f"{'规模':>9} {'后端':<8}{'写入(条/s)':>12}{'平均(ms)':>10}{'P95(ms)':>10}"
+          f"{'批量(ms/条)':>12}{'过滤(ms)':>10}{'Recall':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        vectors, queries = generate(size, args.queries, args.dimension)
+        truth = exact_top_k(vectors, queries, args.top_k)
+        backends = [(name, backend) for name, backend in (
+            ("numpy", NumpyVectorSearch), ("ann", AnnVectorSearch), ("chroma", ChromaVectorSearch)
+        ) if name in args.backends.split(",")]
+        if args.chroma_max is not None and size > args.chroma_max:
+            backends = [(name, backend) for name, backend in backends if name != "chroma"]
+
+        for name, backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                vector_store = backend(path=f"{tmp}/{name}")
+                rate = load(vector_store, vectors)
+                # 预热（Chroma加载HNSW索引、NumPy建立过滤用的倒排表）
+                measure(vector_store, queries[:5], truth[:5], args.top_k, args.batch_size)
+                mean, p95, batch, filtered, recall = measure(vector_store, queries, truth, args.top_k,
+                                                             args.batch_size)
+                print(f"{size:>9} {name:<8}{rate:>12.0f}{mean:>10.2f}{p95:>10.2f}"
+                      f"{batch:>12.2f}{filtered:>10.2f}{recall:>8.3f}", flush=True)
+                vector_store.close()
+
+
+if __name__ == "__main__":
+    main()
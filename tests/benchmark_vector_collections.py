@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+向量集合布局基准：单集合 + content_type过滤 与 按内容类型拆分的集合
+
+在临时Chroma目录中生成聚类分布的实体向量和（数量多得多的）新闻向量，分别写入两种布局，
+统计实体搜索的平均/P95耗时和Recall@k（以实体向量的精确余弦Top-k为基准）
+
+用法: PYTHONPATH=. python tests/benchmark_vector_collections.py [--entities 2000] [--news 20000] [--queries 200]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+class QueryEmbeddingService:
+    """查询文本为 q<序号>，返回预先生成的查询向量"""
+
+    def __init__(self, queries: np.ndarray):
+        self.queries = queries
+
+    async def aembed_text(self, text: str):
+        return self.queries[int(text[1:])].tolist()
+
+
+def generate(entity_count: int, news_count: int, query_count: int, dimension: int):
+    """实体和新闻来自同一组聚类中心，新闻在每个簇中都占多数"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(50, dimension))
+
+    def sample(count, noise):
+        points = centers[rng.integers(0, len(centers), count)] + rng.normal(scale=noise, size=(count, dimension))
+        return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+    entities = sample(entity_count, 0.6)
+    news = sample(news_count, 0.6)
+    queries = entities[rng.integers(0, entity_count, query_count)] + rng.normal(scale=0.05, size=(query_count, dimension))
+    return entities, news, queries.astype(np.float32)
+
+
+def load(vector_store, index_name, vectors, content_type, batch_size=4000):
+    for start in range(0, len(vectors), batch_size):
+        chunk = vectors[start:start + batch_size]
+        ids = [f"{content_type}_{i}" for i in range(start, start + len(chunk))]
+        vector_store.add_vectors(
+            index_name, chunk.tolist(), ids,
+            [{"content_type": content_type, "content_id": str(i)} for i in range(start, start + len(chunk))]
+        )
+
+
+async def measure(manager, queries, truth, top_k):
+    latencies, recalls = [], []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        results = await manager.search_vectors(f"q{i}", "entity", top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {int(result["vector_id"].split("_")[1]) for result in results}
+        recalls.append(len(found & truth[i]) / top_k)
+    return np.mean(latencies), np.percentile(latencies, 95), np.mean(recalls)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="向量集合布局基准")
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--news", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    entities, news, queries = generate(args.entities, args.news, args.queries, args.dimension)
+    scores = queries @ entities.T
+    truth = [set(np.argsort(-row)[:args.top_k].tolist()) for row in scores]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = ChromaVectorSearch(path=f"{tmp}/chroma")
+        embedding = QueryEmbeddingService(queries)
+
+        single = VectorIndexManager(vector_store, embedding, state_path=f"{tmp}/single.json",
+                                    entity_type_collections={})
+        vector_store.create_index("default", args.dimension)
+        load(vector_store, "default", entities, "entity")
+        load(vector_store, "default", news, "news")
+
+        split = VectorIndexManager(vector_store, embedding, state_path=f"{tmp}/split.json",
+                                   entity_type_collections={})
+        split.switch_index("kg")
+        for content_type in split.CONTENT_TYPES:
+            vector_store.create_index(split.collection_for(content_type), args.dimension)
+        load(vector_store, "kg.entity", entities, "entity")
+        load(vector_store, "kg.news", news, "news")
+
+        print(f"实体 {args.entities}，新闻 {args.news}，维度 {args.dimension}，查询 {args.queries}，Top-{args.top_k}")
+        print(f"{'布局':<24}{'平均(ms)':>10}{'P95(ms)':>10}{'Recall':>10}")
+        for name, manager in (("单集合+content_type过滤", single), ("按类型拆分", split)):
+            # 预热
+            await measure(manager, queries[:10], truth[:10], args.top_k)
+            mean, p95, recall = await measure(manager, queries, truth, args.top_k)
+            print(f"{name:<24}{mean:>10.2f}{p95:>10.2f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
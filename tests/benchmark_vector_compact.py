@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+紧凑向量基准：降维/量化粗排 + 完整向量精排的内存占用与Recall@k
+
+数据为合成的1536维聚类向量，各维方差按幂律递减，模拟text-embedding-3这类前若干维承载主要信息、
+可直接截断的嵌入。对每种配置统计粗排向量每百万条的内存占用、不精排（rerank_factor=1）和精排时的
+Recall@k（以完整float32精确Top-k为基准）及单查询平均耗时
+
+用法: PYTHONPATH=. python tests/benchmark_vector_compact.py [--size 100000] [--dimension 1536]
+      [--rerank-factor 4] [--backends numpy,ann]
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.vector.ann_vector_search import AnnVectorSearch
+from app.vector.numpy_memmap_index import _CompactCodec
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+# (名称, compact_dimension, quantization)
+CONFIGS = [
+    ("float32", None, "none"),
+    ("float16", None, "float16"),
+    ("int8", None, "int8"),
+    ("512维", 512, "none"),
+    ("256维", 256, "none"),
+    ("256维int8", 256, "int8"),
+]
+
+
+def generate(count: int, query_count: int, dimension: int, seed: int = 0):
+    """向量来自200个聚类中心，各维按 (i+1)^-0.5 缩放；查询为已有向量加小扰动"""
+    rng = np.random.default_rng(seed)
+    spectrum = (np.arange(1, dimension + 1) ** -0.5).astype(np.float32)
+    centers = rng.normal(size=(200, dimension)).astype(np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, 20000):
+        end = min(start + 20000, count)
+        block = centers[rng.integers(0, len(centers), end - start)]
+        block += rng.normal(scale=0.6, size=(end - start, dimension)).astype(np.float32)
+        vectors[start:end] = block * spectrum
+    queries = vectors[rng.integers(0, count, query_count)] + \
+        rng.normal(scale=0.02, size=(query_count, dimension)).astype(np.float32) * spectrum
+    return vectors, queries
+
+
+def load(vector_store, vectors: np.ndarray, batch_size: int = 5000) -> None:
+    vector_store.create_index("bench", vectors.shape[1])
+    for offset in range(0, len(vectors), batch_size):
+        chunk = vectors[offset:offset + batch_size]
+        vector_store.add_vectors("bench", chunk.tolist(), [f"v_{i}" for i in range(offset, offset + len(chunk))])
+
+
+def measure(vector_store, queries, truth, top_k):
+    latencies, recalls = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        results = vector_store.search_vectors("bench", query.tolist(), top_k, include=['distances'])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({int(result["id"].split("_")[1]) for result in results} & truth[i]) / top_k)
+    return np.mean(latencies), np.mean(recalls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="紧凑向量基准")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--backends", default="numpy,ann")
+    args = parser.parse_args()
+
+    vectors, queries = generate(args.size, args.queries, args.dimension)
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = NumpyVectorSearch(path=f"{tmp}/vectors")
+        load(exact, vectors)
+        truth = [{int(result["id"].split("_")[1]) for result in results}
+                 for results in exact.search_vectors_batch("bench", queries.tolist(), args.top_k)]
+
+        print(f"{args.size} 条 × {args.dimension} 维，查询 {args.queries}，Top-{args.top_k}，"
+              f"精排候选 {args.top_k} × {args.rerank_factor}")
+        print(f"{'后端':<6}{'配置':<12}{'MB/百万条':>11}{'粗排Recall':>12}{'精排Recall':>12}{'精排耗时(ms)':>14}")
+        for backend in args.backends.split(","):
+            for name, compact_dimension, quantization in CONFIGS:
+                if backend == "ann" and quantization != "none":
+                    # hnswlib不支持量化存储（需要faiss）
+                    continue
+                codec = _CompactCodec(args.dimension, "cosine", compact_dimension, quantization)
+                # 近似索引另有图结构开销，这里只统计向量本身
+                megabytes = codec.bytes_per_vector * 1_000_000 / 2 ** 20
+                recalls = []
+                for rerank_factor in (1, args.rerank_factor):
+                    if backend == "numpy":
+                        vector_store = NumpyVectorSearch(path=f"{tmp}/vectors", compact_dimension=compact_dimension,
+                                                         quantization=quantization, rerank_factor=rerank_factor)
+                    else:
+                        vector_store = AnnVectorSearch(path=f"{tmp}/vectors", engine="hnswlib",
+                                                       compact_dimension=compact_dimension,
+                                                       rerank_factor=rerank_factor)
+                    measure(vector_store, queries[:5], truth[:5], args.top_k)
+                    latency, recall = measure(vector_store, queries, truth, args.top_k)
+                    recalls.append(recall)
+                    vector_store.close()
+                print(f"{backend:<6}{name:<12}{megabytes:>11.0f}{recalls[0]:>12.3f}{recalls[1]:>12.3f}"
+                      f"{latency:>14.2f}", flush=True)
+            if backend == "ann":
+                for path in list((exact.path / "bench").glob("ann.*")):
+                    path.unlink()
+        exact.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Chroma搜索结果字段裁剪基准
+
+对比旧的默认字段（向量+元数据+文本+距离）与新的默认字段（元数据+距离，可再按metadata_keys裁剪）
+的单查询耗时和Python内存分配（tracemalloc统计的每查询分配峰值），以及集合句柄缓存未命中时
+list_collections + get_collection 与直接 get_collection 的耗时
+
+用法: PYTHONPATH=. python tests/benchmark_vector_projection.py [--size 20000] [--dimension 1536] [--top-k 10]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+PROJECTIONS = [
+    ("全部字段(旧默认)", {"include": ["embeddings", "metadatas", "documents", "distances"]}),
+    ("元数据+距离(新默认)", {}),
+    ("content_id+距离", {"metadata_keys": ["content_id"]}),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chroma搜索结果字段裁剪基准")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--collections", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.size, args.dimension)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, args.dimension)).astype(np.float32).tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = ChromaVectorSearch(path=tmp)
+        vector_store.create_index("bench", args.dimension)
+        for offset in range(0, args.size, 5000):
+            chunk = vectors[offset:offset + 5000]
+            ids = range(offset, offset + len(chunk))
+            vector_store.add_vectors(
+                "bench", chunk.tolist(), [f"entity_{i}" for i in ids],
+                [{"content_type": "entity", "content_id": str(i), "type": "公司", "name": f"实体{i}",
+                  "description": "描述" * 50} for i in ids],
+                [f"实体{i}: " + "描述" * 100 for i in ids]
+            )
+        vector_store.search_vectors("bench", queries[0], args.top_k)
+
+        print(f"{args.size} 条 × {args.dimension} 维，查询 {args.queries}，Top-{args.top_k}")
+        print(f"{'字段':<16}{'平均(ms)':>10}{'分配峰值(KB)':>16}")
+        for name, kwargs in PROJECTIONS:
+            start = time.perf_counter()
+            for query in queries:
+                vector_store.search_vectors("bench", query, args.top_k, **kwargs)
+            latency = (time.perf_counter() - start) * 1000 / len(queries)
+
+            # 每个查询过程中的内存分配峰值（相对查询前）
+            peaks = []
+            tracemalloc.start()
+            for query in queries[:50]:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                vector_store.search_vectors("bench", query, args.top_k, **kwargs)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            tracemalloc.stop()
+            print(f"{name:<16}{latency:>10.2f}{np.mean(peaks) / 1024:>16.1f}", flush=True)
+
+        # 集合句柄缓存未命中的开销
+        for i in range(args.collections):
+            vector_store.create_index(f"bench_{i}", args.dimension)
+        rounds = 50
+        start = time.perf_counter()
+        for _ in range(rounds):
+            names = [collection.name for collection in vector_store.client.list_collections()]
+            if "bench" in names:
+                vector_store.client.get_collection(name="bench")
+        listed = (time.perf_counter() - start) * 1000 / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            vector_store.collections.clear()
+            vector_store._get_collection("bench")
+        direct = (time.perf_counter() - start) * 1000 / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            vector_store._get_collection("bench")
+        cached = (time.perf_counter() - start) * 1000 / rounds
+        print(f"获取集合（共 {args.collections + 1} 个集合）: list+get {listed:.2f} ms，"
+              f"直接get {direct:.2f} ms，缓存命中 {cached:.4f} ms")
+        vector_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+测试FAISS/hnswlib近似向量搜索（按type拆分的子索引、过滤、删除、持久化与增量同步）
+"""
+
+import numpy as np
+import pytest
+
+from app.exceptions.vector_exceptions import VectorSearchError
+from app.vector import ann_vector_search
+from app.vector.ann_vector_search import AnnVectorSearch
+from app.vector.numpy_vector_search import NumpyVectorSearch
+
+
+DIMENSION = 16
+COUNT = 2000
+
+
+def clustered_vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, DIMENSION))
+    return (centers[rng.integers(0, 20, count)] + rng.normal(scale=0.5, size=(count, DIMENSION))).astype(np.float32)
+
+
+def load(vector_store, vectors):
+    vector_store.create_index("kg.entity", DIMENSION)
+    vector_store.add_vectors(
+        "kg.entity", vectors.tolist(), [f"entity_{i}" for i in range(len(vectors))],
+        [{"content_type": "entity", "type": "公司" if i % 4 == 0 else "人物", "group": i % 2}
+         for i in range(len(vectors))]
+    )
+
+
+@pytest.fixture
+def vectors():
+    return clustered_vectors(COUNT)
+
+
+class TestAnnVectorSearch:
+    """近似向量搜索测试"""
+
+    def test_hnsw_recall_and_partition_filters(self, tmp_path, vectors):
+        vector_store = AnnVectorSearch(path=str(tmp_path / "vectors"), index_type="hnsw", engine="hnswlib")
+        exact = NumpyVectorSearch(path=str(tmp_path / "vectors"))
+        load(vector_store, vectors)
+        queries = (clustered_vectors(20, seed=1) * np.linspace(2.0, 0.1, DIMENSION)).tolist()
+
+        found = vector_store.search_vectors_batch("kg.entity", queries, top_k=10)
+        truth = exact.search_vectors_batch("kg.entity", queries, top_k=10)
+        recall = np.mean([len({r["id"] for r in a} & {r["id"] for r in b}) / 10 for a, b in zip(found, truth)])
+        assert recall >= 0.95
+        assert [r["score"] for r in found[0]] == sorted(r["score"] for r in found[0])
+        assert found[0][0]["score"] == pytest.approx(truth[0][0]["score"], abs=1e-5)
+        assert vector_store.get_index_info("kg.entity")["partitions"] == 2
+
+        # 按分区字段过滤只搜索对应子索引
+        companies = vector_store.search_vectors("kg.entity", queries[0], 10, {"type": "公司"})
+        assert len(companies) == 10 and all(int(r["id"].split("_")[1]) % 4 == 0 for r in companies)
+        assert vector_store.search_vectors("kg.entity", queries[0], 10, {"type": "地点"}) == []
+        # 其他过滤条件与分区条件组合
+        mixed = vector_store.search_vectors("kg.entity", queries[0], 10, {"$and": [{"type": "人物"}, {"group": 1}]})
+        assert len(mixed) == 10 and all(int(r["id"].split("_")[1]) % 2 == 1 for r in mixed)
+
+    def test_residual_filter_above_exact_limit_uses_ann(self, tmp_path, vectors, monkeypatch):
+        monkeypatch.setattr(ann_vector_search, "EXACT_FILTER_MAX", 10)
+        vector_store = AnnVectorSearch(path=str(tmp_path / "vectors"), engine="hnswlib")
+        load(vector_store, vectors)
+
+        results = vector_store.search_vectors("kg.entity", vectors[1].tolist(), 10, {"group": 1})
+        assert len(results) == 10 and results[0]["id"] == "entity_1"
+        assert all(r["metadata"]["group"] == 1 for r in results)
+
+    def test_deletes_updates_and_persistence(self, tmp_path, vectors):
+        path = str(tmp_path / "vectors")
+        vector_store = AnnVectorSearch(path=path, engine="hnswlib")
+        load(vector_store, vectors)
+        assert vector_store.search_vectors("kg.entity", vectors[0].tolist(), 1)[0]["id"] == "entity_0"
+
+        vector_store.delete_vectors("kg.entity", ["entity_0"])
+        vector_store.update_vectors("kg.entity", [vectors[5].tolist()], ["entity_4"], [{"type": "人物"}])
+        results = vector_store.search_vectors("kg.entity", vectors[0].tolist(), 5)
+        assert "entity_0" not in {r["id"] for r in results}
+        # entity_4改为与entity_5相同的向量并移动到人物分区
+        moved = vector_store.search_vectors("kg.entity", vectors[5].tolist(), 2, {"type": "人物"})
+        assert {r["id"] for r in moved} == {"entity_4", "entity_5"}
+        vector_store.close()
+        assert (tmp_path / "vectors" / "kg.entity" / "ann.json").exists()
+
+        # 重新打开后加载已保存的子索引，只同步保存之后的日志
+        reopened = AnnVectorSearch(path=path, engine="hnswlib")
+        writer = NumpyVectorSearch(path=path)
+        writer.add_vectors("kg.entity", [vectors[0].tolist()], ["entity_new"], [{"type": "公司"}])
+        writer.delete_vectors("kg.entity", ["entity_8"])
+        results = reopened.search_vectors("kg.entity", vectors[0].tolist(), 3, {"type": "公司"})
+        assert results[0]["id"] == "entity_new"
+        assert "entity_8" not in {r["id"] for r in reopened.search_vectors("kg.entity", vectors[8].tolist(), 5)}
+        state = reopened.ann_states[tmp_path / "vectors" / "kg.entity"]
+        assert (state.saved_watermark, state.watermark) == (COUNT + 1, COUNT + 2)
+        assert sum(live for _, _, live in state.partitions.values()) == reopened.count_vectors("kg.entity")
+
+        # 压缩后行号变化，按新的文件代号重建
+        reopened.compact_index("kg.entity")
+        assert reopened.search_vectors("kg.entity", vectors[9].tolist(), 1)[0]["id"] == "entity_9"
+        reopened.close()
+
+    def test_index_type_and_engine_selection(self, tmp_path, vectors):
+        flat = AnnVectorSearch(path=str(tmp_path / "vectors"), index_type="flat")
+        load(flat, vectors)
+        assert flat.search_vectors("kg.entity", vectors[3].tolist(), 1)[0]["id"] == "entity_3"
+        assert not (tmp_path / "vectors" / "kg.entity" / "ann.json").exists()
+
+        with pytest.raises(VectorSearchError):
+            AnnVectorSearch(path=str(tmp_path / "vectors"), index_type="lsh")
+        if not ann_vector_search.FAISS_AVAILABLE:
+            with pytest.raises(VectorSearchError):
+                AnnVectorSearch(path=str(tmp_path / "vectors"), index_type="ivf_pq")
+
+    def test_reduced_dimension_subindexes_rerank_with_full_vectors(self, tmp_path, vectors):
+        # 方差逐维递减，前几维承载大部分信息（与可截断的嵌入相似）
+        vectors = vectors * np.linspace(2.0, 0.1, DIMENSION).astype(np.float32)
+        path = str(tmp_path / "vectors")
+        vector_store = AnnVectorSearch(path=path, engine="hnswlib", compact_dimension=8, rerank_factor=4)
+        exact = NumpyVectorSearch(path=path)
+        load(vector_store, vectors)
+        queries = (clustered_vectors(20, seed=1) * np.linspace(2.0, 0.1, DIMENSION)).tolist()
+
+        found = vector_store.search_vectors_batch("kg.entity", queries, top_k=10)
+        truth = exact.search_vectors_batch("kg.entity", queries, top_k=10)
+        recall = np.mean([len({r["id"] for r in a} & {r["id"] for r in b}) / 10 for a, b in zip(found, truth)])
+        assert recall >= 0.9
+        assert found[0][0]["score"] == pytest.approx(truth[0][0]["score"], abs=1e-5)
+        assert [r["score"] for r in found[0]] == sorted(r["score"] for r in found[0])
+        info = vector_store.get_index_info("kg.entity")
+        assert (info["compact_dimension"], info["rerank"]) == (8, True)
+        vector_store.close()
+
+        # 降维参数变化后不复用按完整维度保存的子索引
+        full = AnnVectorSearch(path=path, engine="hnswlib")
+        assert full.search_vectors("kg.entity", vectors[3].tolist(), 1)[0]["id"] == "entity_3"
+        full.close()
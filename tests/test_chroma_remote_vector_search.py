@@ -0,0 +1,148 @@
+"""
+测试Chroma远程向量搜索的原生异步模式（合并添加、重试、操作截止时间）
+
+在本地启动一个 chroma run 服务器作为远程Chroma
+"""
+
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from app.exceptions.vector_exceptions import IndexNotFoundError, QueryError, VectorSearchTimeoutError
+from app.vector.chroma_remote_vector_search import ChromaRemoteVectorSearch
+
+
+DIMENSION = 8
+
+
+# chroma run；服务端遥测的事件合并不是线程安全的，并发查询时会报KeyError，启动前关闭遥测上报
+SERVER_MAIN = ("from chromadb.telemetry.product.posthog import Posthog; Posthog.capture = lambda self, event: None; "
+               "from chromadb.cli.cli import app; app()")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def chroma_server(tmp_path_factory):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_MAIN, "run",
+         "--path", str(tmp_path_factory.mktemp("chroma_server")), "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(300):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/v1/heartbeat", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            pytest.skip("chroma服务器未能启动")
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def make_store(port, **kwargs):
+    return ChromaRemoteVectorSearch(host="127.0.0.1", port=port, embedding_service=object(), async_mode=True,
+                                    **kwargs)
+
+
+def vector(i):
+    return [float((i * 7 + j) % 11) + 0.5 for j in range(DIMENSION)]
+
+
+class TestChromaRemoteAsync:
+    """原生异步模式测试"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_adds_are_batched(self, chroma_server):
+        vector_store = make_store(chroma_server, add_batch_size=64, add_flush_interval=0.05)
+        vector_store.create_index("kg.batched", DIMENSION)
+        try:
+            await asyncio.gather(*(
+                vector_store.aadd_vectors(
+                    "kg.batched", [vector(i * 5 + j) for j in range(5)], [f"v_{i * 5 + j}" for j in range(5)],
+                    [{"n": i * 5 + j} for j in range(5)]
+                )
+                for i in range(20)
+            ))
+            # 100个向量：64个时发送一次，剩余36个等待flush_interval后发送
+            assert vector_store.async_stats["add_batches"] == 2
+            assert vector_store.count_vectors("kg.batched") == 100
+
+            results = await asyncio.gather(*(
+                vector_store.asearch_vectors("kg.batched", vector(i), 3) for i in range(10)
+            ))
+            for i, result in enumerate(results):
+                assert result == vector_store.search_vectors("kg.batched", vector(i), 3)
+                assert result[0]["metadata"]["n"] % 11 == i % 11
+
+            # 同一批次中的重复ID先发送已有部分，不会让整批失败
+            await asyncio.gather(
+                vector_store.aadd_vectors("kg.batched", [vector(200)], ["dup"]),
+                vector_store.aadd_vectors("kg.batched", [vector(201)], ["dup"]),
+            )
+            assert vector_store.get_vectors("kg.batched", ["dup"])[0]["vector"] == pytest.approx(vector(200))
+
+            await vector_store.adelete_vectors("kg.batched", ["v_0", "dup"])
+            assert vector_store.count_vectors("kg.batched") == 99
+            with pytest.raises(IndexNotFoundError):
+                await vector_store.asearch_vectors("kg.missing", vector(0), 3)
+        finally:
+            await vector_store.aclose()
+            vector_store.close()
+
+    @pytest.mark.asyncio
+    async def test_retries_and_deadline(self, chroma_server):
+        vector_store = make_store(chroma_server, retry_base_delay=0.01, operation_timeouts={"search": 0.3})
+        vector_store.create_index("kg.retry", DIMENSION)
+        calls = []
+
+        async def flaky(collection):
+            calls.append(1)
+            if len(calls) <= 2:
+                raise httpx.ConnectError("connection refused")
+            return await collection.count()
+
+        async def slow(collection):
+            await asyncio.sleep(5)
+
+        async def invalid(collection):
+            calls.append(1)
+            raise ValueError("bad request")
+
+        try:
+            assert await vector_store._acall("count", "kg.retry", flaky) == 0
+            assert len(calls) == 3 and vector_store.async_stats["retries"] == 2
+
+            start = time.monotonic()
+            with pytest.raises(VectorSearchTimeoutError):
+                await vector_store._acall("search", "kg.retry", slow)
+            assert time.monotonic() - start < 1
+
+            calls.clear()
+            with pytest.raises(ValueError):
+                await vector_store._acall("count", "kg.retry", invalid)
+            assert len(calls) == 1
+        finally:
+            await vector_store.aclose()
+
+        # 服务器不可达（同步客户端创建时会检查连接，这里只让异步客户端连接空闲端口）：重试max_retries次后失败
+        unreachable = make_store(chroma_server, max_retries=2, retry_base_delay=0.01)
+        unreachable.port = free_port()
+        with pytest.raises(QueryError):
+            await unreachable.asearch_vectors("kg.retry", vector(0), 3)
+        assert unreachable.async_stats["retries"] == 2
+        await unreachable.aclose()
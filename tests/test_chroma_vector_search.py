@@ -0,0 +1,64 @@
+"""
+测试Chroma向量搜索的HNSW参数（全局配置、按索引覆盖、create_index参数）
+"""
+
+from app.config.config_manager import VectorSearchConfig
+from app.vector.ann_vector_search import AnnVectorSearch
+from app.vector.chroma_vector_search import ChromaVectorSearch
+from app.vector.vector_service import VectorSearchService
+
+
+class TestChromaHnswParams:
+    """HNSW参数测试"""
+
+    def test_hnsw_params_written_to_new_collections(self, tmp_path):
+        vector_store = ChromaVectorSearch(
+            path=str(tmp_path / "chroma"), hnsw_m=24, hnsw_ef_construction=150, hnsw_ef_search=50,
+            index_hnsw={"entity": {"hnsw_ef_search": 128}, "kg.entity.company": {"hnsw_m": 48}}
+        )
+        try:
+            vector_store.create_index("kg.news", 8)
+            vector_store.create_index("kg.entity", 8)
+            vector_store.create_index("kg.entity.company", 8)
+            vector_store.create_index("kg.relation", 8, hnsw_ef_search=20)
+
+            def params(index_name):
+                metadata = vector_store.get_index_info(index_name)["metadata"]
+                return metadata["hnsw:M"], metadata["hnsw:construction_ef"], metadata["hnsw:search_ef"]
+
+            assert params("kg.news") == (24, 150, 50)
+            # 后缀匹配；完整集合名优先于后缀
+            assert params("kg.entity") == (24, 150, 128)
+            assert params("kg.entity.company") == (48, 150, 50)
+            assert params("kg.relation") == (24, 150, 20)
+            vector_store.add_vectors("kg.entity", [[0.1] * 8, [0.2, 0.1] * 4], ["entity_1", "entity_2"])
+            assert vector_store.search_vectors("kg.entity", [0.1] * 8, 1)[0]["id"] == "entity_1"
+        finally:
+            vector_store.close()
+
+        # 未配置时使用Chroma默认值
+        default_store = ChromaVectorSearch(path=str(tmp_path / "default"))
+        default_store.create_index("kg.news", 8)
+        assert not any(key in default_store.get_index_info("kg.news")["metadata"]
+                       for key in ("hnsw:M", "hnsw:construction_ef", "hnsw:search_ef"))
+        default_store.close()
+
+    def test_service_passes_config_to_backends(self, tmp_path, monkeypatch):
+        VectorSearchService._instance = None
+        service = VectorSearchService()
+        config = VectorSearchConfig(type="chroma", path=str(tmp_path / "chroma"), hnsw_m=12,
+                                    index_hnsw={"entity": {"hnsw_m": 20}})
+        monkeypatch.setattr(service, "_config_cache", config)
+        try:
+            vector_store = service.get_vector_search("chroma_test")
+            assert vector_store.hnsw_params["hnsw_m"] == 12
+            assert vector_store._hnsw_metadata("kg.entity")["hnsw:M"] == 20
+
+            ann = AnnVectorSearch(path=str(tmp_path / "ann"), engine="hnswlib", hnsw_m=12,
+                                  index_hnsw=config.index_hnsw)
+            ann.create_index("kg.entity", 8)
+            assert ann._index_params(ann._get_index("kg.entity"))["hnsw_m"] == 20
+            ann.close()
+        finally:
+            service.close_all()
+            VectorSearchService._instance = None
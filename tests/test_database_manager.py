@@ -0,0 +1,55 @@
+"""
+测试数据库结构升级（已有数据库补建数据表和索引）
+"""
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.database.core import DatabaseConfig
+from app.database.manager import DatabaseManager
+
+
+async def table_indexes(engine):
+    def read(connection):
+        inspector = inspect(connection)
+        return {
+            table: {index["name"] for index in inspector.get_indexes(table)}
+            for table in inspector.get_table_names()
+        }
+    async with engine.connect() as conn:
+        return await conn.run_sync(read)
+
+
+class TestSchemaUpgrade:
+    """已有数据库升级测试"""
+
+    @pytest.mark.asyncio
+    async def test_existing_database_gets_new_tables_and_indexes(self, tmp_path):
+        manager = DatabaseManager(DatabaseConfig(database_url=f"sqlite+aiosqlite:///{tmp_path}/kg.db"))
+        try:
+            await manager.create_tables()
+            # 模拟升级前的数据库：没有entity_stats表和复合索引，仍有旧的单列索引
+            async with manager.engine.begin() as conn:
+                await conn.execute(text("DROP TABLE entity_stats"))
+                await conn.execute(text("DROP INDEX idx_relation_subject_object"))
+                await conn.execute(text("CREATE INDEX idx_relation_subject ON relations (subject_id)"))
+                await conn.execute(text(
+                    "INSERT INTO entities (id, name, type) VALUES (1, '特斯拉', '公司'), (2, '马斯克', '人物')"
+                ))
+                await conn.execute(text(
+                    "INSERT INTO relations (subject_id, predicate, object_id) VALUES (2, '创立', 1)"
+                ))
+
+            await manager.create_tables()
+
+            indexes = await table_indexes(manager.engine)
+            assert "idx_entity_stats_pagerank" in indexes["entity_stats"]
+            assert "idx_relation_subject_object" in indexes["relations"]
+            assert "idx_relation_subject" not in indexes["relations"]
+            async with manager.engine.connect() as conn:
+                assert (await conn.execute(text("SELECT COUNT(*) FROM relations"))).scalar() == 1
+
+            # 重复执行不报错
+            await manager.create_tables()
+        finally:
+            await manager.close()
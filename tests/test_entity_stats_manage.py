@@ -0,0 +1,224 @@
+"""
+测试实体重要性统计（度数、PageRank、新闻提及数）及其在查询排序中的使用
+"""
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.config.config_manager import EntityStatsConfig, GraphIndexConfig
+from app.database.models import Base, Entity, EntityStats, Relation, NewsEvent, news_event_entity
+from app.services.kg_query_service import KGQueryService
+from app.store.entity_stats_manage import EntityStatsManager, compute_pagerank
+from app.store.graph_index_manage import GraphIndexManager
+
+
+# 实体20为中心连接2..6；实体10同时连接20和7；实体9只出现在新闻中
+EDGES = [(20, 2), (20, 3), (20, 4), (20, 5), (20, 6), (7, 8), (10, 20), (10, 7)]
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        for entity_id in (2, 3, 4, 5, 6, 7, 8, 9, 10, 20):
+            session.add(Entity(id=entity_id, name=f"实体{entity_id}", type="公司"))
+        await session.flush()
+        for subject_id, object_id in EDGES:
+            session.add(Relation(subject_id=subject_id, object_id=object_id, predicate="合作"))
+        session.add(NewsEvent(id=1, title="新闻A", content="内容"))
+        session.add(NewsEvent(id=2, title="新闻B", content="内容"))
+        await session.flush()
+        await session.execute(news_event_entity.insert(), [
+            {"news_event_id": 1, "entity_id": 2},
+            {"news_event_id": 1, "entity_id": 20},
+            {"news_event_id": 2, "entity_id": 20},
+            {"news_event_id": 2, "entity_id": 9},
+        ])
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def entity_stats():
+    """重置单例，使用独立配置创建实体统计管理器（内存图索引关闭）"""
+    EntityStatsManager._instance = None
+    GraphIndexManager._instance = None
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    yield EntityStatsManager(EntityStatsConfig(refresh_interval=0))
+    EntityStatsManager._instance = None
+    GraphIndexManager._instance = None
+
+
+async def load_stats(engine):
+    async with AsyncSession(engine) as session:
+        rows = (await session.execute(select(EntityStats))).scalars().all()
+        return {row.entity_id: row for row in rows}
+
+
+def test_compute_pagerank_star():
+    # 中心0与1..4双向相连
+    src = np.array([0, 0, 0, 0, 1, 2, 3, 4])
+    dst = np.array([1, 2, 3, 4, 0, 0, 0, 0])
+    rank = compute_pagerank(src, dst, np.ones(8), 5)
+
+    assert rank.sum() == pytest.approx(1.0)
+    assert rank[0] == rank.max()
+    assert rank[1] == pytest.approx(rank[4])
+
+
+class TestEntityStatsManager:
+    """实体统计管理器测试"""
+
+    @pytest.mark.asyncio
+    async def test_recompute_writes_table(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        stats = await load_stats(engine)
+
+        assert stats[20].degree == 6
+        assert stats[20].news_count == 2
+        assert stats[9].degree == 0 and stats[9].news_count == 1
+        assert max(stats.values(), key=lambda s: s.pagerank).entity_id == 20
+        assert sum(s.pagerank for s in stats.values()) == pytest.approx(1.0)
+
+        scores = entity_stats.get_scores([20, 7, 999])
+        assert scores[0] == pytest.approx(stats[20].pagerank)
+        assert scores[2] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh_keeps_pagerank(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        before = await load_stats(engine)
+
+        async with AsyncSession(engine) as session:
+            session.add(Relation(subject_id=2, object_id=3, predicate="投资"))
+            await session.commit()
+        entity_stats.mark_dirty([2, 3])
+        await entity_stats.start_incremental_refresh(engine)
+
+        after = await load_stats(engine)
+        assert after[2].degree == 2 and after[3].degree == 2
+        assert after[2].news_count == 1
+        assert after[2].pagerank == pytest.approx(before[2].pagerank)
+        assert entity_stats.get_stats()["dirty"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_incremental_refresh_keeps_dirty_ids(self, engine, entity_stats, monkeypatch):
+        await entity_stats.recompute(engine)
+        refresh_entities = entity_stats.refresh_entities
+
+        async def fail(engine, entity_ids):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(entity_stats, "refresh_entities", fail)
+        entity_stats.mark_dirty([2, 3])
+        await entity_stats.start_incremental_refresh(engine)
+        assert entity_stats.get_stats()["dirty"] == 2
+
+        # 下一次增量刷新处理保留的标记
+        monkeypatch.setattr(entity_stats, "refresh_entities", refresh_entities)
+        await entity_stats.start_incremental_refresh(engine)
+        assert entity_stats.get_stats()["dirty"] == 0
+
+    def test_pagerank_follows_direction_and_predicate_weights(self, entity_stats):
+        # 实体2被1、3、4指向，实体5指向6、7、8，两者度数相同
+        subjects = np.array([1, 3, 4, 5, 5, 5, 9, 9])
+        objects = np.array([2, 2, 2, 6, 7, 8, 10, 11])
+        pred_codes = np.array([0, 0, 0, 0, 0, 0, 1, 0])
+        ids, degrees, ranks, _ = entity_stats._compute(subjects, objects, pred_codes, ["合作", "控股"], [])
+        rank = dict(zip(ids.tolist(), ranks.tolist()))
+        degree = dict(zip(ids.tolist(), degrees.tolist()))
+
+        assert degree[2] == degree[5] == 3
+        assert rank[2] > rank[5]
+        assert rank[10] == pytest.approx(rank[11])
+
+        entity_stats.config.predicate_weights = {"控股": 3.0}
+        ids, _, ranks, _ = entity_stats._compute(subjects, objects, pred_codes, ["合作", "控股"], [])
+        rank = dict(zip(ids.tolist(), ranks.tolist()))
+        assert rank[10] > rank[11]
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh_updates_memory_arrays(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        score = entity_stats.get_scores([2])[0]
+
+        async with AsyncSession(engine) as session:
+            session.add(Entity(id=30, name="实体30", type="公司"))
+            await session.flush()
+            session.add(Relation(subject_id=30, object_id=2, predicate="投资"))
+            await session.execute(news_event_entity.insert(), [
+                {"news_event_id": 2, "entity_id": 2},
+                {"news_event_id": 2, "entity_id": 30},
+            ])
+            await session.execute(news_event_entity.delete().where(news_event_entity.c.entity_id == 9))
+            await session.commit()
+        entity_stats.mark_dirty([2, 30, 9])
+        await entity_stats.start_incremental_refresh(engine)
+
+        assert entity_stats.get_news_counts([2, 30, 9, 20]).tolist() == [2, 1, 0, 2]
+        assert entity_stats.get_scores([2, 30]).tolist() == [pytest.approx(score), 0.0]
+
+    @pytest.mark.asyncio
+    async def test_start_refresh_loads_existing_stats(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        EntityStatsManager._instance = None
+        manager = EntityStatsManager(EntityStatsConfig(refresh_interval=0))
+
+        await manager.start_refresh(engine)
+        assert manager.get_stats()["entities"] == 10
+
+
+class TestImportanceOrdering:
+    """查询服务按重要性排序和截断"""
+
+    @pytest.mark.asyncio
+    async def test_neighbor_truncation_prefers_important(self, engine, entity_stats):
+        """连接数相同时保留PageRank更高的实体（20），而不是ID更小的实体（7）"""
+        await entity_stats.recompute(engine)
+        async with AsyncSession(engine) as session:
+            result = await KGQueryService(session).get_entity_neighbors(10, depth=1, max_entities=2)
+        assert {node["id"] for node in result["nodes"]} == {10, 20}
+
+    @pytest.mark.asyncio
+    async def test_neighbor_truncation_with_memory_index(self, engine, entity_stats):
+        GraphIndexManager._instance = None
+        graph_index = GraphIndexManager(GraphIndexConfig(reload_interval=0))
+        await graph_index.reload(engine)
+        await entity_stats.recompute(engine)
+
+        async with AsyncSession(engine) as session:
+            result = await KGQueryService(session).get_entity_neighbors(10, depth=1, max_entities=2)
+        assert {node["id"] for node in result["nodes"]} == {10, 20}
+
+    @pytest.mark.asyncio
+    async def test_entity_list_sorted_by_importance(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        async with AsyncSession(engine) as session:
+            service = KGQueryService(session)
+            full = await service.get_entity_list(sort_by="importance", page_size=100)
+            ids = [item["id"] for item in full["items"]]
+            assert ids[0] == 20
+
+            paged, cursor = [], None
+            while True:
+                page = await service.get_entity_list(sort_by="importance", page_size=3, cursor=cursor)
+                paged.extend(item["id"] for item in page["items"])
+                if not page["has_more"]:
+                    break
+                cursor = page["next_cursor"]
+            assert paged == ids
+
+    @pytest.mark.asyncio
+    async def test_news_entities_sorted_by_importance(self, engine, entity_stats):
+        await entity_stats.recompute(engine)
+        async with AsyncSession(engine) as session:
+            result = await KGQueryService(session).get_news_entities(1)
+        assert [entity["id"] for entity in result["entities"]] == [20, 2]
+        assert result["entities"][0]["importance"] > result["entities"][1]["importance"]
@@ -0,0 +1,236 @@
+"""
+测试内存图索引（CSR邻接数组）
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.config.config_manager import GraphIndexConfig
+from app.database.models import Base, Entity, Relation
+from app.services.kg_query_service import KGQueryService
+from app.store.graph_index_csr import CSRGraph
+from app.store.graph_index_manage import GraphIndexManager
+
+
+def make_graph(edges):
+    """edges: [(关系ID, 主体ID, 客体ID, 谓词)]"""
+    predicates = sorted({p for _, _, _, p in edges})
+    codes = {p: i for i, p in enumerate(predicates)}
+    return CSRGraph(
+        np.array([e[0] for e in edges]),
+        np.array([e[1] for e in edges]),
+        np.array([e[2] for e in edges]),
+        np.array([codes[e[3]] for e in edges]),
+        predicates
+    )
+
+
+EDGES = [
+    (1, 10, 20, "投资"),
+    (2, 10, 30, "合作"),
+    (3, 40, 10, "投资"),
+    (4, 20, 30, "合作"),
+    (5, 30, 50, "竞争"),
+]
+
+
+@pytest.fixture
+def graph_index():
+    """重置单例，使用独立配置创建图索引管理器"""
+    GraphIndexManager._instance = None
+    manager = GraphIndexManager(GraphIndexConfig(compact_threshold=3, reload_interval=0))
+    yield manager
+    GraphIndexManager._instance = None
+
+
+class TestCSRGraph:
+    """CSR邻接图测试"""
+
+    def test_neighbors_both_directions(self):
+        graph = make_graph(EDGES)
+        assert graph.neighbors(10).tolist() == [20, 30, 40]
+        assert graph.neighbors(50).tolist() == [30]
+        assert graph.neighbors(999).tolist() == []
+
+    def test_sparse_entity_ids(self):
+        """实体ID稀疏时使用二分查找映射"""
+        graph = make_graph([(1, 10 ** 9, 5, "投资"), (2, 5, 7, "合作"), (3, 7, 10 ** 9, "合作")])
+        assert graph.neighbors(10 ** 9).tolist() == [5, 7]
+        assert graph.neighbors(6).tolist() == []
+        assert sorted(graph.relation_ids_among([5, 7, 10 ** 9], ["合作"])) == [2, 3]
+
+    def test_relation_type_filter(self):
+        graph = make_graph(EDGES)
+        assert graph.neighbors(10, ["投资"]).tolist() == [20, 40]
+        assert graph.neighbors(10, ["不存在"]).tolist() == []
+
+    def test_degree(self):
+        graph = make_graph(EDGES)
+        assert graph.degree(10) == 3
+        assert graph.degree(30) == 3
+
+    def test_delta_and_tombstone(self):
+        graph = make_graph(EDGES)
+        graph.add_edge(6, 10, 60, "收购")
+        graph.add_edge(6, 10, 60, "收购")  # 重复添加被忽略
+        graph.remove_edge(1)
+
+        assert graph.neighbors(10).tolist() == [30, 40, 60]
+        assert graph.neighbors(60, ["收购"]).tolist() == [10]
+        assert graph.delta_size == 2
+
+    def test_compacted_matches_delta_view(self):
+        graph = make_graph(EDGES)
+        graph.add_edge(6, 10, 60, "收购")
+        graph.remove_edge(4)
+        compacted = graph.compacted(graph.snapshot())
+
+        assert compacted.delta_size == 0
+        for node in (10, 20, 30, 40, 50, 60):
+            assert compacted.neighbors(node).tolist() == graph.neighbors(node).tolist()
+        assert compacted.edge_count == 5
+
+    def test_rank_frontier_neighbors(self):
+        graph = make_graph(EDGES)
+        # 30同时连接前沿中的10和20，排在最前
+        ranked = graph.rank_frontier_neighbors([10, 20], visited=[10, 20])
+        assert ranked == [(30, 2), (40, 1)]
+        assert graph.rank_frontier_neighbors([10, 20], visited=[10, 20], limit=1) == [(30, 2)]
+
+    def test_relation_ids_among(self):
+        graph = make_graph(EDGES)
+        assert sorted(graph.relation_ids_among([10, 20, 30])) == [1, 2, 4]
+        assert sorted(graph.relation_ids_among([10, 20, 30], ["合作"])) == [2, 4]
+        graph.add_edge(6, 20, 10, "合作")
+        graph.remove_edge(2)
+        assert sorted(graph.relation_ids_among([10, 20, 30], ["合作"])) == [4, 6]
+
+
+@pytest_asyncio.fixture
+async def engine_with_graph():
+    """预置与 EDGES 相同结构的内存SQLite数据库"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        for entity_id in (10, 20, 30, 40, 50, 60):
+            session.add(Entity(id=entity_id, name=f"实体{entity_id}", type="公司"))
+        await session.flush()
+        for edge_id, subject_id, object_id, predicate in EDGES:
+            session.add(Relation(id=edge_id, subject_id=subject_id, object_id=object_id, predicate=predicate))
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+class TestGraphIndexManager:
+    """图索引管理器测试"""
+
+    @pytest.mark.asyncio
+    async def test_reload_from_database(self, graph_index, engine_with_graph):
+        assert graph_index.graph is None
+
+        await graph_index.reload(engine_with_graph)
+
+        stats = graph_index.get_stats()
+        assert stats["ready"] is True
+        assert stats["edges"] == 5
+        assert stats["memory_bytes"] > 0
+        assert graph_index.graph.neighbors(10).tolist() == [20, 30, 40]
+
+    @pytest.mark.asyncio
+    async def test_incremental_add_and_background_compaction(self, graph_index, engine_with_graph):
+        await graph_index.reload(engine_with_graph)
+
+        graph_index.add_relation(6, 10, 60, "收购")
+        graph_index.remove_relation(5)
+        assert graph_index.graph.neighbors(10).tolist() == [20, 30, 40, 60]
+
+        # 达到合并阈值后在后台合并，合并期间的写入会被重放
+        graph_index.add_relation(7, 50, 60, "合作")
+        assert graph_index.is_rebuilding
+        await asyncio.sleep(0)  # 让合并任务取完快照，进入后台线程
+        graph_index.add_relation(8, 20, 60, "合作")
+        await graph_index._rebuild_task
+
+        graph = graph_index.graph
+        assert graph.neighbors(60).tolist() == [10, 20, 50]
+        assert graph.neighbors(50).tolist() == [60]
+        assert graph.delta_size == 1
+
+    @pytest.mark.asyncio
+    async def test_direct_reload_waits_for_compaction(self, graph_index, engine_with_graph, monkeypatch):
+        """直接调用reload时不与后台合并交错，慢合并的结果不会覆盖之后加载的图"""
+        compacted = CSRGraph.compacted
+
+        def slow_compacted(graph, snapshot):
+            time.sleep(0.2)
+            return compacted(graph, snapshot)
+
+        monkeypatch.setattr(CSRGraph, "compacted", slow_compacted)
+        await graph_index.reload(engine_with_graph)
+        for relation_id in (6, 7, 8):
+            graph_index.add_relation(relation_id, 10, 60 + relation_id, "收购")
+        compaction = graph_index._rebuild_task
+        await asyncio.sleep(0)  # 合并进入后台线程
+
+        reload = asyncio.ensure_future(graph_index.reload(engine_with_graph))
+        async with AsyncSession(engine_with_graph) as session:
+            session.add(Relation(id=9, subject_id=20, object_id=60, predicate="合作"))
+            await session.commit()
+        graph_index.add_relation(9, 20, 60, "合作")
+        await asyncio.gather(compaction, reload)
+
+        # 加载在合并之后执行，结果与数据库一致（6、7、8只写入了索引），不会被合并结果覆盖
+        graph = graph_index.graph
+        assert graph.edge_count == 6
+        assert graph.neighbors(10).tolist() == [20, 30, 40]
+        assert graph.neighbors(60).tolist() == [20]
+        assert graph_index._pending_ops is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_index_is_ignored(self, engine_with_graph):
+        GraphIndexManager._instance = None
+        manager = GraphIndexManager(GraphIndexConfig(enabled=False))
+        try:
+            assert manager.start_reload(engine_with_graph) is None
+            manager.add_relation(6, 10, 60, "收购")
+            assert manager.graph is None
+        finally:
+            GraphIndexManager._instance = None
+
+    @pytest.mark.asyncio
+    async def test_query_service_uses_memory_index(self, graph_index, engine_with_graph):
+        """索引就绪时邻居遍历不再查询relations表的邻接，结果与SQL一致"""
+        statements = []
+
+        @event.listens_for(engine_with_graph.sync_engine, "before_cursor_execute")
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        async with AsyncSession(engine_with_graph) as session:
+            sql_result = await KGQueryService(session).get_entity_neighbors(10, depth=2)
+
+        await graph_index.reload(engine_with_graph)
+        statements.clear()
+
+        async with AsyncSession(engine_with_graph) as session:
+            memory_result = await KGQueryService(session).get_entity_neighbors(10, depth=2)
+
+        relation_queries = [s for s in statements if "FROM relations" in s]
+        assert len(relation_queries) == 1
+        assert "relations.id IN" in relation_queries[0]
+
+        def normalize(result):
+            return (
+                sorted((n["id"], n["level"]) for n in result["nodes"]),
+                sorted(e["id"] for e in result["edges"])
+            )
+        assert normalize(memory_result) == normalize(sql_result)
@@ -0,0 +1,150 @@
+"""
+测试HybridStoreCore写操作对依赖数据、图索引、实体统计和向量索引的维护
+"""
+
+import hashlib
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.config.config_manager import CacheConfig, EntityStatsConfig, GraphIndexConfig, VectorBreakerConfig
+from app.database.core import DatabaseConfig
+from app.database.manager import DatabaseManager
+from app.database.models import Attribute, Entity, EntityStats, NewsEvent, Relation, news_event_entity
+from app.exceptions.store_exceptions import StoreError
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+from app.store.hybrid_store_core_implement import HybridStoreCore
+from app.store.response_cache_manage import ResponseCacheManager
+from app.store.store_base_abstract import Entity as StoreEntity
+from app.store.vector_breaker_manage import VectorBreakerManager
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+DIMENSION = 8
+
+
+class StubEmbeddingService:
+    """按文本哈希生成确定性向量的嵌入服务"""
+
+    async def aembed_text(self, text):
+        return [b / 255 for b in hashlib.sha1(text.encode("utf-8")).digest()[:DIMENSION]]
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    VectorBreakerManager._instance = None
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+    breaker = VectorBreakerManager(VectorBreakerConfig(outbox_path=str(tmp_path / "outbox.db")))
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    EntityStatsManager(EntityStatsConfig(enabled=False))
+    ResponseCacheManager(CacheConfig(type="memory", ttl=0, max_size=100, redis={}))
+
+    db_manager = DatabaseManager(DatabaseConfig(database_url=f"sqlite+aiosqlite:///{tmp_path}/kg.db"))
+    await db_manager.create_tables()
+    async with db_manager.get_session() as session:
+        session.add(Entity(id=1, name="特斯拉", type="公司", description="电动汽车"))
+        session.add(Entity(id=2, name="马斯克", type="人物", description="CEO"))
+        session.add(Entity(id=3, name="Tesla", type="公司", canonical_id=1))
+        session.add(NewsEvent(id=1, title="新闻1", content="特斯拉发布新车"))
+        await session.flush()
+        session.add(Relation(id=1, subject_id=2, predicate="任职", object_id=1))
+        session.add(Relation(id=2, subject_id=1, predicate="位于", object_id=3))
+        session.add(Relation(id=3, subject_id=2, predicate="别名", object_id=3))
+        session.add(Attribute(entity_id=1, key="股票代码", value="TSLA"))
+        session.add(EntityStats(entity_id=1, degree=2, pagerank=0.5, news_count=1))
+        await session.execute(news_event_entity.insert().values(news_event_id=1, entity_id=1))
+
+    vector_store = ChromaVectorSearch(path=str(tmp_path / "chroma"))
+    store = HybridStoreCore(db_manager, vector_store, StubEmbeddingService())
+    store.vector_manager = VectorIndexManager(
+        vector_store, store.embedding_service, state_path=str(tmp_path / "vector_index_state.json"),
+        entity_type_collections={}, breaker=breaker
+    )
+    store.vector_manager.switch_index("kg")
+    yield store
+
+    await db_manager.close()
+    vector_store.close()
+    breaker.outbox.close()
+    VectorBreakerManager._instance = None
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+
+
+async def count_rows(store, column, *conditions):
+    async with store.db_manager.get_session() as session:
+        return (await session.execute(select(func.count(column)).where(*conditions))).scalar()
+
+
+class TestDeleteEntity:
+    """删除实体测试"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_dependent_rows_and_bumps_tables(self, store):
+        tables = ("entities", "relations", "news_event_entity", "attributes", "entity_stats")
+        before = await store.response_cache.get_versions(tables)
+
+        assert await store.delete_entity(1)
+
+        assert await count_rows(store, Entity.id, Entity.id == 1) == 0
+        async with store.db_manager.get_session() as session:
+            remaining = (await session.execute(select(Relation.id))).scalars().all()
+            alias = await session.get(Entity, 3)
+        assert remaining == [3]
+        assert alias.canonical_id is None
+        assert await count_rows(store, news_event_entity.c.entity_id, news_event_entity.c.entity_id == 1) == 0
+        assert await count_rows(store, Attribute.id, Attribute.entity_id == 1) == 0
+        assert await count_rows(store, EntityStats.entity_id, EntityStats.entity_id == 1) == 0
+
+        after = await store.response_cache.get_versions(tables)
+        assert all(new == old + 1 for new, old in zip(after, before))
+
+    @pytest.mark.asyncio
+    async def test_updates_graph_index_and_entity_stats(self, store):
+        engine = store.db_manager.engine
+        store.graph_index.config.enabled = True
+        store.entity_stats.config.enabled = True
+        await store.graph_index.reload(engine)
+        await store.entity_stats.recompute(engine)
+        assert sorted(store.graph_index.graph.neighbors(2).tolist()) == [1, 3]
+        assert store.entity_stats.get_news_counts([1]).tolist() == [1]
+
+        await store.delete_entity(1)
+
+        # 图索引和内存中的统计立即生效，邻居的度数在后台刷新
+        assert store.graph_index.graph.neighbors(2).tolist() == [3]
+        assert store.graph_index.graph.neighbors(1).tolist() == []
+        assert store.entity_stats.get_scores([1]).tolist() == [0.0]
+        assert store.entity_stats.get_news_counts([1]).tolist() == [0]
+        await store.entity_stats._refresh_task
+        async with store.db_manager.get_session() as session:
+            degrees = dict((await session.execute(select(EntityStats.entity_id, EntityStats.degree))).all())
+        assert degrees == {2: 1, 3: 1}
+
+
+class TestUpdateEntity:
+    """更新实体测试"""
+
+    @pytest.mark.asyncio
+    async def test_type_only_update_moves_vector_to_type_collection(self, store):
+        store.vector_manager.entity_type_collections = {"人物": "person"}
+        vector_store = store.vector_store
+        created = await store.create_entity(StoreEntity(name="比亚迪", type="公司", description="电动汽车"))
+        assert vector_store.count_vectors("kg.entity") == 1
+
+        updated = await store.update_entity(created.id, {"type": "人物"})
+
+        assert updated.type == "人物"
+        assert vector_store.count_vectors("kg.entity") == 0
+        moved = vector_store.get_vectors("kg.entity.person", [created.vector_id], include_vectors=False)
+        assert moved[0]["metadata"]["type"] == "人物"
+
+        # 没有实体类型时无法确定目标集合
+        with pytest.raises(StoreError):
+            await store.vector_manager.update_vector(created.vector_id, "比亚迪: 电动汽车")
@@ -0,0 +1,204 @@
+"""
+测试JSONL批量导入（实体去重、关系upsert、新闻关联、批量向量写入、断点续传）
+"""
+
+import hashlib
+import os
+
+import orjson
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import func, select
+
+from app.config.config_manager import BulkImportConfig, CacheConfig, EntityStatsConfig, GraphIndexConfig
+from app.database.core import DatabaseConfig
+from app.database.manager import DatabaseManager
+from app.database.models import Entity, Relation, NewsEvent, news_event_entity
+from app.exceptions.store_exceptions import StoreError
+from app.services.kg_bulk_import_service import KGBulkImportService
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+from app.store.hybrid_store_core_implement import HybridStoreCore
+from app.store.import_signal_manage import ImportSignalManager, get_import_signal_manager
+from app.store.response_cache_manage import ResponseCacheManager
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+DIMENSION = 8
+
+RECORDS = [
+    {"type": "entity", "name": "特斯拉", "entity_type": "公司", "description": "电动汽车公司"},
+    {"type": "entity", "name": "马斯克", "entity_type": "人物", "description": "特斯拉CEO"},
+    {"type": "relation", "subject": "马斯克", "predicate": "任职", "object": "特斯拉", "description": "CEO"},
+    {"type": "relation", "subject": "特斯拉", "predicate": "竞争", "object": "比亚迪", "object_type": "公司"},
+    {"type": "news", "title": "特斯拉交付量", "content": "二季度交付44万辆", "source": "财经",
+     "publish_time": "2024-07-02T08:00:00", "entities": ["特斯拉", {"name": "马斯克", "entity_type": "人物"}]},
+    "not an object",
+    {"type": "relation", "subject": "特斯拉"},
+]
+
+
+class StubEmbeddingService:
+    """按文本哈希生成确定性向量的嵌入服务"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def aembed_batch(self, texts, use_cache=True):
+        self.calls.append(len(texts))
+        return [[b / 255 for b in hashlib.sha1(text.encode("utf-8")).digest()[:DIMENSION]] for text in texts]
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+    ImportSignalManager._instance = None
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    EntityStatsManager(EntityStatsConfig(enabled=False))
+    ResponseCacheManager(CacheConfig(type="memory", ttl=0, max_size=100, redis={}))
+    ImportSignalManager(BulkImportConfig(signal_path=str(tmp_path / "import_signal.json")))
+
+    db_manager = DatabaseManager(DatabaseConfig(database_url=f"sqlite+aiosqlite:///{tmp_path}/kg.db"))
+    await db_manager.create_tables()
+    vector_store = ChromaVectorSearch(path=str(tmp_path / "chroma"))
+    vector_store.create_index("default", DIMENSION)
+
+    store = HybridStoreCore(db_manager, vector_store, StubEmbeddingService())
+    store.vector_manager = VectorIndexManager(
+        vector_store, store.embedding_service, state_path=str(tmp_path / "vector_index_state.json")
+    )
+    yield store
+
+    await db_manager.close()
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+    ImportSignalManager._instance = None
+
+
+def write_jsonl(path, records):
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(orjson.dumps(record) + b"\n")
+    return str(path)
+
+
+async def count(store, stmt):
+    async with store.db_manager.get_session() as session:
+        return (await session.execute(stmt)).scalar()
+
+
+class TestKGBulkImportService:
+    """批量导入服务测试"""
+
+    @pytest.mark.asyncio
+    async def test_import_file(self, store, tmp_path):
+        path = write_jsonl(tmp_path / "data.jsonl", RECORDS)
+        stats = await KGBulkImportService(store, BulkImportConfig(batch_size=100)).import_file(path)
+
+        assert stats == {
+            "invalid": 2, "entities_created": 3, "entities_updated": 0, "relations_upserted": 2,
+            "news_created": 1, "news_updated": 0, "news_links": 2, "vectors": 4
+        }
+        async with store.db_manager.get_session() as session:
+            entities = {row.name: row for row in (await session.execute(select(Entity))).scalars()}
+            assert entities["比亚迪"].type == "公司"
+            assert all(entity.vector_id == f"entity_{entity.id}" for entity in entities.values())
+            relation = (await session.execute(
+                select(Relation).where(Relation.predicate == "任职")
+            )).scalar_one()
+            assert (relation.subject_id, relation.object_id) == (entities["马斯克"].id, entities["特斯拉"].id)
+            news = (await session.execute(select(NewsEvent))).scalar_one()
+            assert news.publish_time.month == 7
+
+        assert store.vector_store.get_vectors("default", [f"news_{news.id}"], include_vectors=False)
+
+        assert store.vector_store.count_vectors("default") == 4
+        assert not os.path.exists(f"{path}.checkpoint")
+
+    @pytest.mark.asyncio
+    async def test_reimport_is_idempotent_and_updates_descriptions(self, store, tmp_path):
+        service = KGBulkImportService(store, BulkImportConfig(batch_size=100))
+        await service.import_file(write_jsonl(tmp_path / "a.jsonl", RECORDS))
+        stats = await service.import_file(write_jsonl(tmp_path / "b.jsonl", RECORDS + [
+            {"type": "entity", "name": "特斯拉", "entity_type": "公司", "description": "美国电动汽车公司"},
+        ]))
+
+        assert stats["entities_created"] == 0 and stats["entities_updated"] == 1
+        assert stats["news_created"] == 0
+        # 只有描述变化的实体重新生成向量
+        assert stats["vectors"] == 1
+        assert await count(store, select(func.count()).select_from(Entity)) == 3
+        assert await count(store, select(func.count()).select_from(Relation)) == 2
+        assert await count(store, select(func.count()).select_from(news_event_entity)) == 2
+        description = await count(store, select(Entity.description).where(Entity.name == "特斯拉"))
+        assert description == "美国电动汽车公司"
+
+    @pytest.mark.asyncio
+    async def test_resume_from_checkpoint(self, store, tmp_path, monkeypatch):
+        records = [
+            {"type": "relation", "subject": f"公司{i}", "predicate": "投资", "object": f"公司{i + 1}"}
+            for i in range(10)
+        ]
+        path = write_jsonl(tmp_path / "data.jsonl", records)
+        service = KGBulkImportService(store, BulkImportConfig(batch_size=4, embed_batch_size=3))
+
+        original = service.import_records
+        calls = []
+
+        async def fail_on_second_batch(batch, with_vectors=True):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise StoreError("中断")
+            return await original(batch, with_vectors)
+
+        monkeypatch.setattr(service, "import_records", fail_on_second_batch)
+        with pytest.raises(StoreError):
+            await service.import_file(path)
+        assert orjson.loads(open(f"{path}.checkpoint", "rb").read())["stats"]["relations_upserted"] == 4
+
+        monkeypatch.setattr(service, "import_records", original)
+        stats = await service.import_file(path)
+
+        assert stats["relations_upserted"] == 10
+        assert stats["entities_created"] == 11
+        assert await count(store, select(func.count()).select_from(Relation)) == 10
+        assert store.embedding_service.calls and max(store.embedding_service.calls) <= 3
+
+    @pytest.mark.asyncio
+    async def test_missing_vectors_written_on_reimport(self, store, tmp_path):
+        path = write_jsonl(tmp_path / "data.jsonl", RECORDS)
+        service = KGBulkImportService(store, BulkImportConfig(batch_size=100))
+        await service.import_file(path, with_vectors=False)
+        assert await count(store, select(func.count()).where(Entity.vector_id.is_(None))) == 3
+
+        stats = await service.import_file(path)
+        # 新闻没有vector_id列，按向量库中是否存在判断需要补写
+        assert stats["vectors"] == 4
+        assert await count(store, select(func.count()).where(Entity.vector_id.is_(None))) == 0
+        assert (await service.import_file(path))["vectors"] == 0
+
+    @pytest.mark.asyncio
+    async def test_signal_refreshes_running_server(self, store, tmp_path):
+        path = write_jsonl(tmp_path / "data.jsonl", RECORDS)
+        await KGBulkImportService(store, BulkImportConfig(batch_size=100)).import_file(path, with_vectors=False)
+
+        # 模拟尚未见过该信号的服务进程
+        signal = get_import_signal_manager()
+        signal._mtime = None
+        store.graph_index.config.enabled = True
+        engine = store.db_manager.engine
+        before = await store.response_cache.get_versions(["relations", "entity_stats"])
+
+        assert await signal.check(engine)
+        assert not await signal.check(engine)
+
+        after = await store.response_cache.get_versions(["relations", "entity_stats"])
+        # 实体统计未启用时导入进程不重算，信号中不包含entity_stats
+        assert after == (before[0] + 1, before[1])
+        await store.graph_index._rebuild_task
+        assert store.graph_index.graph.edge_count == 2
@@ -0,0 +1,109 @@
+"""
+测试知识图谱流式导出（NDJSON、列式批次、增量导出）
+"""
+
+from datetime import datetime
+
+import orjson
+import pytest
+import pytest_asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.database.models import Base, Entity, Relation, NewsEvent, news_event_entity
+from app.api import kg_analysis_routes
+from app.services.kg_export_service import KGExportService
+
+
+OLD = datetime(2024, 1, 1)
+NEW = datetime(2024, 6, 1)
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for i in range(1, 6):
+            created = OLD if i <= 3 else NEW
+            session.add(Entity(id=i, name=f"实体{i}", type="公司", created_at=created, updated_at=created))
+        session.add(NewsEvent(id=1, title="新闻", content="内容"))
+        await session.flush()
+        session.add(Relation(id=1, subject_id=1, predicate="投资", object_id=2, created_at=OLD))
+        session.add(Relation(id=2, subject_id=4, predicate="合作", object_id=5, created_at=NEW))
+        await session.execute(news_event_entity.insert(), [
+            {"news_event_id": 1, "entity_id": 1, "created_at": OLD},
+            {"news_event_id": 1, "entity_id": 4, "created_at": NEW},
+        ])
+        await session.commit()
+        yield session
+
+    await engine.dispose()
+
+
+async def export_lines(session, **kwargs):
+    chunks = [chunk async for chunk in KGExportService(session).stream_export(**kwargs)]
+    return [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+class TestKGExportService:
+    """图谱导出服务测试"""
+
+    @pytest.mark.asyncio
+    async def test_ndjson_full_export(self, session):
+        lines = await export_lines(session, batch_size=2)
+
+        assert lines[0]["type"] == "meta"
+        assert lines[-1] == {
+            "type": "end", "exported_at": lines[0]["exported_at"],
+            "counts": {"entities": 5, "relations": 2, "news_entities": 2}
+        }
+        entities = [line for line in lines if line["type"] == "entity"]
+        assert [entity["id"] for entity in entities] == [1, 2, 3, 4, 5]
+        assert entities[0]["entity_type"] == "公司"
+        assert entities[0]["created_at"] == "2024-01-01T00:00:00"
+        assert [line["entity_id"] for line in lines if line["type"] == "news_entity"] == [1, 4]
+
+    @pytest.mark.asyncio
+    async def test_columnar_batches(self, session):
+        lines = await export_lines(session, types=["entities"], export_format="columnar", batch_size=2)
+
+        batches = [line for line in lines if line["type"] == "entity"]
+        assert [batch["columns"]["id"] for batch in batches] == [[1, 2], [3, 4], [5]]
+        assert batches[0]["columns"]["name"] == ["实体1", "实体2"]
+        assert lines[-1]["counts"] == {"entities": 5}
+
+    @pytest.mark.asyncio
+    async def test_columnar_route_streams_ndjson_batches(self, session, monkeypatch):
+        """列式导出逐批写出，每个响应块都是完整的NDJSON行"""
+        async def export_session():
+            yield session
+
+        monkeypatch.setattr(kg_analysis_routes, "get_session", export_session)
+        response = await kg_analysis_routes.export_graph(
+            types=["entities"], updated_since=None, export_format="columnar", batch_size=2
+        )
+
+        assert response.media_type == "application/x-ndjson"
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert len(chunks) == 5  # meta、3个批次、end
+        for chunk in chunks:
+            assert chunk.endswith(b"\n") and chunk.count(b"\n") == 1
+            orjson.loads(chunk)
+
+    @pytest.mark.asyncio
+    async def test_updated_since(self, session):
+        lines = await export_lines(session, updated_since=datetime(2024, 3, 1))
+
+        assert [(line["type"], line.get("id")) for line in lines[1:-1] if line["type"] != "news_entity"] == [
+            ("entity", 4), ("entity", 5), ("relation", 2)
+        ]
+        assert lines[-1]["counts"] == {"entities": 2, "relations": 1, "news_entities": 1}
+
+    def test_normalize_types(self):
+        assert KGExportService.normalize_types(None) == ["entities", "relations", "news_entities"]
+        assert KGExportService.normalize_types(["news_entities", "entities"]) == ["entities", "news_entities"]
+        with pytest.raises(ValueError):
+            KGExportService.normalize_types(["attributes"])
@@ -0,0 +1,144 @@
+"""
+测试多实体共同新闻查询（关联表分组聚合）
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.config.config_manager import EntityStatsConfig, GraphIndexConfig
+from app.database.models import Base, Entity, NewsEvent, news_event_entity
+from app.services.kg_query_service import KGQueryService
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+
+
+# 新闻ID -> 关联的实体ID
+LINKS = {
+    1: [1, 2, 3],
+    2: [1, 2],
+    3: [1, 2, 3, 4],
+    4: [2, 3],
+    5: [1],
+    6: [1, 2, 3],
+    7: [4],
+}
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        base_time = datetime(2024, 1, 1)
+        for i in range(1, 5):
+            session.add(Entity(id=i, name=f"实体{i}", type="公司"))
+        for news_id in LINKS:
+            session.add(NewsEvent(
+                id=news_id, title=f"新闻{news_id}", content="内容",
+                publish_time=base_time + timedelta(days=news_id)
+            ))
+        await session.flush()
+        await session.execute(news_event_entity.insert(), [
+            {"news_event_id": news_id, "entity_id": entity_id}
+            for news_id, entity_ids in LINKS.items() for entity_id in entity_ids
+        ])
+        await session.commit()
+
+        session.info["statements"] = statements
+        session.info["engine"] = engine
+        yield session
+
+    await engine.dispose()
+
+
+class TestCommonNews:
+    """共同新闻查询测试"""
+
+    @pytest.mark.asyncio
+    async def test_all_entities_single_statement(self, session):
+        statements = session.info["statements"]
+        statements.clear()
+
+        result = await KGQueryService(session).get_common_news_for_entities([1, 2, 3], page_size=10)
+
+        assert len(statements) == 1
+        assert [item["id"] for item in result["items"]] == [6, 3, 1]
+        assert result["total"] == 3
+        assert result["total_is_exact"] is True
+        assert {item["matched_entities"] for item in result["items"]} == {3}
+
+    @pytest.mark.asyncio
+    async def test_min_match(self, session):
+        result = await KGQueryService(session).get_common_news_for_entities([1, 2, 3], min_match=2)
+
+        assert [item["id"] for item in result["items"]] == [6, 4, 3, 2, 1]
+        assert [item["matched_entities"] for item in result["items"]] == [3, 2, 3, 2, 3]
+        assert result["min_match"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cursor_pages_keep_total(self, session):
+        service = KGQueryService(session)
+        first = await service.get_common_news_for_entities([1, 2], page_size=2)
+        second = await service.get_common_news_for_entities([1, 2], page_size=2, cursor=first["next_cursor"])
+
+        assert [item["id"] for item in first["items"] + second["items"]] == [6, 3, 2, 1]
+        assert first["total"] == second["total"] == 4
+        assert second["has_more"] is False
+
+    @pytest.mark.asyncio
+    async def test_page_out_of_range_counts_total(self, session):
+        result = await KGQueryService(session).get_common_news_for_entities([1, 2], page=5, page_size=2)
+        assert result["items"] == []
+        assert result["total"] == 4
+
+    @pytest.mark.asyncio
+    async def test_single_entity_returns_empty_page(self, session):
+        result = await KGQueryService(session).get_common_news_for_entities([1, 1])
+        assert result["items"] == [] and result["total"] == 0
+        assert result["next_cursor"] is None and result["has_more"] is False
+        assert result["total_is_exact"] is True and result["entity_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_min_match(self, session):
+        with pytest.raises(ValueError):
+            await KGQueryService(session).get_common_news_for_entities([1, 2], min_match=3)
+
+    @pytest.mark.asyncio
+    async def test_pivot_entities_same_result(self, session):
+        """按新闻数最少的实体缩小分组范围时，结果与完整分组一致"""
+        service = KGQueryService(session)
+        expected = {
+            required: await service.get_common_news_for_entities([1, 2, 3, 4], page_size=10, min_match=required)
+            for required in range(1, 5)
+        }
+
+        EntityStatsManager._instance = None
+        GraphIndexManager._instance = None
+        GraphIndexManager(GraphIndexConfig(enabled=False))
+        try:
+            await EntityStatsManager(EntityStatsConfig(refresh_interval=0)).recompute(session.info["engine"])
+            service = KGQueryService(session)
+            # 测试数据量太小，强制使用枢轴实体
+            service.common_news.COMMON_NEWS_PIVOT_COST = 0
+            assert service.common_news._common_news_pivots([1, 2, 3, 4], 3) == [4, 3]
+
+            for required, result in expected.items():
+                pivoted = await service.get_common_news_for_entities([1, 2, 3, 4], page_size=10, min_match=required)
+                assert pivoted["items"] == result["items"]
+                assert pivoted["total"] == result["total"]
+        finally:
+            EntityStatsManager._instance = None
+            GraphIndexManager._instance = None
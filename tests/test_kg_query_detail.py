@@ -0,0 +1,86 @@
+"""
+测试实体详情与新闻相关实体查询的SQL语句数量
+"""
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.database.models import Base, Entity, EntityStats, Relation, Attribute, NewsEvent, news_event_entity
+from app.services.kg_query_service import KGQueryService
+
+
+@pytest_asyncio.fixture
+async def session():
+    """
+    内存SQLite会话：新闻1关联实体1..5，实体1有3条关系、2个属性，
+    实体统计中实体3最重要，实体4与实体5重要性相同但提及次数不同
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for i in range(1, 6):
+            session.add(Entity(id=i, name=f"实体{i}", type="公司"))
+        session.add(NewsEvent(id=1, title="新闻1", content="内容"))
+        session.add(NewsEvent(id=2, title="新闻2", content="内容"))
+        await session.flush()
+
+        session.add_all([
+            Relation(subject_id=1, predicate="投资", object_id=2),
+            Relation(subject_id=1, predicate="合作", object_id=3),
+            Relation(subject_id=4, predicate="投资", object_id=1),
+            Attribute(entity_id=1, key="行业", value="金融"),
+            Attribute(entity_id=1, key="地区", value="上海"),
+            EntityStats(entity_id=3, degree=1, pagerank=0.5, news_count=1),
+            EntityStats(entity_id=4, degree=1, pagerank=0.2, news_count=1),
+            EntityStats(entity_id=5, degree=0, pagerank=0.2, news_count=2),
+        ])
+        await session.execute(news_event_entity.insert(), [
+            {"news_event_id": 1, "entity_id": i} for i in range(1, 6)
+        ] + [{"news_event_id": 2, "entity_id": 1}])
+        await session.commit()
+
+        session.info["statements"] = statements
+        yield session
+
+    await engine.dispose()
+
+
+class TestStatementCount:
+    """实体详情和新闻相关实体只需一条查询"""
+
+    @pytest.mark.asyncio
+    async def test_entity_detail_single_statement(self, session):
+        statements = session.info["statements"]
+        statements.clear()
+
+        detail = await KGQueryService(session).get_entity_detail(1)
+
+        assert len(statements) == 1
+        assert detail["statistics"] == {"relations_count": 3, "news_count": 2, "attributes_count": 2}
+
+    @pytest.mark.asyncio
+    async def test_entity_detail_missing(self, session):
+        assert await KGQueryService(session).get_entity_detail(999) is None
+
+    @pytest.mark.asyncio
+    async def test_news_entities_single_statement(self, session):
+        statements = session.info["statements"]
+        statements.clear()
+
+        result = await KGQueryService(session).get_news_entities(1)
+
+        assert len(statements) == 1
+        assert [e["id"] for e in result["entities"]] == [3, 5, 4, 2, 1]
+        assert [e["news_count"] for e in result["entities"]][:3] == [1, 2, 1]
+        assert all(e["confidence"] is None for e in result["entities"])
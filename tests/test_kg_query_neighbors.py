@@ -0,0 +1,137 @@
+"""
+测试知识图谱查询服务的邻居网络遍历
+"""
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.database.models import Base, Entity, Relation
+from app.services.kg_query_service import KGQueryService
+
+
+@pytest_asyncio.fixture
+async def graph_session():
+    """
+    内存SQLite会话，预置一个星形+链式图：
+    - 实体1为中心，连接实体2..21（20个一度邻居）
+    - 实体2..6各自再连接3个二度邻居
+    - 实体22同时连接实体2和3（二度邻居中连接数最多）
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for i in range(1, 41):
+            session.add(Entity(id=i, name=f"实体{i}", type="公司"))
+        await session.flush()
+
+        for i in range(2, 22):
+            session.add(Relation(subject_id=1, predicate="投资", object_id=i))
+        next_id = 23
+        for i in range(2, 7):
+            for _ in range(3):
+                session.add(Relation(subject_id=i, predicate="合作", object_id=next_id))
+                next_id += 1
+        session.add(Relation(subject_id=2, predicate="合作", object_id=22))
+        session.add(Relation(subject_id=22, predicate="合作", object_id=3))
+        await session.commit()
+
+        session.info["statements"] = statements
+        yield session
+
+    await engine.dispose()
+
+
+class TestEntityNeighbors:
+    """邻居网络遍历测试"""
+
+    @pytest.mark.asyncio
+    async def test_one_relation_query_per_level(self, graph_session):
+        """每层只发起一次关系查询，与前沿大小无关（另加一次边查询）"""
+        service = KGQueryService(graph_session)
+        statements = graph_session.info["statements"]
+        statements.clear()
+
+        result = await service.get_entity_neighbors(entity_id=1, depth=2, max_entities=500)
+
+        relation_queries = [s for s in statements if "FROM relations" in s]
+        assert len(relation_queries) == 3
+        assert result["metadata"]["level_distribution"] == {0: 1, 1: 20, 2: 16}
+        assert result["metadata"]["truncated"] is False
+
+    @pytest.mark.asyncio
+    async def test_edges_only_between_returned_nodes(self, graph_session):
+        service = KGQueryService(graph_session)
+        result = await service.get_entity_neighbors(entity_id=1, depth=2, max_entities=25)
+
+        node_ids = {node["id"] for node in result["nodes"]}
+        assert len(node_ids) == 25
+        for edge in result["edges"]:
+            assert edge["source"] in node_ids
+            assert edge["target"] in node_ids
+
+    @pytest.mark.asyncio
+    async def test_truncation_prefers_most_connected(self, graph_session):
+        """截断时优先保留与上一层连接数最多的实体"""
+        service = KGQueryService(graph_session)
+        result = await service.get_entity_neighbors(entity_id=1, depth=2, max_entities=22)
+
+        levels = {node["id"]: node["level"] for node in result["nodes"]}
+        assert result["metadata"]["truncated"] is True
+        assert levels.get(22) == 2
+        assert sum(1 for level in levels.values() if level == 2) == 1
+
+    @pytest.mark.asyncio
+    async def test_relation_type_filter(self, graph_session):
+        service = KGQueryService(graph_session)
+        result = await service.get_entity_neighbors(entity_id=1, depth=3, relation_types=["投资"])
+
+        assert result["metadata"]["level_distribution"] == {0: 1, 1: 20}
+        assert {edge["relation_type"] for edge in result["edges"]} == {"投资"}
+
+    @pytest.mark.asyncio
+    async def test_missing_entity(self, graph_session):
+        service = KGQueryService(graph_session)
+        result = await service.get_entity_neighbors(entity_id=999)
+        assert result["nodes"] == []
+
+    @pytest.mark.asyncio
+    async def test_columnar_matches_records(self, graph_session):
+        service = KGQueryService(graph_session)
+        records = await service.get_entity_neighbors(entity_id=1, depth=2, max_entities=30)
+        columnar = await service.get_entity_neighbors(
+            entity_id=1, depth=2, max_entities=30, response_format="columnar"
+        )
+
+        nodes, edges, dictionaries = columnar["nodes"], columnar["edges"], columnar["dictionaries"]
+        assert columnar["format"] == "columnar"
+        assert nodes["id"][0] == 1 and nodes["level"] == sorted(nodes["level"])
+        assert {
+            (node_id, name, dictionaries["type"][code], level)
+            for node_id, name, code, level in zip(nodes["id"], nodes["name"], nodes["type"], nodes["level"])
+        } == {(node["id"], node["name"], node["entity_type"], node["level"]) for node in records["nodes"]}
+        assert sorted(
+            (source, target, dictionaries["predicate"][code])
+            for source, target, code in zip(edges["source"], edges["target"], edges["predicate"])
+        ) == sorted((edge["source"], edge["target"], edge["relation_type"]) for edge in records["edges"])
+        assert sorted(dictionaries["predicate"]) == ["合作", "投资"]
+        assert columnar["metadata"] == records["metadata"]
+
+    @pytest.mark.asyncio
+    async def test_columnar_missing_entity_and_invalid_format(self, graph_session):
+        service = KGQueryService(graph_session)
+        result = await service.get_entity_neighbors(entity_id=999, response_format="columnar")
+        assert result["nodes"]["id"] == [] and result["metadata"]["total_nodes"] == 0
+
+        with pytest.raises(ValueError):
+            await service.get_entity_neighbors(entity_id=1, response_format="csv")
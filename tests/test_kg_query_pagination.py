@@ -0,0 +1,217 @@
+"""
+测试知识图谱查询服务的游标分页与总数缓存
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.database.models import Base, Entity, NewsEvent, news_event_entity
+from app.services.kg_query_service import KGQueryService
+from app.services.query_pagination import (
+    CountCache, count_cache, encode_cursor, decode_cursor
+)
+from app.store.response_cache_manage import get_response_cache_manager
+
+
+@pytest_asyncio.fixture
+async def session():
+    """内存SQLite会话，预置实体和新闻数据"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        base_time = datetime(2024, 1, 1, 12, 0, 0)
+        # 部分实体共享相同的created_at，验证id打破并列
+        for i in range(25):
+            session.add(Entity(
+                name=f"实体{i:02d}",
+                type="公司" if i % 2 else "人物",
+                created_at=base_time + timedelta(minutes=i // 3)
+            ))
+        for i in range(12):
+            session.add(NewsEvent(
+                title=f"新闻{i:02d}",
+                content="内容",
+                source="测试",
+                # 部分新闻没有发布时间，验证NULL排序
+                publish_time=None if i % 5 == 0 else base_time + timedelta(hours=i % 4)
+            ))
+        await session.commit()
+
+        news_ids = (await session.execute(select(NewsEvent.id))).scalars().all()
+        await session.execute(news_event_entity.insert(), [
+            {"news_event_id": news_id, "entity_id": 1} for news_id in news_ids
+        ])
+        await session.commit()
+
+        count_cache.invalidate()
+        yield session
+
+    await engine.dispose()
+
+
+async def _collect_by_cursor(fetch, page_size):
+    """沿next_cursor翻页，收集全部ID"""
+    ids, cursor = [], None
+    while True:
+        result = await fetch(page_size=page_size, cursor=cursor)
+        ids.extend(item["id"] for item in result["items"])
+        if not result["has_more"]:
+            assert result["next_cursor"] is None
+            return ids
+        cursor = result["next_cursor"]
+
+
+class TestCursorCodec:
+    """游标编解码测试"""
+
+    def test_roundtrip_datetime(self):
+        value = datetime(2024, 5, 1, 8, 30)
+        assert decode_cursor(encode_cursor("created_at", value, 7), "created_at") == (value, 7)
+
+    def test_roundtrip_none(self):
+        assert decode_cursor(encode_cursor("publish_time", None, 3), "publish_time") == (None, 3)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor", "created_at")
+
+    def test_sort_mismatch(self):
+        cursor = encode_cursor("name", "a", 1)
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "created_at")
+
+
+class TestKeysetPagination:
+    """游标分页测试"""
+
+    @pytest.mark.asyncio
+    async def test_entity_cursor_matches_offset(self, session):
+        """游标翻页与一次性排序结果一致，且无重复无遗漏"""
+        service = KGQueryService(session)
+        full = await service.get_entity_list(page=1, page_size=100)
+        cursor_ids = await _collect_by_cursor(service.get_entity_list, page_size=7)
+
+        assert cursor_ids == [item["id"] for item in full["items"]]
+        assert len(cursor_ids) == 25
+
+    @pytest.mark.asyncio
+    async def test_entity_cursor_ascending_with_filter(self, session):
+        service = KGQueryService(session)
+
+        async def fetch(**kwargs):
+            return await service.get_entity_list(entity_type="公司", sort_by="name", sort_order="asc", **kwargs)
+
+        ids = await _collect_by_cursor(fetch, page_size=5)
+        names = [(await session.get(Entity, entity_id)).name for entity_id in ids]
+        assert names == sorted(names)
+        assert len(ids) == 12
+
+    @pytest.mark.asyncio
+    async def test_entity_cursor_on_renamed_field(self, session):
+        """排序字段在结果中改名（type -> entity_type）时游标仍然有效"""
+        service = KGQueryService(session)
+        full = await service.get_entity_list(sort_by="type", page_size=100)
+
+        async def fetch(**kwargs):
+            return await service.get_entity_list(sort_by="type", **kwargs)
+
+        assert await _collect_by_cursor(fetch, page_size=4) == [item["id"] for item in full["items"]]
+
+    @pytest.mark.asyncio
+    async def test_news_content_preview(self, session):
+        session.add(NewsEvent(id=100, title="长新闻", content="长" * 301))
+        await session.commit()
+
+        result = await KGQueryService(session).get_news_list(sort_by="id", page_size=1)
+        content = result["items"][0]["content"]
+        assert content == "长" * 300 + "..."
+
+    @pytest.mark.asyncio
+    async def test_news_cursor_handles_null_sort_key(self, session):
+        service = KGQueryService(session)
+        ids = await _collect_by_cursor(service.get_news_list, page_size=5)
+        assert sorted(ids) == sorted(set(ids))
+        assert len(ids) == 12
+
+    @pytest.mark.asyncio
+    async def test_entity_news_cursor(self, session):
+        service = KGQueryService(session)
+
+        async def fetch(**kwargs):
+            return await service.get_entity_news(entity_id=1, **kwargs)
+
+        ids = await _collect_by_cursor(fetch, page_size=4)
+        assert len(set(ids)) == 12
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_raises_value_error(self, session):
+        service = KGQueryService(session)
+        with pytest.raises(ValueError):
+            await service.get_entity_list(cursor="bad")
+
+
+class TestCountCache:
+    """总数缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_cached_total_and_exact_count(self, session):
+        service = KGQueryService(session)
+        first = await service.get_entity_list(page_size=5)
+        assert first["total"] == 25
+        assert first["total_is_exact"] is True
+
+        session.add(Entity(name="新增实体", type="公司"))
+        await session.commit()
+
+        cached = await service.get_entity_list(page_size=5)
+        assert cached["total"] == 25
+        assert cached["total_is_exact"] is False
+
+        exact = await service.get_entity_list(page_size=5, exact_count=True)
+        assert exact["total"] == 26
+        assert exact["total_is_exact"] is True
+
+    @pytest.mark.asyncio
+    async def test_write_through_store_invalidates_cached_total(self, session):
+        service = KGQueryService(session)
+        assert (await service.get_entity_list(page_size=5))["total"] == 25
+        assert (await service.get_entity_news(1, page_size=5))["total"] == 12
+
+        # HybridStoreCore写入后递增数据表版本号，旧总数标记为陈旧并在后台重新计算
+        session.add(Entity(name="新增实体", type="公司"))
+        await session.commit()
+        await get_response_cache_manager().bump("entities")
+
+        result = await service.get_entity_list(page_size=5)
+        assert (result["total"], result["total_is_exact"], result["total_is_stale"]) == (25, False, True)
+        for task in list(count_cache._tasks):
+            await task
+        cached = await service.get_entity_list(page_size=5)
+        assert (cached["total"], cached["total_is_exact"], cached["total_is_stale"]) == (26, False, False)
+        # 不依赖实体表的总数不受影响
+        news = await service.get_entity_news(1, page_size=5)
+        assert (news["total_is_exact"], news["total_is_stale"]) == (False, False)
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_refreshed_in_background(self, session):
+        cache = CountCache(ttl_seconds=0)
+        stmt = select(func.count(Entity.id))
+
+        total, exact, stale = await cache.get_total(("entities",), session, stmt)
+        assert (total, exact, stale) == (25, True, False)
+
+        session.add(Entity(name="新增实体", type="公司"))
+        await session.commit()
+
+        # 过期后先返回旧值，后台任务完成后更新
+        total, exact, stale = await cache.get_total(("entities",), session, stmt)
+        assert (total, exact, stale) == (25, False, False)
+        for task in list(cache._tasks):
+            await task
+        assert cache._entries[("entities",)].value == 26
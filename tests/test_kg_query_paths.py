@@ -0,0 +1,114 @@
+"""
+测试知识图谱查询服务的实体路径查询
+"""
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.config.config_manager import GraphIndexConfig
+from app.database.models import Base, Entity, Relation
+from app.services.kg_query_service import KGQueryService
+from app.store.graph_index_manage import GraphIndexManager
+
+
+# 1 -投资-> 2 -投资-> 3 -投资-> 4，另有两条经过5、6的两跳"合作"路径，7-8与其余实体不连通
+EDGES = [
+    (1, 1, 2, "投资"),
+    (2, 2, 3, "投资"),
+    (3, 3, 4, "投资"),
+    (4, 1, 5, "合作"),
+    (5, 5, 4, "合作"),
+    (6, 6, 1, "合作"),
+    (7, 6, 4, "合作"),
+    (8, 7, 8, "投资"),
+]
+
+
+@pytest_asyncio.fixture
+async def engine():
+    """预置路径测试图的内存SQLite数据库"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        for entity_id in range(1, 9):
+            session.add(Entity(id=entity_id, name=f"实体{entity_id}", type="公司"))
+        await session.flush()
+        for edge_id, subject_id, object_id, predicate in EDGES:
+            session.add(Relation(id=edge_id, subject_id=subject_id, object_id=object_id, predicate=predicate))
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def no_graph_index():
+    """禁用内存图索引，走SQL路径"""
+    GraphIndexManager._instance = None
+    yield GraphIndexManager(GraphIndexConfig(enabled=False))
+    GraphIndexManager._instance = None
+
+
+@pytest.fixture
+def graph_index():
+    GraphIndexManager._instance = None
+    yield GraphIndexManager(GraphIndexConfig(reload_interval=0))
+    GraphIndexManager._instance = None
+
+
+async def find_paths(engine, *args, **kwargs):
+    async with AsyncSession(engine) as session:
+        return await KGQueryService(session).find_paths(*args, **kwargs)
+
+
+class TestFindPaths:
+    """双向BFS路径查询测试"""
+
+    @pytest.mark.asyncio
+    async def test_all_shortest_paths(self, engine, no_graph_index):
+        result = await find_paths(engine, 1, 4)
+
+        assert [path["entity_ids"] for path in result["paths"]] == [[1, 5, 4], [1, 6, 4]]
+        assert result["metadata"]["shortest_length"] == 2
+        assert {node["id"] for node in result["nodes"]} == {1, 4, 5, 6}
+
+        # 关系保留原始方向
+        relations = result["paths"][1]["relations"]
+        assert [(r["source"], r["target"]) for r in relations] == [(6, 1), (6, 4)]
+
+    @pytest.mark.asyncio
+    async def test_relation_type_filter_and_max_hops(self, engine, no_graph_index):
+        result = await find_paths(engine, 1, 4, relation_types=["投资"])
+        assert [path["entity_ids"] for path in result["paths"]] == [[1, 2, 3, 4]]
+        assert [r["id"] for r in result["paths"][0]["relations"]] == [1, 2, 3]
+
+        result = await find_paths(engine, 1, 4, max_hops=2, relation_types=["投资"])
+        assert result["paths"] == []
+
+    @pytest.mark.asyncio
+    async def test_top_k(self, engine, no_graph_index):
+        result = await find_paths(engine, 1, 4, top_k=1)
+        assert len(result["paths"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_disconnected_same_and_missing(self, engine, no_graph_index):
+        assert (await find_paths(engine, 1, 7))["paths"] == []
+        assert (await find_paths(engine, 3, 3))["paths"][0]["entity_ids"] == [3]
+        assert await find_paths(engine, 1, 999) is None
+
+    @pytest.mark.asyncio
+    async def test_edge_budget_stops_search(self, engine, no_graph_index):
+        result = await find_paths(engine, 1, 4, relation_types=["投资"], edge_budget=2)
+        assert result["paths"] == []
+        assert result["metadata"]["stopped_by"] == "edge_budget"
+
+    @pytest.mark.asyncio
+    async def test_memory_index_matches_sql(self, engine, graph_index):
+        sql_result = await find_paths(engine, 2, 6)
+        await graph_index.reload(engine)
+        memory_result = await find_paths(engine, 2, 6)
+
+        assert memory_result["paths"] == sql_result["paths"]
+        assert [path["entity_ids"] for path in memory_result["paths"]] == [[2, 1, 6]]
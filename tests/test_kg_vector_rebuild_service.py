@@ -0,0 +1,185 @@
+"""
+测试向量索引重建（写入新集合、原子切换、补写重建期间的更新、断点续传）
+"""
+
+import hashlib
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import select, update
+
+from app.config.config_manager import (
+    CacheConfig, EntityStatsConfig, GraphIndexConfig, VectorRebuildConfig
+)
+from app.database.core import DatabaseConfig
+from app.database.manager import DatabaseManager
+from app.database.models import Entity, NewsEvent
+from app.exceptions.store_exceptions import StoreError
+from app.services.kg_vector_rebuild_service import KGVectorRebuildService
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+from app.store.hybrid_store_core_implement import HybridStoreCore
+from app.store.response_cache_manage import ResponseCacheManager
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+class StubEmbeddingService:
+    """按文本哈希生成确定性向量的嵌入服务，可在每次调用时执行钩子"""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.calls = []
+        self.hook = None
+
+    async def aembed_batch(self, texts, use_cache=True):
+        self.calls.append(len(texts))
+        if self.hook:
+            await self.hook(len(self.calls))
+        return [[b / 255 for b in hashlib.sha1(text.encode("utf-8")).digest()[:self.dimension]] for text in texts]
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    EntityStatsManager(EntityStatsConfig(enabled=False))
+    ResponseCacheManager(CacheConfig(type="memory", ttl=0, max_size=100, redis={}))
+
+    db_manager = DatabaseManager(DatabaseConfig(database_url=f"sqlite+aiosqlite:///{tmp_path}/kg.db"))
+    await db_manager.create_tables()
+    async with db_manager.get_session() as session:
+        for i in range(1, 6):
+            session.add(Entity(id=i, name=f"实体{i}", type="公司", description=f"描述{i}",
+                               vector_id=f"entity_{i}" if i <= 3 else None))
+        session.add(NewsEvent(id=1, title="新闻", content="内容", publish_time=datetime(2024, 7, 1)))
+
+    # 旧集合为8维，嵌入服务换成16维
+    vector_store = ChromaVectorSearch(path=str(tmp_path / "chroma"))
+    vector_store.create_index("default", 8)
+    vector_store.add_vectors("default", [[0.1] * 8], ["entity_1"], [{"content_type": "entity"}])
+
+    store = HybridStoreCore(db_manager, vector_store, StubEmbeddingService(16))
+    store.vector_manager = VectorIndexManager(
+        vector_store, store.embedding_service, state_path=str(tmp_path / "vector_index_state.json")
+    )
+    yield store
+
+    await db_manager.close()
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+
+
+class TestKGVectorRebuildService:
+    """向量索引重建测试"""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_into_new_collection_and_swap(self, store):
+        vector_store = store.vector_manager.vector_store
+        active_during_rebuild = []
+
+        async def hook(call):
+            active_during_rebuild.append(store.vector_manager.index_name)
+
+        store.embedding_service.hook = hook
+        report = await KGVectorRebuildService(
+            store, VectorRebuildConfig(batch_size=2, embed_batch_size=1, concurrency=2)
+        ).rebuild()
+
+        target = report["target"]
+        assert report["counts"] == {"entity": 5, "news": 1} and report["swapped"]
+        # 重建期间查询仍使用旧集合
+        assert set(active_during_rebuild) == {"default"}
+        assert store.vector_manager.index_name == target
+        assert store.vector_manager.layout == "per_type"
+        assert vector_store.count_vectors(f"{target}.entity") == 5
+        assert vector_store.count_vectors(f"{target}.news") == 1
+        assert vector_store.count_vectors(f"{target}.relation") == 0
+        assert vector_store.get_index_info(f"{target}.entity")["metadata"]["dimension"] == 16
+        assert vector_store.get_index_info(f"{target}.relation")["metadata"]["dimension"] == 16
+        assert vector_store.count_vectors("default") == 1
+
+        # 其他进程的管理器通过状态文件看到切换
+        other = VectorIndexManager(vector_store, store.embedding_service, state_path=store.vector_manager.state_path)
+        assert other.index_name == target
+        assert store.vector_manager.read_state()["previous"] == "default"
+
+        async with store.db_manager.get_session() as session:
+            vector_ids = (await session.execute(select(Entity.vector_id).order_by(Entity.id))).scalars().all()
+        assert vector_ids == [f"entity_{i}" for i in range(1, 6)]
+
+        # 再次重建后删除上上个集合，保留上一个用于回滚
+        second = await KGVectorRebuildService(store, VectorRebuildConfig(batch_size=10)).rebuild()
+        assert {name.split(".")[0] for name in vector_store.list_indices()} == {target, second["target"]}
+
+    @pytest.mark.asyncio
+    async def test_catch_up_rows_updated_during_rebuild(self, store):
+        async def hook(call):
+            if call == 1:
+                async with store.db_manager.get_session() as session:
+                    await session.execute(
+                        update(Entity).where(Entity.id == 1).values(description="新描述", updated_at=datetime.now())
+                    )
+
+        store.embedding_service.hook = hook
+        report = await KGVectorRebuildService(store, VectorRebuildConfig(batch_size=10)).rebuild()
+
+        assert report["caught_up"] == 1
+        vector = store.vector_manager.vector_store.get_vectors(
+            f"{report['target']}.entity", ["entity_1"], include_vectors=False
+        )
+        assert vector[0]["text"] == "实体1: 新描述"
+
+    @pytest.mark.asyncio
+    async def test_resume_from_checkpoint(self, store, tmp_path):
+        config = VectorRebuildConfig(batch_size=2, embed_batch_size=2)
+        service = KGVectorRebuildService(store, config)
+
+        async def fail_on_third_page(call):
+            if call == 3:
+                raise RuntimeError("嵌入服务不可用")
+
+        store.embedding_service.hook = fail_on_third_page
+        with pytest.raises(StoreError):
+            await service.rebuild()
+        assert store.vector_manager.index_name == "default"
+
+        store.embedding_service.hook = None
+        store.embedding_service.calls.clear()
+        report = await service.rebuild()
+
+        assert report["counts"] == {"entity": 5, "news": 1}
+        # 只处理剩余的1个实体和1条新闻
+        assert sum(store.embedding_service.calls) == 2
+        vector_store = store.vector_manager.vector_store
+        assert vector_store.count_vectors(f"{report['target']}.entity") == 5
+        assert vector_store.count_vectors(f"{report['target']}.news") == 1
+        assert not (tmp_path / "vector_index_state.json.rebuild").exists()
+
+    @pytest.mark.asyncio
+    async def test_split_single_collection_without_reembedding(self, store):
+        vector_store = store.vector_manager.vector_store
+        vector_store.add_vectors("default", [[0.2] * 8], ["news_1"], [{"content_type": "news", "content_id": "1"}],
+                                 ["新闻: 内容"])
+
+        report = await KGVectorRebuildService(store, VectorRebuildConfig(batch_size=1)).split_collections()
+
+        target = report["target"]
+        assert report["counts"] == {"entity": 1, "news": 1}
+        # 直接复制已有嵌入，维度保持旧集合的8维
+        assert store.embedding_service.calls == []
+        assert (store.vector_manager.index_name, store.vector_manager.layout) == (target, "per_type")
+        assert vector_store.get_index_info(f"{target}.entity")["metadata"]["dimension"] == 8
+        copied = vector_store.get_vectors(f"{target}.news", ["news_1"])
+        assert copied[0]["vector"] == pytest.approx([0.2] * 8) and copied[0]["text"] == "新闻: 内容"
+        assert vector_store.count_vectors(f"{target}.relation") == 0
+        assert "default" in vector_store.list_indices()
+
+        with pytest.raises(StoreError):
+            await KGVectorRebuildService(store).split_collections()
+
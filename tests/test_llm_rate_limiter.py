@@ -0,0 +1,165 @@
+"""
+测试大模型调用限流（RPM/TPM令牌桶、AIMD自适应并发、Retry-After、排队时间统计）
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.config.config_manager import ConfigManager, LLMRateLimitConfig
+from app.llm.llm_client import LLMClient
+from app.llm.rate_limiter import LLMRateLimiter, ModelRateLimiter, get_retry_after, is_rate_limit_error
+
+
+class FakeRateLimitError(Exception):
+    """模拟OpenAI SDK的429错误"""
+
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("Error code: 429 - Too Many Requests")
+        self.response = SimpleNamespace(status_code=429,
+                                        headers={"retry-after": str(retry_after)} if retry_after else {})
+
+
+class FakeProvider:
+    """同时处理超过capacity个请求时返回429的大模型服务"""
+
+    def __init__(self, capacity, retry_after=0.2, latency=0.05):
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.rejected = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.active >= self.capacity:
+            self.rejected += 1
+            raise FakeRateLimitError(self.retry_after)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        return SimpleNamespace(content="ok", response_metadata={
+            "token_usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        })
+
+
+@pytest.fixture
+def limiter():
+    LLMRateLimiter._instance = None
+    limiter = LLMRateLimiter(LLMRateLimitConfig(initial_concurrency=2, max_concurrency=16,
+                                                default_retry_after=0.1))
+    yield limiter
+    LLMRateLimiter._instance = None
+
+
+class TestModelRateLimiter:
+    """限流器测试"""
+
+    def test_retry_after_parsing(self):
+        assert get_retry_after(FakeRateLimitError(3)) == 3.0
+        error = FakeRateLimitError()
+        error.response.headers["retry-after-ms"] = "250"
+        assert get_retry_after(error) == 0.25
+        assert get_retry_after(Exception("Rate limit reached, retry after 7 seconds")) == 7.0
+        assert get_retry_after(Exception("boom")) is None
+        assert is_rate_limit_error(FakeRateLimitError()) and not is_rate_limit_error(Exception("timeout"))
+
+    @pytest.mark.asyncio
+    async def test_rpm_and_tpm_buckets(self):
+        # 每秒20个请求，容量为0.25秒的额度（5个）：前5个立即通过，之后按速率放行
+        limiter = ModelRateLimiter("m", LLMRateLimitConfig(requests_per_minute=1200, burst_seconds=0.25,
+                                                           max_concurrency=100, initial_concurrency=100))
+        start = time.monotonic()
+        permits = [await limiter.acquire() for _ in range(10)]
+        assert 0.2 < time.monotonic() - start < 0.5
+        for permit in permits:
+            permit.release(used_tokens=0)
+
+        # TPM：按预占token计，完成后退还未用完的部分
+        limiter = ModelRateLimiter("m", LLMRateLimitConfig(tokens_per_minute=60000, burst_seconds=1))
+        permit = await limiter.acquire(800)
+        assert limiter.tpm.level == pytest.approx(200, abs=5)
+        permit.release(used_tokens=100)
+        assert limiter.tpm.level == pytest.approx(900, abs=5)
+        stats = limiter.get_stats()
+        assert stats["requests"] == 1 and stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_aimd_concurrency_and_cancelled_waiters(self):
+        limiter = ModelRateLimiter("m", LLMRateLimitConfig(initial_concurrency=4, max_concurrency=8,
+                                                           decrease_factor=0.5, default_retry_after=0.1))
+        permits = [await limiter.acquire() for _ in range(4)]
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiting.done() and limiter.get_stats()["waiting"] == 1
+        # 排队中被取消的请求不占用名额
+        waiting.cancel()
+        await asyncio.sleep(0)
+
+        # 同一轮请求收到多个429只减少一次并发数，并暂停default_retry_after
+        for permit in permits[:2]:
+            permit.release(rate_limited=True)
+        assert limiter.get_stats()["concurrency_limit"] == 2
+        assert limiter.get_stats()["throttled"] == 2
+        for permit in permits[2:]:
+            permit.release(used_tokens=10)
+        assert limiter.in_flight == 0
+
+        start = time.monotonic()
+        permit = await limiter.acquire()
+        assert time.monotonic() - start >= 0.05
+        assert permit.queue_time >= 0.05
+        # 成功时加性增加：每个成功请求增加 1/当前并发数，约每完成一轮请求增加1（2 → 2.5 → 2.9 → 3.2）
+        permit.release(used_tokens=10)
+        assert limiter.get_stats()["concurrency_limit"] == 3
+        for _ in range(3):
+            permit = await limiter.acquire()
+            permit.release(used_tokens=10)
+        assert limiter.get_stats()["concurrency_limit"] == 4
+
+
+class TestLLMClientRateLimit:
+    """大模型客户端限流测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_adapts_to_provider_capacity(self, limiter):
+        client = LLMClient(config_manager=ConfigManager(), rate_limiter=limiter)
+        provider = FakeProvider(capacity=6)
+        client._llm_instance = provider
+
+        responses = await client.generate_batch_async([f"问题{i}" for i in range(60)], max_retries=5)
+
+        assert all(response.content == "ok" for response in responses)
+        assert all("queue_time" in response.metadata for response in responses)
+        stats = client.get_rate_limit_stats()["models"][client.get_config()["model"]]
+        assert stats["requests"] == provider.calls
+        assert stats["throttled"] == provider.rejected
+        # 并发逐步增加到服务容量附近；429后整体暂停，不会每个请求各自重试
+        assert provider.peak == 6
+        assert provider.rejected <= 10
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0
+        assert stats["queue_time_max"] > 0
+
+    @pytest.mark.asyncio
+    async def test_disabled_limiter_passes_through(self):
+        LLMRateLimiter._instance = None
+        limiter = LLMRateLimiter(LLMRateLimitConfig(enabled=False))
+        try:
+            client = LLMClient(config_manager=ConfigManager(), rate_limiter=limiter)
+            provider = FakeProvider(capacity=100)
+            client._llm_instance = provider
+            responses = await client.generate_batch_async([f"问题{i}" for i in range(20)])
+            assert provider.peak == 20
+            assert "queue_time" not in responses[0].metadata
+            assert limiter.get_stats()["models"] == {}
+        finally:
+            LLMRateLimiter._instance = None
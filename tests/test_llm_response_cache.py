@@ -0,0 +1,175 @@
+"""
+测试大模型响应缓存（缓存键、按提示词键开关、有效期、条目数上限、命中统计）
+"""
+
+import asyncio
+import time
+from unittest import mock
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.config.config_manager import LLMCacheConfig
+from app.llm.base import LLMResponse
+from app.llm.llm_service import LLMService
+from app.llm.response_cache import LLMResponseCache
+
+
+def make_config(tmp_path, **kwargs):
+    values = dict(enabled=True, path=str(tmp_path / "llm_cache.db"), ttl_seconds=3600, max_entries=100,
+                  default_enabled=False, prompt_keys={"content_classification_enhanced": True,
+                                                      "news_summary_extraction": False})
+    values.update(kwargs)
+    return LLMCacheConfig(**values)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    LLMResponseCache._instance = None
+    cache = LLMResponseCache(make_config(tmp_path))
+    yield cache
+    cache.close()
+    LLMResponseCache._instance = None
+
+
+@pytest.fixture
+def llm_service(cache):
+    client = mock.Mock()
+    client.get_config.return_value = {"model": "glm-4-flash", "temperature": 0.1, "max_tokens": 2048}
+
+    async def generate_async(prompt, **kwargs):
+        await asyncio.sleep(0.05)
+        return LLMResponse(content=f"响应: {prompt}", metadata={"model": "glm-4-flash"}, cost=0.01,
+                           latency=0.05, tokens_used={"prompt": 20, "completion": 10, "total": 30})
+    client.generate_async = AsyncMock(side_effect=generate_async)
+
+    with mock.patch("app.llm.llm_service.LLMClient", return_value=client):
+        LLMService._instance = None
+        service = LLMService(response_cache=cache)
+        yield service
+    LLMService._instance = None
+
+
+class TestLLMResponseCache:
+    """响应缓存存储测试"""
+
+    def test_key_flags_ttl_and_eviction(self, cache, tmp_path):
+        key = cache.make_key("glm-4-flash", 0.1, 2048, "提示词")
+        assert key == cache.make_key("glm-4-flash", 0.1, 2048, "提示词")
+        assert key != cache.make_key("glm-4-flash", 0.2, 2048, "提示词")
+        assert key != cache.make_key("glm-4-flash", 0.1, 1024, "提示词")
+        assert key != cache.make_key("glm-4", 0.1, 2048, "提示词")
+        assert key != cache.make_key("glm-4-flash", 0.1, 2048, "提示词", system_prompt="系统")
+        assert key != cache.make_key("glm-4-flash", 0.1, 2048, "提示词", top_p=0.9)
+        assert (cache.make_key("glm-4-flash", 0.1, 2048, "提示词", top_p=0.9, stop=["\n"])
+                == cache.make_key("glm-4-flash", 0.1, 2048, "提示词", stop=["\n"], top_p=0.9))
+
+        assert cache.is_enabled_for("content_classification_enhanced")
+        assert not cache.is_enabled_for("news_summary_extraction")
+        assert not cache.is_enabled_for("query_kg") and not cache.is_enabled_for(None)
+        cache.config.default_enabled = True
+        assert cache.is_enabled_for("query_kg") and not cache.is_enabled_for("news_summary_extraction")
+
+        # 第一次写入前不创建缓存文件
+        assert cache.get(key) is None
+        assert not (tmp_path / "llm_cache.db").exists()
+        cache.put(key, LLMResponse(content="结果", metadata={"model": "glm-4-flash"}, latency=2.5,
+                                   tokens_used={"prompt": 100, "completion": 50, "total": 150}))
+        hit = cache.get(key, "content_classification_enhanced")
+        assert hit.content == "结果" and hit.metadata["cache_hit"] and hit.metadata["model"] == "glm-4-flash"
+        assert hit.tokens_used["total"] == 0 and hit.metadata["cached_tokens_used"]["total"] == 150
+
+        # 超过有效期后不再命中，并删除该条目
+        cache.config.ttl_seconds = 1
+        cache._conn.execute("UPDATE llm_cache SET created_at = ?", (time.time() - 2,))
+        assert cache.get(key) is None
+        assert cache.get_stats()["entries"] == 0
+
+        # 超过条目数上限时淘汰最久未命中的条目
+        cache.config.ttl_seconds = 0
+        cache.config.max_entries = 2
+        for name in ("a", "b"):
+            cache.put(name, LLMResponse(content=name, latency=1.0))
+            time.sleep(0.01)
+        assert cache.get("a") is not None
+        cache.put("c", LLMResponse(content="c", latency=1.0))
+        assert cache.get("b") is None
+        assert cache.get("a").content == "a" and cache.get("c").content == "c"
+
+        stats = cache.get_stats()
+        assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 4, 3)
+        assert stats["saved_latency"] == pytest.approx(5.5)
+        assert stats["saved_tokens"] == 150
+        assert stats["by_prompt"]["content_classification_enhanced"] == {"hits": 1, "misses": 0}
+
+
+class TestLLMServiceCache:
+    """大模型服务响应缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_generate_async_uses_cache_per_prompt_key(self, llm_service, cache, tmp_path):
+        client = llm_service._client
+        first = await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced")
+        start = time.monotonic()
+        second = await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced")
+        assert time.monotonic() - start < 0.05
+        assert client.generate_async.await_count == 1
+        assert "prompt_key" not in client.generate_async.await_args.kwargs
+        assert "cache_hit" not in first.metadata and second.metadata["cache_hit"]
+        assert second.content == first.content
+
+        # 采样参数或提示词不同时不命中
+        await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced", temperature=0.7)
+        await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced", top_p=0.5)
+        await llm_service.generate_async("分类: 另一条新闻", prompt_key="content_classification_enhanced")
+        assert client.generate_async.await_count == 4
+        # 重试次数不影响生成内容，不计入缓存键
+        await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced", max_retries=0)
+        assert client.generate_async.await_count == 4
+
+        # 关闭缓存的提示词和未指定提示词键的调用每次都调用大模型
+        for _ in range(2):
+            await llm_service.generate_async("生成摘要", prompt_key="news_summary_extraction")
+            await llm_service.generate_async("分类: 新闻")
+        assert client.generate_async.await_count == 8
+
+        stats = llm_service.get_stats()["cache"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 4, 4)
+        assert stats["hit_rate"] == pytest.approx(2 / 6)
+        assert stats["saved_latency"] == pytest.approx(0.1)
+
+        # 缓存保存在磁盘上，进程重启后仍然命中
+        cache.close()
+        LLMResponseCache._instance = None
+        llm_service._cache = LLMResponseCache(make_config(tmp_path))
+        try:
+            response = await llm_service.generate_async("分类: 新闻", prompt_key="content_classification_enhanced")
+            assert response.metadata["cache_hit"] and client.generate_async.await_count == 8
+        finally:
+            llm_service._cache.close()
+
+    @pytest.mark.asyncio
+    async def test_astream_caches_full_response(self, llm_service, cache):
+        client = llm_service._client
+        calls = []
+
+        async def astream(prompt, **kwargs):
+            calls.append(kwargs)
+            for chunk in ("{", '"entities": []', "}"):
+                yield chunk
+        client.astream = astream
+
+        chunks = [chunk async for chunk in llm_service.astream("抽取", prompt_key="entity_relation_extraction_unified",
+                                                                max_retries=0)]
+        assert chunks == ["{", '"entities": []', "}"]
+        assert calls == [{"max_retries": 0}]
+        # 开启缓存的提示词需要在配置中列出
+        assert cache.get_stats()["entries"] == 0
+
+        cache.config.prompt_keys["entity_relation_extraction_unified"] = True
+        for _ in range(2):
+            chunks = [chunk async for chunk in llm_service.astream(
+                "抽取", prompt_key="entity_relation_extraction_unified", max_retries=0)]
+            assert "".join(chunks) == '{"entities": []}'
+        assert len(calls) == 2
+        assert cache.get_stats()["by_prompt"]["entity_relation_extraction_unified"] == {"hits": 1, "misses": 1}
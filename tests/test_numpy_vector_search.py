@@ -0,0 +1,177 @@
+"""
+测试NumPy内存映射向量搜索（精确Top-k、元数据过滤、批量查询、覆盖写入、压缩、跨实例可见性、紧凑向量精排）
+"""
+
+import numpy as np
+import pytest
+
+from app.config.config_manager import VectorSearchConfig
+from app.exceptions.vector_exceptions import (
+    DimensionMismatchError, FilterError, IndexAlreadyExistsError, IndexNotFoundError, VectorSearchError
+)
+from app.vector import numpy_vector_search
+from app.vector.numpy_vector_search import NumpyVectorSearch
+from app.vector.vector_service import VectorSearchService
+
+
+DIMENSION = 16
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    store = NumpyVectorSearch(path=str(tmp_path / "vectors"))
+    yield store
+    store.close()
+
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+class TestNumpyVectorSearch:
+    """NumPy向量搜索测试"""
+
+    def test_exact_top_k_matches_brute_force(self, vector_store):
+        vectors = random_vectors(500)
+        vector_store.create_index("kg.entity", DIMENSION)
+        vector_store.add_vectors(
+            "kg.entity", vectors.tolist(), [f"entity_{i}" for i in range(500)],
+            [{"content_type": "entity", "type": "公司" if i % 2 else "人物"} for i in range(500)],
+            [f"文本{i}" for i in range(500)]
+        )
+
+        queries = random_vectors(5, seed=1)
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(queries @ normalized.T), axis=1)[:, :10]
+
+        batch = vector_store.search_vectors_batch("kg.entity", queries.tolist(), top_k=10)
+        assert [[int(r["id"].split("_")[1]) for r in results] for results in batch] == expected.tolist()
+        single = vector_store.search_vectors("kg.entity", queries[0].tolist(), top_k=10,
+                                             include=["embeddings", "metadatas", "documents", "distances"])
+        assert [r["id"] for r in single] == [r["id"] for r in batch[0]]
+        assert [r["score"] for r in single] == pytest.approx([r["score"] for r in batch[0]], abs=1e-6)
+        assert single[0]["text"] == f"文本{expected[0][0]}"
+        assert single[0]["vector"] == pytest.approx(vectors[expected[0][0]].tolist())
+        # score与Chroma一致为余弦距离
+        cosine = queries[0] @ normalized[expected[0][0]] / np.linalg.norm(queries[0])
+        assert single[0]["score"] == pytest.approx(1 - cosine, abs=1e-5)
+        assert [r["score"] for r in single] == sorted(r["score"] for r in single)
+
+        # 等值过滤（含Chroma风格的$eq和$and）只在匹配的行中取Top-k
+        for filter_dict in ({"type": "公司"}, {"type": {"$eq": "公司"}},
+                            {"$and": [{"content_type": "entity"}, {"type": "公司"}]}):
+            results = vector_store.search_vectors("kg.entity", queries[0].tolist(), 5, filter_dict)
+            odd = [i for i in expected[0] if i % 2][:5]
+            assert len(results) == 5 and all(r["metadata"]["type"] == "公司" for r in results)
+            assert [int(r["id"].split("_")[1]) for r in results][:len(odd)] == odd
+        assert vector_store.search_vectors("kg.entity", queries[0].tolist(), 5, {"type": "地点"}) == []
+        with pytest.raises(FilterError):
+            vector_store.search_vectors("kg.entity", queries[0].tolist(), 5, {"type": {"$ne": "公司"}})
+
+    def test_write_update_delete_and_reopen(self, vector_store, tmp_path):
+        vector_store.create_index("kg.news", DIMENSION, metric="l2")
+        with pytest.raises(IndexAlreadyExistsError):
+            vector_store.create_index("kg.news", DIMENSION)
+        with pytest.raises(DimensionMismatchError):
+            vector_store.add_vectors("kg.news", [[0.0] * 4], ["news_0"])
+        with pytest.raises(IndexNotFoundError):
+            vector_store.count_vectors("missing")
+
+        vectors = random_vectors(3)
+        ids = ["news_0", "news_1", "news_2"]
+        vector_store.add_vectors("kg.news", vectors.tolist(), ids,
+                                 [{"content_type": "news", "content_id": str(i)} for i in range(3)], ["a", "b", "c"])
+        # 已存在的ID跳过，update只改已有ID并合并元数据，upsert新增缺少的ID
+        vector_store.add_vectors("kg.news", [[9.0] * DIMENSION], ["news_0"])
+        vector_store.update_vectors("kg.news", [[1.0] * DIMENSION, [2.0] * DIMENSION], ["news_1", "news_9"],
+                                    [{"title": "新标题"}, {"title": "不存在"}])
+        vector_store.upsert_vectors("kg.news", [[3.0] * DIMENSION], ["news_3"], [{"content_type": "news"}], ["d"])
+        vector_store.delete_vectors("kg.news", ["news_2"])
+
+        assert vector_store.count_vectors("kg.news") == 3
+        updated = vector_store.get_vectors("kg.news", ["news_1", "news_2", "news_9"])
+        assert [r["id"] for r in updated] == ["news_1"]
+        assert updated[0]["vector"] == [1.0] * DIMENSION and updated[0]["text"] == "b"
+        assert updated[0]["metadata"] == {"content_type": "news", "content_id": "1", "title": "新标题"}
+        results = vector_store.search_vectors("kg.news", [2.9] * DIMENSION, top_k=10)
+        assert [r["id"] for r in results] == ["news_3", "news_1", "news_0"]
+        assert results[0]["score"] == pytest.approx(0.01 * DIMENSION, rel=1e-4)
+
+        # 重新打开后从日志恢复，压缩后只剩存活行
+        reopened = NumpyVectorSearch(path=str(tmp_path / "vectors"))
+        assert reopened.search_vectors("kg.news", [2.9] * DIMENSION, top_k=10) == results
+        assert reopened.get_index_info("kg.news")["rows"] == 5
+        reopened.compact_index("kg.news")
+        info = reopened.get_index_info("kg.news")
+        assert (info["count"], info["rows"], info["metric"], info["metadata"]["dimension"]) == (3, 3, "l2", DIMENSION)
+        assert sorted(r["id"] for batch in reopened.scan_vectors("kg.news", batch_size=2) for r in batch) == [
+            "news_0", "news_1", "news_3"
+        ]
+        # 原实例在下次访问时看到新的文件代号
+        assert vector_store.search_vectors("kg.news", [2.9] * DIMENSION, top_k=10) == results
+
+    def test_other_instance_sees_appends_and_auto_compaction(self, vector_store, tmp_path, monkeypatch):
+        monkeypatch.setattr(numpy_vector_search, "COMPACT_MIN_DEAD", 2)
+        reader = NumpyVectorSearch(path=str(tmp_path / "vectors"))
+        vector_store.create_index("kg.entity", DIMENSION)
+        assert reader.list_indices() == ["kg.entity"]
+        assert reader.count_vectors("kg.entity") == 0
+
+        vectors = random_vectors(6)
+        vector_store.add_vectors("kg.entity", vectors[:4].tolist(), [f"entity_{i}" for i in range(4)])
+        assert reader.count_vectors("kg.entity") == 4
+        vector_store.delete_vectors("kg.entity", ["entity_0", "entity_1", "entity_2"])
+        # 失效行超过阈值且多于存活行时自动压缩
+        assert vector_store.get_index_info("kg.entity")["rows"] == 1
+        vector_store.add_vectors("kg.entity", vectors[4:].tolist(), ["entity_4", "entity_5"])
+
+        results = reader.search_vectors("kg.entity", vectors[5].tolist(), top_k=10)
+        assert results[0]["id"] == "entity_5" and len(results) == 3
+        vector_store.delete_index("kg.entity")
+        with pytest.raises(IndexNotFoundError):
+            reader.search_vectors("kg.entity", vectors[5].tolist())
+
+    def test_compact_vectors_with_full_precision_rerank(self, tmp_path):
+        # 方差逐维递减，前几维承载大部分信息（与可截断的嵌入相似）
+        rng = np.random.default_rng(0)
+        scales = np.linspace(2.0, 0.1, DIMENSION).astype(np.float32)
+        vectors = (rng.normal(size=(1000, DIMENSION)) * scales).astype(np.float32)
+        queries = vectors[:20] + rng.normal(scale=0.05, size=(20, DIMENSION)).astype(np.float32)
+        exact = NumpyVectorSearch(path=str(tmp_path / "vectors"))
+        exact.create_index("kg.entity", DIMENSION)
+        exact.add_vectors("kg.entity", vectors[:600].tolist(), [f"entity_{i}" for i in range(600)])
+        truth = exact.search_vectors_batch("kg.entity", queries.tolist(), top_k=10)
+
+        for compact_dimension, quantization in ((None, "float16"), (None, "int8"), (8, "none"), (8, "int8")):
+            compact = NumpyVectorSearch(path=str(tmp_path / "vectors"), compact_dimension=compact_dimension,
+                                        quantization=quantization, rerank_factor=4)
+            # 其他实例追加的行同样编码为紧凑向量
+            compact.count_vectors("kg.entity")
+            exact.add_vectors("kg.entity", vectors[600:].tolist(), [f"entity_{i}" for i in range(600, 1000)])
+            truth = exact.search_vectors_batch("kg.entity", queries.tolist(), top_k=10)
+            found = compact.search_vectors_batch("kg.entity", queries.tolist(), top_k=10)
+            recall = np.mean([len({r["id"] for r in a} & {r["id"] for r in b}) / 10 for a, b in zip(found, truth)])
+            assert recall >= 0.9
+            # 精排后的距离是完整精度的
+            assert found[0][0]["score"] == pytest.approx(truth[0][0]["score"], abs=1e-5)
+            info = compact.get_index_info("kg.entity")
+            assert info["compact_dimension"] == (compact_dimension or DIMENSION)
+            assert info["quantization"] == quantization
+            compact.close()
+            exact.delete_vectors("kg.entity", [f"entity_{i}" for i in range(600, 1000)])
+            exact.compact_index("kg.entity")
+
+        with pytest.raises(VectorSearchError):
+            NumpyVectorSearch(path=str(tmp_path / "vectors"), quantization="int4")
+        exact.close()
+
+    def test_selected_by_vector_search_type(self, tmp_path, monkeypatch):
+        VectorSearchService._instance = None
+        service = VectorSearchService()
+        monkeypatch.setattr(service, "_config_cache",
+                            VectorSearchConfig(type="numpy", path=str(tmp_path / "vectors")))
+        try:
+            assert isinstance(service.get_vector_search("numpy_test"), NumpyVectorSearch)
+        finally:
+            service.close_all()
+            VectorSearchService._instance = None
@@ -0,0 +1,263 @@
+"""
+测试查询响应缓存（数据版本失效、LRU淘汰、ETag）及其在查询路由中的使用
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.api import kg_query_routes, kg_route_utils
+from app.config.config_manager import CacheConfig
+from app.database.models import Base, Entity
+from app.services.kg_query_service import KGQueryService
+from app.services.query_pagination import count_cache
+from app.store.response_cache_manage import ResponseCacheManager
+
+
+def make_cache(**overrides) -> ResponseCacheManager:
+    """重置单例，使用独立配置创建响应缓存"""
+    ResponseCacheManager._instance = None
+    settings = {"type": "memory", "ttl": 0, "max_size": 100, "redis": {}}
+    settings.update(overrides)
+    return ResponseCacheManager(CacheConfig(**settings))
+
+
+@pytest.fixture
+def response_cache():
+    yield make_cache()
+    ResponseCacheManager._instance = None
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for i in range(1, 4):
+            session.add(Entity(id=i, name=f"实体{i}", type="公司"))
+        await session.commit()
+
+        session.info["statements"] = statements
+        yield session
+
+    await engine.dispose()
+
+
+class FakeRedis:
+    """只支持版本号读写的Redis客户端，fail为True时递增失败"""
+
+    def __init__(self):
+        self.values = {}
+        self.fail = False
+        self._pending = []
+
+    def pipeline(self):
+        self._pending = []
+        return self
+
+    def incr(self, key):
+        self._pending.append(key)
+
+    async def execute(self):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        for key in self._pending:
+            self.values[key] = self.values.get(key, 0) + 1
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+
+async def list_entities(service, **kwargs):
+    params = {
+        "page": 1, "page_size": 20, "search": None, "entity_type": None,
+        "sort_by": "created_at", "sort_order": "desc", "cursor": None, "exact_count": False,
+        "if_none_match": None
+    }
+    params.update(kwargs)
+    return await kg_query_routes.get_entities(query_service=service, **params)
+
+
+class TestResponseCacheManager:
+    """响应缓存管理器测试"""
+
+    def test_make_key_normalizes_params(self, response_cache):
+        a = response_cache.make_key("neighbors", {"depth": 2, "relation_types": ["b", "a"], "x": None}, (1, 2))
+        b = response_cache.make_key("neighbors", {"relation_types": ["a", "b"], "depth": 2}, (1, 2))
+        assert a == b
+        assert a != response_cache.make_key("neighbors", {"depth": 2, "relation_types": ["a", "b"]}, (1, 3))
+
+    @pytest.mark.asyncio
+    async def test_bump_only_changes_listed_tables(self, response_cache):
+        before = await response_cache.get_versions(["entities", "news_events"])
+        await response_cache.bump("entities")
+        after = await response_cache.get_versions(["entities", "news_events"])
+
+        assert after[0] == before[0] + 1
+        assert after[1] == before[1]
+
+    @pytest.mark.asyncio
+    async def test_redis_bump_is_visible_immediately_and_retried(self, response_cache):
+        redis = FakeRedis()
+        response_cache._redis = redis
+
+        await response_cache.bump("entities")
+        assert redis.values == {"kg:version:entities": 1}
+        assert await response_cache.get_versions(["entities", "relations"]) == (1, 0)
+
+        # 递增失败时本进程改用本地版本号，之后读取版本号时重试
+        redis.fail = True
+        await response_cache.bump("entities")
+        assert await response_cache.get_versions(["entities"]) != (1,)
+        assert response_cache.get_stats()["unsynced_tables"] == ["entities"]
+        redis.fail = False
+        assert await response_cache.get_versions(["entities"]) == (2,)
+        assert response_cache.get_stats()["unsynced_tables"] == []
+
+    def test_etag_matches(self, response_cache):
+        etag = response_cache.make_etag("entities?page=1#v=1")
+        assert etag.startswith('W/"')
+        assert response_cache.etag_matches(etag, etag)
+        assert response_cache.etag_matches(f'"other", {etag[2:]}', etag)
+        assert response_cache.etag_matches("*", etag)
+        assert not response_cache.etag_matches(None, etag)
+        assert etag != response_cache.make_etag("entities?page=1#v=2")
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_count_and_memory(self):
+        cache = make_cache(max_size=2)
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+        assert await cache.get("a") == b"1"
+        await cache.set("c", b"3")
+
+        # b最久未使用，被淘汰
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"1"
+        stats = cache.get_stats()
+        assert stats["entries"] == 2 and stats["evictions"] == 1
+        assert stats["hit_ratio"] == pytest.approx(2 / 3)
+
+        cache = make_cache(max_memory_mb=1)
+        await cache.set("big1", b"x" * 600 * 1024)
+        await cache.set("big2", b"x" * 600 * 1024)
+        assert await cache.get("big1") is None
+        assert cache.get_stats()["memory_bytes"] == 600 * 1024 + len("big2")
+        ResponseCacheManager._instance = None
+
+
+class TestRenderJson:
+    """路由JSON序列化测试"""
+
+    def test_native_types(self):
+        body = kg_route_utils.render_json({
+            "created_at": datetime(2024, 1, 1, 8, 30, 0, 500),
+            "level_distribution": {0: 1, 1: np.int64(3)},
+            "score": Decimal("0.5"),
+            "name": "实体"
+        })
+        assert json.loads(body) == {
+            "created_at": "2024-01-01T08:30:00.000500",
+            "level_distribution": {"0": 1, "1": 3},
+            "score": 0.5,
+            "name": "实体"
+        }
+
+
+class TestCachedRoutes:
+    """查询路由的响应缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_query_until_table_bumped(self, session, response_cache):
+        statements = session.info["statements"]
+        service = KGQueryService(session)
+
+        first = await list_entities(service)
+        statements.clear()
+        second = await list_entities(service)
+
+        assert statements == []
+        assert second.body == first.body
+        assert len(json.loads(second.body)["items"]) == 3
+
+        # 无关数据表的写入不影响缓存
+        await response_cache.bump("news_events")
+        await list_entities(service)
+        assert statements == []
+
+        session.add(Entity(id=4, name="实体4", type="公司"))
+        await session.commit()
+        await response_cache.bump("entities")
+        third = await list_entities(service)
+        assert statements
+        assert len(json.loads(third.body)["items"]) == 4
+
+        # 总数还是写入前的值时不缓存、不返回ETag，后台重新计算完成后才缓存
+        assert json.loads(third.body)["total_is_stale"] is True
+        assert "etag" not in third.headers
+        for task in list(count_cache._tasks):
+            await task
+        fourth = await list_entities(service)
+        assert json.loads(fourth.body)["total"] == 4
+        assert "etag" in fourth.headers
+
+    @pytest.mark.asyncio
+    async def test_exact_count_bypasses_cache(self, session, response_cache):
+        service = KGQueryService(session)
+        result = await list_entities(service, exact_count=True)
+
+        assert result["total_is_exact"] is True
+        assert response_cache.get_stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_if_none_match_returns_304_without_query(self, session, response_cache):
+        statements = session.info["statements"]
+        service = KGQueryService(session)
+
+        first = await list_entities(service)
+        etag = first.headers["etag"]
+        response_cache.clear()
+        statements.clear()
+
+        # 缓存已清空，304仍不需要查询
+        not_modified = await list_entities(service, if_none_match=etag)
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+        assert statements == []
+        assert response_cache.get_stats()["not_modified"] == 1
+
+        # 其他参数的请求不匹配
+        other = await list_entities(service, page_size=2, if_none_match=etag)
+        assert other.status_code == 200
+
+        await response_cache.bump("entity_stats")
+        changed = await list_entities(service, if_none_match=etag)
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_etag_without_response_cache(self, session):
+        make_cache(response_enabled=False)
+        try:
+            service = KGQueryService(session)
+            first = await list_entities(service)
+            assert first.status_code == 200
+            second = await list_entities(service, if_none_match=first.headers["etag"])
+            assert second.status_code == 304
+        finally:
+            ResponseCacheManager._instance = None
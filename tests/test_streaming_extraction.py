@@ -0,0 +1,217 @@
+"""
+测试流式实体关系提取（增量JSON解析、实体在生成过程中返回、流式失败时改为一次性调用、实体处理与生成重叠）
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.core.content_processor import ContentProcessor
+from app.core.extract_models import Entity
+from app.llm.base import LLMResponse
+from app.services.kg_core_impl import KGCoreImplService
+from app.utils.json_stream_parser import JsonStreamParser
+
+
+RESPONSE = "```json\n" + json.dumps({
+    "is_financial_content": True,
+    "confidence": 0.9,
+    "entities": [
+        {"name": "特斯拉", "type": "公司", "description": "电动汽车公司，描述中有}和\"引号"},
+        {"name": "马斯克", "type": "人物", "description": "CEO", "aliases": [{"name": "Elon"}]},
+        {"name": "特斯拉", "type": "公司", "description": "重复实体"},
+        {"name": "上海", "type": "地点", "description": "超级工厂所在地"},
+    ],
+    "relations": [{"subject": "马斯克", "predicate": "任职", "object": "特斯拉", "description": "CEO"}],
+}, ensure_ascii=False) + "\n```"
+
+
+class FakeLLMService:
+    """按固定速度流式输出RESPONSE的大模型服务"""
+
+    def __init__(self, chunk_size=8, delay=0.005, fail_after=None, fallback_response=RESPONSE):
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.fail_after = fail_after
+        # 一次性调用返回的响应，为None时一次性调用也失败
+        self.fallback_response = fallback_response
+        self.stream_kwargs = None
+        self.generate_calls = 0
+        self.finished_at = None
+
+    async def astream(self, prompt, **kwargs):
+        self.stream_kwargs = kwargs
+        for offset in range(0, len(RESPONSE), self.chunk_size):
+            if self.fail_after is not None and offset >= self.fail_after:
+                raise ConnectionError("stream reset")
+            await asyncio.sleep(self.delay)
+            yield RESPONSE[offset:offset + self.chunk_size]
+        self.finished_at = time.monotonic()
+
+    async def generate_async(self, prompt, **kwargs):
+        self.generate_calls += 1
+        if self.fallback_response is None:
+            raise ConnectionError("service unavailable")
+        return LLMResponse(content=self.fallback_response)
+
+
+class FakeStore:
+    """没有已有实体、存储每个实体需要固定时间的存储"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.created = []
+        self.deleted = []
+
+    async def search_entities(self, **kwargs):
+        return []
+
+    async def create_entity(self, entity):
+        await asyncio.sleep(self.delay)
+        entity.id = len(self.created) + 1
+        self.created.append((entity.name, time.monotonic()))
+        return entity
+
+    async def delete_entity(self, entity_id):
+        self.deleted.append(entity_id)
+        return True
+
+
+class TestJsonStreamParser:
+    """增量JSON解析测试"""
+
+    def test_items_match_full_parse_for_any_chunk_size(self):
+        expected = [item for item in json.loads(RESPONSE.strip("`json\n"))["entities"]]
+        for size in (1, 2, 5, 64, len(RESPONSE)):
+            parser = JsonStreamParser(["entities"])
+            items = []
+            for offset in range(0, len(RESPONSE), size):
+                items.extend(parser.feed(RESPONSE[offset:offset + size]))
+            assert [item for _, item in items] == expected
+            assert {key for key, _ in items} == {"entities"}
+            assert parser.done and parser.text == RESPONSE
+
+        # 实体在其所在的对象闭合时返回，而不是在整个响应结束时
+        parser = JsonStreamParser(["entities"])
+        first_close = RESPONSE.index("}", RESPONSE.index("引号")) + 1
+        assert parser.feed(RESPONSE[:first_close - 1]) == []
+        assert [item["name"] for _, item in parser.feed(RESPONSE[first_close - 1:first_close])] == ["特斯拉"]
+
+    def test_ignores_other_arrays_and_bad_items(self):
+        parser = JsonStreamParser(["entities"])
+        items = parser.feed('{"relations": [{"a": 1}], "meta": {"entities": [{"x": 1}]}, '
+                            '"entities": [{"name": "A"}, {"name": bad}, {"name": "B"}]} trailing')
+        assert [item for _, item in items] == [{"name": "A"}, {"name": "B"}]
+        assert parser.feed("{more}") == [] and parser.done
+
+
+class TestExtractionStream:
+    """流式实体关系提取测试"""
+
+    @pytest.mark.asyncio
+    async def test_entities_arrive_before_generation_finishes(self):
+        llm = FakeLLMService()
+        processor = ContentProcessor(llm_service=llm)
+        stream = processor.stream_entities_and_relations("马斯克是特斯拉的CEO", entity_types="公司,人物",
+                                                         relation_types="任职")
+        arrivals = []
+        async for entity in stream:
+            assert isinstance(entity, Entity)
+            arrivals.append((entity.name, time.monotonic()))
+
+        assert [name for name, _ in arrivals] == ["特斯拉", "马斯克", "上海"]
+        assert arrivals[0][1] < llm.finished_at
+        assert llm.stream_kwargs == {"prompt_key": "entity_relation_extraction_unified", "max_retries": 0}
+        assert stream.result.knowledge_graph.relations[0].subject == "马斯克"
+        assert len(stream.result.knowledge_graph.entities) == 4
+        assert stream.first_entity_seconds < stream.total_seconds
+        assert not stream.fallback and llm.generate_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_single_call_when_stream_fails(self):
+        llm = FakeLLMService(fail_after=RESPONSE.index("上海"))
+        processor = ContentProcessor(llm_service=llm)
+        stream = processor.stream_entities_and_relations("马斯克是特斯拉的CEO", entity_types="公司,人物",
+                                                         relation_types="任职")
+        names = [entity.name async for entity in stream]
+
+        # 流式输出中断前返回的实体不重复返回，其余实体由一次性调用补充
+        assert names == ["特斯拉", "马斯克", "上海"]
+        assert stream.fallback and llm.generate_calls == 1
+        assert len(stream.result.knowledge_graph.relations) == 1
+
+
+class TestStreamingEntityProcessing:
+    """实体处理与大模型生成重叠测试"""
+
+    @pytest.mark.asyncio
+    async def test_entities_persist_while_llm_is_generating(self):
+        llm = FakeLLMService(chunk_size=4, delay=0.005)
+        processor = ContentProcessor(llm_service=llm)
+        service = KGCoreImplService(content_processor=processor, entity_analyzer=Mock(),
+                                    content_summarizer=Mock(), llm_service=llm, auto_init_store=False)
+        service.store = FakeStore(delay=0.05)
+
+        start = time.monotonic()
+        stream = processor.stream_entities_and_relations("马斯克是特斯拉的CEO", entity_types="公司,人物",
+                                                         relation_types="任职")
+        processed = await service._process_entities_with_vector_search(stream)
+        elapsed = time.monotonic() - start
+
+        assert list(processed) == ["特斯拉", "马斯克", "上海"]
+        assert [name for name, _ in service.store.created] == ["特斯拉", "马斯克", "上海"]
+        # 第一个实体在生成结束前已存储，总耗时小于生成耗时与存储耗时之和
+        assert service.store.created[0][1] < llm.finished_at
+        generation = llm.finished_at - start
+        assert elapsed < generation + 3 * 0.05
+
+        # 实体列表的处理方式不变
+        service.store = FakeStore(delay=0)
+        processed = await service._process_entities_with_vector_search(
+            [Entity(name="A", type="公司"), Entity(name="A", type="公司"), Entity(name="B", type="人物")]
+        )
+        assert list(processed) == ["A", "B"]
+
+    @pytest.mark.asyncio
+    async def test_entities_missing_from_final_result_are_never_stored(self):
+        fallback = "```json\n" + json.dumps({
+            "is_financial_content": True,
+            "confidence": 0.9,
+            "entities": [{"name": "特斯拉", "type": "公司"}, {"name": "比亚迪", "type": "公司"}],
+            "relations": [],
+        }, ensure_ascii=False) + "\n```"
+        llm = FakeLLMService(fail_after=RESPONSE.index("上海"), fallback_response=fallback)
+        processor = ContentProcessor(llm_service=llm)
+        service = KGCoreImplService(content_processor=processor, entity_analyzer=Mock(),
+                                    content_summarizer=Mock(), llm_service=llm, auto_init_store=False)
+        service.store = FakeStore(delay=0)
+
+        stream = processor.stream_entities_and_relations("马斯克是特斯拉的CEO", entity_types="公司,人物",
+                                                         relation_types="任职")
+        processed = await service._process_streamed_entities(stream)
+
+        # 流式中断前暂存的马斯克不在一次性调用的结果中，从映射中移除且从未存储
+        assert stream.fallback
+        assert list(processed) == ["特斯拉", "比亚迪"]
+        assert [name for name, _ in service.store.created] == ["特斯拉", "比亚迪"]
+        assert all(entity.id for entity in processed.values())
+        assert service.store.deleted == []
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_stored_when_extraction_fails(self):
+        llm = FakeLLMService(fail_after=RESPONSE.index("上海"), fallback_response=None)
+        processor = ContentProcessor(llm_service=llm)
+        service = KGCoreImplService(content_processor=processor, entity_analyzer=Mock(),
+                                    content_summarizer=Mock(), llm_service=llm, auto_init_store=False)
+        service.store = FakeStore(delay=0)
+
+        stream = processor.stream_entities_and_relations("马斯克是特斯拉的CEO", entity_types="公司,人物",
+                                                         relation_types="任职")
+        with pytest.raises(RuntimeError):
+            await service._process_streamed_entities(stream)
+        # 提取失败前的实体只是暂存，不写入也不删除
+        assert service.store.created == []
+        assert service.store.deleted == []
@@ -0,0 +1,268 @@
+"""
+测试向量存储熔断（失败/慢调用熔断、探测恢复）、熔断期间写操作的待重放队列和搜索降级
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from app.api.kg_query_routes import get_health
+from app.config.config_manager import (
+    CacheConfig, EntityStatsConfig, GraphIndexConfig, VectorBreakerConfig
+)
+from app.database.core import DatabaseConfig
+from app.database.manager import DatabaseManager
+from app.database.models import Entity, NewsEvent
+from app.exceptions.vector_exceptions import IndexNotFoundError, VectorStoreUnavailableError
+from app.store.entity_stats_manage import EntityStatsManager
+from app.store.graph_index_manage import GraphIndexManager
+from app.store.hybrid_store_core_implement import HybridStoreCore
+from app.store.response_cache_manage import ResponseCacheManager
+from app.store.vector_breaker_manage import VectorBreakerManager, VectorOutbox
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+DIMENSION = 8
+
+
+class StubEmbeddingService:
+    """按文本哈希生成确定性向量的嵌入服务"""
+
+    async def aembed_text(self, text):
+        return [b / 255 for b in hashlib.sha1(text.encode("utf-8")).digest()[:DIMENSION]]
+
+
+class FlakyVectorStore:
+    """包装向量存储，可模拟调用变慢"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.delay = 0.0
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if self.delay:
+                time.sleep(self.delay)
+            return attr(*args, **kwargs)
+        return call
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    VectorBreakerManager._instance = None
+    breaker = VectorBreakerManager(VectorBreakerConfig(
+        call_timeout=0.1, window_size=5, min_calls=3, failure_rate=0.5, slow_call_seconds=0.05,
+        slow_call_rate=0.6, open_seconds=0.3, outbox_path=str(tmp_path / "outbox.db"), max_replay_attempts=2
+    ))
+    yield breaker
+    breaker.outbox.close()
+    VectorBreakerManager._instance = None
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    store = ChromaVectorSearch(path=str(tmp_path / "chroma"))
+    yield FlakyVectorStore(store)
+    store.close()
+
+
+class TestVectorBreakerManager:
+    """熔断器状态测试"""
+
+    @pytest.mark.asyncio
+    async def test_trips_on_failures_and_recovers_after_probe(self, breaker):
+        def fail():
+            raise ConnectionError("down")
+
+        def missing():
+            raise IndexNotFoundError("kg.entity")
+
+        # 业务错误说明向量存储可用，不计为失败
+        for _ in range(3):
+            with pytest.raises(IndexNotFoundError):
+                await breaker.call(missing)
+        assert breaker.state == "closed"
+
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await breaker.call(fail)
+        assert breaker.state == "open"
+        with pytest.raises(VectorStoreUnavailableError):
+            await breaker.call(lambda: 1)
+        stats = breaker.get_stats()
+        assert (stats["trips"], stats["rejected"], stats["outbox_depth"]) == (1, 1, 0)
+
+        # 熔断时间到期后放行一次探测调用：失败则继续熔断，成功则关闭
+        await asyncio.sleep(0.3)
+        assert breaker.state == "half_open"
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.state == "open" and breaker.get_stats()["trips"] == 2
+        await asyncio.sleep(0.3)
+        assert await breaker.call(lambda: 1) == 1
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_trips_on_slow_calls_and_timeouts(self, breaker):
+        for _ in range(3):
+            assert await breaker.call(time.sleep, 0.06) is None
+        assert breaker.state == "open"
+
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        with pytest.raises(VectorStoreUnavailableError):
+            await breaker.call(time.sleep, 1)
+        # 超时后不再等待线程中的调用
+        assert time.monotonic() - start < 0.5
+        assert breaker.state == "open" and breaker.get_stats()["timeouts"] == 1
+
+
+class TestVectorOutbox:
+    """熔断期间的写操作和重放测试"""
+
+    @pytest.mark.asyncio
+    async def test_writes_queue_while_open_and_replay_in_order(self, breaker, vector_store, tmp_path):
+        manager = VectorIndexManager(vector_store, StubEmbeddingService(),
+                                     state_path=str(tmp_path / "vector_index_state.json"),
+                                     entity_type_collections={}, breaker=breaker)
+        manager.switch_index("kg")
+        await manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司"})
+        assert breaker.outbox.depth() == 0
+
+        # 调用超时：写操作进入队列，返回的向量ID不变；搜索超时由调用方降级；三次超时后熔断
+        vector_store.delay = 0.3
+        assert await manager.add_to_index("马斯克: CEO", 2, "entity", {"type": "人物"}) == "entity_2"
+        for _ in range(2):
+            with pytest.raises(VectorStoreUnavailableError):
+                await manager.search_vectors("特斯拉", "entity")
+        assert breaker.state == "open"
+
+        # 熔断期间（以及队列非空时）的写操作直接进入队列
+        assert await manager.add_to_index("新闻: 内容", 1, "news", {"type": "news"}) == "news_1"
+        assert await manager.update_vector("entity_1", "特斯拉: 汽车公司", {"type": "公司"})
+        assert await manager.delete_vector("entity_2")
+        assert await manager.add_to_index("比亚迪: 汽车", 3, "entity", {"type": "公司"}) == "entity_3"
+        assert breaker.outbox.depth() == 5
+        assert breaker.get_stats()["timeouts"] == 3
+        # 队列写入磁盘，进程重启后仍在
+        assert VectorOutbox(breaker.outbox.path).depth() == 5
+
+        # 恢复：等待超时的调用结束、熔断时间到期；探测成功后在后台按顺序重放
+        vector_store.delay = 0.0
+        await asyncio.sleep(0.4)
+        await manager.search_vectors("特斯拉", "entity")
+        assert breaker.state == "closed"
+        await manager.write_router.replay_task
+        assert breaker.outbox.depth() == 0
+        assert vector_store.count_vectors("kg.entity") == 2
+        assert vector_store.count_vectors("kg.news") == 1
+        entity_1 = vector_store.get_vectors("kg.entity", ["entity_1"])[0]
+        assert entity_1["text"] == "特斯拉: 汽车公司"
+        assert vector_store.get_vectors("kg.entity", ["entity_2"]) == []
+
+    @pytest.mark.asyncio
+    async def test_replay_stops_while_down_and_drops_failing_entries(self, breaker, vector_store, tmp_path):
+        manager = VectorIndexManager(vector_store, StubEmbeddingService(),
+                                     state_path=str(tmp_path / "vector_index_state.json"),
+                                     entity_type_collections={}, breaker=breaker)
+        manager.switch_index("kg")
+        breaker.outbox.append("update", {"vector_id": "news_9", "vector": [0.1] * 3, "metadata": None,
+                                         "text": "维度不一致"})
+        breaker.outbox.append("delete", {"vector_id": "entity_1"})
+
+        # 队列非空时新的写操作排在队列后面
+        await manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司"})
+        assert breaker.outbox.depth() == 3
+        await manager.write_router.replay_task
+
+        # 集合不存在的更新重试max_replay_attempts次后丢弃，之后的操作继续重放
+        assert await manager.replay_outbox() == 2
+        assert breaker.outbox.depth() == 0
+        assert vector_store.get_vectors("kg.entity", ["entity_1"])[0]["text"] == "特斯拉: 电动汽车"
+
+        # 向量存储不可用时停止重放，保留队列
+        breaker.outbox.append("delete", {"vector_id": "entity_1"})
+        vector_store.delay = 0.3
+        assert await manager.replay_outbox() == 0
+        assert breaker.outbox.depth() == 1
+        await asyncio.sleep(0.3)
+
+        # 其他进程持有重放租约时不重放
+        vector_store.delay = 0.0
+        assert breaker.outbox.acquire_lease("other", 60)
+        assert await manager.replay_outbox() == 0
+        breaker.outbox.release_lease("other")
+        assert await manager.replay_outbox() == 1
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path, breaker, vector_store):
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+    GraphIndexManager(GraphIndexConfig(enabled=False))
+    EntityStatsManager(EntityStatsConfig(enabled=False))
+    ResponseCacheManager(CacheConfig(type="memory", ttl=0, max_size=100, redis={}))
+
+    db_manager = DatabaseManager(DatabaseConfig(database_url=f"sqlite+aiosqlite:///{tmp_path}/kg.db"))
+    await db_manager.create_tables()
+    async with db_manager.get_session() as session:
+        session.add(Entity(id=1, name="特斯拉", type="公司", description="电动汽车"))
+        session.add(Entity(id=2, name="特斯拉", type="人物", description="发明家"))
+        session.add(Entity(id=3, name="特斯拉汽车", type="公司", description="旧名称"))
+        session.add(NewsEvent(id=1, title="新闻1", content="特斯拉发布新车", publish_time=datetime(2024, 7, 1)))
+        session.add(NewsEvent(id=2, title="新闻2", content="特斯拉", publish_time=datetime(2024, 6, 1)))
+        session.add(NewsEvent(id=3, title="新闻3", content="特斯拉降价", publish_time=datetime(2023, 1, 1)))
+
+    store = HybridStoreCore(db_manager, vector_store, StubEmbeddingService())
+    store.vector_manager = VectorIndexManager(
+        vector_store, store.embedding_service, state_path=str(tmp_path / "vector_index_state.json"),
+        entity_type_collections={}, breaker=breaker
+    )
+    store.vector_manager.switch_index("kg")
+    yield store
+
+    await db_manager.close()
+    GraphIndexManager._instance = None
+    EntityStatsManager._instance = None
+    ResponseCacheManager._instance = None
+
+
+class TestDegradedSearch:
+    """熔断期间的搜索降级测试"""
+
+    @pytest.mark.asyncio
+    async def test_entity_and_news_search_fall_back_to_database(self, store, breaker):
+        await store.vector_manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司"})
+        results = await store.search_entities("特斯拉: 电动汽车")
+        assert [result.entity.id for result in results] == [1]
+        assert "fallback" not in results[0].metadata
+        assert (await get_health())["status"] == "healthy"
+
+        breaker._open("测试")
+        # 实体按名称精确匹配
+        results = await store.search_entities("特斯拉")
+        assert [result.entity.id for result in results] == [1, 2]
+        assert all(result.metadata["fallback"] == "exact_name" and result.score == 1.0 for result in results)
+        assert [result.entity.id for result in await store.search_entities("特斯拉", entity_type="人物")] == [2]
+
+        # 新闻按内容关键词搜索，内容完全相同的排在前面，按时间范围过滤
+        results = await store.search_news_events("特斯拉", top_k=10,
+                                                 time_range=(datetime(2024, 1, 1), datetime(2024, 12, 31)))
+        assert [result.news_event.id for result in results] == [2, 1]
+        assert [result.score for result in results] == [1.0, 0.5]
+        assert results[0].metadata["fallback"] == "keyword"
+
+        health = await get_health()
+        assert health["status"] == "degraded"
+        assert health["vector_breaker"]["state"] == "open"
+        assert health["vector_breaker"]["outbox_depth"] == 0
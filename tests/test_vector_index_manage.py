@@ -0,0 +1,124 @@
+"""
+测试向量索引管理器的集合路由（按内容类型和实体类型拆分的集合、旧版单集合）和搜索结果字段裁剪
+"""
+
+import hashlib
+
+import pytest
+
+from app.exceptions.vector_exceptions import IndexNotFoundError
+from app.store.vector_index_manage import VectorIndexManager
+from app.vector.chroma_vector_search import ChromaVectorSearch
+
+
+DIMENSION = 8
+
+
+class StubEmbeddingService:
+    """按文本哈希生成确定性向量的嵌入服务"""
+
+    async def aembed_text(self, text):
+        return [b / 255 for b in hashlib.sha1(text.encode("utf-8")).digest()[:DIMENSION]]
+
+    async def aembed_batch(self, texts, use_cache=True):
+        return [await self.aembed_text(text) for text in texts]
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    store = ChromaVectorSearch(path=str(tmp_path / "chroma"))
+    yield store
+    store.close()
+
+
+def make_manager(vector_store, tmp_path, entity_type_collections=None):
+    return VectorIndexManager(
+        vector_store, StubEmbeddingService(),
+        state_path=str(tmp_path / "vector_index_state.json"),
+        entity_type_collections=entity_type_collections or {}
+    )
+
+
+class TestVectorIndexManager:
+    """向量集合路由测试"""
+
+    @pytest.mark.asyncio
+    async def test_new_deployment_uses_per_type_collections(self, vector_store, tmp_path):
+        manager = make_manager(vector_store, tmp_path, {"公司": "company"})
+        await manager.initialize()
+
+        assert (manager.index_name, manager.layout) == ("kg", "per_type")
+        assert set(vector_store.list_indices()) == {"kg.entity", "kg.entity.company", "kg.news", "kg.relation"}
+        assert manager.read_state()["layout"] == "per_type"
+
+    @pytest.mark.asyncio
+    async def test_existing_default_collection_stays_single(self, vector_store, tmp_path):
+        vector_store.create_index("default", DIMENSION)
+        manager = make_manager(vector_store, tmp_path)
+        await manager.initialize()
+
+        assert (manager.index_name, manager.layout) == ("default", "single")
+        assert not (tmp_path / "vector_index_state.json").exists()
+        await manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司"})
+        await manager.add_to_index("新闻: 内容", 1, "news", {"type": "news"})
+
+        results = await manager.search_vectors("特斯拉: 电动汽车", "entity")
+        assert [result["vector_id"] for result in results] == ["entity_1"]
+        assert vector_store.count_vectors("default") == 2
+
+    @pytest.mark.asyncio
+    async def test_routing_search_update_and_delete(self, vector_store, tmp_path):
+        manager = make_manager(vector_store, tmp_path, {"公司": "company"})
+        manager.switch_index("kg")
+
+        await manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司", "name": "特斯拉"})
+        await manager.add_to_index("马斯克: CEO", 2, "entity", {"type": "人物", "name": "马斯克"})
+        await manager.add_to_index("新闻: 内容", 1, "news", {"type": "news"})
+        assert vector_store.count_vectors("kg.entity.company") == 1
+        assert vector_store.count_vectors("kg.entity") == 1
+        assert vector_store.count_vectors("kg.news") == 1
+
+        # 不指定实体类型时合并所有实体集合的结果，按相似度排序
+        results = await manager.search_vectors("特斯拉: 电动汽车", "entity")
+        assert [result["vector_id"] for result in results] == ["entity_1", "entity_2"]
+        assert results[0]["score"] == pytest.approx(1.0)
+        # 单独建集合的类型只搜索该集合；其他类型在通用实体集合中按type过滤
+        assert [r["vector_id"] for r in await manager.search_vectors("x", "entity", 10, {"type": "公司"})] == ["entity_1"]
+        assert [r["vector_id"] for r in await manager.search_vectors("x", "entity", 10, {"type": "人物"})] == ["entity_2"]
+        assert len(await manager.search_vectors("x")) == 3
+        assert await manager.get_vector_count("entity") == 2
+
+        # 实体类型变化后移动到对应集合
+        await manager.update_vector("entity_2", "马斯克: 公司", {"type": "公司", "name": "马斯克"})
+        assert vector_store.count_vectors("kg.entity") == 0
+        moved = vector_store.get_vectors("kg.entity.company", ["entity_2"], include_vectors=False)
+        assert moved[0]["metadata"]["content_id"] == "2" and moved[0]["text"] == "马斯克: 公司"
+
+        await manager.delete_vector("entity_1")
+        assert vector_store.count_vectors("kg.entity.company") == 1
+
+    @pytest.mark.asyncio
+    async def test_search_projection_and_collection_handle_cache(self, vector_store, tmp_path, monkeypatch):
+        manager = make_manager(vector_store, tmp_path)
+        manager.switch_index("kg")
+        await manager.add_to_index("特斯拉: 电动汽车", 1, "entity", {"type": "公司", "name": "特斯拉"})
+
+        # 集合句柄已缓存，搜索不再列出全部集合
+        monkeypatch.setattr(vector_store.client, "list_collections", lambda *args, **kwargs: 1 / 0)
+        results = await manager.search_vectors("特斯拉: 电动汽车", "entity")
+        assert "content" not in results[0]
+        assert results[0]["metadata"]["name"] == "特斯拉"
+        results = await manager.search_vectors("特斯拉: 电动汽车", "entity", include_content=True,
+                                               metadata_keys=["content_id"])
+        assert results[0]["content"] == "特斯拉: 电动汽车"
+        assert results[0]["metadata"] == {"content_id": "1"}
+
+        # 后端默认只返回ID、距离和元数据，向量和文本需要显式请求
+        query = await StubEmbeddingService().aembed_text("特斯拉: 电动汽车")
+        lean = vector_store.search_vectors("kg.entity", query, 1)
+        assert set(lean[0]) == {"id", "score", "metadata"}
+        full = vector_store.search_vectors("kg.entity", query, 1,
+                                           include=["embeddings", "metadatas", "documents", "distances"])
+        assert full[0]["text"] == "特斯拉: 电动汽车" and len(full[0]["vector"]) == DIMENSION
+        with pytest.raises(IndexNotFoundError):
+            vector_store.search_vectors("kg.missing", query, 1)